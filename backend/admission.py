@@ -0,0 +1,272 @@
+"""
+Contrôle d'admission des endpoints coûteux, par classe et par client.
+
+Les requêtes rapides (`/api/health`, listings en cache) et les requêtes
+lourdes (SPARQL arbitraire, appels Gemini, sauvegardes du fichier)
+partagent les mêmes threads et le même CPU. Sans limite, quelques clients
+qui lancent des requêtes lourdes en parallèle ralentissent tout le monde.
+
+Chaque endpoint coûteux appartient à une classe (`query`, `llm`, `write`);
+les autres sont interactifs et ne passent par aucune file. Pour chaque
+classe:
+
+- au plus `concurrency` requêtes en cours; les suivantes attendent dans
+  une file FIFO d'au plus `queue` places, pendant au plus
+  ADMISSION_TIMEOUT_S secondes;
+- file pleine ou attente trop longue: 503 avec `Retry-After`, estimé
+  d'après la file et la durée moyenne des requêtes de la classe;
+- chaque client (en-tête `X-Client-Id`, sinon adresse IP) a un seau à
+  jetons par classe: `rate` requêtes par seconde, par rafales de `burst`.
+  Au-delà: 429 avec `Retry-After`, sans attendre de place.
+
+La place est rendue à la fin de la requête, y compris après la fin d'une
+réponse en flux (`/api/export`).
+
+Configuration (les classes non citées gardent DEFAULT_LIMITS et DEFAULT_RATES):
+    ADMISSION=false                                   désactiver
+    ADMISSION_LIMITS=query=2/16,llm=4/32,write=2/32   concurrence/file (0: illimité)
+    CLIENT_RATE_LIMITS=query=5/10,llm=2/5,write=10/20 débit/rafale par client (0: illimité)
+    ADMISSION_TIMEOUT_S=10
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import g as request_state, jsonify, request
+
+from concurrency import RateLimiter
+from metrics import Counter, Gauge, Histogram, registry
+
+CLIENT_HEADER = 'X-Client-Id'
+DEFAULT_LIMITS = 'query=2/16,llm=4/32,write=2/32'
+DEFAULT_RATES = 'query=5/10,llm=2/5,write=10/20'
+# Seaux à jetons gardés (les clients les moins récents sont oubliés au-delà)
+MAX_CLIENTS = 10000
+
+queue_depth = registry.register(Gauge(
+    'admission_queue_depth', "Requêtes en attente d'admission par classe"))
+in_flight = registry.register(Gauge(
+    'admission_in_flight', 'Requêtes admises en cours par classe'))
+queue_wait = registry.register(Histogram(
+    'admission_wait_seconds', "Attente dans la file d'admission par classe"))
+rejected = registry.register(Counter(
+    'admission_rejected_total', 'Requêtes refusées par classe et motif (rate_limited, queue_full, queue_timeout)'))
+
+
+class Rejected(Exception):
+    """Requête refusée: statut HTTP et délai conseillé (Retry-After, secondes)"""
+
+    def __init__(self, status, reason, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _paires(texte, nom):
+    """Limites par classe: `query=2/16,llm=4/32` -> {'query': (2.0, 16.0), 'llm': (4.0, 32.0)}"""
+    valeurs = {}
+    for element in texte.split(','):
+        if not element.strip():
+            continue
+        classe, _, limites = element.partition('=')
+        try:
+            a, _, b = limites.partition('/')
+            valeurs[classe.strip()] = (float(a), float(b or 0))
+        except ValueError:
+            raise ValueError(f"{nom} invalide: {element} (attendu classe=a/b)") from None
+    return valeurs
+
+
+class EndpointClass:
+    """Concurrence, file FIFO bornée et seaux à jetons par client d'une classe d'endpoints"""
+
+    def __init__(self, name, concurrency=0, queue=0, timeout=10.0, rate=0, burst=1):
+        self.name = name
+        self.concurrency = int(concurrency)
+        self.queue = int(queue)
+        self.timeout = timeout
+        self.rate = rate
+        self.burst = int(burst) or 1
+        self.active = 0
+        self.admitted = 0
+        self.rejected = {}
+        self._file = deque()
+        self._cond = threading.Condition()
+        self._clients = OrderedDict()
+        # Durée moyenne (mobile) d'une requête admise, pour Retry-After
+        self._duree = 0.1
+
+    # ------------------------------------------------------------------
+    # Limites par client
+    # ------------------------------------------------------------------
+
+    def _seau(self, client):
+        with self._cond:
+            seau = self._clients.get(client)
+            if seau is None:
+                seau = self._clients[client] = RateLimiter(self.rate, self.burst)
+                if len(self._clients) > MAX_CLIENTS:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+            return seau
+
+    def _refuser(self, status, reason, retry_after, message):
+        with self._cond:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        rejected.inc(**{'class': self.name, 'reason': reason})
+        raise Rejected(status, reason, max(1, math.ceil(retry_after)), message)
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def _estimation(self, rang):
+        """Secondes avant qu'une place se libère pour le rang `rang` de la file"""
+        return (rang + 1) * self._duree / max(1, self.concurrency)
+
+    def acquire(self, client):
+        """Attendre une place (lève Rejected); retourne l'attente en secondes"""
+        if self.rate > 0:
+            attente = self._seau(client).try_acquire()
+            if attente:
+                self._refuser(429, 'rate_limited', attente,
+                              f"Trop de requêtes {self.name} pour ce client, réessayer plus tard")
+        if self.concurrency <= 0:
+            with self._cond:
+                self.active += 1
+                self.admitted += 1
+            in_flight.inc(**{'class': self.name})
+            return 0.0
+
+        debut = time.monotonic()
+        with self._cond:
+            if not self._file and self.active < self.concurrency:
+                self.active += 1
+                self.admitted += 1
+                in_flight.inc(**{'class': self.name})
+                return 0.0
+            if len(self._file) >= self.queue:
+                estimation = self._estimation(len(self._file))
+                plein = True
+            else:
+                plein = False
+                ticket = object()
+                self._file.append(ticket)
+                queue_depth.set(len(self._file), **{'class': self.name})
+                echeance = debut + self.timeout
+                try:
+                    while self._file[0] is not ticket or self.active >= self.concurrency:
+                        reste = echeance - time.monotonic()
+                        if reste <= 0:
+                            break
+                        self._cond.wait(reste)
+                    else:
+                        self._file.popleft()
+                        self.active += 1
+                        self.admitted += 1
+                        ticket = None
+                        # Une autre place est peut-être libre pour le suivant
+                        self._cond.notify_all()
+                finally:
+                    if ticket is not None:
+                        self._file.remove(ticket)
+                        # Le suivant est peut-être devenu premier
+                        self._cond.notify_all()
+                    queue_depth.set(len(self._file), **{'class': self.name})
+                estimation = self._estimation(len(self._file))
+        if plein:
+            self._refuser(503, 'queue_full', estimation,
+                          f"File {self.name} pleine ({self.queue} requêtes en attente), réessayer plus tard")
+        if ticket is not None:
+            self._refuser(503, 'queue_timeout', estimation,
+                          f"Aucune place {self.name} libérée en {self.timeout:g} s, réessayer plus tard")
+        attente = time.monotonic() - debut
+        in_flight.inc(**{'class': self.name})
+        queue_wait.observe(attente, **{'class': self.name})
+        return attente
+
+    def release(self, duree):
+        with self._cond:
+            self.active -= 1
+            self._duree = 0.8 * self._duree + 0.2 * duree
+            self._cond.notify_all()
+        in_flight.dec(**{'class': self.name})
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency": self.concurrency,
+                "queue_limit": self.queue,
+                "client_rate": self.rate,
+                "client_burst": self.burst,
+                "active": self.active,
+                "queued": len(self._file),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "mean_duration_ms": round(self._duree * 1000, 1)
+            }
+
+
+class AdmissionControl:
+    """Classes d'endpoints et hooks Flask qui leur font passer l'admission"""
+
+    def __init__(self, endpoint_classes, limits=None, rates=None, timeout=None, enabled=None):
+        if enabled is None:
+            enabled = os.getenv('ADMISSION', 'true').lower() != 'false'
+        self.enabled = enabled
+        self.endpoint_classes = dict(endpoint_classes)
+        # Les classes absentes de la configuration gardent leurs valeurs par défaut
+        limites = _paires(DEFAULT_LIMITS, 'ADMISSION_LIMITS')
+        limites.update(_paires(os.getenv('ADMISSION_LIMITS', '') if limits is None else limits,
+                               'ADMISSION_LIMITS'))
+        debits = _paires(DEFAULT_RATES, 'CLIENT_RATE_LIMITS')
+        debits.update(_paires(os.getenv('CLIENT_RATE_LIMITS', '') if rates is None else rates,
+                              'CLIENT_RATE_LIMITS'))
+        if timeout is None:
+            timeout = float(os.getenv('ADMISSION_TIMEOUT_S', 10))
+        inconnues = (set(limites) | set(debits)) - set(self.endpoint_classes.values())
+        if inconnues:
+            raise ValueError(f"Classe(s) d'admission inconnue(s): {', '.join(sorted(inconnues))} "
+                             f"(valeurs possibles: {', '.join(sorted(set(self.endpoint_classes.values())))})")
+        self.classes = {}
+        for nom in sorted(set(self.endpoint_classes.values())):
+            concurrence, file = limites.get(nom, (0, 0))
+            debit, rafale = debits.get(nom, (0, 1))
+            self.classes[nom] = EndpointClass(nom, concurrence, file, timeout, debit, rafale)
+
+    @staticmethod
+    def client_id():
+        return request.headers.get(CLIENT_HEADER) or request.remote_addr or 'inconnu'
+
+    def stats(self):
+        return {"enabled": self.enabled, "classes": {nom: c.stats() for nom, c in self.classes.items()}}
+
+    def init_app(self, app):
+        """Admission avant les autres hooks de requête (à brancher tôt), libération au teardown"""
+
+        @app.before_request
+        def _admettre():
+            if not self.enabled:
+                return None
+            classe = self.classes.get(self.endpoint_classes.get(request.endpoint))
+            if classe is None:
+                return None
+            try:
+                classe.acquire(self.client_id())
+            except Rejected as e:
+                response = jsonify({"success": False, "error": str(e), "reason": e.reason})
+                response.status_code = e.status
+                response.headers['Retry-After'] = str(e.retry_after)
+                return response
+            request_state.admission = (classe, time.monotonic())
+
+        @app.teardown_request
+        def _liberer(exc):
+            admission = request_state.pop('admission', None)
+            if admission is not None:
+                classe, debut = admission
+                classe.release(time.monotonic() - debut)
@@ -1,16 +1,38 @@
-from flask import Flask, request, jsonify
+# En premier: référence des temps de démarrage (voir startup)
+import startup
+from flask import Flask, request, jsonify as flask_jsonify, Response, g as request_state, stream_with_context
 from flask_cors import CORS
-from rdflib import Graph, Namespace, URIRef, Literal, RDF, RDFS, OWL, XSD
-from rdflib.plugins.sparql import prepareQuery
-from SPARQLWrapper import SPARQLWrapper, JSON
+from werkzeug.local import LocalProxy
+from rdflib import Namespace, URIRef, Literal, RDF, RDFS, OWL
+from rdflib.util import guess_format
 import json
 import os
 import sys
 from dotenv import load_dotenv
-import google.generativeai as genai
 import re
 import requests
-from types import SimpleNamespace
+import functools
+import threading
+import metrics
+import encoding
+from storage import create_backend
+from replication import FusekiReplicator
+from sparql_results import SparqlResult, prepare_query, query_fuseki
+from collection_queries import LISTING_QUERIES, MULTI_VALUED
+from entity_types import EntityTypes, InvalidValue
+from similarity import ROOT_CLASSES
+from itinerary import valider_budget
+from export import BATCH_ROWS, EXTENSIONS, Export, export_query, stream_graph
+from tenants import DEFAULT_TENANT, Tenant, TenantRegistry
+from parallel_sparql import ParallelEvaluator
+from dependencies import ANY, track_reads, untracked, write_set
+from persistence import DURABILITY_MODES, default_durability
+from concurrency import RateLimiter, map_concurrently
+from admission import AdmissionControl
+from metrics import span
+from startup import LazyComponent, readiness, warm_up
+
+startup.report.checkpoint('imports')
 
 # Forcer l'encodage UTF-8 pour la console
 if sys.platform == 'win32':
@@ -23,97 +45,523 @@ load_dotenv()
 
 app = Flask(__name__)
 CORS(app)
+metrics.init_app(app)
+encoding.init_app(app)
+
+# Classe d'admission des endpoints coûteux (admission.py); les autres endpoints sont interactifs
+ENDPOINT_CLASSES = {
+    'execute_query': 'query',
+    'export_results': 'query',
+    'recommend_itineraries': 'query',
+    'similar_entities': 'query',
+    'natural_language_query': 'llm',
+    'natural_language_batch': 'llm',
+    'create_entity': 'write',
+    'update_entity': 'write',
+    'delete_entity': 'write'
+}
+# Avant la sélection du locataire: une requête refusée ne charge pas de locataire froid
+admission_control = AdmissionControl(ENDPOINT_CLASSES)
+admission_control.init_app(app)
 
-# Configuration Google Gemini
+def jsonify(*args, **kwargs):
+    """jsonify instrumenté (span de sérialisation), au format négocié par Accept (voir encoding)"""
+    with span('serialization'):
+        mimetype, _ = encoding.negotiate()
+        if mimetype != encoding.JSON and len(args) == 1 and not kwargs:
+            corps, mimetype = encoding.encode(args[0], mimetype, curie_namespaces())
+            return app.response_class(corps, mimetype=mimetype)
+        return flask_jsonify(*args, **kwargs)
+
+# Configuration Google Gemini (importé et configuré au préchauffage: l'import seul prend ~1 s)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
-if GEMINI_API_KEY:
+
+def init_gemini():
+    if not GEMINI_API_KEY:
+        print("⚠️ ATTENTION: Clé API Gemini non configurée. L'IA ne sera pas disponible.")
+        return None
     try:
+        import google.generativeai as genai
         genai.configure(api_key=GEMINI_API_KEY)
         # Utiliser Gemini 2.5 Flash (rapide et gratuit)
-        gemini_model = genai.GenerativeModel('models/gemini-2.5-flash')
+        model = genai.GenerativeModel('models/gemini-2.5-flash')
         print("✅ Google Gemini AI configurée avec succès! (modèle: gemini-2.5-flash)")
+        return model
     except Exception as e:
-        gemini_model = None
         print(f"⚠️ Erreur configuration Gemini: {e}")
-else:
-    gemini_model = None
-    print("⚠️ ATTENTION: Clé API Gemini non configurée. L'IA ne sera pas disponible.")
+        raise
+
+gemini_client = LazyComponent('gemini', init_gemini)
+
+def gemini():
+    """Modèle Gemini (None si indisponible); attend la fin du préchauffage si besoin"""
+    return gemini_client.get()
+
+# Débit maximal des appels Gemini (tout le processus) et appels simultanés d'un lot /api/nl-query/batch
+NL_BATCH_CONCURRENCY = int(os.getenv('NL_BATCH_CONCURRENCY', 8))
+NL_BATCH_MAX = int(os.getenv('NL_BATCH_MAX', 100))
+gemini_limiter = RateLimiter(float(os.getenv('GEMINI_RPS', 10)), burst=NL_BATCH_CONCURRENCY)
 
 # Namespace de l'ontologie
 NS = Namespace("http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#")
 
 # Configuration Fuseki
 FUSEKI_ENDPOINT = "http://localhost:3030/tourisme/sparql"
+FUSEKI_UPDATE_ENDPOINT = "http://localhost:3030/tourisme/update"
 USE_FUSEKI = os.getenv('USE_FUSEKI', 'false').lower() == 'true'
 
-# Vérifier si Fuseki est disponible
-fuseki_available = False
+# Réplication des écritures vers Fuseki (active même si Fuseki est injoignable
+# au démarrage: les lots attendent dans la boîte d'envoi)
+fuseki_replicator = None
 if USE_FUSEKI:
+    fuseki_replicator = FusekiReplicator(
+        FUSEKI_UPDATE_ENDPOINT,
+        os.getenv('FUSEKI_OUTBOX', 'fuseki-outbox.jsonl'),
+        batch_delay=float(os.getenv('FUSEKI_BATCH_MS', 50)) / 1000)
+    print(f"🔁 Réplication des écritures vers {FUSEKI_UPDATE_ENDPOINT}")
+
+# Vérifier si Fuseki est disponible (sonde au préchauffage: jusqu'à 2 s sans réponse)
+def init_fuseki():
+    if not USE_FUSEKI:
+        return None
     try:
         response = requests.get("http://localhost:3030", timeout=2)
-        fuseki_available = response.status_code == 200
-        if fuseki_available:
-            print("✅ Fuseki détecté et actif sur http://localhost:3030")
-            sparql_wrapper = SPARQLWrapper(FUSEKI_ENDPOINT)
-            sparql_wrapper.setReturnFormat(JSON)
-        else:
-            print("⚠️ Fuseki configuré mais non accessible")
-    except:
+    except requests.RequestException:
         print("⚠️ Fuseki non disponible, utilisation de RDFLib en mémoire")
-        USE_FUSEKI = False
+        return None
+    if response.status_code != 200:
+        print("⚠️ Fuseki configuré mais non accessible")
+        return None
+    print("✅ Fuseki détecté et actif sur http://localhost:3030")
+    # Session HTTP réutilisée (pool de connexions keep-alive)
+    return requests.Session()
 
-# Charger l'ontologie RDF en mémoire (toujours comme fallback)
-print("📚 Chargement de l'ontologie en mémoire avec RDFLib...")
-g = Graph()
-g.parse("../ws.rdf", format="xml")
+fuseki_client = LazyComponent('fuseki', init_fuseki)
+
+# Fichier de l'ontologie (ONTOLOGY_FILE permet de pointer vers un jeu de données de test)
+ONTOLOGY_FILE = os.getenv('ONTOLOGY_FILE', '../ws.rdf')
+ONTOLOGY_FORMAT = guess_format(ONTOLOGY_FILE) or 'xml'
+
+# Charger l'ontologie (RDF_STORE=memory en mémoire, ou sqlite sur disque)
+storage_backend = create_backend(ONTOLOGY_FILE, ONTOLOGY_FORMAT)
+print(f"📚 Chargement de l'ontologie avec RDFLib (stockage: {storage_backend.name})...")
+# Un locataire porte le graphe et tout ce qui en dérive: génération (incrémentée
+# à chaque modification, pour les caches), optimiseur d'itinéraires, index
+# d'adjacence des propriétés d'objet et flux des changements (SSE)
+with startup.report.phase('ontology'):
+    default_tenant = Tenant(DEFAULT_TENANT, storage_backend, NS)
 print("✅ Ontologie chargée avec succès!")
+if default_tenant.reasoner is not None:
+    reasoner_report = default_tenant.reasoner.stats()
+    print(f"🧠 {reasoner_report['inferred_triples']} fait(s) inféré(s) ({', '.join(reasoner_report['rules'])}) "
+          f"en {reasoner_report['materialize_ms']} ms")
+
+# Autres ontologies servies par le même processus (TENANTS_DIR/<nom>.nt|.ttl|.rdf)
+tenant_registry = TenantRegistry(
+    default_tenant, NS,
+    tenants_dir=os.getenv('TENANTS_DIR'),
+    schema_file=os.getenv('TENANT_SCHEMA_FILE'),
+    max_hot=int(os.getenv('MAX_HOT_TENANTS', 8)))
+tenant_registry.init_app(app)
+if tenant_registry.tenants_dir:
+    print(f"🏢 Locataires servis depuis {tenant_registry.tenants_dir} (/t/<nom>/api/... ou en-tête X-Tenant)")
+
+def current_tenant():
+    """Locataire de la requête en cours"""
+    return tenant_registry.current()
+
+def entity_types():
+    """Types d'entités du locataire en cours (attributs, conversions; entity_types.py)"""
+    return current_tenant().entity_types
+
+def curie_namespaces():
+    """Espace de noms -> préfixe des CURIE des formats compacts (ns pour l'ontologie)"""
+    espaces = {str(NS): 'ns'}
+    for prefixe, espace in g.namespaces():
+        if prefixe and prefixe != 'ns':
+            espaces.setdefault(str(espace), prefixe)
+    return espaces
+
+# Graphe du locataire courant
+g = LocalProxy(lambda: current_tenant().graph)
 
-def reload_graph():
-    """Recharger le graphe RDF depuis ws.rdf"""
-    global g
+# Évaluation SPARQL parallèle (opt-in par requête): pool de PARALLEL_WORKERS processus
+parallel_evaluator = ParallelEvaluator(int(os.getenv('PARALLEL_WORKERS', 0)) or None)
+
+# Durabilité par défaut des écritures (sync: journal synchronisé avant la réponse)
+WRITE_DURABILITY = default_durability()
+# Attente maximale de la synchronisation du journal en mode sync (secondes)
+WRITE_TIMEOUT = float(os.getenv('WRITE_TIMEOUT', 10))
+# Intervalle de relevé du fichier de l'ontologie (modifications externes, 0 pour désactiver)
+WATCH_INTERVAL_S = float(os.getenv('WATCH_INTERVAL_S', 1))
+# Lignes par lot (row group) des exports en flux, si la requête ne le précise pas
+EXPORT_BATCH_ROWS = int(os.getenv('EXPORT_BATCH_ROWS', BATCH_ROWS))
+
+# Delta de la mutation en cours (par thread de requête), publié à la sauvegarde
+pending_changes = threading.local()
+
+# Classes racines des collections exposées par l'API
+COLLECTION_CLASSES = {
+    'Destination': 'destinations',
+    'Hébergement': 'hebergements',
+    'ActivitéTouristique': 'activites',
+    'Transport': 'transports',
+    'Services': 'services',
+    'Nourriture': 'nourritures',
+    'Equipement': 'equipements',
+    'Personne': 'personnes',
+    'CertificationÉco': 'certifications'
+}
+
+def notify_graph_change(added=(), removed=(), tenant=None):
+    """Propager un delta de triplets aux index et caches dérivés du graphe
+
+    Les caches ne perdent que les entrées qui ont lu une classe ou un
+    prédicat écrit par le delta (`dependencies.write_set`), faits inférés
+    qu'il ajoute ou retire compris.
+    """
+    tenant = tenant or current_tenant()
+    tenant.adjacency_index.apply(added, removed)
+    delta = list(added) + list(removed)
+    if EntityTypes.affected_by(delta):
+        tenant.entity_types = EntityTypes(tenant.graph, tenant.entity_types.ns)
+    tenant.similarity_index.apply(added, removed)
+    if tenant.reasoner is not None:
+        inferes_ajoutes, inferes_retires = tenant.reasoner.apply(added, removed)
+        delta += inferes_ajoutes + inferes_retires
+    jetons = write_set(delta, tenant.graph)
+    tenant.bgp_cache.invalidate(jetons)
+    tenant.response_cache.invalidate(jetons)
+    tenant.itinerary_optimizer.invalidate(jetons)
+
+def _pending():
+    if not hasattr(pending_changes, 'added'):
+        pending_changes.added = []
+        pending_changes.removed = []
+    return pending_changes
+
+def graph_add(triple):
+    """Ajouter un triplet au graphe en maintenant les index dérivés"""
+    tenant = current_tenant()
+    with tenant.write_lock:
+        g.add(triple)
+        notify_graph_change(added=[triple])
+        tenant.writer.track([triple])
+    _pending().added.append(triple)
+
+def graph_remove(pattern):
+    """Retirer les triplets correspondant au motif en maintenant les index dérivés"""
+    tenant = current_tenant()
+    with tenant.write_lock:
+        candidats = list(g.triples(pattern))
+        g.remove(pattern)
+        # Seuls les triplets réellement retirés (pas le schéma partagé d'un locataire)
+        removed = [t for t in candidats if t not in g]
+        notify_graph_change(removed=removed)
+        tenant.writer.track(removed)
+    _pending().removed.extend(removed)
+    return removed
+
+def entity_collection(types, graph=g):
+    """Collection de l'API (destinations, hebergements...) d'après les types RDF"""
+    for t in types:
+        for cls in graph.transitive_objects(t, RDFS.subClassOf):
+            name = str(cls).split('#')[-1]
+            if name in COLLECTION_CLASSES:
+                return COLLECTION_CLASSES[name]
+    return None
+
+def take_pending_changes():
+    """Récupérer (et vider) le delta net de la mutation en cours"""
+    pending = _pending()
+    added, removed = pending.added, pending.removed
+    pending.added, pending.removed = [], []
+    # Un triplet ajouté puis retiré (ou l'inverse) dans la même requête ne compte
+    # que par son état final
+    added = [t for t in dict.fromkeys(added) if t in g]
+    removed = [t for t in dict.fromkeys(removed) if t not in g]
+    return added, removed
+
+def publish_changes(added, removed, generation, tenant=None):
+    """Publier le delta d'une génération sur le flux de changements
+
+    Appelée sous le verrou d'écriture du locataire, dans le bloc qui a
+    produit `generation`: les événements sortent dans l'ordre des générations.
+    """
+    if not added and not removed:
+        return
+    
+    tenant = tenant or current_tenant()
+    graph = tenant.graph
+    entities = []
+    for subject in dict.fromkeys(s for s, _, _ in added + removed):
+        deleted = (subject, None, None) not in graph
+        if deleted:
+            types = [o for s, p, o in removed if s == subject and p == RDF.type]
+        else:
+            types = list(graph.objects(subject, RDF.type))
+        entities.append({
+            "uri": str(subject),
+            "types": [str(t).split('#')[-1] for t in types if t != OWL.NamedIndividual],
+            "collection": entity_collection(types, graph),
+            "deleted": deleted
+        })
+    tenant.change_feed.publish(generation, added, removed, entities)
+
+def apply_external_changes(tenant, added, removed):
+    """Appliquer le delta d'une modification externe du fichier d'un locataire
+
+    Appelée par la surveillance du fichier (file_watch), verrou d'écriture
+    tenu, hors de toute requête. Le fichier contient déjà ce delta: rien à
+    journaliser ni à sauvegarder.
+    """
+    for triple in removed:
+        tenant.graph.remove(triple)
+    for triple in added:
+        tenant.graph.add(triple)
+    notify_graph_change(added, removed, tenant)
+    tenant.generation += 1
+    tenant.writer.external(tenant.generation)
+    if fuseki_replicator is not None and tenant is default_tenant:
+        fuseki_replicator.submit(added, removed)
+    publish_changes(added, removed, tenant.generation, tenant)
+    print(f"🔄 Fichier {tenant.backend.source_file} modifié: {len(added)} triplet(s) ajouté(s), {len(removed)} retiré(s)")
+
+def watch_tenant_file(tenant):
+    tenant.watch(apply_external_changes, WATCH_INTERVAL_S)
+
+# Modifications externes de ws.rdf (et des fichiers des locataires) appliquées par delta
+watch_tenant_file(default_tenant)
+tenant_registry.watch = watch_tenant_file
+
+@app.before_request
+def reset_pending_changes():
+    """Chaque requête démarre avec un delta vide"""
+    pending_changes.added = []
+    pending_changes.removed = []
+
+@app.before_request
+def choose_durability():
+    """Durabilité des écritures de la requête: champ JSON "durability" (sync ou async)"""
+    data = request.get_json(silent=True) if request.method in ('POST', 'PUT', 'DELETE') else None
+    mode = data.get('durability') if isinstance(data, dict) else None
+    mode = mode or request.args.get('durability') or WRITE_DURABILITY
+    if mode not in DURABILITY_MODES:
+        return jsonify({
+            "success": False,
+            "error": f"Durabilité inconnue: {mode} (valeurs possibles: sync, async)"
+        }), 400
+    request_state.durability = mode
+
+def query_graph(query, parallel=False):
+    """Exécuter une requête SPARQL sur le graphe RDFLib en mesurant parse et évaluation
+
+    La requête lit les faits assertés et les faits inférés du locataire
+    (`reasoner`). Les BGP déjà évalués par une requête précédente sont
+    servis par le cache de solutions du locataire. Avec `parallel`, les
+    autres sont évalués sur les fragments du graphe répartis entre les
+    processus de `parallel_evaluator`.
+    """
+    tenant = current_tenant()
+    graph = tenant.sparql_graph
+    with span('sparql_parse'):
+        prepared = prepare_query(query, graph)
+    jeton_cache = tenant.bgp_cache.activate(graph)
+    jeton = parallel_evaluator.activate(graph, tenant.generation, tenant.write_lock) if parallel else None
     try:
-        temp_graph = Graph()
-        temp_graph.parse("../ws.rdf", format="xml")
-        
-        # Remplacer le graphe global
-        g = temp_graph
-        
-        # Réenregistrer les namespaces
-        g.bind("default1", NS)
-        g.bind("rdf", RDF)
-        g.bind("rdfs", RDFS)
-        g.bind("owl", OWL)
-        g.bind("xsd", XSD)
-        
-        # Log simplifie sans caracteres speciaux
-        triplet_count = len(g)
-        return True
-    except Exception as e:
-        print(f"[ERROR] Erreur lors du rechargement: {e}")
-        return False
+        with span('sparql_eval'):
+            results = SparqlResult.from_rdflib(graph.query(prepared))
+            # Forcer l'évaluation (paresseuse dans RDFLib) pour la mesurer ici
+            len(results)
+    finally:
+        if jeton is not None:
+            parallel_evaluator.deactivate(jeton)
+        tenant.bgp_cache.deactivate(jeton_cache)
+    return results
+
+def call_gemini(prompt):
+    """Appel Gemini instrumenté et limité en débit (GEMINI_RPS); retourne le texte de la réponse"""
+    gemini_limiter.acquire()
+    with span('gemini_call'):
+        return gemini().generate_content(prompt).text
 
-def execute_sparql(query):
-    """Exécute une requête SPARQL sur Fuseki ou RDFLib et retourne un format uniforme"""
-    if USE_FUSEKI and fuseki_available:
+def execute_sparql(query, parallel=False):
+    """Exécute une requête SPARQL sur Fuseki ou RDFLib et retourne un SparqlResult"""
+    # Fuseki ne contient que l'ontologie du locataire par défaut
+    fuseki_session = fuseki_client.get() if current_tenant() is default_tenant else None
+    if fuseki_session is not None:
+        # Fuseki est répliqué en différé: ses réponses ne vont pas dans le cache
+        untracked()
         try:
-            sparql_wrapper.setQuery(query)
-            results = sparql_wrapper.query().convert()
-            # Convertir format Fuseki JSON en objets similaires à RDFLib
-            bindings = results.get("results", {}).get("bindings", [])
-            return [SimpleNamespace(**{k: v.get("value") for k, v in binding.items()}) 
-                    for binding in bindings]
+            with span('fuseki_http'):
+                # Réponse TSV lue en flux: les lignes sont décodées à l'accès
+                return query_fuseki(fuseki_session, FUSEKI_ENDPOINT, query)
         except Exception as e:
             print(f"❌ Erreur Fuseki: {e}, fallback vers RDFLib")
-            return g.query(query)
+            return query_graph(query, parallel)
     else:
-        return g.query(query)
+        return query_graph(query, parallel)
+
+def multi_valued(collection, **converters):
+    """{champ: {uri: [valeurs]}} des propriétés multivaluées d'un listing (MULTI_VALUED)
+
+    Une requête `?item ?valeur` par propriété, regroupée par entité en une
+    passe, au lieu d'une jointure qui multiplie les lignes de la requête de
+    base. `converters` convertit les valeurs d'un champ (`empreintes=float`).
+    """
+    champs = {}
+    for champ, query in MULTI_VALUED.get(collection, {}).items():
+        convertir = converters.get(champ)
+        groupes = {}
+        for row in execute_sparql(query).records(**({'valeur': convertir} if convertir else {})):
+            if row['valeur'] is not None:
+                groupes.setdefault(row['item'], {})[row['valeur']] = None
+        champs[champ] = {uri: list(valeurs) for uri, valeurs in groupes.items()}
+    return champs
+
+def stream_sparql(query):
+    """Comme execute_sparql, mais résultat lu en flux et jamais retenu (exports)"""
+    fuseki_session = fuseki_client.get() if current_tenant() is default_tenant else None
+    if fuseki_session is not None:
+        try:
+            return query_fuseki(fuseki_session, FUSEKI_ENDPOINT, query, timeout=300)
+        except Exception as e:
+            print(f"❌ Erreur Fuseki: {e}, fallback vers RDFLib")
+    return stream_graph(current_tenant().sparql_graph, query)
+
+def cached_response(view):
+    """Réponse mise en cache par locataire, URL, format et compression négociés
+
+    Les classes et prédicats lus sont relevés pendant le calcul (BGP
+    évalués). L'entrée n'est invalidée que par une mutation qui les écrit.
+    Le corps est mis en cache déjà encodé et compressé.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_tenant().response_cache
+        if not cache.enabled:
+            return view(*args, **kwargs)
+        variante = encoding.negotiate()
+        cle = (request.full_path,) + variante
+        entree = cache.get(cle)
+        if entree is not None:
+            corps, mimetype, compression = entree
+            response = app.response_class(corps, mimetype=mimetype)
+            if compression:
+                response.headers['Content-Encoding'] = compression
+            response.vary.update(('Accept', 'Accept-Encoding'))
+            response.headers['X-Cache'] = 'HIT'
+            return response
+        epoque = cache.epoch()
+        with track_reads() as lectures:
+            response = app.make_response(view(*args, **kwargs))
+        if response.status_code == 200 and lectures.complet and lectures.jetons:
+            with span('compression'):
+                encoding.compress_response(response, variante[1], app.config['COMPRESS_MIN_BYTES'])
+            corps = response.get_data()
+            jetons = ANY if ANY in lectures.jetons else lectures.jetons
+            cache.put(cle, (corps, response.mimetype, response.headers.get('Content-Encoding')),
+                      jetons, len(corps), epoque)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+    return wrapper
+
+# Index de similarité des collections du locataire par défaut, construits au préchauffage
+similarity_warm_up = LazyComponent(
+    'similarity', lambda: default_tenant.similarity_index.warm(default_tenant.graph))
+
+# Composants initialisés au préchauffage (voir startup)
+WARM_UP_COMPONENTS = [fuseki_client, gemini_client, similarity_warm_up]
 
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Vérifier l'état de l'API"""
-    return jsonify({"status": "ok", "message": "API en ligne"})
+    """Vérifier l'état de l'API (vivante, prête, rapport de démarrage)"""
+    ready, components = readiness(WARM_UP_COMPONENTS)
+    status = {
+        "status": "ok",
+        "message": "API en ligne",
+        "tenant": current_tenant().name,
+        "live": True,
+        "ready": ready,
+        "components": components,
+        "startup": startup.report.as_dict()
+    }
+    if fuseki_replicator is not None:
+        status["replication"] = fuseki_replicator.status()
+    return jsonify(status)
+
+@app.route('/api/health/live', methods=['GET'])
+def health_live():
+    """Vivacité: le processus répond (sans attendre le préchauffage)"""
+    return jsonify({"live": True})
+
+@app.route('/api/health/ready', methods=['GET'])
+def health_ready():
+    """Disponibilité: 503 tant que le préchauffage des composants n'est pas terminé"""
+    ready, components = readiness(WARM_UP_COMPONENTS)
+    return jsonify({"ready": ready, "components": components}), 200 if ready else 503
+
+@app.route('/api/tenants', methods=['GET'])
+def list_tenants():
+    """Locataires disponibles et locataires chargés en mémoire"""
+    return jsonify({
+        "tenants": tenant_registry.names(),
+        **tenant_registry.stats()
+    })
+
+@app.route('/api/cache', methods=['GET'])
+def cache_stats():
+    """Taux de succès des caches du locataire"""
+    tenant = current_tenant()
+    return jsonify({
+        "bgp": tenant.bgp_cache.stats(),
+        "responses": tenant.response_cache.stats(),
+        "itineraries": tenant.itinerary_optimizer.stats()
+    })
+
+@app.route('/api/admission', methods=['GET'])
+def admission_stats():
+    """Files d'admission: places occupées, requêtes en attente, refus par motif"""
+    return jsonify(admission_control.stats())
+
+@app.route('/api/reasoner', methods=['GET'])
+def reasoner_stats():
+    """Règles actives et faits inférés du locataire (null si REASONER_RULES est vide)"""
+    reasoner = current_tenant().reasoner
+    return jsonify({"reasoner": reasoner.stats() if reasoner is not None else None})
+
+@app.route('/api/persistence', methods=['GET'])
+def persistence_status():
+    """État de l'écrivain du locataire; avec ?generation=N, attend que N soit journalisée"""
+    writer = current_tenant().writer
+    durable = None
+    generation = request.args.get('generation', type=int)
+    if generation is not None:
+        timeout = min(request.args.get('timeout', 0, type=float), WRITE_TIMEOUT)
+        durable = writer.wait(generation, timeout)
+    watcher = current_tenant().watcher
+    return jsonify({
+        **writer.status(),
+        "durable": durable,
+        "default_durability": WRITE_DURABILITY,
+        "file_watch": watcher.status() if watcher is not None else None
+    })
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """Flux Server-Sent Events des changements du graphe (rejeu depuis ?since=)"""
+    since = request.args.get('since', request.headers.get('Last-Event-ID'))
+    try:
+        since = int(since) if since is not None else None
+    except ValueError:
+        since = None
+    return Response(current_tenant().change_feed.stream(since), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/api/ontology/stats', methods=['GET'])
+@cached_response
 def get_ontology_stats():
     """Obtenir les statistiques de l'ontologie"""
     query = """
@@ -131,299 +579,172 @@ def get_ontology_stats():
         UNION {?ind a ?type . ?type a owl:Class}
     }
     """
-    results = g.query(query)
-    for row in results:
+    results = query_graph(query)
+    for row in results.records(classes=int, properties=int, individuals=int):
         return jsonify({
-            "classes": int(row.classes) if row.classes else 0,
-            "properties": int(row.properties) if row.properties else 0,
-            "individuals": int(row.individuals) if row.individuals else 0
+            "classes": row['classes'] or 0,
+            "properties": row['properties'] or 0,
+            "individuals": row['individuals'] or 0
         })
 
 @app.route('/api/destinations', methods=['GET'])
+@cached_response
 def get_destinations():
     """Récupérer toutes les destinations"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    
-    SELECT DISTINCT ?destination ?nom
-    WHERE {
-        ?destination rdf:type ns:Destination .
-        OPTIONAL { ?destination ns:nomDestination ?nom }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['destinations'])
     # Utiliser un dictionnaire pour dédupliquer par URI
     destinations_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'destination', ''))
+    for row in results.records():
+        uri = row['destination']
         if uri not in destinations_dict:
             destinations_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
+                "nom": row['nom'],
                 "type": "Destination"
             }
     return jsonify(list(destinations_dict.values()))
 
 @app.route('/api/hebergements', methods=['GET'])
+@cached_response
 def get_hebergements():
     """Récupérer tous les hébergements"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    PREFIX owl: <http://www.w3.org/2002/07/owl#>
-    
-    SELECT DISTINCT ?hebergement ?nom ?certification
-    WHERE {
-        {
-            ?hebergement rdf:type ns:Hébergement .
-        } UNION {
-            ?hebergement rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:Hébergement .
-        }
-        OPTIONAL { ?hebergement ns:nomHebergement ?nom }
-        OPTIONAL { ?hebergement ns:possèdeCertification ?cert .
-                   ?cert ns:nomCertification ?certification }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['hebergements'])
+    certifications = multi_valued('hebergements')['certifications']
     # Dédupliquer par URI
     hebergements_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'hebergement', ''))
+    for row in results.records():
+        uri = row['hebergement']
         if uri not in hebergements_dict:
+            noms = certifications.get(uri, [])
             hebergements_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
+                "nom": row['nom'],
                 "type": "Hébergement",
-                "certification": str(getattr(row, 'certification', '')) if getattr(row, 'certification', None) else None
+                "certification": noms[0] if noms else None,
+                "certifications": noms
             }
     return jsonify(list(hebergements_dict.values()))
 
 @app.route('/api/activites', methods=['GET'])
+@cached_response
 def get_activites():
     """Récupérer toutes les activités touristiques"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?activite ?nom ?duree ?empreinte
-    WHERE {
-        {
-            ?activite rdf:type ns:ActivitéTouristique .
-        } UNION {
-            ?activite rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:ActivitéTouristique .
-        }
-        OPTIONAL { ?activite ns:nomActivité ?nom }
-        OPTIONAL { ?activite ns:duree ?duree }
-        OPTIONAL { ?activite ns:aEmpreinteCarbone ?ec .
-                   ?ec ns:empreinte ?empreinte }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['activites'])
+    types = entity_types()
+    empreintes = multi_valued('activites', **types['EmpreinteCarbone'].decoders(
+        empreintes='empreinte'))['empreintes']
     # Dédupliquer par URI
     activites_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'activite', ''))
+    for row in results.records(**types['ActivitéTouristique'].decoders('duree')):
+        uri = row['activite']
         if uri not in activites_dict:
-            duree_val = getattr(row, 'duree', None)
-            empreinte_val = getattr(row, 'empreinte', None)
+            valeurs = empreintes.get(uri, [])
             activites_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
-                "duree": int(duree_val) if duree_val else None,
-                "empreinte": float(empreinte_val) if empreinte_val else None,
+                "nom": row['nom'],
+                "duree": row['duree'],
+                "empreinte": valeurs[0] if valeurs else None,
+                "empreintes": valeurs,
                 "type": "Activité Touristique"
             }
     return jsonify(list(activites_dict.values()))
 
 @app.route('/api/transports', methods=['GET'])
+@cached_response
 def get_transports():
     """Récupérer tous les moyens de transport"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?transport ?empreinte
-    WHERE {
-        ?transport rdf:type ns:Transport .
-        OPTIONAL { ?transport ns:aEmpreinteCarbone ?ec .
-                   ?ec ns:empreinte ?empreinte }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['transports'])
+    empreintes = multi_valued('transports', **entity_types()['EmpreinteCarbone'].decoders(
+        empreintes='empreinte'))['empreintes']
     # Dédupliquer par URI
     transports_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'transport', ''))
+    for row in results.records():
+        uri = row['transport']
         if uri not in transports_dict:
-            empreinte_val = getattr(row, 'empreinte', None)
+            valeurs = empreintes.get(uri, [])
             transports_dict[uri] = {
                 "uri": uri,
                 "type": "Transport",
-                "empreinte": float(empreinte_val) if empreinte_val else None
+                "empreinte": valeurs[0] if valeurs else None,
+                "empreintes": valeurs
             }
     return jsonify(list(transports_dict.values()))
 
 @app.route('/api/services', methods=['GET'])
+@cached_response
 def get_services():
     """Récupérer tous les services"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?service ?nom ?prix
-    WHERE {
-        {
-            ?service rdf:type ns:Services .
-        } UNION {
-            ?service rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:Services .
-        }
-        OPTIONAL { ?service ns:nomService ?nom }
-        OPTIONAL { ?service ns:prix ?prix }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['services'])
     services_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'service', ''))
+    for row in results.records(**entity_types()['Services'].decoders('prix')):
+        uri = row['service']
         if uri not in services_dict:
-            prix_val = getattr(row, 'prix', None)
             services_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
-                "prix": float(prix_val) if prix_val else None
+                "nom": row['nom'],
+                "prix": row['prix']
             }
     return jsonify(list(services_dict.values()))
 
 @app.route('/api/nourritures', methods=['GET'])
+@cached_response
 def get_nourritures():
     """Récupérer toutes les nourritures"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?nourriture ?nom
-    WHERE {
-        {
-            ?nourriture rdf:type ns:Nourriture .
-        } UNION {
-            ?nourriture rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:Nourriture .
-        }
-        OPTIONAL { ?nourriture ns:nomNourriture ?nom }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['nourritures'])
     nourritures_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'nourriture', ''))
+    for row in results.records():
+        uri = row['nourriture']
         if uri not in nourritures_dict:
             nourritures_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None
+                "nom": row['nom']
             }
     return jsonify(list(nourritures_dict.values()))
 
 @app.route('/api/equipements', methods=['GET'])
+@cached_response
 def get_equipements():
     """Récupérer tous les équipements"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?equipement ?nom
-    WHERE {
-        {
-            ?equipement rdf:type ns:Equipement .
-        } UNION {
-            ?equipement rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:Equipement .
-        }
-        OPTIONAL { ?equipement ns:nomEquipement ?nom }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['equipements'])
     equipements_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'equipement', ''))
+    for row in results.records():
+        uri = row['equipement']
         if uri not in equipements_dict:
             equipements_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None
+                "nom": row['nom']
             }
     return jsonify(list(equipements_dict.values()))
 
 @app.route('/api/personnes', methods=['GET'])
+@cached_response
 def get_personnes():
     """Récupérer toutes les personnes"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?personne ?nom ?age
-    WHERE {
-        {
-            ?personne rdf:type ns:Personne .
-        } UNION {
-            ?personne rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:Personne .
-        }
-        OPTIONAL { ?personne ns:nomVoyageur ?nom }
-        OPTIONAL { ?personne ns:age ?age }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['personnes'])
     personnes_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'personne', ''))
+    for row in results.records(**entity_types()['Personne'].decoders('age')):
+        uri = row['personne']
         if uri not in personnes_dict:
-            age_val = getattr(row, 'age', None)
             personnes_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
-                "age": int(age_val) if age_val else None
+                "nom": row['nom'],
+                "age": row['age']
             }
     return jsonify(list(personnes_dict.values()))
 
 @app.route('/api/certifications', methods=['GET'])
+@cached_response
 def get_certifications():
     """Récupérer toutes les certifications"""
-    query = """
-    PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-    
-    SELECT DISTINCT ?certification ?nom ?date
-    WHERE {
-        {
-            ?certification rdf:type ns:CertificationÉco .
-        } UNION {
-            ?certification rdf:type ?subclass .
-            ?subclass rdfs:subClassOf ns:CertificationÉco .
-        }
-        OPTIONAL { ?certification ns:nomCertification ?nom }
-        OPTIONAL { ?certification ns:dateValidite ?date }
-    }
-    """
-    results = execute_sparql(query)
+    results = execute_sparql(LISTING_QUERIES['certifications'])
     certifications_dict = {}
-    for row in results:
-        uri = str(getattr(row, 'certification', ''))
+    for row in results.records():
+        uri = row['certification']
         if uri not in certifications_dict:
             certifications_dict[uri] = {
                 "uri": uri,
-                "nom": str(getattr(row, 'nom', '')) if getattr(row, 'nom', None) else None,
-                "dateValidite": str(getattr(row, 'date', '')) if getattr(row, 'date', None) else None
+                "nom": row['nom'],
+                "dateValidite": row['date']
             }
     return jsonify(list(certifications_dict.values()))
 
@@ -434,16 +755,12 @@ def execute_query():
     sparql_query = data.get('query', '')
     
     try:
-        results = execute_sparql(sparql_query)
-        result_list = []
-        for row in results:
-            result_dict = {}
-            for var in results.vars:
-                result_dict[str(var)] = str(row[var]) if row[var] else None
-            result_list.append(result_dict)
+        results = execute_sparql(sparql_query, parallel=bool(data.get('parallel')))
+        result_list = results.typed_records()
         return jsonify({
             "success": True,
             "results": result_list,
+            "columns": results.describe(),
             "count": len(result_list)
         })
     except Exception as e:
@@ -452,9 +769,188 @@ def execute_query():
             "error": str(e)
         }), 400
 
+@app.route('/api/export', methods=['GET', 'POST'])
+def export_results():
+    """Exporter en flux une requête SPARQL ou une collection (CSV, Parquet, Arrow)"""
+    data = request.get_json(silent=True) if request.method == 'POST' else request.args
+    data = data if hasattr(data, 'get') else {}
+    try:
+        query, nom = export_query(data)
+        export = Export(stream_sparql(query), data.get('format', 'csv'),
+                        int(data.get('batch_rows', 0) or 0) or EXPORT_BATCH_ROWS, data.get('types'))
+    except Exception as e:
+        # Paramètres invalides (ExportError) ou requête en erreur: avant le début du flux
+        return jsonify({"success": False, "error": str(e)}), 400
+    return Response(stream_with_context(export), mimetype=export.mimetype, headers={
+        'Content-Disposition': f'attachment; filename="{nom}.{EXTENSIONS[export.format]}"',
+        'X-Column-Types': export.column_types()
+    })
+
+@app.route('/api/itineraires', methods=['POST'])
+def recommend_itineraries():
+    """Recommander les itinéraires d'empreinte carbone minimale sous un budget"""
+    data = request.json or {}
+    voyageur = data.get('voyageur')
+    
+    if not voyageur:
+        return jsonify({
+            "success": False,
+            "error": "URI du voyageur requise"
+        }), 400
+    
+    try:
+        budget = float(data.get('budget', 0))
+        k = int(data.get('k', 3))
+        nb_activites = int(data.get('nb_activites', 1))
+    except (TypeError, ValueError, OverflowError):
+        return jsonify({
+            "success": False,
+            "error": "budget, k et nb_activites doivent être numériques"
+        }), 400
+    
+    if k <= 0 or nb_activites < 0:
+        return jsonify({
+            "success": False,
+            "error": "k doit être strictement positif et nb_activites positif ou nul"
+        }), 400
+    
+    try:
+        # NaN et ±inf passent `budget <= 0`: refusés ici, comme les budgets démesurés
+        budget = valider_budget(budget)
+    except ValueError as e:
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    if (URIRef(voyageur), None, None) not in g:
+        return jsonify({
+            "success": False,
+            "error": "Voyageur non trouvé"
+        }), 404
+    
+    tenant = current_tenant()
+    itineraires = tenant.itinerary_optimizer.recommander(
+        tenant.graph, voyageur, budget, k=k, nb_activites=nb_activites,
+        inclure_non_localises=bool(data.get('inclure_non_localises', True))
+    )
+    return jsonify({
+        "success": True,
+        "itineraires": itineraires,
+        "count": len(itineraires)
+    })
+
+def resolve_entity_uri(value):
+    """Accepter une URI complète ou un nom local de l'ontologie"""
+    if ':' in value:
+        return URIRef(value)
+    return NS[value]
+
+def describe_node(node, name_properties):
+    """URI, nom (première propriété de nom du schéma) et classes d'un nœud"""
+    types = [str(t).split('#')[-1] for t in g.objects(node, RDF.type) if t != OWL.NamedIndividual]
+    nom = None
+    for p, o in g.predicate_objects(node):
+        if p in name_properties and isinstance(o, Literal):
+            nom = str(o)
+            break
+    return {"uri": str(node), "nom": nom, "types": types}
+
+@app.route('/api/entity/<path:uri>/neighborhood', methods=['GET'])
+def get_entity_neighborhood(uri):
+    """Sous-graphe atteignable depuis une entité en au plus `depth` sauts"""
+    try:
+        depth = int(request.args.get('depth', 1))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "depth et limit doivent être des entiers"
+        }), 400
+    direction = request.args.get('direction', 'out')
+    if direction not in ('out', 'in', 'both'):
+        return jsonify({
+            "success": False,
+            "error": "direction doit valoir 'out', 'in' ou 'both'"
+        }), 400
+    
+    # Borner le parcours pour protéger le serveur
+    depth = max(0, min(depth, 4))
+    limit = max(1, min(limit, 1000))
+    
+    predicates = None
+    if request.args.get('predicates'):
+        predicates = [resolve_entity_uri(p.strip()) for p in request.args['predicates'].split(',') if p.strip()]
+    
+    entity_uri = resolve_entity_uri(uri)
+    if (entity_uri, None, None) not in g and (None, None, entity_uri) not in g:
+        return jsonify({
+            "success": False,
+            "error": "Entité non trouvée"
+        }), 404
+    
+    distances, edges, truncated = current_tenant().adjacency_index.neighborhood(
+        entity_uri, depth=depth, predicates=predicates, limit=limit, direction=direction
+    )
+    
+    name_properties = entity_types().name_properties
+    nodes = [dict(describe_node(node, name_properties), distance=distance) for node, distance in distances.items()]
+    
+    return jsonify({
+        "success": True,
+        "root": str(entity_uri),
+        "depth": depth,
+        "nodes": nodes,
+        "edges": [{"source": str(s), "predicate": str(p).split('#')[-1], "target": str(o)} for s, p, o in edges],
+        "truncated": truncated
+    })
+
+@app.route('/api/similar/<path:uri>', methods=['GET'])
+def similar_entities(uri):
+    """Entités les plus proches d'une entité dans sa collection (index de similarité)"""
+    try:
+        k = int(request.args.get('k', 10))
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "error": "k doit être un entier"
+        }), 400
+    if not 1 <= k <= 100:
+        return jsonify({
+            "success": False,
+            "error": "k doit être compris entre 1 et 100"
+        }), 400
+    
+    entity_uri = resolve_entity_uri(uri)
+    if (entity_uri, None, None) not in g:
+        return jsonify({
+            "success": False,
+            "error": "Entité non trouvée"
+        }), 404
+    
+    tenant = current_tenant()
+    index = tenant.similarity_index
+    with span('similarity'):
+        collection, voisins = index.similar(tenant.graph, entity_uri, k)
+    if voisins is None:
+        return jsonify({
+            "success": False,
+            "error": "L'entité n'appartient à aucune collection (destinations, activités...)"
+        }), 404
+    
+    name_properties = entity_types().name_properties
+    return jsonify({
+        "success": True,
+        "uri": str(entity_uri),
+        "collection": collection,
+        "results": [dict(describe_node(node, name_properties), score=score) for node, score in voisins],
+        "count": len(voisins),
+        "index": index.stats().get(collection)
+    })
+
 def generate_sparql_with_gemini(question):
     """Utilise Google Gemini pour convertir une question en requête SPARQL"""
-    if not gemini_model:
+    if not gemini():
         return None
     
     prompt = f"""Tu es un expert en SPARQL et en ontologies OWL.
@@ -496,8 +992,7 @@ La requête doit:
 5. Répondre précisément à la question"""
 
     try:
-        response = gemini_model.generate_content(prompt)
-        sparql_query = response.text.strip()
+        sparql_query = call_gemini(prompt).strip()
         
         # Nettoyer la réponse pour extraire uniquement le SPARQL
         # Chercher le code entre ```sparql et ``` ou juste le texte
@@ -511,28 +1006,23 @@ La requête doit:
         print(f"Erreur Gemini: {e}")
         return None
 
-@app.route('/api/nl-query', methods=['POST'])
-def natural_language_query():
-    """Convertir une question en langage naturel en requête SPARQL avec IA Gemini OU gérer opérations CRUD"""
-    data = request.json
-    question = data.get('question', '')
-    use_ai = data.get('use_ai', True)  # Par défaut, utiliser l'IA
-    
-    question_lower = question.lower()
-    
-    # ========================================
-    # DÉTECTION D'INTENTIONS CRUD
-    # ========================================
-    
-    # Détecter les relations EN PREMIER (avant "ajouter" pour éviter confusion avec "Ajoute une relation X possede Y")
-    if any(word in question_lower for word in [' va à ', ' va a ', ' visite ', ' choisit ', ' séjourne dans ', ' utilise ', 'possede', 'possède', ' a la certification', ' a une certification']):
-        # RECHARGER LE GRAPHE AVANT DE TRAITER LA RELATION
-        print("[DEBUG] RELOAD avant traitement relation")
-        reload_graph()
-        print(f"[DEBUG] Graphe recharge - {len(g)} triplets en memoire")
-        try:
-            if gemini_model:
-                prompt = f"""
+# ========================================
+# COMMANDES CRUD EN LANGAGE NATUREL
+# ========================================
+
+# Intentions détectées par mots-clés, dans l'ordre de priorité. Les relations
+# passent EN PREMIER (avant "ajouter" pour éviter la confusion avec
+# "Ajoute une relation X possede Y")
+CRUD_INTENTS = [
+    ('add_relation', [' va à ', ' va a ', ' visite ', ' choisit ', ' séjourne dans ', ' utilise ', 'possede', 'possède', ' a la certification', ' a une certification']),
+    ('create', ['ajouter', 'ajoute', 'créer', 'crée', 'nouveau', 'nouvelle']),
+    ('delete', ['supprimer', 'supprime', 'effacer', 'efface', 'retirer', 'retire']),
+    ('update', ['modifier', 'modifie', 'changer', 'change', 'mettre à jour', 'update'])
+]
+
+# Prompts d'extraction (str.format avec {question})
+CRUD_PROMPTS = {
+    'add_relation': """
 Extrais les informations de cette demande de relation entre entités:
 Question: "{question}"
 
@@ -561,109 +1051,8 @@ Exemples:
 "Surf utilise Jet-Ski" -> {{"sujet_type": "ActivitéTouristique", "sujet_nom": "Surf", "relation": "utilise", "objet_type": "Transport", "objet_nom": "Jet-Ski"}}
 
 Réponds UNIQUEMENT avec le JSON.
-"""
-                response = gemini_model.generate_content(prompt)
-                json_str = response.text.strip().replace('```json', '').replace('```', '').strip()
-                print(f"[DEBUG] Gemini JSON brut: {json_str}")
-                relation_data = json.loads(json_str)
-                print(f"[DEBUG] Relation parsed: {relation_data}")
-                
-                # Mapping des propriétés nom
-                name_property_map = {
-                    'Personne': 'nomVoyageur',
-                    'Destination': 'nomDestination',
-                    'Hébergement': 'nomHebergement',
-                    'ActivitéTouristique': 'nomActivité',
-                    'Transport': 'nomTransport',
-                    'Services': 'nomService',
-                    'Nourriture': 'nomNourriture',
-                    'Equipement': 'nomEquipement',
-                    'CertificationÉco': 'nomCertification'
-                }
-                
-                # Trouver le sujet
-                sujet_uri = None
-                sujet_type = relation_data['sujet_type']
-                sujet_nom = relation_data['sujet_nom'].lower()
-                
-                if sujet_type in name_property_map:
-                    name_prop = NS[name_property_map[sujet_type]]
-                    type_uri = NS[sujet_type]
-                    print(f"[DEBUG] Recherche sujet: type={sujet_type}, nom={sujet_nom}")
-                    for s, p, o in g.triples((None, RDF.type, type_uri)):
-                        for _, _, nom in g.triples((s, name_prop, None)):
-                            print(f"[DEBUG] Compare: '{str(nom).lower()}' == '{sujet_nom}' ?")
-                            if str(nom).lower() == sujet_nom:
-                                sujet_uri = s
-                                print(f"[DEBUG] TROUVE sujet: {s}")
-                                break
-                        if sujet_uri:
-                            break
-                
-                if not sujet_uri:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Entité sujet '{relation_data['sujet_nom']}' non trouvée"
-                    }), 404
-                
-                # Trouver l'objet
-                objet_uri = None
-                objet_type = relation_data['objet_type']
-                objet_nom = relation_data['objet_nom'].lower()
-                
-                if objet_type in name_property_map:
-                    name_prop = NS[name_property_map[objet_type]]
-                    type_uri = NS[objet_type]
-                    for s, p, o in g.triples((None, RDF.type, type_uri)):
-                        for _, _, nom in g.triples((s, name_prop, None)):
-                            if str(nom).lower() == objet_nom:
-                                objet_uri = s
-                                break
-                        if objet_uri:
-                            break
-                
-                if not objet_uri:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Entité objet '{relation_data['objet_nom']}' non trouvée"
-                    }), 404
-                
-                # Ajouter la relation
-                relation_prop = NS[relation_data['relation']]
-                g.add((sujet_uri, relation_prop, objet_uri))
-                
-                # Sauvegarder
-                print(f"[DEBUG] AVANT save_rdf_to_file() - Relation {relation_data.get('sujet_nom')} -> {relation_data.get('objet_nom')}")
-                if save_rdf_to_file():
-                    return jsonify({
-                        "success": True,
-                        "action": "add_relation",
-                        "message": f"✅ Relation ajoutée: '{relation_data['sujet_nom']}' {relation_data['relation']} '{relation_data['objet_nom']}'",
-                        "relation": {
-                            "sujet": {"type": sujet_type, "nom": relation_data['sujet_nom'], "uri": str(sujet_uri)},
-                            "propriete": relation_data['relation'],
-                            "objet": {"type": objet_type, "nom": relation_data['objet_nom'], "uri": str(objet_uri)}
-                        }
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Relation ajoutée en mémoire mais erreur de sauvegarde"
-                    }), 500
-                    
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "error": f"Impossible d'ajouter la relation: {str(e)}",
-                "suggestion": "Essayez: '[personne] va à [destination]' ou '[personne] séjourne dans [hébergement]'"
-            }), 400
-    
-    # Détecter "ajouter/créer"
-    elif any(word in question_lower for word in ['ajouter', 'ajoute', 'créer', 'crée', 'nouveau', 'nouvelle']):
-        try:
-            # Utiliser Gemini pour extraire les informations structurées
-            if gemini_model:
-                prompt = f"""
+""",
+    'create': """
 Extrais les informations de cette demande de création d'entité:
 Question: "{question}"
 
@@ -675,100 +1064,8 @@ Exemple pour "Ajoute une personne Jean qui a 25 ans":
 {{"type": "Personne", "attributes": {{"nom": "Jean", "age": 25}}}}
 
 Réponds UNIQUEMENT avec le JSON, sans texte avant ou après.
-"""
-                response = gemini_model.generate_content(prompt)
-                json_str = response.text.strip()
-                # Nettoyer la réponse (enlever markdown si présent)
-                json_str = json_str.replace('```json', '').replace('```', '').strip()
-                
-                entity_data = json.loads(json_str)
-                
-                # Créer l'entité directement ici
-                entity_type = entity_data.get('type')
-                attributes = entity_data.get('attributes', {})
-                
-                if not entity_type or not attributes.get('nom'):
-                    return jsonify({
-                        "success": False,
-                        "error": "Type d'entité et nom requis"
-                    }), 400
-                
-                # Générer URI unique
-                entity_uri = generate_uri(entity_type, attributes['nom'])
-                
-                # Vérifier si l'entité existe déjà
-                if (entity_uri, None, None) in g:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Une entité avec le nom '{attributes['nom']}' existe déjà"
-                    }), 400
-                
-                # Ajouter le type (rdf:type)
-                class_uri = NS[entity_type]
-                g.add((entity_uri, RDF.type, class_uri))
-                
-                # Mapping des propriétés par type d'entité
-                property_mappings = {
-                    'Personne': {'nom': 'nomVoyageur', 'age': 'age'},
-                    'Destination': {'nom': 'nomDestination', 'pays': 'pays'},
-                    'Hébergement': {'nom': 'nomHebergement', 'prix': 'prix', 'capacite': 'capacite', 'type': 'typeHebergement'},
-                    'ActivitéTouristique': {'nom': 'nomActivité', 'prix': 'prix', 'duree': 'duree'},
-                    'Transport': {'nom': 'nomTransport', 'type': 'typeTransport'},
-                    'Services': {'nom': 'nomService', 'prix': 'prix'},
-                    'Nourriture': {'nom': 'nomNourriture'},
-                    'Equipement': {'nom': 'nomEquipement'},
-                    'CertificationÉco': {'nom': 'nomCertification', 'date': 'dateValidite'}
-                }
-                
-                # Ajouter les propriétés de données
-                if entity_type in property_mappings:
-                    for attr_key, attr_value in attributes.items():
-                        if attr_key in property_mappings[entity_type]:
-                            property_name = property_mappings[entity_type][attr_key]
-                            property_uri = NS[property_name]
-                            
-                            # Déterminer le type de littéral
-                            if attr_key in ['age', 'prix', 'capacite', 'duree']:
-                                if attr_key == 'prix':
-                                    literal = Literal(float(attr_value), datatype=XSD.float)
-                                else:
-                                    literal = Literal(int(attr_value), datatype=XSD.integer)
-                            else:
-                                literal = Literal(attr_value)
-                            
-                            g.add((entity_uri, property_uri, literal))
-                
-                # Sauvegarder dans ws.rdf
-                print(f"[DEBUG] AVANT save_rdf_to_file() - Creation de {attributes.get('nom', 'UNKNOWN')}")
-                if save_rdf_to_file():
-                    return jsonify({
-                        "success": True,
-                        "action": "create",
-                        "message": f"✅ {entity_type} '{attributes['nom']}' créé avec succès et sauvegardé dans ws.rdf!",
-                        "entity": {
-                            "type": entity_type,
-                            "uri": str(entity_uri),
-                            "attributes": attributes
-                        }
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Entité créée en mémoire mais erreur de sauvegarde dans ws.rdf"
-                    }), 500
-            
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "error": f"Impossible d'extraire les informations de création: {str(e)}",
-                "suggestion": "Essayez: 'Ajoute une personne [nom] qui a [age] ans'"
-            }), 400
-    
-    # Détecter "supprimer/effacer"
-    elif any(word in question_lower for word in ['supprimer', 'supprime', 'effacer', 'efface', 'retirer', 'retire']):
-        try:
-            if gemini_model:
-                prompt = f"""
+""",
+    'delete': """
 Extrais les informations de cette demande de suppression:
 Question: "{question}"
 
@@ -780,82 +1077,8 @@ Exemple pour "Supprime la personne Jean":
 {{"type": "Personne", "nom": "Jean"}}
 
 Réponds UNIQUEMENT avec le JSON.
-"""
-                response = gemini_model.generate_content(prompt)
-                json_str = response.text.strip().replace('```json', '').replace('```', '').strip()
-                delete_data = json.loads(json_str)
-                
-                # Mapping des propriétés pour trouver l'attribut nom
-                name_property_map = {
-                    'Personne': 'nomVoyageur',
-                    'Destination': 'nomDestination',
-                    'Hébergement': 'nomHebergement',
-                    'ActivitéTouristique': 'nomActivité',
-                    'Transport': 'nomTransport',
-                    'Services': 'nomService',
-                    'Nourriture': 'nomNourriture',
-                    'Equipement': 'nomEquipement',
-                    'CertificationÉco': 'nomCertification'
-                }
-                
-                # Trouver l'entité en cherchant par nom (insensible à la casse)
-                entity_type = delete_data['type']
-                search_name = delete_data['nom'].lower()
-                entity_uri = None
-                
-                if entity_type in name_property_map:
-                    name_property = name_property_map[entity_type]
-                    name_property_uri = NS[name_property]
-                    
-                    # Chercher toutes les entités de ce type
-                    type_uri = NS[entity_type]
-                    for s, p, o in g.triples((None, RDF.type, type_uri)):
-                        # Vérifier si le nom correspond (insensible à la casse)
-                        for _, _, nom in g.triples((s, name_property_uri, None)):
-                            if str(nom).lower() == search_name:
-                                entity_uri = s
-                                break
-                        if entity_uri:
-                            break
-                
-                # Vérifier que l'entité existe
-                if not entity_uri or (entity_uri, None, None) not in g:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Entité '{delete_data['nom']}' de type {delete_data['type']} non trouvée"
-                    }), 404
-                
-                # Supprimer tous les triplets où l'entité est sujet
-                g.remove((entity_uri, None, None))
-                
-                # Supprimer tous les triplets où l'entité est objet
-                g.remove((None, None, entity_uri))
-                
-                # Sauvegarder
-                if save_rdf_to_file():
-                    return jsonify({
-                        "success": True,
-                        "action": "delete",
-                        "message": f"✅ {delete_data['type']} '{delete_data['nom']}' supprimé avec succès de ws.rdf!"
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Entité supprimée en mémoire mais erreur de sauvegarde"
-                    }), 500
-                
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "error": f"Impossible de supprimer: {str(e)}",
-                "suggestion": "Essayez: 'Supprime [type] [nom]'"
-            }), 400
-    
-    # Détecter "modifier/changer"
-    elif any(word in question_lower for word in ['modifier', 'modifie', 'changer', 'change', 'mettre à jour', 'update']):
-        try:
-            if gemini_model:
-                prompt = f"""
+""",
+    'update': """
 Extrais les informations de cette demande de modification:
 Question: "{question}"
 
@@ -869,331 +1092,583 @@ Exemple pour "Modifie l'âge de Jean à 30 ans":
 
 Réponds UNIQUEMENT avec le JSON.
 """
-                response = gemini_model.generate_content(prompt)
-                json_str = response.text.strip().replace('```json', '').replace('```', '').strip()
-                update_data = json.loads(json_str)
-                
-                # Mapping des propriétés pour trouver l'attribut nom
-                name_property_map = {
-                    'Personne': 'nomVoyageur',
-                    'Destination': 'nomDestination',
-                    'Hébergement': 'nomHebergement',
-                    'ActivitéTouristique': 'nomActivité',
-                    'Transport': 'nomTransport',
-                    'Services': 'nomService',
-                    'Nourriture': 'nomNourriture',
-                    'Equipement': 'nomEquipement',
-                    'CertificationÉco': 'nomCertification'
-                }
-                
-                # Trouver l'entité en cherchant par nom (insensible à la casse)
-                entity_type = update_data['type']
-                search_name = update_data['nom'].lower()
-                entity_uri = None
-                
-                if entity_type in name_property_map:
-                    name_property = name_property_map[entity_type]
-                    name_property_uri = NS[name_property]
-                    
-                    # Chercher toutes les entités de ce type
-                    type_uri = NS[entity_type]
-                    for s, p, o in g.triples((None, RDF.type, type_uri)):
-                        # Vérifier si le nom correspond (insensible à la casse)
-                        for _, _, nom in g.triples((s, name_property_uri, None)):
-                            if str(nom).lower() == search_name:
-                                entity_uri = s
-                                break
-                        if entity_uri:
-                            break
-                
-                # Vérifier que l'entité existe
-                if not entity_uri or (entity_uri, None, None) not in g:
-                    return jsonify({
-                        "success": False,
-                        "error": f"Entité '{update_data['nom']}' non trouvée"
-                    }), 404
-                
-                # Mapping des propriétés
-                property_mappings = {
-                    'Personne': {'nom': 'nomVoyageur', 'age': 'age'},
-                    'Destination': {'nom': 'nomDestination', 'pays': 'pays'},
-                    'Hébergement': {'nom': 'nomHebergement', 'prix': 'prix', 'capacite': 'capacite', 'type': 'typeHebergement'},
-                    'ActivitéTouristique': {'nom': 'nomActivité', 'prix': 'prix', 'duree': 'duree'},
-                    'Transport': {'nom': 'nomTransport', 'type': 'typeTransport'},
-                    'Services': {'nom': 'nomService', 'prix': 'prix'},
-                    'Nourriture': {'nom': 'nomNourriture'},
-                    'Equipement': {'nom': 'nomEquipement'},
-                    'CertificationÉco': {'nom': 'nomCertification', 'date': 'dateValidite'}
-                }
-                
-                # Supprimer les anciennes valeurs et ajouter les nouvelles
-                entity_type = update_data['type']
-                attributes = update_data.get('attributes', {})
-                
-                if entity_type in property_mappings:
-                    for attr_key, attr_value in attributes.items():
-                        if attr_key in property_mappings[entity_type]:
-                            property_name = property_mappings[entity_type][attr_key]
-                            property_uri = NS[property_name]
-                            
-                            # Supprimer l'ancienne valeur
-                            g.remove((entity_uri, property_uri, None))
-                            
-                            # Ajouter la nouvelle valeur
-                            if attr_key in ['age', 'prix', 'capacite', 'duree']:
-                                if attr_key == 'prix':
-                                    literal = Literal(float(attr_value), datatype=XSD.float)
-                                else:
-                                    literal = Literal(int(attr_value), datatype=XSD.integer)
-                            else:
-                                literal = Literal(attr_value)
-                            
-                            g.add((entity_uri, property_uri, literal))
-                
-                # Sauvegarder
-                if save_rdf_to_file():
-                    return jsonify({
-                        "success": True,
-                        "action": "update",
-                        "message": f"✅ {entity_type} '{update_data['nom']}' modifié avec succès dans ws.rdf!",
-                        "entity": {
-                            "type": entity_type,
-                            "uri": str(entity_uri),
-                            "attributes": attributes
-                        }
-                    })
-                else:
-                    return jsonify({
-                        "success": False,
-                        "error": "Entité mise à jour en mémoire mais erreur de sauvegarde"
-                    }), 500
-                
-        except Exception as e:
-            return jsonify({
-                "success": False,
-                "error": f"Impossible de modifier: {str(e)}",
-                "suggestion": "Essayez: 'Modifie [attribut] de [nom] à [nouvelle valeur]'"
-            }), 400
-    
-    # ========================================
-    # REQUÊTES DE LECTURE (SELECT)
-    # ========================================
-    # Note: si on arrive ici, ce n'est ni CREATE, ni UPDATE, ni DELETE, ni RELATION
-    # donc c'est une vraie requête de consultation
+}
+
+# Messages par intention: (erreur d'extraction, suggestion, erreur de sauvegarde)
+CRUD_ERRORS = {
+    'add_relation': ("Impossible d'ajouter la relation",
+                     "Essayez: '[personne] va à [destination]' ou '[personne] séjourne dans [hébergement]'",
+                     "Relation ajoutée en mémoire mais erreur de sauvegarde"),
+    'create': ("Impossible d'extraire les informations de création",
+               "Essayez: 'Ajoute une personne [nom] qui a [age] ans'",
+               "Entité créée en mémoire mais erreur de sauvegarde dans ws.rdf"),
+    'delete': ("Impossible de supprimer",
+               "Essayez: 'Supprime [type] [nom]'",
+               "Entité supprimée en mémoire mais erreur de sauvegarde"),
+    'update': ("Impossible de modifier",
+               "Essayez: 'Modifie [attribut] de [nom] à [nouvelle valeur]'",
+               "Entité mise à jour en mémoire mais erreur de sauvegarde")
+}
+
+def detect_crud_intent(question_lower):
+    """Intention CRUD d'une question (add_relation, create, delete, update), None pour une consultation"""
+    for intent, words in CRUD_INTENTS:
+        if any(word in question_lower for word in words):
+            return intent
+    return None
+
+def extract_crud_slots(intent, question):
+    """Informations structurées d'une commande CRUD, extraites par Gemini"""
+    json_str = call_gemini(CRUD_PROMPTS[intent].format(question=question)).strip()
+    # Nettoyer la réponse (enlever markdown si présent)
+    json_str = json_str.replace('```json', '').replace('```', '').strip()
+    return json.loads(json_str)
+
+class NameResolver:
+    """Entités par type et nom (insensible à la casse), sur un instantané du graphe
+
+    La table d'un type est construite au premier nom cherché pour ce type.
+    Les commandes appliquées la tiennent à jour (`learn`, `forget`): les
+    commandes d'un même lot voient les entités créées par les précédentes.
+    """
+
+    def __init__(self):
+        self._tables = {}
+        self._types = entity_types()
+
+    def _table(self, entity_type):
+        table = self._tables.get(entity_type)
+        if table is None:
+            table = self._tables[entity_type] = {}
+            name_property = self._types[entity_type].name_property
+            for s in g.subjects(RDF.type, NS[entity_type]):
+                for nom in g.objects(s, name_property):
+                    table.setdefault(str(nom).lower(), s)
+        return table
+
+    def find(self, entity_type, nom):
+        type_info = self._types.get(entity_type)
+        if type_info is None or type_info.name_property is None:
+            return None
+        return self._table(entity_type).get(nom.lower())
+
+    def learn(self, entity_type, nom, uri):
+        if entity_type in self._tables:
+            self._tables[entity_type].setdefault(str(nom).lower(), uri)
+
+    def forget(self, uri):
+        for table in self._tables.values():
+            for nom in [nom for nom, s in table.items() if s == uri]:
+                del table[nom]
+
+def plan_crud(intent, data, resolver):
+    """Mutations d'une commande CRUD extraite, calculées sans toucher au graphe
+
+    Retourne (réponse, code, uri, motifs à retirer, triplets à ajouter). Les
+    erreurs (entité introuvable, valeur invalide) sont détectées avant toute
+    mutation.
+    """
+    if intent == 'add_relation':
+        app.logger.debug(f"Relation extraite: {data}")
+        # Trouver le sujet
+        sujet_uri = resolver.find(data['sujet_type'], data['sujet_nom'])
+        if not sujet_uri:
+            return {"success": False, "error": f"Entité sujet '{data['sujet_nom']}' non trouvée"}, 404, None, [], []
+        # Trouver l'objet
+        objet_uri = resolver.find(data['objet_type'], data['objet_nom'])
+        if not objet_uri:
+            return {"success": False, "error": f"Entité objet '{data['objet_nom']}' non trouvée"}, 404, None, [], []
+        return {
+            "action": "add_relation",
+            "message": f"✅ Relation ajoutée: '{data['sujet_nom']}' {data['relation']} '{data['objet_nom']}'",
+            "relation": {
+                "sujet": {"type": data['sujet_type'], "nom": data['sujet_nom'], "uri": str(sujet_uri)},
+                "propriete": data['relation'],
+                "objet": {"type": data['objet_type'], "nom": data['objet_nom'], "uri": str(objet_uri)}
+            }
+        }, 200, sujet_uri, [], [(sujet_uri, NS[data['relation']], objet_uri)]
+
+    if intent == 'create':
+        entity_type = data.get('type')
+        attributes = data.get('attributes', {})
+        if not entity_type or not attributes.get('nom'):
+            return {"success": False, "error": "Type d'entité et nom requis"}, 400, None, [], []
+        type_info = entity_types().get(entity_type)
+        if type_info is None:
+            return {"success": False, "error": f"Type d'entité inconnu: {entity_type}"}, 400, None, [], []
+        try:
+            valeurs, _ = type_info.encode(attributes)
+        except InvalidValue as e:
+            return {"success": False, "error": str(e)}, 400, None, [], []
+        # Générer URI unique
+        entity_uri = generate_uri(entity_type, attributes['nom'])
+        # Vérifier si l'entité existe déjà
+        if (entity_uri, None, None) in g:
+            return {"success": False, "error": f"Une entité avec le nom '{attributes['nom']}' existe déjà"}, 400, None, [], []
+        # Le type (rdf:type) puis les propriétés de données
+        additions = [(entity_uri, RDF.type, type_info.uri)]
+        additions += [(entity_uri, p, o) for p, o in valeurs]
+        return {
+            "action": "create",
+            "message": f"✅ {entity_type} '{attributes['nom']}' créé avec succès et sauvegardé dans ws.rdf!",
+            "entity": {"type": entity_type, "uri": str(entity_uri), "attributes": attributes}
+        }, 200, entity_uri, [], additions
+
+    # Suppression et modification: trouver l'entité par son nom
+    entity_type = data['type']
+    entity_uri = resolver.find(entity_type, data['nom'])
+    if not entity_uri or (entity_uri, None, None) not in g:
+        erreur = (f"Entité '{data['nom']}' de type {entity_type} non trouvée" if intent == 'delete'
+                  else f"Entité '{data['nom']}' non trouvée")
+        return {"success": False, "error": erreur}, 404, None, [], []
+
+    if intent == 'delete':
+        # Tous les triplets où l'entité est sujet, puis ceux où elle est objet
+        return {
+            "action": "delete",
+            "message": f"✅ {entity_type} '{data['nom']}' supprimé avec succès de ws.rdf!"
+        }, 200, entity_uri, [(entity_uri, None, None), (None, None, entity_uri)], []
+
+    # Supprimer les anciennes valeurs et ajouter les nouvelles
+    attributes = data.get('attributes', {})
+    try:
+        valeurs, _ = entity_types()[entity_type].encode(attributes)
+    except InvalidValue as e:
+        return {"success": False, "error": str(e)}, 400, None, [], []
+    removals = [(entity_uri, p, None) for p, _ in valeurs]
+    additions = [(entity_uri, p, o) for p, o in valeurs]
+    return {
+        "action": "update",
+        "message": f"✅ {entity_type} '{data['nom']}' modifié avec succès dans ws.rdf!",
+        "entity": {"type": entity_type, "uri": str(entity_uri), "attributes": attributes}
+    }, 200, entity_uri, removals, additions
+
+def run_crud(intent, data, resolver):
+    """Planifier puis appliquer une commande CRUD au graphe; retourne (réponse, code)
+
+    La sauvegarde reste à la charge de l'appelant (une seule pour un lot).
+    """
+    payload, code, uri, removals, additions = plan_crud(intent, data, resolver)
+    if code != 200:
+        return payload, code
+    with current_tenant().write_lock:
+        for pattern in removals:
+            graph_remove(pattern)
+        for triple in additions:
+            graph_add(triple)
+    if intent == 'create':
+        resolver.learn(data['type'], data['attributes']['nom'], uri)
+    elif intent == 'delete':
+        resolver.forget(uri)
+    elif intent == 'update' and 'nom' in data.get('attributes', {}):
+        resolver.forget(uri)
+        resolver.learn(data['type'], data['attributes']['nom'], uri)
+    return payload, code
+
+def crud_extraction_error(intent, error):
+    erreur, suggestion, _ = CRUD_ERRORS[intent]
+    return {"success": False, "error": f"{erreur}: {str(error)}", "suggestion": suggestion}
+
+def keyword_sparql(question_lower):
+    """Fallback: mapping simple de questions vers requêtes SPARQL (None si non comprise)"""
+    if "destination" in question_lower and ("toutes" in question_lower or "liste" in question_lower):
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?destination ?nom
+        WHERE {
+            ?destination rdf:type/rdfs:subClassOf* ns:Destination .
+            OPTIONAL { ?destination ns:nomDestination ?nom }
+        }
+        """
+    elif "hébergement" in question_lower and "certification" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?hebergement ?nom ?certification
+        WHERE {
+            ?hebergement rdf:type/rdfs:subClassOf* ns:Hébergement .
+            ?hebergement ns:possèdeCertification ?cert .
+            ?cert ns:nomCertification ?certification .
+            OPTIONAL { ?hebergement ns:nomHebergement ?nom }
+        }
+        """
+    elif "activité" in question_lower and ("écologique" in question_lower or "empreinte" in question_lower):
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?activite ?nom ?empreinte
+        WHERE {
+            ?activite rdf:type/rdfs:subClassOf* ns:ActivitéTouristique .
+            ?activite ns:aEmpreinteCarbone ?ec .
+            ?ec ns:empreinte ?empreinte .
+            OPTIONAL { ?activite ns:nomActivité ?nom }
+        }
+        ORDER BY ?empreinte
+        """
+    elif "transport" in question_lower and "écologique" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        
+        SELECT DISTINCT ?transport ?type ?empreinte
+        WHERE {
+            ?transport rdf:type ns:Vélo .
+            OPTIONAL { ?transport ns:aEmpreinteCarbone ?ec .
+                       ?ec ns:empreinte ?empreinte }
+        }
+        """
+    elif "personne" in question_lower or "voyageur" in question_lower or "qui" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?personne ?nom ?age
+        WHERE {
+            {
+                ?personne rdf:type ns:Personne .
+            } UNION {
+                ?personne rdf:type ?subclass .
+                ?subclass rdfs:subClassOf ns:Personne .
+            }
+            OPTIONAL { ?personne ns:nomVoyageur ?nom }
+            OPTIONAL { ?personne ns:age ?age }
+        }
+        """
+    elif "service" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?service ?nom ?prix
+        WHERE {
+            {
+                ?service rdf:type ns:Services .
+            } UNION {
+                ?service rdf:type ?subclass .
+                ?subclass rdfs:subClassOf ns:Services .
+            }
+            OPTIONAL { ?service ns:nomService ?nom }
+            OPTIONAL { ?service ns:prix ?prix }
+        }
+        """
+    elif "certification" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?certification ?nom ?date
+        WHERE {
+            {
+                ?certification rdf:type ns:CertificationÉco .
+            } UNION {
+                ?certification rdf:type ?subclass .
+                ?subclass rdfs:subClassOf ns:CertificationÉco .
+            }
+            OPTIONAL { ?certification ns:nomCertification ?nom }
+            OPTIONAL { ?certification ns:dateValidite ?date }
+        }
+        """
+    elif "nourriture" in question_lower or "repas" in question_lower or "manger" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?nourriture ?nom
+        WHERE {
+            {
+                ?nourriture rdf:type ns:Nourriture .
+            } UNION {
+                ?nourriture rdf:type ?subclass .
+                ?subclass rdfs:subClassOf ns:Nourriture .
+            }
+            OPTIONAL { ?nourriture ns:nomNourriture ?nom }
+        }
+        """
+    elif "équipement" in question_lower or "equipement" in question_lower or "matériel" in question_lower:
+        return """
+        PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+        PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+        PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+        
+        SELECT DISTINCT ?equipement ?nom
+        WHERE {
+            {
+                ?equipement rdf:type ns:Equipement .
+            } UNION {
+                ?equipement rdf:type ?subclass .
+                ?subclass rdfs:subClassOf ns:Equipement .
+            }
+            OPTIONAL { ?equipement ns:nomEquipement ?nom }
+        }
+        """
+    return None
+
+# « activités similaires à la randonnée », « destinations comme Djerba »
+SIMILARITY_PATTERN = re.compile(
+    r"(?:similaires?|semblables?|ressemblant|proches?)\s+(?:à|a|de)\s+(?P<nom>.+?)\s*\??$"
+    r"|\bcomme\s+(?P<nom2>.+?)\s*\??$", re.IGNORECASE)
+SIMILARITY_ARTICLES = re.compile(r"^(?:l'|la |le |les |un |une |du |des |celle de |celui de )", re.IGNORECASE)
+# Mot de la question -> collection de l'index de similarité
+SIMILARITY_COLLECTIONS = {
+    'destination': 'Destination',
+    'hébergement': 'Hébergement',
+    'hôtel': 'Hébergement',
+    'activité': 'ActivitéTouristique',
+    'transport': 'Transport',
+    'service': 'Services',
+    'nourriture': 'Nourriture',
+    'repas': 'Nourriture',
+    'équipement': 'Equipement',
+    'voyageur': 'Personne',
+    'personne': 'Personne',
+    'certification': 'CertificationÉco'
+}
+
+def answer_similarity(question, k=10):
+    """Question « X similaires à Y » par l'index de similarité; None si ce n'en est pas une
+
+    Y est cherché par son nom (mots et trigrammes) dans la collection
+    nommée par la question, ou dans toutes sinon.
+    """
+    match = SIMILARITY_PATTERN.search(question)
+    if not match:
+        return None
+    nom = SIMILARITY_ARTICLES.sub('', (match.group('nom') or match.group('nom2')).strip())
+    debut = question[:match.start()].lower()
+    collections = [c for mot, c in SIMILARITY_COLLECTIONS.items() if mot in debut]
+    tenant = current_tenant()
+    index = tenant.similarity_index
+    with span('similarity'):
+        collection, reference = index.find(tenant.graph, nom, collections or ROOT_CLASSES)
+        if reference is None:
+            return None
+        collection, voisins = index.similar(tenant.graph, reference, k)
+    name_properties = entity_types().name_properties
+    results = []
+    for node, score in voisins or []:
+        description = describe_node(node, name_properties)
+        results.append({"nom": description["nom"], "types": ", ".join(description["types"]),
+                        "score": score, "uri": description["uri"]})
+    return {
+        "success": True,
+        "question": question,
+        "method": "similarity",
+        "reference": describe_node(reference, name_properties),
+        "collection": collection,
+        "ai_available": gemini() is not None,
+        "results": results,
+        "count": len(results)
+    }, 200
+
+def answer_question(question, use_ai=True, sparql_query=None):
+    """Requête de consultation: SPARQL de Gemini, sinon par mots-clés; retourne (réponse, code)"""
+    method_used = "gemini-ai"
     
-    sparql_query = None
-    method_used = "fallback"
+    # « Destinations comme Djerba »: index de similarité, sans Gemini
+    if sparql_query is None:
+        similaires = answer_similarity(question)
+        if similaires is not None:
+            return similaires
     
     # Essayer d'abord avec Gemini AI (seulement pour les requêtes SELECT, pas les CRUD)
-    if use_ai and gemini_model:
+    if sparql_query is None and use_ai and gemini():
         sparql_query = generate_sparql_with_gemini(question)
-        if sparql_query:
-            method_used = "gemini-ai"
     
     # Fallback: Mapping simple de questions vers requêtes SPARQL
     if not sparql_query:
         method_used = "keyword-matching"
-        
-        if "destination" in question_lower and ("toutes" in question_lower or "liste" in question_lower):
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?destination ?nom
-            WHERE {
-                ?destination rdf:type/rdfs:subClassOf* ns:Destination .
-                OPTIONAL { ?destination ns:nomDestination ?nom }
-            }
-            """
-        elif "hébergement" in question_lower and "certification" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?hebergement ?nom ?certification
-            WHERE {
-                ?hebergement rdf:type/rdfs:subClassOf* ns:Hébergement .
-                ?hebergement ns:possèdeCertification ?cert .
-                ?cert ns:nomCertification ?certification .
-                OPTIONAL { ?hebergement ns:nomHebergement ?nom }
-            }
-            """
-        elif "activité" in question_lower and ("écologique" in question_lower or "empreinte" in question_lower):
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?activite ?nom ?empreinte
-            WHERE {
-                ?activite rdf:type/rdfs:subClassOf* ns:ActivitéTouristique .
-                ?activite ns:aEmpreinteCarbone ?ec .
-                ?ec ns:empreinte ?empreinte .
-                OPTIONAL { ?activite ns:nomActivité ?nom }
-            }
-            ORDER BY ?empreinte
-            """
-        elif "transport" in question_lower and "écologique" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            
-            SELECT DISTINCT ?transport ?type ?empreinte
-            WHERE {
-                ?transport rdf:type ns:Vélo .
-                OPTIONAL { ?transport ns:aEmpreinteCarbone ?ec .
-                           ?ec ns:empreinte ?empreinte }
-            }
-            """
-        elif "personne" in question_lower or "voyageur" in question_lower or "qui" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?personne ?nom ?age
-            WHERE {
-                {
-                    ?personne rdf:type ns:Personne .
-                } UNION {
-                    ?personne rdf:type ?subclass .
-                    ?subclass rdfs:subClassOf ns:Personne .
-                }
-                OPTIONAL { ?personne ns:nomVoyageur ?nom }
-                OPTIONAL { ?personne ns:age ?age }
-            }
-            """
-        elif "service" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?service ?nom ?prix
-            WHERE {
-                {
-                    ?service rdf:type ns:Services .
-                } UNION {
-                    ?service rdf:type ?subclass .
-                    ?subclass rdfs:subClassOf ns:Services .
-                }
-                OPTIONAL { ?service ns:nomService ?nom }
-                OPTIONAL { ?service ns:prix ?prix }
-            }
-            """
-        elif "certification" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?certification ?nom ?date
-            WHERE {
-                {
-                    ?certification rdf:type ns:CertificationÉco .
-                } UNION {
-                    ?certification rdf:type ?subclass .
-                    ?subclass rdfs:subClassOf ns:CertificationÉco .
-                }
-                OPTIONAL { ?certification ns:nomCertification ?nom }
-                OPTIONAL { ?certification ns:dateValidite ?date }
-            }
-            """
-        elif "nourriture" in question_lower or "repas" in question_lower or "manger" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?nourriture ?nom
-            WHERE {
-                {
-                    ?nourriture rdf:type ns:Nourriture .
-                } UNION {
-                    ?nourriture rdf:type ?subclass .
-                    ?subclass rdfs:subClassOf ns:Nourriture .
-                }
-                OPTIONAL { ?nourriture ns:nomNourriture ?nom }
-            }
-            """
-        elif "équipement" in question_lower or "equipement" in question_lower or "matériel" in question_lower:
-            sparql_query = """
-            PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
-            PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
-            PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
-            
-            SELECT DISTINCT ?equipement ?nom
-            WHERE {
-                {
-                    ?equipement rdf:type ns:Equipement .
-                } UNION {
-                    ?equipement rdf:type ?subclass .
-                    ?subclass rdfs:subClassOf ns:Equipement .
-                }
-                OPTIONAL { ?equipement ns:nomEquipement ?nom }
-            }
-            """
-        else:
-            return jsonify({
+        sparql_query = keyword_sparql(question.lower())
+        if sparql_query is None:
+            return {
                 "success": False,
                 "error": "Question non comprise. Essayez des questions sur les destinations, hébergements, activités, transports, personnes, services, nourritures, équipements ou certifications.",
-                "ai_available": gemini_model is not None
-            }), 400
+                "ai_available": gemini() is not None
+            }, 400
     
     # Exécuter la requête SPARQL
-    if not sparql_query:
-        return jsonify({
-            "success": False,
-            "error": "Impossible de générer une requête SPARQL pour cette question.",
-            "ai_available": gemini_model is not None
-        }), 400
-    
     try:
-        results = g.query(sparql_query)
-        result_list = []
-        for row in results:
-            result_dict = {}
-            for var in results.vars:
-                result_dict[str(var)] = str(row[var]) if row[var] else None
-            result_list.append(result_dict)
+        results = query_graph(sparql_query)
+        result_list = results.records()
         
-        return jsonify({
+        return {
             "success": True,
             "question": question,
             "sparql": sparql_query,
             "method": method_used,
-            "ai_available": gemini_model is not None,
+            "ai_available": gemini() is not None,
             "results": result_list,
             "count": len(result_list)
-        })
+        }, 200
     except Exception as e:
-        return jsonify({
+        return {
             "success": False,
             "error": str(e)
+        }, 400
+
+@app.route('/api/nl-query', methods=['POST'])
+def natural_language_query():
+    """Convertir une question en langage naturel en requête SPARQL avec IA Gemini OU gérer opérations CRUD"""
+    data = request.json
+    question = data.get('question', '')
+    use_ai = data.get('use_ai', True)  # Par défaut, utiliser l'IA
+    
+    # ========================================
+    # DÉTECTION D'INTENTIONS CRUD
+    # ========================================
+    intent = detect_crud_intent(question.lower())
+    if intent and gemini():
+        try:
+            payload, code = run_crud(intent, extract_crud_slots(intent, question), NameResolver())
+        except Exception as e:
+            return jsonify(crud_extraction_error(intent, e)), 400
+        if code != 200:
+            return jsonify(payload), code
+        
+        # Sauvegarder dans ws.rdf
+        if save_rdf_to_file():
+            return jsonify({"success": True, **write_receipt(), **payload})
+        return jsonify({
+            "success": False,
+            "error": CRUD_ERRORS[intent][2]
+        }), 500
+    
+    # ========================================
+    # REQUÊTES DE LECTURE (SELECT)
+    # ========================================
+    # Note: si on arrive ici, ce n'est ni CREATE, ni UPDATE, ni DELETE, ni RELATION
+    # donc c'est une vraie requête de consultation
+    payload, code = answer_question(question, use_ai)
+    return jsonify(payload), code
+
+@app.route('/api/nl-query/batch', methods=['POST'])
+def natural_language_batch():
+    """Exécuter une liste de commandes en langage naturel, avec une seule sauvegarde
+
+    Les informations de chaque commande (ou la requête SPARQL d'une
+    consultation) sont extraites par Gemini en parallèle
+    (NL_BATCH_CONCURRENCY threads, au plus GEMINI_RPS appels par seconde).
+    Les commandes sont ensuite appliquées dans l'ordre, sous le verrou
+    d'écriture du locataire, avec les noms résolus sur un même instantané du
+    graphe. Une commande en erreur n'applique aucune de ses mutations; les
+    autres sont conservées. Tout le lot produit une seule génération et une
+    seule sauvegarde.
+    """
+    data = request.json or {}
+    questions = data.get('questions')
+    use_ai = data.get('use_ai', True)
+    if not isinstance(questions, list) or not questions or not all(isinstance(q, str) for q in questions):
+        return jsonify({
+            "success": False,
+            "error": "Liste de questions requise ('questions')"
+        }), 400
+    if len(questions) > NL_BATCH_MAX:
+        return jsonify({
+            "success": False,
+            "error": f"Au plus {NL_BATCH_MAX} questions par lot"
         }), 400
+    
+    # Extraction concurrente (appels Gemini)
+    intents = [detect_crud_intent(q.lower()) if gemini() else None for q in questions]
+    
+    def extraire(i):
+        if intents[i]:
+            return extract_crud_slots(intents[i], questions[i])
+        if use_ai and gemini() and not SIMILARITY_PATTERN.search(questions[i]):
+            return generate_sparql_with_gemini(questions[i])
+        return None
+    extractions = map_concurrently(extraire, range(len(questions)), NL_BATCH_CONCURRENCY)
+    
+    # Application dans l'ordre, sur un même instantané du graphe
+    results = []
+    tenant = current_tenant()
+    with tenant.write_lock:
+        resolver = NameResolver()
+        for question, intent, (extrait, erreur) in zip(questions, intents, extractions):
+            if intent is None:
+                payload, code = answer_question(question, use_ai=False, sparql_query=extrait)
+            elif erreur is not None:
+                payload, code = crud_extraction_error(intent, erreur), 400
+            else:
+                try:
+                    payload, code = run_crud(intent, extrait, resolver)
+                except Exception as e:
+                    payload, code = crud_extraction_error(intent, e), 400
+                if code == 200:
+                    payload = {"success": True, **payload}
+            results.append({"question": question, "status": code, **payload})
+    
+    receipt = {}
+    if any(r["status"] == 200 and r.get("action") for r in results):
+        # Une seule sauvegarde pour toutes les mutations du lot
+        if not save_rdf_to_file():
+            return jsonify({
+                "success": False,
+                "error": "Commandes appliquées en mémoire mais erreur de sauvegarde",
+                "results": results
+            }), 500
+        receipt = write_receipt()
+    return jsonify({
+        "success": True,
+        **receipt,
+        "count": len(results),
+        "failed": sum(1 for r in results if r["status"] != 200),
+        "results": results
+    })
 
 # ========================================
 # CRUD OPERATIONS - Création/Modification/Suppression
 # ========================================
 
 def save_rdf_to_file():
-    """Sauvegarder le graphe RDF dans ws.rdf et recharger"""
-    print(">>> DEBUT save_rdf_to_file()")
-    global g
-    # Sauvegarder
-    g.serialize(destination="../ws.rdf", format="xml", encoding="utf-8")
-    print("SAVE: ws.rdf sauvegarde OK")
-    
-    # Recharger IMMÉDIATEMENT dans un nouveau graphe
-    new_graph = Graph()
-    new_graph.parse("../ws.rdf", format="xml")
-    g = new_graph
-    print(f"RELOAD: Graphe recharge OK - {len(g)} triplets")
+    """Valider la mutation en cours: nouvelle génération, journal, réplication
+
+    Le graphe en mémoire est déjà modifié. Le delta est confié à l'écrivain
+    de fond du locataire, qui le journalise puis regroupe les sauvegardes
+    complètes (ws.rdf ou store sur disque). En durabilité `sync`, on attend
+    que le journal soit synchronisé sur disque; False si ce n'est pas fait à
+    temps.
+    """
+    tenant = current_tenant()
+    with tenant.write_lock:
+        # Delta net relu sous le verrou: chaque triplet est émis dans son état
+        # courant, la dernière émission est donc toujours l'état final
+        added, removed = take_pending_changes()
+        # Générations et journal dans le même ordre que les mutations
+        tenant.generation += 1
+        generation = tenant.generation
+        tenant.writer.submit(generation, added, removed)
+        # Répliquer vers Fuseki (boîte d'envoi durable, envoi en arrière-plan),
+        # dans l'ordre des générations pour que Fuseki converge vers le graphe local
+        if fuseki_replicator is not None and tenant is default_tenant:
+            fuseki_replicator.submit(added, removed)
+        # Diffuser la mutation aux clients abonnés, avec sa propre génération
+        publish_changes(added, removed, generation, tenant)
+    # Instantané des requêtes parallèles reconstruit en fond, pas par la prochaine requête
+    parallel_evaluator.rafraichir(tenant.sparql_graph, generation, tenant.write_lock)
+    request_state.write_generation = generation
     
+    if request_state.get('durability', WRITE_DURABILITY) == 'sync':
+        return tenant.writer.wait(generation, WRITE_TIMEOUT)
     return True
 
+def write_receipt():
+    """Génération produite par la requête et durabilité demandée, pour la réponse"""
+    return {
+        "generation": request_state.get('write_generation', current_tenant().generation),
+        "durability": request_state.get('durability', WRITE_DURABILITY)
+    }
+
 def generate_uri(class_name, name):
     """Générer un URI unique pour une nouvelle instance"""
     # Nettoyer le nom pour l'URI
@@ -1224,47 +1699,31 @@ def create_entity():
                 "error": f"Une entité avec le nom '{attributes['nom']}' existe déjà"
             }), 400
         
-        # Ajouter le type (rdf:type)
-        class_uri = NS[entity_type]
-        g.add((entity_uri, RDF.type, class_uri))
-        
-        # Mapping des propriétés par type d'entité
-        property_mappings = {
-            'Personne': {'nom': 'nomVoyageur', 'age': 'age'},
-            'Destination': {'nom': 'nomDestination', 'pays': 'pays'},
-            'Hébergement': {'nom': 'nomHebergement', 'prix': 'prix', 'capacite': 'capacite', 'type': 'typeHebergement'},
-            'ActivitéTouristique': {'nom': 'nomActivité', 'prix': 'prix', 'duree': 'duree'},
-            'Transport': {'nom': 'nomTransport', 'type': 'typeTransport'},
-            'Services': {'nom': 'nomService', 'prix': 'prix'},
-            'Nourriture': {'nom': 'nomNourriture'},
-            'Equipement': {'nom': 'nomEquipement'},
-            'CertificationÉco': {'nom': 'nomCertification', 'date': 'dateValidite'}
-        }
+        # Attributs convertis selon le schéma avant toute écriture
+        type_info = entity_types().get(entity_type)
+        if type_info is None:
+            return jsonify({
+                "success": False,
+                "error": f"Type d'entité inconnu: {entity_type}"
+            }), 400
+        try:
+            valeurs, ignored = type_info.encode(attributes)
+        except InvalidValue as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         
-        # Ajouter les propriétés de données
-        if entity_type in property_mappings:
-            for attr_key, attr_value in attributes.items():
-                if attr_key in property_mappings[entity_type]:
-                    property_name = property_mappings[entity_type][attr_key]
-                    property_uri = NS[property_name]
-                    
-                    # Déterminer le type de littéral
-                    if attr_key in ['age', 'prix', 'capacite', 'duree']:
-                        if attr_key == 'prix':
-                            literal = Literal(float(attr_value), datatype=XSD.float)
-                        else:
-                            literal = Literal(int(attr_value), datatype=XSD.integer)
-                    else:
-                        literal = Literal(attr_value)
-                    
-                    g.add((entity_uri, property_uri, literal))
+        # Ajouter le type (rdf:type) puis les propriétés de données
+        graph_add((entity_uri, RDF.type, type_info.uri))
+        for property_uri, literal in valeurs:
+            graph_add((entity_uri, property_uri, literal))
         
         # Sauvegarder dans ws.rdf
         if save_rdf_to_file():
             return jsonify({
                 "success": True,
+                **write_receipt(),
                 "message": f"{entity_type} '{attributes['nom']}' créé avec succès",
-                "uri": str(entity_uri)
+                "uri": str(entity_uri),
+                "ignored": ignored
             })
         else:
             return jsonify({
@@ -1301,39 +1760,28 @@ def update_entity():
                 "error": "Entité non trouvée"
             }), 404
         
+        # Propriétés des types de l'entité (rdf:type), valeurs converties avant toute écriture
+        type_info = entity_types().of(g, entity_uri)
+        if type_info is None:
+            valeurs, ignored = [], list(attributes)
+        else:
+            try:
+                valeurs, ignored = type_info.encode(attributes)
+            except InvalidValue as e:
+                return jsonify({"success": False, "error": str(e)}), 400
+        
         # Supprimer les anciennes valeurs et ajouter les nouvelles
-        for attr_key, attr_value in attributes.items():
-            # Trouver la propriété correspondante
-            property_uri = None
-            for prop in [NS.nomVoyageur, NS.age, NS.nomDestination, NS.pays, 
-                        NS.nomHebergement, NS.prix, NS.capacite, NS.typeHebergement,
-                        NS.nomActivité, NS.duree, NS.nomTransport, NS.typeTransport,
-                        NS.nomService, NS.nomNourriture, NS.nomEquipement, 
-                        NS.nomCertification, NS.dateValidite]:
-                if str(prop).split('#')[1] == attr_key or str(prop).split('#')[1].startswith('nom'):
-                    property_uri = prop
-                    break
-            
-            if property_uri:
-                # Supprimer l'ancienne valeur
-                g.remove((entity_uri, property_uri, None))
-                
-                # Ajouter la nouvelle valeur
-                if attr_key in ['age', 'prix', 'capacite', 'duree']:
-                    if attr_key == 'prix':
-                        literal = Literal(float(attr_value), datatype=XSD.float)
-                    else:
-                        literal = Literal(int(attr_value), datatype=XSD.integer)
-                else:
-                    literal = Literal(attr_value)
-                
-                g.add((entity_uri, property_uri, literal))
+        for property_uri, literal in valeurs:
+            graph_remove((entity_uri, property_uri, None))
+            graph_add((entity_uri, property_uri, literal))
         
         # Sauvegarder
         if save_rdf_to_file():
             return jsonify({
                 "success": True,
-                "message": "Entité mise à jour avec succès"
+                **write_receipt(),
+                "message": "Entité mise à jour avec succès",
+                "ignored": ignored
             })
         else:
             return jsonify({
@@ -1370,15 +1818,20 @@ def delete_entity():
             }), 404
         
         # Supprimer tous les triplets où l'entité est sujet
-        g.remove((entity_uri, None, None))
+        if not graph_remove((entity_uri, None, None)):
+            return jsonify({
+                "success": False,
+                "error": "Entité du schéma partagé: non supprimable depuis ce locataire"
+            }), 403
         
         # Supprimer tous les triplets où l'entité est objet
-        g.remove((None, None, entity_uri))
+        graph_remove((None, None, entity_uri))
         
         # Sauvegarder
         if save_rdf_to_file():
             return jsonify({
                 "success": True,
+                **write_receipt(),
                 "message": "Entité supprimée avec succès"
             })
         else:
@@ -1393,6 +1846,11 @@ def delete_entity():
             "error": f"Erreur lors de la suppression: {str(e)}"
         }), 500
 
+# Fin de l'import: le serveur peut répondre, Gemini et Fuseki s'initialisent en fond
+startup.report.mark_serving()
+print(startup.report.summary())
+warm_up(WARM_UP_COMPONENTS)
+
 if __name__ == '__main__':
     # Désactiver le reloader en mode debug pour éviter les redémarrages constants
     import os
@@ -0,0 +1,298 @@
+"""
+Cache des solutions de BGP (motifs de graphe) partagé entre requêtes SPARQL.
+
+Beaucoup de requêtes de /api/query et /api/nl-query contiennent les mêmes
+sous-motifs, par exemple `?h rdf:type ns:Hébergement . ?h
+ns:possèdeCertification ?c . ?c ns:nomCertification ?n`, avec des noms de
+variables différents. Chaque BGP évalué par RDFLib est mis sous forme
+canonique: les variables sont renommées d'après leur rôle dans le motif
+(raffinement de couleurs), puis les triplets sont triés. La même table de
+solutions sert donc à toutes les requêtes qui contiennent ce motif, quels
+que soient les noms de variables.
+
+Une table est stockée de façon compacte: un dictionnaire de termes propre à
+l'entrée et les lignes sous forme d'identifiants entiers dans un
+`array('I')`. Quand le BGP est évalué avec des variables déjà liées (partie
+droite d'un OPTIONAL, jointure), la table complète est calculée une fois,
+puis interrogée par un index de hachage sur les colonnes liées.
+
+Chaque entrée dépend des prédicats et des classes lus par son motif
+(`dependencies.read_set`). Une mutation n'invalide que les entrées dont les
+dépendances croisent ce qu'elle a écrit. Le cache est borné en nombre de
+cellules, avec éviction LRU. Chaque BGP évalué signale aussi ses lectures
+au relevé en cours, ce qui sert au cache des réponses.
+"""
+import contextvars
+import os
+from array import array
+from functools import lru_cache
+
+from rdflib import BNode, Variable
+from rdflib.plugins.sparql import CUSTOM_EVALS
+from rdflib.plugins.sparql.evaluate import evalBGP
+from rdflib.plugins.sparql.sparql import Bindings
+
+from dependencies import DependencyCache, read_set, record_reads
+from metrics import Counter, registry
+
+# Cache actif pour la requête en cours: (cache, graphe)
+_actif = contextvars.ContextVar('bgp_cache', default=None)
+
+bgp_cache_lookups = registry.register(Counter(
+    'bgp_cache_lookups_total', 'Évaluations de BGP par résultat du cache (hit, miss, bypass)'))
+
+
+def _est_variable(t):
+    return isinstance(t, (Variable, BNode))
+
+
+def canonicalize(triples):
+    """Forme canonique d'un BGP, invariante par renommage des variables
+
+    Retourne (clé, variables): `variables` donne la variable d'origine de
+    chaque colonne, dans l'ordre canonique. Deux BGP de même clé sont
+    identiques au nommage près.
+    """
+    triples = [tuple(t) for t in triples]
+    variables = list(dict.fromkeys(t for triple in triples for t in triple if _est_variable(t)))
+    constantes = {}
+
+    def n3(t):
+        texte = constantes.get(t)
+        if texte is None:
+            texte = constantes[t] = t.n3()
+        return texte
+
+    def forme(triple, couleurs, v):
+        return ' '.join('*' if t == v else f'?{couleurs[t]}' if t in couleurs else n3(t) for t in triple)
+
+    # Raffinement: la couleur d'une variable résume les motifs où elle apparaît
+    couleurs = dict.fromkeys(variables, 0)
+    for _ in range(len(variables)):
+        signatures = {
+            v: (couleurs[v],) + tuple(sorted(forme(triple, couleurs, v) for triple in triples if v in triple))
+            for v in variables}
+        rangs = {sig: i for i, sig in enumerate(sorted(set(signatures.values())))}
+        nouvelles = {v: rangs[signatures[v]] for v in variables}
+        stable = len(set(nouvelles.values())) == len(set(couleurs.values()))
+        couleurs = nouvelles
+        if stable:
+            break
+
+    ordre = sorted(variables, key=lambda v: (couleurs[v], str(v)))
+    noms = {v: f'?v{i}' for i, v in enumerate(ordre)}
+    cle = '\n'.join(sorted({' '.join(noms[t] if t in noms else n3(t) for t in triple) for triple in triples}))
+    return cle, ordre
+
+
+class Entry:
+    """Table de solutions compacte: termes internés + lignes d'identifiants"""
+
+    __slots__ = ('largeur', 'termes', 'lignes', 'index')
+
+    def __init__(self, largeur, termes, lignes):
+        self.largeur = largeur
+        self.termes = termes
+        self.lignes = lignes
+        self.index = {}
+
+    def __len__(self):
+        return len(self.lignes) // self.largeur if self.largeur else len(self.lignes)
+
+    @property
+    def cells(self):
+        # Taille comptée dans le budget du cache, index de jointure compris
+        return len(self.lignes) + len(self.termes) + len(self)
+
+    def rows(self, colonnes=(), valeurs=()):
+        """Lignes (tuples de termes), filtrées sur les colonnes liées"""
+        termes, lignes, largeur = self.termes, self.lignes, self.largeur
+        if not largeur:
+            # BGP sans variable: une ligne vide par solution
+            return [()] * len(lignes)
+        if colonnes:
+            index = self.index.get(colonnes)
+            if index is None:
+                index = {}
+                for debut in range(0, len(lignes), largeur):
+                    cle = tuple(termes[lignes[debut + j]] for j in colonnes)
+                    index.setdefault(cle, []).append(debut)
+                self.index[colonnes] = index
+            debuts = index.get(tuple(valeurs), ())
+        else:
+            debuts = range(0, len(lignes), largeur)
+        return [tuple(termes[i] for i in lignes[debut:debut + largeur]) for debut in debuts]
+
+
+class BGPCache:
+    """Tables de solutions de BGP canoniques, invalidées par dépendances"""
+
+    def __init__(self, max_cells=1000000):
+        self.tables = DependencyCache(max_cells)
+        # Motifs dont la table dépasse la taille maximale d'une entrée
+        self.refus = DependencyCache(4096)
+        self.max_entry_cells = max_cells // 4
+        self.bypass = 0
+
+    @property
+    def max_cells(self):
+        return self.tables.max_cost
+
+    @max_cells.setter
+    def max_cells(self, valeur):
+        self.tables.max_cost = valeur
+        self.max_entry_cells = valeur // 4
+
+    @property
+    def enabled(self):
+        return self.tables.enabled
+
+    def activate(self, graph):
+        """Consulter le cache pour la requête en cours (jeton à passer à deactivate)"""
+        return _actif.set((self, graph))
+
+    @staticmethod
+    def deactivate(jeton):
+        _actif.reset(jeton)
+
+    def invalidate(self, jetons):
+        """Retirer les tables qui lisent l'un des jetons écrits (`dependencies.write_set`)"""
+        self.tables.invalidate(jetons)
+        self.refus.invalidate(jetons)
+
+    def clear(self):
+        self.tables.clear()
+        self.refus.clear()
+
+    def stats(self):
+        stats = self.tables.stats()
+        stats["bypass"] = self.bypass
+        return stats
+
+    # ------------------------------------------------------------------
+    # Évaluation
+    # ------------------------------------------------------------------
+
+    def _calculer(self, ctx, part, cle, variables, dependances, epoque):
+        """Solutions d'un BGP sans variable liée, enregistrées au passage
+
+        Les solutions sont transmises au fur et à mesure; la table n'est
+        enregistrée que si l'évaluation va jusqu'au bout (pas de LIMIT qui
+        l'interrompt) et reste sous la taille maximale d'une entrée.
+        """
+        termes, ids, lignes = [None], {None: 0}, array('I')
+        largeur = len(variables)
+        for solution in _evaluer(ctx, part):
+            if lignes is not None:
+                for v in variables:
+                    t = solution.get(v)
+                    ident = ids.get(t)
+                    if ident is None:
+                        ident = ids[t] = len(termes)
+                        termes.append(t)
+                    lignes.append(ident)
+                if not largeur:
+                    lignes.append(0)
+                if len(lignes) + len(termes) > self.max_entry_cells:
+                    lignes = None
+            yield solution
+        if lignes is not None:
+            entry = Entry(largeur, termes, lignes)
+            self.tables.put(cle, entry, dependances, entry.cells, epoque)
+
+    def _table(self, ctx, part, cle, variables, dependances):
+        """Table complète d'un BGP (calculée hors des liaisons courantes), ou None si trop grande"""
+        vide = ctx.clone()
+        vide.bindings = Bindings()
+        epoque = self.tables.epoch()
+        for _ in self._calculer(vide, part, cle, variables, dependances, epoque):
+            pass
+        entry = self.tables.get(cle, count=False)
+        if entry is None:
+            # Trop grande (ou invalidée entre-temps): marquer le motif pour ne pas réessayer
+            self.refus.put(cle, True, dependances, 1, epoque)
+        return entry
+
+    def evaluate(self, ctx, part):
+        cle, variables, dependances = _forme_canonique(part)
+        liees = tuple(j for j, v in enumerate(variables) if ctx[v] is not None)
+        entry = self.tables.get(cle)
+        if entry is None and not self.refus.get(cle, count=False):
+            if not liees:
+                bgp_cache_lookups.inc(result='miss')
+                return self._calculer(ctx, part, cle, variables, dependances, self.tables.epoch())
+            entry = self._table(ctx, part, cle, variables, dependances)
+        if entry is None:
+            # Motif trop volumineux pour le cache
+            self.bypass += 1
+            bgp_cache_lookups.inc(result='bypass')
+            return _evaluer(ctx, part)
+        bgp_cache_lookups.inc(result='hit')
+        return self._solutions(ctx, entry, variables, liees)
+
+    @staticmethod
+    def _solutions(ctx, entry, variables, liees):
+        libres = [j for j in range(len(variables)) if j not in liees]
+        for ligne in entry.rows(liees, [ctx[variables[j]] for j in liees]):
+            c = ctx.push()
+            for j in libres:
+                if ligne[j] is not None:
+                    c[variables[j]] = ligne[j]
+            yield c.solution()
+
+
+def _forme_canonique(part):
+    # Mémorisée sur le nœud de l'algèbre (attribut, pas une clé de la CompValue):
+    # la partie droite d'un OPTIONAL est réévaluée pour chaque ligne
+    forme = part.__dict__.get('_bgp_cache')
+    if forme is None:
+        forme = part.__dict__['_bgp_cache'] = _canonique(tuple(tuple(t) for t in part.triples))
+    return forme
+
+
+@lru_cache(maxsize=4096)
+def _canonique(triples):
+    # Les mêmes BGP reviennent à chaque requête (endpoints, questions NL)
+    cle, variables = canonicalize(triples)
+    return cle, variables, read_set(triples)
+
+
+def _evaluer(ctx, part):
+    """Évaluation sans cache: autres évaluations personnalisées, puis RDFLib"""
+    for nom, evaluation in list(CUSTOM_EVALS.items()):
+        if nom == 'bgp_cache':
+            continue
+        try:
+            return evaluation(ctx, part)
+        except NotImplementedError:
+            pass
+    # Même ordre que RDFLib: motifs les plus liés d'abord
+    triples = sorted(part.triples, key=lambda t: len([n for n in t if ctx[n] is None]))
+    return evalBGP(ctx, triples)
+
+
+def _custom_eval(ctx, part):
+    """Hook CUSTOM_EVALS: lectures relevées, BGP servis depuis le cache du locataire"""
+    if part.name != 'BGP' or not part.triples:
+        raise NotImplementedError
+    record_reads(_forme_canonique(part)[2])
+    actif = _actif.get()
+    if actif is None:
+        raise NotImplementedError
+    cache, graph = actif
+    if ctx.graph is not graph or not cache.enabled:
+        raise NotImplementedError
+    return cache.evaluate(ctx, part)
+
+
+def create_cache():
+    """Cache de BGP selon BGP_CACHE_CELLS (0 pour le désactiver)"""
+    return BGPCache(int(os.getenv('BGP_CACHE_CELLS', 1000000)))
+
+
+# Le cache passe avant les autres évaluations personnalisées (évaluation
+# parallèle...), qu'il appelle lui-même en cas d'absence
+_autres = {nom: evaluation for nom, evaluation in CUSTOM_EVALS.items() if nom != 'bgp_cache'}
+CUSTOM_EVALS.clear()
+CUSTOM_EVALS['bgp_cache'] = _custom_eval
+CUSTOM_EVALS.update(_autres)
@@ -0,0 +1,268 @@
+"""
+Requêtes SPARQL des collections de l'API.
+
+`COLLECTION_QUERIES`: une requête tabulaire par collection, qui joint
+toutes les propriétés. Les exports (`export.py`) en écrivent les lignes
+brutes: un hébergement à k certifications y occupe k lignes.
+
+Les listings (`/api/destinations`, `/api/hebergements`...) rendent au
+contraire un enregistrement par entité. Leur requête de base
+(`LISTING_QUERIES`) ne joint que les propriétés monovaluées. Chaque
+propriété multivaluée (`MULTI_VALUED`) est lue par sa propre requête
+`?item ?valeur`, puis regroupée par entité en une passe: le moteur produit
+k + m lignes pour une entité à k certifications et m empreintes, au lieu
+de k x m.
+"""
+
+PREFIXES = """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+"""
+
+COLLECTION_QUERIES = {
+    'destinations': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT DISTINCT ?destination ?nom
+WHERE {
+    ?destination rdf:type ns:Destination .
+    OPTIONAL { ?destination ns:nomDestination ?nom }
+}
+""",
+    'hebergements': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+PREFIX owl: <http://www.w3.org/2002/07/owl#>
+
+SELECT DISTINCT ?hebergement ?nom ?certification
+WHERE {
+    {
+        ?hebergement rdf:type ns:Hébergement .
+    } UNION {
+        ?hebergement rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Hébergement .
+    }
+    OPTIONAL { ?hebergement ns:nomHebergement ?nom }
+    OPTIONAL { ?hebergement ns:possèdeCertification ?cert .
+               ?cert ns:nomCertification ?certification }
+}
+""",
+    'activites': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?activite ?nom ?duree ?empreinte
+WHERE {
+    {
+        ?activite rdf:type ns:ActivitéTouristique .
+    } UNION {
+        ?activite rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:ActivitéTouristique .
+    }
+    OPTIONAL { ?activite ns:nomActivité ?nom }
+    OPTIONAL { ?activite ns:duree ?duree }
+    OPTIONAL { ?activite ns:aEmpreinteCarbone ?ec .
+               ?ec ns:empreinte ?empreinte }
+}
+""",
+    'transports': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?transport ?empreinte
+WHERE {
+    ?transport rdf:type ns:Transport .
+    OPTIONAL { ?transport ns:aEmpreinteCarbone ?ec .
+               ?ec ns:empreinte ?empreinte }
+}
+""",
+    'services': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?service ?nom ?prix
+WHERE {
+    {
+        ?service rdf:type ns:Services .
+    } UNION {
+        ?service rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Services .
+    }
+    OPTIONAL { ?service ns:nomService ?nom }
+    OPTIONAL { ?service ns:prix ?prix }
+}
+""",
+    'nourritures': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?nourriture ?nom
+WHERE {
+    {
+        ?nourriture rdf:type ns:Nourriture .
+    } UNION {
+        ?nourriture rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Nourriture .
+    }
+    OPTIONAL { ?nourriture ns:nomNourriture ?nom }
+}
+""",
+    'equipements': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?equipement ?nom
+WHERE {
+    {
+        ?equipement rdf:type ns:Equipement .
+    } UNION {
+        ?equipement rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Equipement .
+    }
+    OPTIONAL { ?equipement ns:nomEquipement ?nom }
+}
+""",
+    'personnes': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?personne ?nom ?age
+WHERE {
+    {
+        ?personne rdf:type ns:Personne .
+    } UNION {
+        ?personne rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Personne .
+    }
+    OPTIONAL { ?personne ns:nomVoyageur ?nom }
+    OPTIONAL { ?personne ns:age ?age }
+}
+""",
+    'certifications': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?certification ?nom ?date
+WHERE {
+    {
+        ?certification rdf:type ns:CertificationÉco .
+    } UNION {
+        ?certification rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:CertificationÉco .
+    }
+    OPTIONAL { ?certification ns:nomCertification ?nom }
+    OPTIONAL { ?certification ns:dateValidite ?date }
+}
+""",
+}
+
+# Requêtes de base des listings: une ligne par entité
+LISTING_QUERIES = {
+    **COLLECTION_QUERIES,
+    'hebergements': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?hebergement ?nom
+WHERE {
+    {
+        ?hebergement rdf:type ns:Hébergement .
+    } UNION {
+        ?hebergement rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Hébergement .
+    }
+    OPTIONAL { ?hebergement ns:nomHebergement ?nom }
+}
+""",
+    'activites': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?activite ?nom ?duree
+WHERE {
+    {
+        ?activite rdf:type ns:ActivitéTouristique .
+    } UNION {
+        ?activite rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:ActivitéTouristique .
+    }
+    OPTIONAL { ?activite ns:nomActivité ?nom }
+    OPTIONAL { ?activite ns:duree ?duree }
+}
+""",
+    'transports': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT DISTINCT ?transport
+WHERE {
+    ?transport rdf:type ns:Transport .
+}
+""",
+}
+
+# Propriétés multivaluées des listings: champ -> requête (?item ?valeur),
+# restreinte aux entités de la collection comme sa requête de base
+MULTI_VALUED = {
+    'hebergements': {
+        'certifications': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?item ?valeur
+WHERE {
+    {
+        ?item rdf:type ns:Hébergement .
+    } UNION {
+        ?item rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:Hébergement .
+    }
+    ?item ns:possèdeCertification ?cert .
+    ?cert ns:nomCertification ?valeur
+}
+"""
+    },
+    'activites': {
+        'empreintes': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+
+SELECT DISTINCT ?item ?valeur
+WHERE {
+    {
+        ?item rdf:type ns:ActivitéTouristique .
+    } UNION {
+        ?item rdf:type ?subclass .
+        ?subclass rdfs:subClassOf ns:ActivitéTouristique .
+    }
+    ?item ns:aEmpreinteCarbone ?ec .
+    ?ec ns:empreinte ?valeur
+}
+"""
+    },
+    'transports': {
+        'empreintes': """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+
+SELECT DISTINCT ?item ?valeur
+WHERE {
+    ?item rdf:type ns:Transport .
+    ?item ns:aEmpreinteCarbone ?ec .
+    ?ec ns:empreinte ?valeur
+}
+"""
+    },
+}
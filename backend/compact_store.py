@@ -0,0 +1,403 @@
+"""
+Store RDFLib compact: dictionnaire de termes interné et triplets en entiers.
+
+Chaque terme est interné une seule fois dans un dictionnaire, sous une clé
+texte où l'espace de noms est remplacé par un numéro de préfixe (toutes les
+URI de l'ontologie partagent le long préfixe `http://www.semanticweb.org/...#`).
+Les triplets sont stockés sous forme d'identifiants entiers dans trois
+colonnes `array` (S, P, O), avec trois permutations triées (SPO, POS, OSP)
+pour répondre à tous les motifs par recherche dichotomique.
+
+Les ajouts sont accumulés dans une petite zone d'attente, indexée par
+sujet, prédicat et objet, que les lectures consultent directement. Ils ne
+sont fusionnés dans les permutations qu'au-delà de SEUIL_FUSION lignes, par
+insertion dichotomique dans les tableaux triés (pas de tri complet, sauf
+pour un chargement en masse). Les suppressions marquent les lignes mortes,
+compactées quand elles dépassent un quart du total. Le store se branche sur
+`rdflib.Graph`, donc SPARQL fonctionne sans changement.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+
+from rdflib import BNode, Literal, URIRef
+from rdflib.store import Store, VALID_STORE
+
+# Taille du cache des termes décodés (identifiant -> terme RDFLib)
+TAILLE_CACHE_TERMES = 65536
+# Lignes en attente au-delà desquelles elles sont fusionnées dans les permutations
+SEUIL_FUSION = 1024
+
+
+def _split_uri(uri):
+    """Couper une URI en (espace de noms, nom local) au dernier '#' ou '/'"""
+    coupure = max(uri.rfind('#'), uri.rfind('/')) + 1
+    return uri[:coupure], uri[coupure:]
+
+
+class CompactStore(Store):
+    """Triplets en identifiants entiers avec permutations SPO / POS / OSP triées"""
+
+    context_aware = False
+    formula_aware = False
+    graph_aware = False
+
+    def __init__(self, configuration=None, identifier=None):
+        super().__init__(configuration, identifier)
+        self._lock = threading.RLock()
+        # Dictionnaire de termes
+        self._prefixes = []
+        self._prefix_ids = {}
+        self._keys = []
+        self._ids = {}
+        self._decoded = {}
+        # Triplets
+        self._s = array('I')
+        self._p = array('I')
+        self._o = array('I')
+        self._vivant = bytearray()
+        self._morts = 0
+        self._spo = array('I')
+        self._pos = array('I')
+        self._osp = array('I')
+        # Lignes >= _n_fusion: en attente, hors des permutations; celles < _indexe
+        # sont dans l'index d'attente (clé -> ligne, et identifiant -> lignes)
+        self._n_fusion = 0
+        self._indexe = 0
+        self._attente = {}
+        self._attente_s = {}
+        self._attente_p = {}
+        self._attente_o = {}
+        self._namespaces = {}
+        self._prefix_of = {}
+
+    def open(self, configuration, create=False):
+        return VALID_STORE
+
+    # ------------------------------------------------------------------
+    # Dictionnaire de termes
+    # ------------------------------------------------------------------
+
+    def _prefix_id(self, namespace):
+        pid = self._prefix_ids.get(namespace)
+        if pid is None:
+            pid = len(self._prefixes)
+            self._prefixes.append(namespace)
+            self._prefix_ids[namespace] = pid
+        return pid
+
+    def _key(self, term, creer):
+        if isinstance(term, Literal):
+            dt = ''
+            if term.datatype is not None:
+                dt = self._id(term.datatype, creer)
+                if dt is None:
+                    return None
+            return f"L{dt}|{term.language or ''}|{term}"
+        if isinstance(term, BNode):
+            return f"B{term}"
+        namespace, local = _split_uri(str(term))
+        if creer:
+            pid = self._prefix_id(namespace)
+        else:
+            pid = self._prefix_ids.get(namespace)
+            if pid is None:
+                return None
+        return f"U{pid}|{local}"
+
+    def _id(self, term, creer=False):
+        key = self._key(term, creer)
+        if key is None:
+            return None
+        ident = self._ids.get(key)
+        if ident is None and creer:
+            ident = len(self._keys)
+            self._keys.append(key)
+            self._ids[key] = ident
+        return ident
+
+    def _term(self, ident):
+        term = self._decoded.get(ident)
+        if term is not None:
+            return term
+        key = self._keys[ident]
+        kind = key[0]
+        if kind == 'U':
+            pid, local = key[1:].split('|', 1)
+            term = URIRef(self._prefixes[int(pid)] + local)
+        elif kind == 'L':
+            dt, lang, lexical = key[1:].split('|', 2)
+            term = Literal(lexical, lang=lang or None, datatype=self._term(int(dt)) if dt else None)
+        else:
+            term = BNode(key[1:])
+        if len(self._decoded) >= TAILLE_CACHE_TERMES:
+            self._decoded.clear()
+        self._decoded[ident] = term
+        return term
+
+    # ------------------------------------------------------------------
+    # Index
+    # ------------------------------------------------------------------
+
+    def _cles(self, s, p, o):
+        return {
+            'spo': lambda i: (s[i], p[i], o[i]),
+            'pos': lambda i: (p[i], o[i], s[i]),
+            'osp': lambda i: (o[i], s[i], p[i]),
+        }
+
+    def _dans_permutations(self, cle):
+        """Une ligne vivante des permutations a-t-elle ce triplet (identifiants)?"""
+        cs, cp, co, vivant, spo = self._s, self._p, self._o, self._vivant, self._spo
+        k = bisect_left(spo, cle, key=lambda i: (cs[i], cp[i], co[i]))
+        while k < len(spo) and (cs[spo[k]], cp[spo[k]], co[spo[k]]) == cle:
+            if vivant[spo[k]]:
+                return True
+            k += 1
+        return False
+
+    def _preparer(self):
+        """Avant une lecture: indexer les lignes en attente, ou les fusionner si trop nombreuses"""
+        if len(self._s) - self._n_fusion > SEUIL_FUSION:
+            self._fusionner()
+            if self._morts > len(self._s) // 4:
+                self._compacter()
+            return
+        cs, cp, co, vivant = self._s, self._p, self._o, self._vivant
+        for i in range(self._indexe, len(cs)):
+            if not vivant[i]:
+                continue
+            cle = (cs[i], cp[i], co[i])
+            if cle in self._attente or self._dans_permutations(cle):
+                # Doublon d'un triplet présent
+                vivant[i] = 0
+                self._morts += 1
+                continue
+            self._attente[cle] = i
+            self._attente_s.setdefault(cle[0], []).append(i)
+            self._attente_p.setdefault(cle[1], []).append(i)
+            self._attente_o.setdefault(cle[2], []).append(i)
+        self._indexe = len(cs)
+
+    def _oublier_attente(self, i):
+        cle = (self._s[i], self._p[i], self._o[i])
+        del self._attente[cle]
+        for index, ident in ((self._attente_s, cle[0]), (self._attente_p, cle[1]), (self._attente_o, cle[2])):
+            lignes = index[ident]
+            lignes.remove(i)
+            if not lignes:
+                del index[ident]
+
+    @staticmethod
+    def _inserer(perm, nouvelles, cle):
+        """Fusion linéaire: `nouvelles` (triées) insérées dans `perm` (triée)"""
+        resultat = array('I')
+        debut = 0
+        for i in nouvelles:
+            position = bisect_left(perm, cle(i), debut, key=cle)
+            resultat += perm[debut:position]
+            resultat.append(i)
+            debut = position
+        resultat += perm[debut:]
+        return resultat
+
+    def _fusionner(self):
+        """Intégrer les lignes en attente aux permutations et éliminer les doublons"""
+        s, p, o = self._s, self._p, self._o
+        if self._n_fusion == len(s):
+            return
+        cles = self._cles(s, p, o)
+        vivant = self._vivant
+        nouvelles = [i for i in range(self._n_fusion, len(s)) if vivant[i]]
+        self._n_fusion = self._indexe = len(s)
+        self._attente, self._attente_s, self._attente_p, self._attente_o = {}, {}, {}, {}
+
+        if len(nouvelles) > len(self._spo) // 8:
+            # Chargement en masse: un tri complet coûte moins que les insertions
+            spo = sorted(self._spo + array('I', nouvelles), key=cles['spo'])
+            # Doublons: lignes vivantes adjacentes de même clé dans l'ordre SPO
+            precedent = None
+            for i in spo:
+                if not vivant[i]:
+                    continue
+                cle = (s[i], p[i], o[i])
+                if cle == precedent:
+                    vivant[i] = 0
+                    self._morts += 1
+                precedent = cle
+            self._spo = array('I', spo)
+            self._pos = array('I', sorted(self._pos + array('I', nouvelles), key=cles['pos']))
+            self._osp = array('I', sorted(self._osp + array('I', nouvelles), key=cles['osp']))
+            return
+
+        nouvelles.sort(key=cles['spo'])
+        gardees = []
+        precedent = None
+        for i in nouvelles:
+            cle = (s[i], p[i], o[i])
+            if cle == precedent or self._dans_permutations(cle):
+                vivant[i] = 0
+                self._morts += 1
+            else:
+                gardees.append(i)
+            precedent = cle
+        self._spo = self._inserer(self._spo, gardees, cles['spo'])
+        self._pos = self._inserer(self._pos, sorted(gardees, key=cles['pos']), cles['pos'])
+        self._osp = self._inserer(self._osp, sorted(gardees, key=cles['osp']), cles['osp'])
+
+    def _compacter(self):
+        """Réécrire les colonnes sans les lignes mortes"""
+        self._fusionner()
+        garder = [i for i in self._spo if self._vivant[i]]
+        self._s = array('I', (self._s[i] for i in garder))
+        self._p = array('I', (self._p[i] for i in garder))
+        self._o = array('I', (self._o[i] for i in garder))
+        n = len(garder)
+        self._vivant = bytearray(b'\x01') * n
+        self._morts = 0
+        self._n_fusion = self._indexe = n
+        cles = self._cles(self._s, self._p, self._o)
+        self._spo = array('I', range(n))
+        self._pos = array('I', sorted(range(n), key=cles['pos']))
+        self._osp = array('I', sorted(range(n), key=cles['osp']))
+
+    def _lignes(self, s, p, o):
+        """Lignes vivantes correspondant au motif (identifiants ou None)"""
+        return self._lignes_permutations(s, p, o) + self._lignes_attente(s, p, o)
+
+    def _lignes_attente(self, s, p, o):
+        if not self._attente:
+            return []
+        if s is not None:
+            candidates = self._attente_s.get(s, ())
+        elif p is not None:
+            candidates = self._attente_p.get(p, ())
+        elif o is not None:
+            candidates = self._attente_o.get(o, ())
+        else:
+            return list(self._attente.values())
+        cs, cp, co = self._s, self._p, self._o
+        return [i for i in candidates
+                if (s is None or cs[i] == s) and (p is None or cp[i] == p) and (o is None or co[i] == o)]
+
+    def _lignes_permutations(self, s, p, o):
+        cs, cp, co = self._s, self._p, self._o
+        vivant = self._vivant
+        if s is not None:
+            if o is not None and p is None:
+                perm, cle, prefixe = self._osp, (lambda i: (co[i], cs[i], cp[i])), (o, s)
+            else:
+                perm, cle = self._spo, (lambda i: (cs[i], cp[i], co[i]))
+                prefixe = (s,) if p is None else ((s, p) if o is None else (s, p, o))
+        elif p is not None:
+            perm, cle = self._pos, (lambda i: (cp[i], co[i], cs[i]))
+            prefixe = (p,) if o is None else (p, o)
+        elif o is not None:
+            perm, cle, prefixe = self._osp, (lambda i: (co[i], cs[i], cp[i])), (o,)
+        else:
+            return [i for i in self._spo if vivant[i]]
+        debut = bisect_left(perm, prefixe, key=cle)
+        fin = bisect_left(perm, prefixe[:-1] + (prefixe[-1] + 1,), key=cle)
+        return [perm[k] for k in range(debut, fin) if vivant[perm[k]]]
+
+    # ------------------------------------------------------------------
+    # API Store
+    # ------------------------------------------------------------------
+
+    def add(self, triple, context=None, quoted=False):
+        with self._lock:
+            s, p, o = (self._id(t, creer=True) for t in triple)
+            self._s.append(s)
+            self._p.append(p)
+            self._o.append(o)
+            self._vivant.append(1)
+
+    def addN(self, quads):
+        for s, p, o, c in quads:
+            self.add((s, p, o), c)
+
+    def _motif(self, triple_pattern):
+        ids = []
+        for term in triple_pattern:
+            if term is None:
+                ids.append(None)
+            else:
+                ident = self._id(term)
+                if ident is None:
+                    return None
+                ids.append(ident)
+        return ids
+
+    def remove(self, triple_pattern, context=None):
+        with self._lock:
+            self._preparer()
+            ids = self._motif(triple_pattern)
+            if ids is None:
+                return
+            for i in self._lignes(*ids):
+                self._vivant[i] = 0
+                self._morts += 1
+                if i >= self._n_fusion:
+                    self._oublier_attente(i)
+            if self._morts > len(self._s) // 4:
+                self._compacter()
+
+    def triples(self, triple_pattern, context=None):
+        with self._lock:
+            self._preparer()
+            ids = self._motif(triple_pattern)
+            if ids is None:
+                return
+            lignes = self._lignes(*ids)
+            cs, cp, co = self._s, self._p, self._o
+            term = self._term
+            resultats = [(term(cs[i]), term(cp[i]), term(co[i])) for i in lignes]
+        for triple in resultats:
+            yield triple, iter(())
+
+    def __len__(self, context=None):
+        with self._lock:
+            self._preparer()
+            return len(self._s) - self._morts
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # ------------------------------------------------------------------
+    # Espaces de noms
+    # ------------------------------------------------------------------
+
+    def bind(self, prefix, namespace, override=True):
+        if not override and prefix in self._namespaces:
+            return
+        ancien = self._prefix_of.pop(namespace, None)
+        if ancien is not None:
+            self._namespaces.pop(ancien, None)
+        self._namespaces[prefix] = namespace
+        self._prefix_of[namespace] = prefix
+
+    def namespace(self, prefix):
+        return self._namespaces.get(prefix)
+
+    def prefix(self, namespace):
+        return self._prefix_of.get(namespace)
+
+    def namespaces(self):
+        return iter(list(self._namespaces.items()))
+
+    # ------------------------------------------------------------------
+    # Statistiques
+    # ------------------------------------------------------------------
+
+    def memory_stats(self):
+        """Taille des structures principales (octets approximatifs)"""
+        with self._lock:
+            self._fusionner()
+            colonnes = sum(a.itemsize * len(a) for a in (self._s, self._p, self._o, self._spo,
+                                                           self._pos, self._osp))
+            return {
+                "triples": len(self._s) - self._morts,
+                "terms": len(self._keys),
+                "prefixes": len(self._prefixes),
+                "index_bytes": colonnes + len(self._vivant)
+            }
@@ -0,0 +1,74 @@
+"""
+Appels concurrents vers des services lents (Gemini) sous limite de débit.
+
+`RateLimiter` est un seau à jetons: au plus `rate` appels par seconde, par
+rafales de `burst`. `acquire` attend le jeton (appels sortants vers
+Gemini), `try_acquire` refuse sans attendre (limites par client,
+`admission.py`). `map_concurrently`
+exécute une fonction sur une liste d'éléments dans un pool de threads. Le
+contexte de la requête Flask est recopié dans chaque thread, donc les spans
+restent rattachés à la requête. Les résultats sont rendus dans l'ordre, avec
+l'exception éventuelle de chaque élément.
+"""
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class RateLimiter:
+    """Seau à jetons: `rate` jetons par seconde, capacité `burst` (rate <= 0: illimité)"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._jetons = float(self.burst)
+        self._dernier = time.monotonic()
+        self._lock = threading.Lock()
+        self.waits = 0
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        self._jetons = min(self.burst, self._jetons + (maintenant - self._dernier) * self.rate)
+        self._dernier = maintenant
+
+    def acquire(self):
+        """Prendre un jeton, en attendant qu'il soit disponible"""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            self._remplir()
+            self._jetons -= 1
+            # Jeton emprunté: attendre hors du verrou qu'il soit remboursé
+            attente = -self._jetons / self.rate if self._jetons < 0 else 0
+            if attente:
+                self.waits += 1
+        if attente:
+            time.sleep(attente)
+
+    def try_acquire(self):
+        """Prendre un jeton sans attendre; retourne 0, ou le délai (s) avant le prochain jeton"""
+        if self.rate <= 0:
+            return 0
+        with self._lock:
+            self._remplir()
+            if self._jetons >= 1:
+                self._jetons -= 1
+                return 0
+            return (1 - self._jetons) / self.rate
+
+
+def map_concurrently(fn, items, workers):
+    """[(résultat, exception)] de fn sur chaque élément, dans l'ordre des éléments"""
+    def appel(item):
+        try:
+            return fn(item), None
+        except Exception as e:
+            return None, e
+
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [appel(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        futures = [pool.submit(contextvars.copy_context().run, appel, item) for item in items]
+        return [future.result() for future in futures]
@@ -0,0 +1,269 @@
+"""
+Dépendances entre caches et mutations: classes et prédicats lus ou écrits.
+
+Une entrée de cache retient les jetons qu'elle a lus:
+- un prédicat (`ns:nomDestination`);
+- une classe `(rdf:type, C)`, pour les motifs `?x rdf:type C`,
+  `?x rdf:type ?sous . ?sous rdfs:subClassOf C` ou
+  `?x rdf:type/rdfs:subClassOf* C`;
+- ou `ANY` quand un prédicat est variable.
+
+Une mutation produit les jetons qu'elle écrit: ses prédicats et, pour
+chaque `rdf:type`, la classe et toutes ses super-classes. Seules les
+entrées dont les jetons croisent ceux de la mutation sont invalidées:
+ajouter une `Nourriture` ne touche pas la liste des destinations.
+
+Les lectures sont relevées automatiquement. Chaque BGP évalué par RDFLib
+signale ses jetons (voir `bgp_cache`) au relevé en cours (`track_reads`).
+Un endpoint mis en cache n'a donc pas de liste de dépendances à maintenir
+à la main.
+"""
+import contextvars
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from rdflib import RDF, RDFS, BNode, URIRef, Variable
+from rdflib.paths import MulPath, NegatedPath, Path, SequencePath
+
+# Jeton d'une lecture qui dépend de tout le graphe (prédicat variable...)
+ANY = None
+
+# Relevé des lectures de la requête en cours
+_releve = contextvars.ContextVar('dependencies', default=None)
+
+
+def _est_variable(t):
+    return isinstance(t, (Variable, BNode))
+
+
+def _predicats(p):
+    """Prédicats lus par un prédicat de motif (ANY si variable ou chemin négatif)"""
+    if isinstance(p, URIRef):
+        return {p}
+    if _est_variable(p) or isinstance(p, NegatedPath) or not isinstance(p, Path):
+        return ANY
+    sous = getattr(p, 'args', None) or [getattr(p, 'path', None) or p.arg]
+    resultat = set()
+    for q in sous:
+        predicats = _predicats(q)
+        if predicats is ANY:
+            return ANY
+        resultat |= predicats
+    return resultat
+
+
+def _sous_classe(p):
+    return p == RDFS.subClassOf or (isinstance(p, MulPath) and p.path == RDFS.subClassOf)
+
+
+def read_set(triples):
+    """Jetons lus par un BGP (ANY si un prédicat est variable)"""
+    # ?sous rdfs:subClassOf C: les types liés à ?sous sont des sous-classes de C
+    bornes = {}
+    for s, p, o in triples:
+        if _est_variable(s) and not _est_variable(o) and _sous_classe(p):
+            bornes.setdefault(s, set()).add(o)
+
+    jetons = set()
+    for s, p, o in triples:
+        if p == RDF.type:
+            if not _est_variable(o):
+                jetons.add((RDF.type, o))
+            elif o in bornes:
+                jetons.update((RDF.type, c) for c in bornes[o])
+            else:
+                # Type quelconque: toute écriture de rdf:type
+                jetons.add(RDF.type)
+            continue
+        if (isinstance(p, SequencePath) and p.args[0] == RDF.type and not _est_variable(o)
+                and all(_sous_classe(q) for q in p.args[1:])):
+            jetons.add((RDF.type, o))
+            jetons.add(RDFS.subClassOf)
+            continue
+        predicats = _predicats(p)
+        if predicats is ANY:
+            return ANY
+        jetons |= predicats
+    return jetons
+
+
+def write_set(triples, graph):
+    """Jetons écrits par un delta de triplets (super-classes comprises)"""
+    jetons = set()
+    for _, p, o in triples:
+        jetons.add(p)
+        if p == RDF.type:
+            jetons.update((RDF.type, c) for c in graph.transitive_objects(o, RDFS.subClassOf))
+    return jetons
+
+
+# ----------------------------------------------------------------------
+# Relevé des lectures
+# ----------------------------------------------------------------------
+
+class _Releve:
+    __slots__ = ('jetons', 'complet')
+
+    def __init__(self):
+        self.jetons = set()
+        self.complet = True
+
+
+@contextmanager
+def track_reads():
+    """Relever les jetons lus pendant le bloc (`releve.jetons`, ANY compris)"""
+    releve = _Releve()
+    jeton = _releve.set(releve)
+    try:
+        yield releve
+    finally:
+        _releve.reset(jeton)
+
+
+def record_reads(jetons):
+    releve = _releve.get()
+    if releve is not None:
+        if jetons is ANY:
+            releve.jetons.add(ANY)
+        else:
+            releve.jetons |= jetons
+
+
+def untracked():
+    """Signaler une lecture hors graphe local (Fuseki...): le résultat n'est pas mis en cache"""
+    releve = _releve.get()
+    if releve is not None:
+        releve.complet = False
+
+
+# ----------------------------------------------------------------------
+# Cache à invalidation sélective
+# ----------------------------------------------------------------------
+
+class _Entree:
+    __slots__ = ('valeur', 'jetons', 'cout', 'ecritures')
+
+    def __init__(self, valeur, jetons, cout, ecritures):
+        self.valeur = valeur
+        self.jetons = jetons
+        self.cout = cout
+        self.ecritures = ecritures
+
+
+class DependencyCache:
+    """Cache LRU borné dont les entrées sont invalidées par les jetons écrits
+
+    Les statistiques comparent avec une invalidation globale: `survivals`
+    compte les succès sur des entrées qui ont traversé au moins une
+    mutation. Avec une invalidation globale, ces accès auraient été des
+    absences.
+    """
+
+    def __init__(self, max_cost):
+        self.max_cost = max_cost
+        self._entries = OrderedDict()
+        self._index = {}
+        self._cout = 0
+        self._ecritures = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.survivals = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_cost > 0
+
+    def epoch(self):
+        """Compteur de mutations, à relire avant de stocker un résultat calculé"""
+        with self._lock:
+            return self._ecritures
+
+    def get(self, cle, count=True):
+        with self._lock:
+            entree = self._entries.get(cle)
+            if entree is None:
+                if count:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(cle)
+            if count:
+                self.hits += 1
+                if entree.ecritures != self._ecritures:
+                    self.survivals += 1
+            return entree.valeur
+
+    def put(self, cle, valeur, jetons, cout=1, epoch=None):
+        """Stocker une valeur; ignorée si une mutation a eu lieu depuis `epoch`"""
+        if cout > self.max_cost:
+            return False
+        with self._lock:
+            if (epoch is not None and epoch != self._ecritures) or cle in self._entries:
+                return False
+            jetons = (ANY,) if jetons is ANY else tuple(jetons)
+            self._entries[cle] = _Entree(valeur, jetons, cout, self._ecritures)
+            self._cout += cout
+            for jeton in jetons:
+                self._index.setdefault(jeton, set()).add(cle)
+            while self._cout > self.max_cost and self._entries:
+                self._retirer(next(iter(self._entries)))
+                self.evictions += 1
+            return True
+
+    def _retirer(self, cle):
+        entree = self._entries.pop(cle)
+        self._cout -= entree.cout
+        for jeton in entree.jetons:
+            cles = self._index.get(jeton)
+            if cles is not None:
+                cles.discard(cle)
+                if not cles:
+                    del self._index[jeton]
+
+    def invalidate(self, jetons):
+        """Retirer les entrées qui ont lu l'un des jetons écrits"""
+        if not jetons:
+            return
+        with self._lock:
+            self._ecritures += 1
+            cles = set(self._index.get(ANY, ()))
+            for jeton in jetons:
+                cles |= self._index.get(jeton, set())
+            for cle in cles:
+                self._retirer(cle)
+            self.invalidations += len(cles)
+
+    def clear(self):
+        with self._lock:
+            self._ecritures += 1
+            self._entries.clear()
+            self._index.clear()
+            self._cout = 0
+
+    def stats(self):
+        with self._lock:
+            consultations = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "cost": self._cout,
+                "max_cost": self.max_cost,
+                "hits": self.hits,
+                "misses": self.misses,
+                "survivals": self.survivals,
+                "hit_rate": round(self.hits / consultations, 4) if consultations else None,
+                # Taux qu'aurait donné une invalidation de tout le cache à chaque mutation
+                "global_invalidation_hit_rate":
+                    round((self.hits - self.survivals) / consultations, 4) if consultations else None,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "writes": self._ecritures
+            }
+
+
+def create_response_cache():
+    """Cache des réponses des listings selon RESPONSE_CACHE_MB (0 pour le désactiver)"""
+    return DependencyCache(int(float(os.getenv('RESPONSE_CACHE_MB', 32)) * 1024 * 1024))
@@ -0,0 +1,279 @@
+"""
+Formats de réponse négociés: JSON en colonnes, binaires et compression.
+
+Le format est choisi par l'en-tête `Accept`:
+
+- `application/json` (défaut): inchangé, une liste d'objets;
+- `application/vnd.ws.columnar+json`: chaque liste d'objets
+  devient une table `{"fields", "columns", "curies", "prefixes"}`, une
+  liste de valeurs par champ. Les colonnes dont toutes les valeurs sont des
+  URI d'un espace de noms connu sont écrites en CURIE (`ns:Paris`), avec la
+  table des préfixes utilisés;
+- `application/msgpack` (paquet `msgpack`): la même structure en
+  MessagePack;
+- `application/vnd.apache.arrow.stream` (paquet `pyarrow`): la
+  liste principale en flux Arrow IPC. Les autres champs de la réponse sont
+  dans les métadonnées du schéma (`payload`).
+
+Les formats dont le paquet n'est pas installé ne sont pas proposés: la
+réponse reste alors en JSON. Le corps est ensuite compressé selon
+`Accept-Encoding` (`br` si le paquet `brotli` est installé, sinon `gzip`),
+au-delà de COMPRESS_MIN_BYTES octets (défaut 1024).
+
+Le JSON est produit par orjson quand il est installé (`OrjsonProvider`),
+sinon par le module json de Flask.
+"""
+import gzip
+import json
+import os
+from operator import itemgetter
+
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+from metrics import span
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+JSON = 'application/json'
+COLUMNAR = 'application/vnd.ws.columnar+json'
+MSGPACK = 'application/msgpack'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+# JSON en premier: choisi pour `Accept: */*` (navigateur, curl)
+AVAILABLE_FORMATS = [JSON, COLUMNAR] + ([MSGPACK] if msgpack else []) + ([ARROW] if pyarrow else [])
+AVAILABLE_ENCODINGS = (['br'] if brotli else []) + ['gzip']
+
+COMPRESSIBLE = {JSON, COLUMNAR, MSGPACK, ARROW}
+
+# Niveaux rapides: les listings sont compressés à chaque absence du cache
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+# ----------------------------------------------------------------------
+# Sérialiseur JSON
+# ----------------------------------------------------------------------
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify par orjson: mêmes clés triées, encodage UTF-8 sans échappement"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj, self._options()).decode()
+
+    def _options(self):
+        options = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        corps = dumps(obj, self._options())
+        return self._app.response_class(corps + b'\n', mimetype=self.mimetype)
+
+
+def dumps(obj, options=None):
+    """JSON compact en octets (orjson si disponible)"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=DefaultJSONProvider.default,
+                                option=orjson.OPT_NON_STR_KEYS if options is None else options)
+        except orjson.JSONEncodeError:
+            # Entier au-delà de 64 bits...: module json
+            pass
+    return json.dumps(obj, default=DefaultJSONProvider.default, ensure_ascii=False,
+                      separators=(',', ':')).encode('utf-8')
+
+
+# ----------------------------------------------------------------------
+# Négociation
+# ----------------------------------------------------------------------
+
+def negotiate():
+    """(format, encodage) demandés par la requête en cours"""
+    if not has_request_context():
+        return JSON, None
+    return (request.accept_mimetypes.best_match(AVAILABLE_FORMATS, default=JSON),
+            request.accept_encodings.best_match(AVAILABLE_ENCODINGS))
+
+
+# ----------------------------------------------------------------------
+# Tables en colonnes
+# ----------------------------------------------------------------------
+
+def _espace(v, espaces):
+    """(espace de noms, préfixe) d'une URI, ou (None, None)"""
+    if not isinstance(v, str):
+        return None, None
+    coupure = max(v.rfind('#'), v.rfind('/')) + 1
+    prefixe = espaces.get(v[:coupure]) if coupure else None
+    return (v[:coupure], prefixe) if prefixe is not None else (None, None)
+
+
+def _curies(valeurs, espaces, utilises):
+    """Colonne en CURIE, ou None si une valeur n'est pas une URI d'un espace connu"""
+    premier = next((v for v in valeurs if v is not None), None)
+    espace, prefixe = _espace(premier, espaces)
+    if espace is None:
+        return None
+    # Cas courant: toute la colonne dans le même espace de noms (une passe en C)
+    n = len(espace)
+    if all(v is None or (isinstance(v, str) and v.startswith(espace)) for v in valeurs):
+        utilises[prefixe] = espace
+        debut = prefixe + ':'
+        return [None if v is None else debut + v[n:] for v in valeurs]
+    resultat = []
+    for v in valeurs:
+        if v is None:
+            resultat.append(None)
+            continue
+        espace, prefixe = _espace(v, espaces)
+        if espace is None:
+            return None
+        utilises[prefixe] = espace
+        resultat.append(f"{prefixe}:{v[len(espace):]}")
+    return resultat
+
+
+def table(rows, espaces):
+    """Table en colonnes d'une liste d'objets aux mêmes clés, sinon None"""
+    if not rows or type(rows[0]) is not dict:
+        return None
+    champs = list(rows[0])
+    n = len(champs)
+    try:
+        # Même nombre de clés et toutes présentes: mêmes clés
+        if any(len(r) != n for r in rows):
+            return None
+        colonnes = [list(map(itemgetter(c), rows)) for c in champs]
+    except (KeyError, TypeError):
+        return None
+    curies, utilises = [], {}
+    for i, champ in enumerate(champs):
+        compacte = _curies(colonnes[i], espaces, utilises)
+        if compacte is not None:
+            colonnes[i] = compacte
+            curies.append(champ)
+    return {"fields": champs, "columns": colonnes, "curies": curies, "prefixes": utilises}
+
+
+def columnar(data, espaces):
+    """Réponse avec chaque liste d'objets (racine ou champ de premier niveau) en table"""
+    if isinstance(data, list):
+        return table(data, espaces) or data
+    if isinstance(data, dict):
+        return {cle: (table(valeur, espaces) or valeur) if isinstance(valeur, list) else valeur
+                for cle, valeur in data.items()}
+    return data
+
+
+def _arrow(data, espaces):
+    """Flux Arrow IPC de la liste principale, ou None si les colonnes sont hétérogènes"""
+    if isinstance(data, list):
+        rows, reste = data, {}
+    elif isinstance(data, dict) and isinstance(data.get('results'), list):
+        rows, reste = data['results'], {cle: v for cle, v in data.items() if cle != 'results'}
+    else:
+        return None
+    t = table(rows, espaces) if rows else {"fields": [], "columns": [], "curies": [], "prefixes": {}}
+    if t is None:
+        return None
+    try:
+        colonnes = []
+        for valeurs in t["columns"]:
+            colonne = pyarrow.array(valeurs)
+            # Valeurs répétées (type, certification...): encodage par dictionnaire
+            if pyarrow.types.is_string(colonne.type) and len(set(valeurs)) * 2 <= len(valeurs):
+                colonne = colonne.dictionary_encode()
+            colonnes.append(colonne)
+        metadata = {"curies": json.dumps(t["curies"]), "prefixes": json.dumps(t["prefixes"]),
+                    "payload": dumps(reste)}
+        donnees = pyarrow.table(colonnes, names=t["fields"]) if colonnes else pyarrow.table({})
+        donnees = donnees.replace_schema_metadata(metadata)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError):
+        return None
+    sink = pyarrow.BufferOutputStream()
+    with pyarrow.ipc.new_stream(sink, donnees.schema) as writer:
+        writer.write_table(donnees)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(data, mimetype, espaces):
+    """(corps, mimetype effectif) de la réponse dans le format demandé
+
+    Arrow retombe sur le JSON en colonnes si la réponse ne s'y prête pas.
+    """
+    if mimetype == ARROW:
+        corps = _arrow(data, espaces)
+        if corps is not None:
+            return corps, ARROW
+        mimetype = COLUMNAR
+    if mimetype == MSGPACK:
+        return msgpack.packb(columnar(data, espaces), use_bin_type=True, default=str), MSGPACK
+    if mimetype == COLUMNAR:
+        return dumps(columnar(data, espaces)), COLUMNAR
+    return dumps(data), JSON
+
+
+# ----------------------------------------------------------------------
+# Compression
+# ----------------------------------------------------------------------
+
+def compress(corps, encodage):
+    if encodage == 'br':
+        return brotli.compress(corps, quality=BROTLI_QUALITY)
+    if encodage == 'gzip':
+        return gzip.compress(corps, compresslevel=GZIP_LEVEL)
+    return corps
+
+
+def compress_response(response, encodage, min_bytes):
+    """Compresser le corps d'une réponse (une seule fois, corps en mémoire seulement)"""
+    response.vary.add('Accept')
+    response.vary.add('Accept-Encoding')
+    if (encodage is None or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or response.status_code != 200
+            or response.mimetype not in COMPRESSIBLE):
+        return response
+    corps = response.get_data()
+    if len(corps) < min_bytes:
+        return response
+    response.set_data(compress(corps, encodage))
+    response.headers['Content-Encoding'] = encodage
+    return response
+
+
+def init_app(app):
+    """Sérialiseur orjson et compression des réponses selon Accept-Encoding"""
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    min_bytes = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+    app.config['COMPRESS_MIN_BYTES'] = min_bytes
+
+    @app.after_request
+    def _compresser(response):
+        if response.mimetype not in COMPRESSIBLE:
+            return response
+        encodage = request.accept_encodings.best_match(AVAILABLE_ENCODINGS)
+        with span('compression'):
+            return compress_response(response, encodage, min_bytes)
@@ -0,0 +1,200 @@
+"""
+Types d'entités et propriétés de données, lus dans le schéma de l'ontologie.
+
+Les attributs d'une entité (créations, modifications, commandes en langage
+naturel, listings) viennent des déclarations owl:DatatypeProperty: chaque
+propriété appartient aux classes de ses rdfs:domain (plusieurs domaines
+valent une union) et à leurs sous-classes (rdfs:subClassOf). Son rdfs:range
+fixe la conversion:
+
+- entiers (xsd:integer, xsd:int...): `int`, littéral du type déclaré;
+- décimaux (xsd:float, xsd:double, xsd:decimal): `float`, idem;
+- xsd:boolean: `bool`, idem;
+- autres (xsd:string, xsd:date...): texte, littéral simple, comme dans ws.rdf.
+
+Un attribut se nomme par le nom local de sa propriété (`nomVoyageur`,
+`dateValidite`) ou par le premier mot de ce nom (`nom`, `date`, `type`),
+si aucune autre propriété de la classe ne commence par le même mot.
+
+Les tables (attribut -> propriété, encodeur, décodeur) sont construites une
+fois par locataire au chargement, puis reconstruites si un delta touche au
+schéma (`affected_by`).
+"""
+import re
+
+from rdflib import OWL, RDF, RDFS, XSD, Literal, URIRef
+
+ENTIERS = {XSD.integer, XSD.int, XSD.long, XSD.short, XSD.byte, XSD.nonNegativeInteger,
+           XSD.positiveInteger, XSD.negativeInteger, XSD.nonPositiveInteger, XSD.unsignedInt,
+           XSD.unsignedLong, XSD.unsignedShort, XSD.unsignedByte}
+DECIMAUX = {XSD.float, XSD.double, XSD.decimal}
+
+# Prédicats du schéma dont dépendent les tables
+SCHEMA_PREDICATES = {RDFS.domain, RDFS.range, RDFS.subClassOf}
+SCHEMA_TYPES = {OWL.DatatypeProperty, OWL.Class}
+
+_PREMIER_MOT = re.compile(r'^[a-z]+')
+
+
+class InvalidValue(ValueError):
+    """Valeur d'attribut non convertible vers le type déclaré de sa propriété"""
+
+
+def _local(uri):
+    return str(uri).split('#')[-1]
+
+
+def _booleen(valeur):
+    if isinstance(valeur, bool):
+        return valeur
+    texte = str(valeur).strip().lower()
+    if texte in ('true', '1'):
+        return True
+    if texte in ('false', '0'):
+        return False
+    raise ValueError(valeur)
+
+
+def _codecs(datatype):
+    """(décodeur du texte d'une cellule ou None pour du texte, encodeur vers un littéral)"""
+    if datatype in ENTIERS:
+        return int, lambda v: Literal(int(v), datatype=datatype)
+    if datatype in DECIMAUX:
+        return float, lambda v: Literal(float(v), datatype=datatype)
+    if datatype == XSD.boolean:
+        return _booleen, lambda v: Literal(_booleen(v), datatype=datatype)
+    return None, lambda v: Literal(str(v))
+
+
+class Attribute:
+    """Propriété de données d'un type: URI, type XSD, conversions"""
+    __slots__ = ('key', 'property', 'datatype', 'decode', '_encode')
+
+    def __init__(self, key, prop, datatype):
+        self.key = key
+        self.property = prop
+        self.datatype = datatype
+        self.decode, self._encode = _codecs(datatype)
+
+    def encode(self, valeur):
+        """Littéral de la valeur (lève InvalidValue)"""
+        try:
+            return self._encode(valeur)
+        except (TypeError, ValueError):
+            attendu = _local(self.datatype) if self.datatype is not None else 'texte'
+            raise InvalidValue(f"Valeur invalide pour '{self.key}' ({attendu}): {valeur!r}") from None
+
+
+class EntityType:
+    """Attributs d'une classe (propriétés de ses domaines et de ses super-classes)"""
+
+    def __init__(self, name, uri, properties):
+        self.name = name
+        self.uri = uri
+        # properties: {propriété: type XSD ou None}
+        self.attributes = {}
+        for prop, datatype in sorted(properties.items()):
+            self.attributes[_local(prop)] = Attribute(_local(prop), prop, datatype)
+        mots = {}
+        for cle in list(self.attributes):
+            mot = _PREMIER_MOT.match(cle)
+            if mot and mot.group() != cle:
+                mots.setdefault(mot.group(), []).append(cle)
+        self.aliases = {mot: cles[0] for mot, cles in mots.items()
+                        if len(cles) == 1 and mot not in self.attributes}
+        nom = self.aliases.get('nom')
+        self.name_property = self.attributes[nom].property if nom else None
+
+    def attribute(self, key):
+        """Attribut par nom local ou premier mot (None s'il n'existe pas pour ce type)"""
+        return self.attributes.get(self.aliases.get(key, key))
+
+    def encode(self, attributes):
+        """([(propriété, littéral)], [attributs inconnus]) pour un dict {attribut: valeur}
+
+        Lève InvalidValue avant tout résultat si une valeur n'est pas convertible.
+        """
+        valeurs, inconnus = [], []
+        for cle, valeur in attributes.items():
+            attribut = self.attribute(cle)
+            if attribut is None:
+                inconnus.append(cle)
+            else:
+                valeurs.append((attribut.property, attribut.encode(valeur)))
+        return valeurs, inconnus
+
+    def decoders(self, *keys, **columns):
+        """Convertisseurs de `SparqlResult.records` des attributs non textuels
+
+        `decoders('age')` pour une colonne nommée comme l'attribut,
+        `decoders(empreintes='empreinte')` pour une colonne nommée autrement.
+        """
+        colonnes = dict(zip(keys, keys), **columns)
+        convertisseurs = {}
+        for colonne, cle in colonnes.items():
+            attribut = self.attribute(cle)
+            if attribut is None:
+                raise KeyError(f"{self.name} n'a pas d'attribut '{cle}'")
+            if attribut.decode is not None:
+                convertisseurs[colonne] = attribut.decode
+        return convertisseurs
+
+
+class EntityTypes:
+    """Types d'entités du schéma d'un graphe, par nom local de classe"""
+
+    def __init__(self, graph, ns):
+        self.ns = ns
+        domaines, ranges = {}, {}
+        for prop in graph.subjects(RDF.type, OWL.DatatypeProperty):
+            if not isinstance(prop, URIRef):
+                continue
+            ranges[prop] = graph.value(prop, RDFS.range)
+            for domaine in graph.objects(prop, RDFS.domain):
+                domaines.setdefault(domaine, set()).add(prop)
+        classes = {c for c in graph.subjects(RDF.type, OWL.Class) if isinstance(c, URIRef)}
+        classes.update(c for c in domaines if isinstance(c, URIRef))
+        self.types = {}
+        for classe in classes:
+            proprietes = {}
+            # La classe elle-même puis ses super-classes
+            for ancetre in graph.transitive_objects(classe, RDFS.subClassOf):
+                for prop in domaines.get(ancetre, ()):
+                    proprietes[prop] = ranges[prop]
+            self.types[_local(classe)] = EntityType(_local(classe), classe, proprietes)
+        self.by_uri = {t.uri: t for t in self.types.values()}
+        self.name_properties = {t.name_property for t in self.types.values() if t.name_property is not None}
+        self._fusions = {}
+
+    def __contains__(self, name):
+        return name in self.types
+
+    def __getitem__(self, name):
+        return self.types[name]
+
+    def get(self, name):
+        return self.types.get(name)
+
+    def for_types(self, class_uris):
+        """Type fusionné des classes d'une entité (ses rdf:type), None si aucune n'est connue"""
+        connus = sorted({self.by_uri[c] for c in class_uris if c in self.by_uri}, key=lambda t: t.name)
+        if len(connus) <= 1:
+            return connus[0] if connus else None
+        cle = tuple(t.name for t in connus)
+        fusion = self._fusions.get(cle)
+        if fusion is None:
+            proprietes = {}
+            for t in connus:
+                for attribut in t.attributes.values():
+                    proprietes[attribut.property] = attribut.datatype
+            fusion = self._fusions[cle] = EntityType('+'.join(cle), connus[0].uri, proprietes)
+        return fusion
+
+    def of(self, graph, uri):
+        """Type d'une entité du graphe d'après ses rdf:type"""
+        return self.for_types(graph.objects(uri, RDF.type))
+
+    @staticmethod
+    def affected_by(triples):
+        """Le delta touche-t-il aux déclarations dont dépendent les tables?"""
+        return any(p in SCHEMA_PREDICATES or (p == RDF.type and o in SCHEMA_TYPES) for _, p, o in triples)
@@ -0,0 +1,117 @@
+"""
+Flux de changements (change-data-capture) du graphe RDF.
+
+Chaque mutation persistée publie un événement contenant les triplets ajoutés
+et retirés, les entités touchées avec leur type et la génération du graphe.
+Les clients s'abonnent en Server-Sent Events et peuvent rejouer les
+événements manqués à partir d'une génération (`since` ou `Last-Event-ID`).
+Si la génération demandée n'est plus dans le tampon, un événement `resync`
+demande au client de recharger ses collections.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from rdflib import BNode, Literal, URIRef
+
+# Nombre d'événements conservés pour le rejeu
+TAILLE_TAMPON = 1000
+
+# Intervalle (secondes) des commentaires keep-alive sur les connexions SSE
+KEEPALIVE = 15
+
+
+def term_to_json(term):
+    """Sérialiser un terme RDF (URI, littéral typé ou nœud anonyme)"""
+    if isinstance(term, Literal):
+        data = {"type": "literal", "value": str(term)}
+        if term.datatype:
+            data["datatype"] = str(term.datatype)
+        if term.language:
+            data["lang"] = term.language
+        return data
+    if isinstance(term, BNode):
+        return {"type": "bnode", "value": str(term)}
+    return {"type": "uri", "value": str(term)}
+
+
+def term_from_json(data):
+    """Terme RDF à partir de sa forme JSON (inverse de term_to_json)"""
+    if data["type"] == "literal":
+        datatype = data.get("datatype")
+        return Literal(data["value"], lang=data.get("lang"), datatype=URIRef(datatype) if datatype else None)
+    if data["type"] == "bnode":
+        return BNode(data["value"])
+    return URIRef(data["value"])
+
+
+def triple_to_json(triple):
+    s, p, o = triple
+    return {"s": str(s), "p": str(p), "o": term_to_json(o)}
+
+
+class ChangeFeed:
+    """Tampon circulaire d'événements avec notification des abonnés"""
+
+    def __init__(self, taille=TAILLE_TAMPON):
+        self._events = deque(maxlen=taille)
+        self._condition = threading.Condition()
+        self._oubliee = -1       # plus grande génération sortie du tampon
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def publish(self, generation, added, removed, entities):
+        """Publier l'événement d'une mutation et réveiller les abonnés"""
+        event = {
+            "generation": generation,
+            "timestamp": time.time(),
+            "entities": entities,
+            "added": [triple_to_json(t) for t in added],
+            "removed": [triple_to_json(t) for t in removed]
+        }
+        with self._condition:
+            if len(self._events) == self._events.maxlen:
+                self._oubliee = self._events[0]["generation"]
+            self._events.append(event)
+            self._generation = generation
+            self._condition.notify_all()
+        return event
+
+    def since(self, generation):
+        """Événements postérieurs à `generation`, ou None si le rejeu est impossible"""
+        with self._condition:
+            # Génération oubliée, ou venue d'une instance précédente du serveur
+            if generation < self._oubliee or generation > self._generation:
+                return None
+            return [e for e in self._events if e["generation"] > generation]
+
+    def wait(self, generation, timeout):
+        """Attendre un événement postérieur à `generation` (ou l'expiration)"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation > generation, timeout=timeout)
+
+    def stream(self, since=None):
+        """Générateur SSE: rejeu depuis `since` puis événements en direct"""
+        courante = self._generation if since is None else since
+        yield _sse("hello", {"generation": self._generation}, courante)
+        while True:
+            events = self.since(courante)
+            if events is None:
+                yield _sse("resync", {"generation": self._generation}, self._generation)
+                courante = self._generation
+                continue
+            for event in events:
+                yield _sse("change", event, event["generation"])
+                courante = event["generation"]
+            if not events:
+                self.wait(courante, KEEPALIVE)
+                if self._generation <= courante:
+                    yield ": keep-alive\n\n"
+
+
+def _sse(event, data, ident):
+    return f"id: {ident}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,407 @@
+"""
+Exports en flux des résultats SPARQL et des collections: CSV, Parquet, Arrow.
+
+`/api/query` renvoie tout le résultat en JSON, chaque valeur en texte. Un
+export lit au contraire le résultat par lots de `batch_rows` lignes
+(défaut 65536), sans le garder en mémoire:
+
+- moteur RDFLib: la requête SELECT est évaluée au fil de la lecture
+  (`stream_graph`), sans passer par `rdflib.query.Result` qui retient
+  toutes les solutions. Le cache de BGP n'est pas utilisé;
+- Fuseki: la réponse TSV est lue en flux (`query_fuseki`).
+
+Chaque lot devient un groupe de lignes (row group) Parquet, un
+RecordBatch Arrow IPC ou un bloc de lignes CSV, écrit puis envoyé aussitôt.
+La mémoire dépend donc de la taille d'un lot, pas du résultat. Les
+requêtes avec DISTINCT ou ORDER BY gardent cependant leur propre état dans
+RDFLib.
+
+Le type de chaque colonne vient des datatypes XSD du premier lot
+(`xsd:integer` et ses dérivés → int64, `xsd:decimal|float|double` →
+double, `xsd:boolean`, `xsd:date`, `xsd:dateTime` → timestamp, le reste →
+string). Les littéraux simples ne fixent pas le type: une colonne `prix`
+dont certaines valeurs ne sont pas typées reste numérique. Une valeur qui
+ne se convertit pas dans le type de sa colonne est exportée nulle. Le
+paramètre `types` force le type d'une colonne (`prix:double,age:int64`).
+Le CSV garde la forme lexicale des valeurs.
+
+Parquet et Arrow demandent le paquet `pyarrow`; sans lui, seul le CSV est
+proposé.
+
+Usage:
+    python export.py --collection activites --format parquet --output activites.parquet
+    python export.py --query-file requete.rq --format csv --ontology ../benchmarks/data/onto-1m.nt > r.csv
+    python export.py --collection personnes --format arrow --endpoint http://localhost:3030/tourisme/sparql
+"""
+import argparse
+import csv
+import io
+import itertools
+import os
+import sys
+import time
+from datetime import date, datetime, timezone
+
+from rdflib import Graph, XSD
+from rdflib.plugins.sparql.evaluate import evalQuery
+from rdflib.util import guess_format
+
+from collection_queries import COLLECTION_QUERIES
+from metrics import Counter, registry
+from sparql_results import RDFLibCodec, SparqlResult, _convertir, prepare_query
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+CSV = 'text/csv'
+PARQUET = 'application/vnd.apache.parquet'
+ARROW = 'application/vnd.apache.arrow.stream'
+
+FORMATS = {'csv': CSV, 'parquet': PARQUET, 'arrow': ARROW}
+EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet', 'arrow': 'arrows'}
+AVAILABLE_FORMATS = ['csv'] + (['parquet', 'arrow'] if pyarrow else [])
+
+BATCH_ROWS = 65536
+TYPES = ('int64', 'double', 'boolean', 'date', 'timestamp', 'string')
+
+_ENTIERS = (XSD.integer, XSD.int, XSD.long, XSD.short, XSD.byte, XSD.nonNegativeInteger,
+            XSD.positiveInteger, XSD.nonPositiveInteger, XSD.negativeInteger, XSD.unsignedLong,
+            XSD.unsignedInt, XSD.unsignedShort, XSD.unsignedByte)
+_TYPES_XSD = {
+    **{str(d): 'int64' for d in _ENTIERS},
+    **{str(d): 'double' for d in (XSD.decimal, XSD.double, XSD.float)},
+    str(XSD.boolean): 'boolean',
+    str(XSD.date): 'date',
+    str(XSD.dateTime): 'timestamp'
+}
+_TEXTE = str(XSD.string)
+
+export_rows = registry.register(Counter('export_rows_total', 'Lignes exportées par format'))
+
+
+class ExportError(ValueError):
+    """Paramètres d'export invalides (format, collection, types)"""
+
+
+# ----------------------------------------------------------------------
+# Lecture en flux
+# ----------------------------------------------------------------------
+
+def stream_graph(graph, query):
+    """Résultat évalué au fil de la lecture (SELECT): aucune solution retenue"""
+    prepared = prepare_query(query, graph)
+    if prepared.algebra.name != 'SelectQuery':
+        return SparqlResult.from_rdflib(graph.query(prepared))
+    resultat = evalQuery(graph, prepared, {})
+    variables = resultat['vars_']
+    # Comme rdflib.query.Result: pas de ligne pour une solution vide
+    lignes = (tuple(b.get(v) for v in variables) for b in resultat['bindings'] if b)
+    return SparqlResult(variables, lignes, RDFLibCodec)
+
+
+# ----------------------------------------------------------------------
+# Types des colonnes
+# ----------------------------------------------------------------------
+
+def _booleen(valeur):
+    if valeur in ('true', '1'):
+        return True
+    if valeur in ('false', '0'):
+        return False
+    raise ValueError(valeur)
+
+
+def _horodatage(valeur):
+    moment = datetime.fromisoformat(valeur.replace('Z', '+00:00'))
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+CONVERTERS = {
+    'int64': int,
+    'double': float,
+    'boolean': _booleen,
+    'date': lambda valeur: date.fromisoformat(valeur[:10]),
+    'timestamp': _horodatage
+}
+
+
+def parse_types(valeur):
+    """Types forcés: {"prix": "double"} ou "prix:double,age:int64" """
+    if not valeur:
+        return {}
+    if isinstance(valeur, str):
+        paires = [p.split(':', 1) for p in valeur.split(',') if p.strip()]
+        if any(len(p) != 2 for p in paires):
+            raise ExportError(f"types invalides: {valeur} (attendu colonne:type,...)")
+        valeur = {nom.strip(): t.strip() for nom, t in paires}
+    if not isinstance(valeur, dict):
+        raise ExportError("types doit être un objet {colonne: type}")
+    inconnus = sorted({t for t in valeur.values() if t not in TYPES})
+    if inconnus:
+        raise ExportError(f"Type(s) inconnu(s): {', '.join(map(str, inconnus))} "
+                          f"(valeurs possibles: {', '.join(TYPES)})")
+    return valeur
+
+
+def infer_types(result, lot, forces=None):
+    """Type de chaque colonne d'après les datatypes XSD des lignes du lot"""
+    kind = result.codec.kind
+    types = []
+    for j, var in enumerate(result.vars):
+        if forces and str(var) in forces:
+            types.append(forces[str(var)])
+            continue
+        trouves, texte = set(), False
+        for cells in lot:
+            genre, datatype = kind(cells[j])
+            if genre is None or (genre == 'literal' and datatype == _TEXTE):
+                continue
+            t = _TYPES_XSD.get(datatype) if genre == 'literal' else None
+            if t is None:
+                # URI, nœud anonyme, chaîne avec langue, autre datatype
+                texte = True
+                break
+            trouves.add(t)
+        if texte or not trouves:
+            types.append('string')
+        elif trouves <= {'int64'}:
+            types.append('int64')
+        elif trouves <= {'int64', 'double'}:
+            types.append('double')
+        else:
+            types.append(trouves.pop() if len(trouves) == 1 else 'string')
+    return types
+
+
+# ----------------------------------------------------------------------
+# Écrivains
+# ----------------------------------------------------------------------
+
+class _Flux:
+    """Fichier en écriture seule vidé après chaque lot (sortie des écrivains pyarrow)"""
+
+    def __init__(self):
+        self._morceaux = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, donnees):
+        donnees = bytes(donnees)
+        self._morceaux.append(donnees)
+        self._position += len(donnees)
+        return len(donnees)
+
+    def tell(self):
+        return self._position
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vider(self):
+        donnees = b''.join(self._morceaux)
+        self._morceaux = []
+        return donnees
+
+
+class CSVWriter:
+    """Lignes CSV (en-tête = variables), valeurs sous leur forme lexicale"""
+
+    typed = False
+
+    def __init__(self, noms, types):
+        self._tampon = io.StringIO()
+        self._csv = csv.writer(self._tampon, lineterminator='\n')
+        self._csv.writerow(noms)
+
+    def _vider(self):
+        texte = self._tampon.getvalue()
+        self._tampon.seek(0)
+        self._tampon.truncate()
+        return texte.encode('utf-8')
+
+    def write(self, colonnes):
+        self._csv.writerows(zip(*colonnes))
+        return self._vider()
+
+    def close(self):
+        return self._vider()
+
+
+class ArrowWriter:
+    """Flux Arrow IPC (un RecordBatch par lot) ou fichier Parquet (un row group par lot)"""
+
+    typed = True
+
+    def __init__(self, noms, types, parquet=False):
+        types_arrow = {'int64': pyarrow.int64(), 'double': pyarrow.float64(), 'boolean': pyarrow.bool_(),
+                       'date': pyarrow.date32(), 'timestamp': pyarrow.timestamp('us'),
+                       'string': pyarrow.string()}
+        self._schema = pyarrow.schema([pyarrow.field(n, types_arrow[t]) for n, t in zip(noms, types)])
+        self._sortie = _Flux()
+        self._parquet = parquet
+        if parquet:
+            self._writer = pyarrow.parquet.ParquetWriter(self._sortie, self._schema)
+        else:
+            self._writer = pyarrow.ipc.new_stream(self._sortie, self._schema)
+
+    def write(self, colonnes):
+        lot = pyarrow.RecordBatch.from_arrays(
+            [pyarrow.array(valeurs, type=champ.type) for valeurs, champ in zip(colonnes, self._schema)],
+            schema=self._schema)
+        if self._parquet:
+            self._writer.write_table(pyarrow.Table.from_batches([lot]))
+        else:
+            self._writer.write_batch(lot)
+        return self._sortie.vider()
+
+    def close(self):
+        self._writer.close()
+        return self._sortie.vider()
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+class Export:
+    """Export d'un SparqlResult, itérable en morceaux d'octets
+
+    Le premier lot est lu à la construction: une requête invalide échoue
+    ici, avant le début de la réponse, et ce lot fixe le type des colonnes.
+    """
+
+    def __init__(self, result, fmt='csv', batch_rows=BATCH_ROWS, types=None):
+        if fmt not in FORMATS:
+            raise ExportError(f"Format inconnu: {fmt} (valeurs possibles: {', '.join(FORMATS)})")
+        if fmt not in AVAILABLE_FORMATS:
+            raise ExportError(f"Format {fmt} indisponible: installer pyarrow")
+        if batch_rows <= 0:
+            raise ExportError("batch_rows doit être positif")
+        self.format = fmt
+        self.mimetype = FORMATS[fmt]
+        self.result = result
+        self.names = [str(v) for v in result.vars]
+        self.rows = 0
+        self.batches = 0
+        self._lots = result.batches(batch_rows)
+        self._premier = next(self._lots, [])
+        self.types = infer_types(result, self._premier, parse_types(types))
+
+    def _writer(self):
+        if self.format == 'csv':
+            return CSVWriter(self.names, self.types)
+        return ArrowWriter(self.names, self.types, parquet=self.format == 'parquet')
+
+    def __iter__(self):
+        writer = self._writer()
+        lexical = self.result.codec.lexical
+        conversions = [CONVERTERS.get(t) if writer.typed else None for t in self.types]
+        premier, self._premier = self._premier, None
+        for lot in itertools.chain([premier], self._lots):
+            if not lot:
+                continue
+            colonnes = []
+            for j, convertir in enumerate(conversions):
+                valeurs = [lexical(cells[j]) for cells in lot]
+                if convertir is not None:
+                    valeurs = [_convertir(convertir, v) for v in valeurs]
+                colonnes.append(valeurs)
+            self.rows += len(lot)
+            self.batches += 1
+            export_rows.inc(len(lot), format=self.format)
+            yield writer.write(colonnes)
+        yield writer.close()
+
+    def column_types(self):
+        """En-tête X-Column-Types: colonne=type,..."""
+        return ','.join(f"{nom}={t}" for nom, t in zip(self.names, self.types))
+
+
+def export_query(data):
+    """Requête SPARQL d'un export: `query`, ou la requête de la collection `collection`"""
+    collection = data.get('collection')
+    if collection:
+        if collection not in COLLECTION_QUERIES:
+            raise ExportError(f"Collection inconnue: {collection} "
+                              f"(valeurs possibles: {', '.join(COLLECTION_QUERIES)})")
+        return COLLECTION_QUERIES[collection], collection
+    query = data.get('query')
+    if not query:
+        raise ExportError("Paramètre query ou collection requis")
+    return query, 'export'
+
+
+# ----------------------------------------------------------------------
+# Ligne de commande
+# ----------------------------------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporter une requête SPARQL ou une collection en flux")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--collection', choices=sorted(COLLECTION_QUERIES))
+    source.add_argument('--query', help="requête SPARQL")
+    source.add_argument('--query-file', help="fichier contenant la requête SPARQL")
+    parser.add_argument('--format', default='csv', choices=list(FORMATS))
+    parser.add_argument('--output', help="fichier de sortie (défaut: sortie standard)")
+    parser.add_argument('--ontology', default=os.getenv('ONTOLOGY_FILE', '../ws.rdf'),
+                        help="ontologie interrogée avec RDFLib (défaut: ONTOLOGY_FILE)")
+    parser.add_argument('--endpoint', help="endpoint SPARQL Fuseki à interroger à la place de RDFLib")
+    parser.add_argument('--batch-rows', type=int, default=BATCH_ROWS, help="lignes par lot (row group)")
+    parser.add_argument('--types', help="types forcés: colonne:type,... (int64, double, boolean, date, timestamp, string)")
+    args = parser.parse_args(argv)
+
+    if args.query_file:
+        with open(args.query_file, encoding='utf-8') as f:
+            args.query = f.read()
+    debut = time.perf_counter()
+    try:
+        query, _ = export_query({'collection': args.collection, 'query': args.query})
+        if args.endpoint:
+            import requests
+            from sparql_results import query_fuseki
+            result = query_fuseki(requests.Session(), args.endpoint, query, timeout=300)
+        else:
+            from reasoner import create_reasoner
+            graph = Graph()
+            graph.parse(args.ontology, format=guess_format(args.ontology) or 'xml')
+            reasoner = create_reasoner(graph)
+            if reasoner is not None and len(reasoner.inferred):
+                graph = reasoner.view
+            print(f"📚 {args.ontology} chargé ({len(graph)} triplets) en {time.perf_counter() - debut:.1f} s",
+                  file=sys.stderr)
+        export = Export(result if args.endpoint else stream_graph(graph, query), args.format,
+                        args.batch_rows, args.types)
+    except Exception as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    sortie = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for morceau in export:
+            sortie.write(morceau)
+    finally:
+        if args.output:
+            sortie.close()
+    duree = time.perf_counter() - debut
+    print(f"✅ {export.rows} ligne(s) en {export.batches} lot(s), {args.format}, {duree:.1f} s "
+          f"({export.column_types()})", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Surveillance du fichier d'un locataire: modifications externes appliquées par delta.
+
+Un thread de fond relève toutes les WATCH_INTERVAL_S secondes la date et la
+taille du fichier (ws.rdf, fichier d'un locataire). Quand elles changent et
+que le contenu (empreinte SHA-256) n'est pas celui de la dernière sauvegarde
+du backend, le fichier est relu dans un graphe à part, hors du chemin des
+requêtes. Seul le delta avec le graphe en mémoire est appliqué; les index et
+caches suivent comme pour une mutation de l'API.
+
+Les triplets modifiés en mémoire mais pas encore sauvegardés (voir
+persistence) ne sont jamais annulés par le delta. L'écrivain vérifie aussi
+le fichier juste avant chaque sauvegarde, pour ne pas écraser une
+modification externe arrivée entre deux relevés.
+
+Les nœuds anonymes reçoivent de nouveaux identifiants à chaque lecture. Les
+triplets qui en contiennent sont donc comparés par isomorphisme, et
+remplacés en bloc seulement s'ils diffèrent.
+"""
+import hashlib
+import logging
+import os
+import threading
+
+from rdflib import BNode, Graph
+from rdflib.compare import isomorphic
+
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+def _anonyme(triple):
+    return any(isinstance(t, BNode) for t in triple)
+
+
+def diff_graphs(fichier, live, proteges=()):
+    """(ajoutés, retirés) qui amènent `live` au contenu de `fichier`, hors triplets protégés"""
+    added = [t for t in fichier if not _anonyme(t) and t not in proteges and t not in live]
+    removed = [t for t in live if not _anonyme(t) and t not in proteges and t not in fichier]
+    anonymes_fichier, anonymes_live = Graph(), Graph()
+    for t in fichier:
+        if _anonyme(t):
+            anonymes_fichier.add(t)
+    for t in live:
+        if _anonyme(t):
+            anonymes_live.add(t)
+    if (len(anonymes_fichier) or len(anonymes_live)) and not isomorphic(anonymes_fichier, anonymes_live):
+        added.extend(anonymes_fichier)
+        removed.extend(t for t in anonymes_live if t not in proteges)
+    return added, removed
+
+
+class FileWatcher:
+    """Relève les modifications externes du fichier d'un locataire et en applique le delta
+
+    `apply(tenant, added, removed)` est appelé sous le verrou d'écriture du
+    locataire.
+    """
+
+    def __init__(self, tenant, apply, interval=1.0):
+        self.tenant = tenant
+        self.path = tenant.backend.source_file
+        self.apply = apply
+        self.interval = interval
+        self._signature = self._relever()
+        self._empreinte = self._hacher()
+        self._arret = threading.Event()
+        self._thread = None
+        self.reloads = 0
+        self.last_error = None
+
+    def _relever(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _hacher(self):
+        empreinte = hashlib.sha256()
+        try:
+            with open(self.path, 'rb') as f:
+                for bloc in iter(lambda: f.read(1 << 20), b''):
+                    empreinte.update(bloc)
+        except OSError:
+            return None
+        return empreinte.hexdigest()
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name=f'file-watch-{self.tenant.name}', daemon=True)
+            self._thread.start()
+
+    def close(self):
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._arret.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                # Fichier en cours d'écriture ou invalide: réessayer au prochain relevé
+                self.last_error = str(e)
+                logger.warning(f"Relecture de {self.path} impossible: {e}")
+
+    def acknowledge(self):
+        """Le backend vient de sauvegarder le fichier: son contenu est connu"""
+        self._signature = self._relever()
+        self._empreinte = self._hacher()
+
+    def check(self):
+        """Appliquer les modifications externes du fichier; retourne le nombre de triplets changés"""
+        signature = self._relever()
+        if signature is None or signature == self._signature:
+            return 0
+        empreinte = self._hacher()
+        if empreinte == self._empreinte:
+            # Fichier touché sans changement de contenu
+            self._signature = signature
+            return 0
+
+        # Relecture hors du verrou: les écritures de l'API continuent pendant le parsing
+        with span('file_reload'):
+            fichier = self.tenant.backend.read_file()
+
+        with self.tenant.write_lock:
+            if signature == self._signature:
+                # Sauvegarde du backend reconnue entre-temps
+                return 0
+            if self._relever() != signature:
+                # Fichier réécrit entre-temps (sauvegarde, nouvelle modification): prochain relevé
+                return 0
+            live = self.tenant.backend.data_graph(self.tenant.graph)
+            added, removed = diff_graphs(fichier, live, self.tenant.writer.unsaved)
+            if added or removed:
+                self.apply(self.tenant, added, removed)
+            self._signature, self._empreinte = signature, empreinte
+            self.reloads += 1
+            self.last_error = None
+        return len(added) + len(removed)
+
+    def status(self):
+        return {
+            "path": self.path,
+            "interval_s": self.interval,
+            "reloads": self.reloads,
+            "last_error": self.last_error
+        }
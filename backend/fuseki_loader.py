@@ -0,0 +1,363 @@
+"""
+Chargement en masse d'un fichier RDF dans Fuseki (Graph Store Protocol).
+
+Remplace l'envoi du fichier entier en une requête (load-ontology-fuseki.ps1):
+
+- la source (RDF/XML, Turtle ou N-Triples) est lue en flux. Les N-Triples
+  sont découpés ligne à ligne sans parsing. Les autres formats passent par
+  le parseur RDFLib, avec un store qui transmet chaque triplet au découpage
+  au lieu de le garder en mémoire;
+- les triplets sont regroupés en lots N-Triples de `chunk_size` triplets,
+  envoyés en parallèle (`POST ...?default` ou `?graph=<uri>`) par `workers`
+  threads sur une session HTTP à connexions réutilisées. Les lots en vol
+  sont bornés: la lecture attend quand l'envoi ne suit pas;
+- chaque lot acquitté est noté dans un fichier de reprise
+  (`<source>.fuseki-load.json`). Après un échec, relancer la même commande
+  ne renvoie que les lots manquants. Le découpage est déterministe pour une
+  même source et une même taille de lot.
+
+Les étiquettes de nœuds anonymes n'ont de sens qu'à l'intérieur d'une
+requête. Les triplets qui en contiennent partent donc ensemble dans un
+dernier lot, pour garder leurs liens (restrictions OWL...).
+
+Usage:
+    python fuseki_loader.py ../ws.rdf
+    python fuseki_loader.py data/onto-1m.nt --endpoint http://localhost:3030/tourisme/data \\
+        --chunk-size 50000 --workers 4 --graph urn:ws:onto
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from rdflib import BNode, Graph
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.store import Store, VALID_STORE
+from rdflib.util import guess_format
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENDPOINT = 'http://localhost:3030/tourisme/data'
+NTRIPLES = 'application/n-triples; charset=utf-8'
+
+# Statuts pour lesquels un lot est renvoyé (les autres 4xx sont définitifs)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+# Attente maximale entre deux tentatives d'envoi d'un lot (secondes)
+BACKOFF_MAX = 30.0
+
+
+class LoadError(RuntimeError):
+    """Lot refusé ou Fuseki injoignable: relancer pour reprendre"""
+
+
+class _Interrompu(Exception):
+    """Arrêt de la lecture après l'échec d'un envoi"""
+
+
+# ----------------------------------------------------------------------
+# Lecture en flux
+# ----------------------------------------------------------------------
+
+class _TripleSink(Store):
+    """Store sans mémoire: chaque triplet parsé est transmis à `callback`"""
+
+    context_aware = False
+    formula_aware = False
+    graph_aware = False
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+        self._prefixes = {}
+
+    def open(self, configuration, create=False):
+        return VALID_STORE
+
+    def add(self, triple, context=None, quoted=False):
+        self.callback(triple)
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.callback((s, p, o))
+
+    def triples(self, triple_pattern, context=None):
+        return iter(())
+
+    def __len__(self, context=None):
+        return 0
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self._prefixes[prefix] = namespace
+
+    def namespace(self, prefix):
+        return self._prefixes.get(prefix)
+
+    def prefix(self, namespace):
+        return next((p for p, ns in self._prefixes.items() if ns == namespace), None)
+
+    def namespaces(self):
+        return iter(self._prefixes.items())
+
+
+def read_statements(source, rdf_format, emit):
+    """Appeler emit(ligne N-Triples, anonyme) pour chaque triplet de la source"""
+    if rdf_format in ('nt', 'nt11', 'ntriples'):
+        with open(source, encoding='utf-8') as f:
+            for ligne in f:
+                texte = ligne.strip()
+                if not texte or texte.startswith('#'):
+                    continue
+                # '_:' dans un littéral: simple faux positif, le triplet part au dernier lot
+                emit(texte + '\n', '_:' in texte)
+        return
+
+    def recevoir(triple):
+        emit(_nt_row(triple), any(isinstance(t, BNode) for t in triple))
+    Graph(store=_TripleSink(recevoir)).parse(source, format=rdf_format)
+
+
+# ----------------------------------------------------------------------
+# Reprise
+# ----------------------------------------------------------------------
+
+class Checkpoint:
+    """Lots acquittés d'un chargement, réécrits atomiquement après chaque lot"""
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.done = set()
+        self.triples = 0
+        self.anonymous_done = False
+        self.complete = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path, signature):
+        """Reprise d'un chargement précédent de la même source (sinon vierge)"""
+        checkpoint = cls(path, signature)
+        try:
+            with open(path, encoding='utf-8') as f:
+                etat = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if etat.get('signature') != signature:
+            logger.warning(f"{path}: source ou paramètres modifiés, chargement repris de zéro")
+            return checkpoint
+        checkpoint.done = set(etat['done'])
+        checkpoint.triples = etat['triples']
+        checkpoint.anonymous_done = etat['anonymous_done']
+        checkpoint.complete = etat['complete']
+        return checkpoint
+
+    def mark(self, index, triples):
+        with self._lock:
+            if index is None:
+                self.anonymous_done = True
+            else:
+                self.done.add(index)
+            self.triples += triples
+            self._ecrire()
+
+    def finish(self):
+        with self._lock:
+            self.complete = True
+            self._ecrire()
+
+    def _ecrire(self):
+        temp = self.path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({"signature": self.signature, "done": sorted(self.done), "triples": self.triples,
+                       "anonymous_done": self.anonymous_done, "complete": self.complete}, f)
+        os.replace(temp, self.path)
+
+
+# ----------------------------------------------------------------------
+# Envoi
+# ----------------------------------------------------------------------
+
+class FusekiLoader:
+    """Découpe une source en lots N-Triples et les envoie en parallèle"""
+
+    def __init__(self, endpoint=DEFAULT_ENDPOINT, graph=None, chunk_size=50000, workers=4,
+                 retries=5, timeout=120, progress=None):
+        self.endpoint = endpoint
+        self.graph = graph
+        self.chunk_size = chunk_size
+        self.workers = max(1, workers)
+        self.retries = retries
+        self.timeout = timeout
+        self.progress = progress
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _params(self):
+        return {'graph': self.graph} if self.graph else {'default': ''}
+
+    def clear(self):
+        """Vider le graphe cible avant un chargement complet"""
+        reponse = self.session.delete(self.endpoint, params=self._params(), timeout=self.timeout)
+        if reponse.status_code not in (200, 204, 404):
+            raise LoadError(f"Impossible de vider le graphe: HTTP {reponse.status_code}")
+
+    def send(self, corps):
+        """Envoyer un lot, avec backoff exponentiel sur les erreurs passagères"""
+        attente = 0.5
+        for tentative in range(self.retries + 1):
+            try:
+                reponse = self.session.post(self.endpoint, params=self._params(), data=corps,
+                                            headers={'Content-Type': NTRIPLES}, timeout=self.timeout)
+                if reponse.status_code < 300:
+                    return
+                erreur = f"HTTP {reponse.status_code}: {reponse.text[:200]}"
+                if reponse.status_code not in RETRY_STATUS:
+                    raise LoadError(f"Lot refusé par Fuseki ({erreur})")
+            except requests.RequestException as e:
+                erreur = str(e)
+            if tentative < self.retries:
+                logger.warning(f"Envoi d'un lot en échec ({erreur}), nouvel essai dans {attente:.1f} s")
+                time.sleep(attente)
+                attente = min(attente * 2, BACKOFF_MAX)
+        raise LoadError(f"Lot non envoyé après {self.retries + 1} tentative(s): {erreur}")
+
+    def load(self, source, rdf_format=None, checkpoint_path=None, replace=False, restart=False):
+        """Charger la source; retourne le rapport (triplets, lots, débit)"""
+        rdf_format = rdf_format or guess_format(source) or 'xml'
+        stat = os.stat(source)
+        signature = {"source": os.path.abspath(source), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                     "format": rdf_format, "chunk_size": self.chunk_size,
+                     "endpoint": self.endpoint, "graph": self.graph}
+        checkpoint_path = checkpoint_path or source + '.fuseki-load.json'
+        checkpoint = Checkpoint(signature=signature, path=checkpoint_path) if restart \
+            else Checkpoint.load(checkpoint_path, signature)
+        rapport = {"source": source, "format": rdf_format, "chunk_size": self.chunk_size,
+                   "workers": self.workers, "resumed": bool(checkpoint.done or checkpoint.anonymous_done)}
+        if checkpoint.complete:
+            rapport.update(triples=checkpoint.triples, sent_triples=0, chunks=0, skipped_chunks=len(checkpoint.done),
+                           seconds=0.0, triples_per_s=None, already_loaded=True)
+            return rapport
+        if replace and not rapport["resumed"]:
+            self.clear()
+
+        debut = time.perf_counter()
+        etat = {"envoyes": 0, "lots": 0, "ignores": 0, "octets": 0, "affiche": debut}
+        verrou = threading.Lock()
+        en_vol = threading.BoundedSemaphore(self.workers * 2)
+        erreurs = []
+        lot, anonymes = [], []
+        index = [0]
+
+        def envoyer(numero, lignes):
+            try:
+                if erreurs:
+                    return
+                corps = ''.join(lignes).encode('utf-8')
+                self.send(corps)
+                checkpoint.mark(numero, len(lignes))
+                with verrou:
+                    etat["envoyes"] += len(lignes)
+                    etat["lots"] += 1
+                    etat["octets"] += len(corps)
+                    maintenant = time.perf_counter()
+                    if self.progress is not None and maintenant - etat["affiche"] >= 1.0:
+                        etat["affiche"] = maintenant
+                        self.progress(etat["envoyes"], etat["envoyes"] / (maintenant - debut))
+            except Exception as e:
+                erreurs.append(e)
+            finally:
+                en_vol.release()
+
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='fuseki-load') as pool:
+            def soumettre(numero, lignes):
+                if erreurs:
+                    raise _Interrompu()
+                if numero is not None and numero in checkpoint.done:
+                    etat["ignores"] += 1
+                    return
+                en_vol.acquire()
+                pool.submit(envoyer, numero, lignes)
+
+            def recevoir(ligne, anonyme):
+                if anonyme:
+                    anonymes.append(ligne)
+                    return
+                lot.append(ligne)
+                if len(lot) >= self.chunk_size:
+                    soumettre(index[0], lot[:])
+                    lot.clear()
+                    index[0] += 1
+
+            try:
+                read_statements(source, rdf_format, recevoir)
+                if lot:
+                    soumettre(index[0], lot[:])
+            except _Interrompu:
+                pass
+        if not erreurs and anonymes and not checkpoint.anonymous_done:
+            # Nœuds anonymes: une seule requête, une fois tous les autres lots acquittés
+            en_vol.acquire()
+            envoyer(None, anonymes)
+        if erreurs:
+            raise LoadError(f"{erreurs[0]} ({checkpoint.triples} triplet(s) chargé(s); "
+                            f"relancer pour reprendre depuis {checkpoint_path})") from erreurs[0]
+        checkpoint.finish()
+
+        duree = time.perf_counter() - debut
+        rapport.update(triples=checkpoint.triples, sent_triples=etat["envoyes"], chunks=etat["lots"],
+                       skipped_chunks=etat["ignores"], bytes=etat["octets"], seconds=round(duree, 3),
+                       triples_per_s=round(etat["envoyes"] / duree, 1) if duree else None,
+                       already_loaded=False)
+        return rapport
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Charger un fichier RDF dans Fuseki par lots parallèles")
+    parser.add_argument('source', nargs='?', default=os.getenv('ONTOLOGY_FILE', '../ws.rdf'),
+                        help="fichier RDF/XML, Turtle ou N-Triples (défaut: ONTOLOGY_FILE)")
+    parser.add_argument('--endpoint', default=os.getenv('FUSEKI_DATA_ENDPOINT', DEFAULT_ENDPOINT),
+                        help="endpoint Graph Store Protocol du dataset")
+    parser.add_argument('--graph', help="graphe nommé cible (défaut: graphe par défaut)")
+    parser.add_argument('--format', help="format de la source (défaut: d'après l'extension)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="triplets par requête")
+    parser.add_argument('--workers', type=int, default=4, help="requêtes simultanées")
+    parser.add_argument('--retries', type=int, default=5, help="nouvelles tentatives par lot")
+    parser.add_argument('--checkpoint', help="fichier de reprise (défaut: <source>.fuseki-load.json)")
+    parser.add_argument('--replace', action='store_true', help="vider le graphe cible avant un nouveau chargement")
+    parser.add_argument('--restart', action='store_true', help="ignorer le fichier de reprise")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    def progression(triplets, debit):
+        print(f"   {triplets} triplets envoyés ({debit:.0f} triplets/s)", flush=True)
+
+    loader = FusekiLoader(args.endpoint, args.graph, args.chunk_size, args.workers, args.retries,
+                          progress=progression)
+    print(f"📤 Chargement de {args.source} vers {args.endpoint} "
+          f"(lots de {args.chunk_size}, {args.workers} en parallèle)...")
+    try:
+        rapport = loader.load(args.source, args.format, args.checkpoint, args.replace, args.restart)
+    except (LoadError, OSError) as e:
+        print(f"❌ {e}")
+        return 1
+    if rapport["already_loaded"]:
+        print(f"✅ Déjà chargé ({rapport['triples']} triplets); --restart pour recharger")
+    else:
+        reprise = f", {rapport['skipped_chunks']} lot(s) déjà chargé(s)" if rapport["skipped_chunks"] else ""
+        print(f"✅ {rapport['triples']} triplets chargés en {rapport['seconds']} s "
+              f"({rapport['triples_per_s']} triplets/s{reprise})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
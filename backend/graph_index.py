@@ -0,0 +1,207 @@
+"""
+Index d'adjacence compact pour les parcours multi-sauts.
+
+Les termes sont internés en identifiants entiers et les arêtes des propriétés
+d'objet (owl:ObjectProperty) sont rangées en listes d'adjacence CSR
+(tableaux `array` d'offsets / cibles / prédicats), dans les deux sens.
+Les mutations sont appliquées dans une petite surcouche (ajouts / retraits)
+fusionnée dans les tableaux CSR quand elle devient trop grande, ce qui évite
+de reconstruire l'index à chaque écriture. Les ajouts sont indexés par sujet
+et par objet: un nœud ne lit que ses propres arêtes. Seule la déclaration
+(ou le retrait) d'une owl:ObjectProperty reconstruit l'index.
+"""
+import threading
+from array import array
+from collections import deque
+
+from rdflib import RDF, OWL, Literal, URIRef
+
+# Taille de la surcouche au-delà de laquelle les tableaux CSR sont recompactés
+SEUIL_COMPACTAGE = 1024
+
+
+class _CSR:
+    """Listes d'adjacence figées: voisins de n = cibles[offsets[n]:offsets[n+1]]"""
+    __slots__ = ("offsets", "cibles", "predicats")
+
+    def __init__(self, nb_noeuds, aretes):
+        # aretes: liste de (source, predicat, cible) en identifiants
+        aretes.sort()
+        self.offsets = array('l', [0]) * (nb_noeuds + 1)
+        self.cibles = array('l', (a[2] for a in aretes))
+        self.predicats = array('l', (a[1] for a in aretes))
+        for s, _, _ in aretes:
+            self.offsets[s + 1] += 1
+        for i in range(nb_noeuds):
+            self.offsets[i + 1] += self.offsets[i]
+
+    def voisins(self, noeud):
+        if noeud + 1 >= len(self.offsets):
+            return
+        for i in range(self.offsets[noeud], self.offsets[noeud + 1]):
+            yield self.predicats[i], self.cibles[i]
+
+
+class AdjacencyIndex:
+    """Index d'adjacence entier des propriétés d'objet du graphe"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = {}
+        self._termes = []
+        self._proprietes = set()
+        self._sortant = None
+        self._entrant = None
+        self._graph = None
+        self._ajouts = set()
+        self._ajouts_sortants = {}   # sujet -> arêtes ajoutées
+        self._ajouts_entrants = {}   # objet -> arêtes ajoutées
+        self._retraits = set()
+
+    def _id(self, terme):
+        ident = self._ids.get(terme)
+        if ident is None:
+            ident = len(self._termes)
+            self._ids[terme] = ident
+            self._termes.append(terme)
+        return ident
+
+    # ------------------------------------------------------------------
+    # Construction et maintenance
+    # ------------------------------------------------------------------
+
+    def rebuild(self, graph):
+        """Reconstruire entièrement l'index à partir du graphe"""
+        with self._lock:
+            self._graph = graph
+            self._ids = {}
+            self._termes = []
+            self._proprietes = set(graph.subjects(RDF.type, OWL.ObjectProperty))
+            aretes = set()
+            for p in self._proprietes:
+                for s, o in graph.subject_objects(p):
+                    if isinstance(o, Literal):
+                        continue
+                    aretes.add((self._id(s), self._id(p), self._id(o)))
+            self._compacter(aretes)
+
+    def _aretes_figees(self):
+        for s in range(len(self._sortant.offsets) - 1):
+            for p, o in self._sortant.voisins(s):
+                yield (s, p, o)
+
+    def _compacter(self, aretes=None):
+        if aretes is None:
+            aretes = set(self._aretes_figees())
+            aretes -= self._retraits
+            aretes |= self._ajouts
+        n = len(self._termes)
+        self._sortant = _CSR(n, list(aretes))
+        self._entrant = _CSR(n, [(o, p, s) for s, p, o in aretes])
+        self._ajouts = set()
+        self._ajouts_sortants = {}
+        self._ajouts_entrants = {}
+        self._retraits = set()
+
+    def _ajouter(self, arete):
+        self._ajouts.add(arete)
+        self._ajouts_sortants.setdefault(arete[0], []).append(arete)
+        self._ajouts_entrants.setdefault(arete[2], []).append(arete)
+
+    def _oublier(self, arete):
+        self._ajouts.discard(arete)
+        for index, noeud in ((self._ajouts_sortants, arete[0]), (self._ajouts_entrants, arete[2])):
+            liste = index[noeud]
+            liste.remove(arete)
+            if not liste:
+                del index[noeud]
+
+    def apply(self, added=(), removed=()):
+        """Appliquer un delta de triplets (ajoutés, retirés) à l'index"""
+        with self._lock:
+            if self._sortant is None:
+                return
+            # Propriété d'objet déclarée ou retirée: ses arêtes existantes entrent
+            # dans l'index ou en sortent, reconstruire depuis le graphe
+            for s, p, o in list(added) + list(removed):
+                if p == RDF.type and o == OWL.ObjectProperty:
+                    self.rebuild(self._graph)
+                    return
+            for s, p, o in removed:
+                if p not in self._proprietes or isinstance(o, Literal):
+                    continue
+                if s in self._ids and o in self._ids:
+                    arete = (self._ids[s], self._ids[p], self._ids[o])
+                    if arete in self._ajouts:
+                        self._oublier(arete)
+                    else:
+                        self._retraits.add(arete)
+            for s, p, o in added:
+                if p not in self._proprietes or isinstance(o, Literal):
+                    continue
+                arete = (self._id(s), self._id(p), self._id(o))
+                if arete in self._retraits:
+                    self._retraits.discard(arete)
+                elif arete not in self._ajouts:
+                    self._ajouter(arete)
+            if len(self._ajouts) + len(self._retraits) > SEUIL_COMPACTAGE:
+                self._compacter()
+
+    # ------------------------------------------------------------------
+    # Parcours
+    # ------------------------------------------------------------------
+
+    def _voisins(self, noeud, direction):
+        csrs = []
+        if direction in ('out', 'both'):
+            csrs.append((self._sortant, False))
+        if direction in ('in', 'both'):
+            csrs.append((self._entrant, True))
+        for csr, inverse in csrs:
+            for p, v in csr.voisins(noeud):
+                arete = (v, p, noeud) if inverse else (noeud, p, v)
+                if arete not in self._retraits:
+                    yield p, v, arete
+        if direction in ('out', 'both'):
+            for arete in self._ajouts_sortants.get(noeud, ()):
+                yield arete[1], arete[2], arete
+        if direction in ('in', 'both'):
+            for arete in self._ajouts_entrants.get(noeud, ()):
+                yield arete[1], arete[0], arete
+
+    def neighborhood(self, start, depth=1, predicates=None, limit=100, direction='out'):
+        """Parcours en largeur borné; retourne (noeuds par distance, arêtes, tronqué)"""
+        with self._lock:
+            start = URIRef(start)
+            if start not in self._ids:
+                return {start: 0}, [], False
+            filtre = None
+            if predicates:
+                filtre = {self._ids[p] for p in predicates if p in self._ids}
+            origine = self._ids[start]
+            distances = {origine: 0}
+            aretes = set()
+            tronque = False
+            frontiere = deque([origine])
+            for saut in range(1, depth + 1):
+                suivante = deque()
+                ajoutes = 0
+                for noeud in frontiere:
+                    for p, voisin, arete in self._voisins(noeud, direction):
+                        if filtre is not None and p not in filtre:
+                            continue
+                        if voisin not in distances:
+                            if ajoutes >= limit:
+                                tronque = True
+                                continue
+                            distances[voisin] = saut
+                            suivante.append(voisin)
+                            ajoutes += 1
+                        aretes.add(arete)
+                frontiere = suivante
+                if not frontiere:
+                    break
+            termes = self._termes
+            return ({termes[n]: d for n, d in distances.items()},
+                    [(termes[s], termes[p], termes[o]) for s, p, o in aretes],
+                    tronque)
@@ -0,0 +1,322 @@
+"""
+Optimisation d'itinéraires à faible empreinte carbone.
+
+Pour un voyageur, on choisit une destination, un hébergement, un transport et
+des activités qui minimisent l'empreinte totale (propriété `empreinte` des
+individus EmpreinteCarbone) sous un budget construit à partir de `prix`.
+
+Le graphe pondéré est construit à partir des propriétés d'objet
+choisitDestination, séjourneDans, participeÀ, utilise, estSituéÀ/contient
+et aPourLieu/propose. La sélection des activités est résolue par une
+programmation dynamique de type sac à dos (exactement N activités, coût
+borné), les ensembles de candidats par destination étant mis en cache
+entre les requêtes. Seules les mutations qui touchent les classes ou
+propriétés lues par l'index (voir `dependencies`) le reconstruisent.
+"""
+import heapq
+import math
+import threading
+from collections import OrderedDict
+
+from rdflib import RDF, RDFS, URIRef
+
+# Nombre maximal de cases de budget pour la programmation dynamique
+MAX_BUDGET_CASES = 2000
+# Budget maximal accepté (au-delà, la discrétisation n'a plus de sens)
+MAX_BUDGET = 1e9
+# Tables de programmation dynamique conservées (LRU, vidée à chaque reconstruction)
+MAX_DP_ENTRIES = 256
+
+
+def valider_budget(budget):
+    """Retourner le budget en float, ou lever ValueError s'il n'est pas fini, positif et borné"""
+    budget = float(budget)
+    if not math.isfinite(budget) or budget <= 0:
+        raise ValueError("budget doit être un nombre fini strictement positif")
+    if budget > MAX_BUDGET:
+        raise ValueError(f"budget doit être inférieur ou égal à {MAX_BUDGET:.0f}")
+    return budget
+
+
+def _instances(graph, class_uri):
+    """Retourner les individus d'une classe et de toutes ses sous-classes"""
+    classes = set(graph.transitive_subjects(RDFS.subClassOf, class_uri))
+    instances = set()
+    for cls in classes:
+        instances.update(s for s in graph.subjects(RDF.type, cls) if isinstance(s, URIRef))
+    return instances
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Candidat:
+    """Un élément sélectionnable (hébergement, transport ou activité)"""
+    __slots__ = ("uri", "nom", "prix", "empreinte")
+
+    def __init__(self, uri, nom, prix, empreinte):
+        self.uri = uri
+        self.nom = nom
+        self.prix = prix
+        self.empreinte = empreinte
+
+    def to_dict(self):
+        return {
+            "uri": str(self.uri),
+            "nom": self.nom,
+            "prix": self.prix,
+            "empreinte": self.empreinte
+        }
+
+
+class ItineraryOptimizer:
+    """Recommandation des top-k itinéraires par destination"""
+
+    def __init__(self, ns):
+        self.ns = ns
+        self._lock = threading.Lock()
+        self._graph = None
+        self._candidats = {}     # destination -> (hébergements, activités)
+        self._dp = OrderedDict() # (destination, nb, pas, cases) -> meilleurs ensembles (LRU)
+        self._index = None
+        self.rebuilds = 0
+        self.kept = 0
+        # Jetons lus par _construire_index (prédicats, et classes via rdf:type)
+        self.lectures = {RDFS.subClassOf} | {
+            ns[p] for p in ('empreinte', 'aEmpreinteCarbone', 'estAttribuéeÀ', 'prix', 'nomHebergement',
+                            'nomActivité', 'nomTransport', 'estSituéÀ', 'contient', 'aPourLieu', 'propose')
+        } | {(RDF.type, ns[c]) for c in ('Destination', 'Hébergement', 'ActivitéTouristique', 'Transport')}
+
+    # ------------------------------------------------------------------
+    # Construction des index (après une mutation qui les concerne)
+    # ------------------------------------------------------------------
+
+    def invalidate(self, jetons):
+        """Oublier l'index si une mutation a écrit l'un des jetons qu'il lit"""
+        with self._lock:
+            if self._index is None:
+                return
+            if self.lectures.isdisjoint(jetons):
+                self.kept += 1
+            else:
+                self._index = None
+
+    def stats(self):
+        with self._lock:
+            return {"rebuilds": self.rebuilds, "kept": self.kept}
+
+    def _invalider_si_besoin(self, graph):
+        if self._index is None or graph is not self._graph:
+            self._graph = graph
+            self._candidats = {}
+            self._dp.clear()
+            self._index = self._construire_index(graph)
+            self.rebuilds += 1
+
+    def _construire_index(self, graph):
+        ns = self.ns
+
+        # Empreinte par entité: aEmpreinteCarbone et estAttribuéeÀ
+        valeur_empreinte = {}
+        for ec, valeur in graph.subject_objects(ns.empreinte):
+            v = _float(valeur)
+            if v is not None:
+                valeur_empreinte[ec] = v
+        empreintes = {}
+        for entite, ec in graph.subject_objects(ns.aEmpreinteCarbone):
+            if ec in valeur_empreinte:
+                empreintes[entite] = max(empreintes.get(entite, 0.0), valeur_empreinte[ec])
+        for ec, entite in graph.subject_objects(ns['estAttribuéeÀ']):
+            if ec in valeur_empreinte:
+                empreintes[entite] = max(empreintes.get(entite, 0.0), valeur_empreinte[ec])
+
+        prix = {}
+        for entite, valeur in graph.subject_objects(ns.prix):
+            v = _float(valeur)
+            if v is not None:
+                prix[entite] = v
+
+        def candidat(uri, nom_prop):
+            nom = graph.value(uri, ns[nom_prop])
+            return Candidat(uri, str(nom) if nom is not None else None,
+                            prix.get(uri, 0.0), empreintes.get(uri, 0.0))
+
+        destinations = _instances(graph, ns.Destination)
+        hebergements = {h: candidat(h, 'nomHebergement') for h in _instances(graph, ns['Hébergement'])}
+        activites = {a: candidat(a, 'nomActivité') for a in _instances(graph, ns['ActivitéTouristique'])}
+        transports = {t: candidat(t, 'nomTransport') for t in _instances(graph, ns.Transport)}
+
+        # Arêtes de localisation (dans les deux sens de la relation)
+        lieu_hebergement = {}
+        for h, d in graph.subject_objects(ns['estSituéÀ']):
+            lieu_hebergement.setdefault(h, set()).add(d)
+        for d, h in graph.subject_objects(ns.contient):
+            lieu_hebergement.setdefault(h, set()).add(d)
+        lieu_activite = {}
+        for a, d in graph.subject_objects(ns.aPourLieu):
+            lieu_activite.setdefault(a, set()).add(d)
+        for d, a in graph.subject_objects(ns.propose):
+            lieu_activite.setdefault(a, set()).add(d)
+
+        return {
+            "destinations": destinations,
+            "hebergements": hebergements,
+            "activites": activites,
+            "transports": transports,
+            "lieu_hebergement": lieu_hebergement,
+            "lieu_activite": lieu_activite
+        }
+
+    def _candidats_destination(self, destination, inclure_non_localises):
+        cle = (destination, inclure_non_localises)
+        if cle not in self._candidats:
+            idx = self._index
+
+            def filtrer(elements, lieux):
+                choisis = []
+                for uri, c in elements.items():
+                    lieux_uri = lieux.get(uri)
+                    if (lieux_uri and destination in lieux_uri) or (not lieux_uri and inclure_non_localises):
+                        choisis.append(c)
+                return choisis
+
+            hebergements = sorted(filtrer(idx["hebergements"], idx["lieu_hebergement"]),
+                                  key=lambda c: (c.empreinte, c.prix))
+            activites = filtrer(idx["activites"], idx["lieu_activite"])
+            self._candidats[cle] = (hebergements, activites)
+        return self._candidats[cle]
+
+    # ------------------------------------------------------------------
+    # Sac à dos: exactement `nb` activités, coût <= budget, empreinte minimale
+    # ------------------------------------------------------------------
+
+    def _meilleures_activites(self, cle, activites, nb, pas, cases):
+        """Retourne pour chaque budget c (en cases) le meilleur ensemble de coût <= c"""
+        cle_dp = (cle, nb, pas, cases)
+        if cle_dp in self._dp:
+            self._dp.move_to_end(cle_dp)
+            return self._dp[cle_dp]
+
+        infini = (math.inf, ())
+        # dp[j][c] = (empreinte minimale, indices) pour j activités de coût exactement c
+        dp = [[infini] * (cases + 1) for _ in range(nb + 1)]
+        dp[0][0] = (0.0, ())
+        for i, act in enumerate(activites):
+            cout = int(math.ceil(act.prix / pas - 1e-9))
+            if cout > cases:
+                continue
+            for j in range(min(nb, i + 1), 0, -1):
+                precedent, courant = dp[j - 1], dp[j]
+                for c in range(cases, cout - 1, -1):
+                    base = precedent[c - cout]
+                    if base[0] == math.inf:
+                        continue
+                    total = base[0] + act.empreinte
+                    if total < courant[c][0]:
+                        courant[c] = (total, base[1] + (i,))
+
+        # Minimum préfixe: meilleur ensemble pour un budget d'au plus c
+        meilleur = []
+        best = infini
+        for c in range(cases + 1):
+            if dp[nb][c][0] < best[0]:
+                best = dp[nb][c]
+            meilleur.append(best)
+        self._dp[cle_dp] = meilleur
+        if len(self._dp) > MAX_DP_ENTRIES:
+            self._dp.popitem(last=False)
+        return meilleur
+
+    # ------------------------------------------------------------------
+    # API publique
+    # ------------------------------------------------------------------
+
+    def recommander(self, graph, voyageur, budget, k=3, nb_activites=1,
+                    inclure_non_localises=True):
+        """Retourner les k itinéraires d'empreinte minimale respectant le budget"""
+        budget = valider_budget(budget)
+        ns = self.ns
+        voyageur = URIRef(voyageur)
+        with self._lock:
+            self._invalider_si_besoin(graph)
+            idx = self._index
+
+            # Destinations candidates: choix explicites, puis lieux des séjours/activités
+            destinations = set(graph.objects(voyageur, ns.choisitDestination))
+            for h in graph.objects(voyageur, ns['séjourneDans']):
+                destinations.update(idx["lieu_hebergement"].get(h, ()))
+            for a in graph.objects(voyageur, ns['participeÀ']):
+                destinations.update(idx["lieu_activite"].get(a, ()))
+            destinations &= idx["destinations"]
+            if not destinations:
+                destinations = idx["destinations"]
+
+            transports = [idx["transports"][t] for t in graph.objects(voyageur, ns.utilise)
+                          if t in idx["transports"]]
+            if not transports:
+                transports = list(idx["transports"].values())
+            transports.sort(key=lambda c: (c.empreinte, c.prix))
+            if not transports:
+                transports = [None]
+
+            # Discrétisation du budget pour borner la taille de la table
+            pas = max(1.0, budget / MAX_BUDGET_CASES)
+            cases = int(budget // pas)
+
+            heap = []
+            compteur = 0
+            for destination in destinations:
+                hebergements, activites = self._candidats_destination(destination, inclure_non_localises)
+                nb = min(nb_activites, len(activites))
+                meilleur = self._meilleures_activites((destination, inclure_non_localises),
+                                                     activites, nb, pas, cases)
+                # Empreinte minimale des activités, tous budgets confondus
+                borne_a = meilleur[cases][0]
+                if borne_a == math.inf:
+                    continue
+                empreinte_t_min = transports[0].empreinte if transports[0] else 0.0
+                for h in hebergements or [None]:
+                    prix_h = h.prix if h else 0.0
+                    empreinte_h = h.empreinte if h else 0.0
+                    # Tas plein: hébergements et transports sont triés par empreinte,
+                    # les suivants ne peuvent plus battre le k-ième meilleur
+                    if len(heap) == k and borne_a + empreinte_h + empreinte_t_min >= -heap[0][0]:
+                        break
+                    for t in transports:
+                        empreinte_t = t.empreinte if t else 0.0
+                        if len(heap) == k and borne_a + empreinte_h + empreinte_t >= -heap[0][0]:
+                            break
+                        prix_t = t.prix if t else 0.0
+                        reste = budget - prix_h - prix_t
+                        if reste < 0:
+                            continue
+                        empreinte_a, choix = meilleur[min(cases, int(reste // pas))]
+                        if empreinte_a == math.inf:
+                            continue
+                        total = empreinte_a + empreinte_h + empreinte_t
+                        compteur += 1
+                        entree = (-total, -compteur, destination, h, t, choix)
+                        if len(heap) < k:
+                            heapq.heappush(heap, entree)
+                        elif entree > heap[0]:
+                            heapq.heapreplace(heap, entree)
+
+            itineraires = []
+            for neg_total, _, destination, h, t, choix in sorted(heap, reverse=True):
+                _, activites = self._candidats_destination(destination, inclure_non_localises)
+                choisies = [activites[i] for i in choix]
+                nom = graph.value(destination, ns.nomDestination)
+                itineraires.append({
+                    "destination": {"uri": str(destination), "nom": str(nom) if nom is not None else None},
+                    "hebergement": h.to_dict() if h else None,
+                    "transport": t.to_dict() if t else None,
+                    "activites": [a.to_dict() for a in choisies],
+                    "empreinte_totale": round(-neg_total, 4),
+                    "prix_total": round(sum(a.prix for a in choisies)
+                                        + (h.prix if h else 0.0) + (t.prix if t else 0.0), 2)
+                })
+            return itineraires
@@ -0,0 +1,206 @@
+"""
+Instrumentation des requêtes: spans, histogrammes de latence et compteurs.
+
+Les métriques sont exposées au format texte Prometheus. Chaque requête
+collecte ses spans (parse/éval SPARQL, HTTP Fuseki, appel Gemini,
+sérialisation, persistance), renvoyés dans l'en-tête `Server-Timing`.
+Si SLOW_REQUEST_PROFILE_MS est défini, chaque requête est profilée avec
+cProfile et le profil est écrit sur disque quand elle dépasse le seuil.
+"""
+import cProfile
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g as request_state, has_request_context, request
+
+# Bornes (secondes) des histogrammes de latence
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return '{' + inner + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, borne in enumerate(self.buckets):
+                if value <= borne:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                for borne, n in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_labels(key + (('le', borne),))} {n}")
+                lines.append(f"{self.name}_bucket{_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_labels(key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests = registry.register(Counter(
+    'http_requests_total', 'Nombre de requêtes HTTP par route, méthode et statut'))
+http_latency = registry.register(Histogram(
+    'http_request_duration_seconds', 'Latence des requêtes HTTP par route'))
+span_latency = registry.register(Histogram(
+    'span_duration_seconds', 'Durée des étapes internes (SPARQL, Fuseki, Gemini, sérialisation, persistance)'))
+slow_requests = registry.register(Counter(
+    'slow_requests_total', 'Requêtes ayant dépassé le seuil de profilage'))
+
+
+@contextmanager
+def span(name):
+    """Mesurer une étape; rattachée à la requête courante si elle existe"""
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        duree = time.perf_counter() - debut
+        span_latency.observe(duree, span=name)
+        if has_request_context():
+            spans = request_state.setdefault('spans', [])
+            spans.append((name, duree))
+
+
+def init_app(app):
+    """Brancher l'instrumentation (hooks de requête + endpoint /metrics)"""
+    seuil_ms = os.getenv('SLOW_REQUEST_PROFILE_MS')
+    seuil = float(seuil_ms) / 1000 if seuil_ms else None
+    dossier = os.getenv('SLOW_REQUEST_PROFILE_DIR', 'profiles')
+
+    @app.before_request
+    def _debut_requete():
+        request_state.request_start = time.perf_counter()
+        request_state.spans = []
+        if seuil is not None:
+            request_state.profiler = cProfile.Profile()
+            request_state.profiler.enable()
+
+    @app.after_request
+    def _fin_requete(response):
+        debut = request_state.get('request_start')
+        if debut is None:
+            return response
+        duree = time.perf_counter() - debut
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_latency.observe(duree, route=route, method=request.method)
+        http_requests.inc(route=route, method=request.method, status=response.status_code)
+
+        spans = request_state.get('spans', [])
+        timing = [f"{nom};dur={d * 1000:.2f}" for nom, d in spans]
+        timing.append(f"total;dur={duree * 1000:.2f}")
+        response.headers['Server-Timing'] = ', '.join(timing)
+
+        profiler = request_state.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            if duree >= seuil:
+                slow_requests.inc(route=route)
+                os.makedirs(dossier, exist_ok=True)
+                nom = route.strip('/').replace('/', '_').replace('<', '').replace('>', '') or 'root'
+                chemin = os.path.join(dossier, f"{int(time.time() * 1000)}_{nom}.prof")
+                profiler.dump_stats(chemin)
+                app.logger.warning(f"Requête lente {request.method} {request.path}: "
+                                   f"{duree * 1000:.0f} ms, profil écrit dans {chemin}")
+        return response
+
+    @app.teardown_request
+    def _arret_profiler(exc):
+        # after_request n'est pas appelé si le handler lève une exception
+        profiler = request_state.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Métriques au format texte Prometheus"""
+        return registry.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
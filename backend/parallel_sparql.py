@@ -0,0 +1,440 @@
+"""
+Évaluation SPARQL parallèle: graphe partitionné par sujet sur plusieurs processus.
+
+Sur demande (`"parallel": true` dans /api/query), les triplets du graphe sont
+encodés en identifiants entiers puis répartis en N fragments selon le
+sujet. Chaque fragment est placé en mémoire partagée
+(`multiprocessing.shared_memory`), trié SPO et POS. Les processus d'un
+`ProcessPoolExecutor` s'y attachent sans copie. L'instantané est lu sous le
+verrou d'écriture du locataire, et reconstruit quand la génération du graphe
+change: en fond après chaque écriture (`rafraichir`), sinon par la requête
+qui le trouve périmé. L'ancien n'est libéré (unlink) qu'une fois terminées
+les requêtes qui l'utilisent encore.
+
+Les processus de travail ne sont pas créés par `fork` (le serveur est
+multithread): ils partent d'un serveur de fork qui ne charge que ce module,
+et les tâches ne reçoivent que les noms des fragments en mémoire partagée.
+
+Le point d'entrée est le hook `CUSTOM_EVALS` de RDFLib, au niveau des BGP.
+Un BGP est découpé en étoiles, c'est-à-dire en motifs qui partagent le même
+sujet. Tous les triplets d'un sujet sont dans un seul fragment, donc chaque
+étoile est évaluée indépendamment dans tous les fragments en parallèle. Les
+résultats partiels sont concaténés, puis joints entre étoiles par hachage.
+Le reste de la requête (FILTER, OPTIONAL, DISTINCT, GROUP BY, agrégats)
+reste évalué par RDFLib sur ces solutions.
+
+Les BGP avec chemins de propriétés, ou évalués avec des variables déjà liées
+(partie droite d'un OPTIONAL...), retombent sur l'évaluation RDFLib normale.
+"""
+import atexit
+import contextvars
+import multiprocessing
+import os
+import sys
+import threading
+import weakref
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from importlib.machinery import ModuleSpec
+from multiprocessing import shared_memory
+
+from rdflib import BNode, Variable
+from rdflib.paths import Path
+from rdflib.plugins.sparql import CUSTOM_EVALS
+
+# Évaluateur actif pour la requête en cours: (évaluateur, graphe, génération, verrou)
+_actif = contextvars.ContextVar('parallel_sparql', default=None)
+
+# Colonnes d'un fragment en mémoire partagée (uint32): ordre SPO puis ordre POS
+_COLONNES = 6
+
+# ----------------------------------------------------------------------
+# Côté processus de travail
+# ----------------------------------------------------------------------
+
+_segments = {}
+
+
+def _attacher(nom, n):
+    """Colonnes d'un fragment (vues sans copie sur la mémoire partagée)"""
+    segment = _segments.get(nom)
+    if segment is None:
+        # Nouvel instantané: libérer les fragments des générations précédentes
+        for ancien, (shm, colonnes) in list(_segments.items()):
+            for c in colonnes:
+                c.release()
+            shm.close()
+            del _segments[ancien]
+        shm = shared_memory.SharedMemory(name=nom)
+        vue = shm.buf[:_COLONNES * n * 4].cast('I')
+        segment = _segments[nom] = (shm, [vue[i * n:(i + 1) * n] for i in range(_COLONNES)])
+    return segment[1]
+
+
+def _plage(a, b, va, vb=None):
+    """Indices [lo, hi) où a == va (et b == vb), colonnes triées par (a, b)"""
+    lo = bisect_left(a, va)
+    hi = bisect_right(a, va, lo)
+    if vb is not None and lo < hi:
+        lo, hi = bisect_left(b, vb, lo, hi), bisect_right(b, vb, lo, hi)
+    return lo, hi
+
+
+def evaluer_etoile(nom, n, sujet, motifs, nb_vars):
+    """Solutions d'une étoile dans un fragment
+
+    `sujet` et les éléments de `motifs` [(prédicat, objet)] sont des
+    spécifications ('c', id) pour une constante ou ('v', index) pour une
+    variable. Retourne des tuples de `nb_vars` identifiants (None si la
+    variable n'apparaît pas dans l'étoile).
+    """
+    if n == 0:
+        return []
+    sS, sP, sO, pP, pO, pS = _attacher(nom, n)
+
+    if sujet[0] == 'c':
+        candidats = [sujet[1]]
+    else:
+        # Motif le plus sélectif pour énumérer les sujets: (p, o) constants, puis p constant
+        plage = None
+        for p, o in motifs:
+            if p[0] == 'c' and o[0] == 'c':
+                plage = _plage(pP, pO, p[1], o[1])
+                break
+        if plage is None:
+            for p, o in motifs:
+                if p[0] == 'c':
+                    plage = _plage(pP, pO, p[1])
+                    break
+        if plage is not None:
+            candidats = sorted(set(pS[plage[0]:plage[1]]))
+        else:
+            candidats = sorted(set(sS))
+
+    resultats = []
+    for s in candidats:
+        base = [None] * nb_vars
+        if sujet[0] == 'v':
+            base[sujet[1]] = s
+        lignes = [base]
+        for p, o in motifs:
+            lo, hi = _plage(sS, sP, s, p[1] if p[0] == 'c' else None)
+            if lo == hi:
+                lignes = []
+                break
+            suivantes = []
+            for ligne in lignes:
+                for k in range(lo, hi):
+                    vp, vo = sP[k], sO[k]
+                    if o[0] == 'c' and vo != o[1]:
+                        continue
+                    nouvelle = ligne
+                    if p[0] == 'v':
+                        if ligne[p[1]] is not None and ligne[p[1]] != vp:
+                            continue
+                        nouvelle = list(ligne)
+                        nouvelle[p[1]] = vp
+                    if o[0] == 'v':
+                        if nouvelle[o[1]] is not None and nouvelle[o[1]] != vo:
+                            continue
+                        if nouvelle is ligne:
+                            nouvelle = list(ligne)
+                        nouvelle[o[1]] = vo
+                    suivantes.append(nouvelle)
+            lignes = suivantes
+            if not lignes:
+                break
+        resultats.extend(tuple(ligne) for ligne in lignes)
+    return resultats
+
+
+# ----------------------------------------------------------------------
+# Côté serveur
+# ----------------------------------------------------------------------
+
+def _contexte():
+    """Contexte multiprocessing des processus de travail (forkserver, à défaut spawn)
+
+    Un fork du serveur multithread peut copier un verrou tenu par un autre
+    thread (écrivain, surveillance des fichiers...) et bloquer le processus.
+    """
+    methode = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    contexte = multiprocessing.get_context(methode)
+    if methode == 'forkserver':
+        contexte.set_forkserver_preload([__name__])
+    principal = sys.modules['__main__']
+    if getattr(principal, '__spec__', None) is None and getattr(principal, '__file__', None):
+        # Script lancé directement (python app.py): sans nom de module, chaque
+        # processus de travail le ré-exécuterait (ontologie, threads). Les
+        # tâches ne référencent que ce module, le script n'est pas nécessaire.
+        principal.__spec__ = ModuleSpec('__main__', None)
+    return contexte
+
+
+class Snapshot:
+    """Graphe encodé en entiers, fragmenté par sujet en mémoire partagée"""
+
+    def __init__(self, graph, shards, verrou=None):
+        self.terms = []
+        self.ids = {}
+        # Requêtes en cours sur cet instantané; remplacé, il est libéré par la dernière
+        self.refs = 0
+        self.retired = False
+        # Copie cohérente du graphe vivant, encodée ensuite hors du verrou d'écriture
+        with verrou or nullcontext():
+            triplets = list(graph)
+        colonnes = [([], [], []) for _ in range(shards)]
+        for s, p, o in triplets:
+            ids = []
+            for term in (s, p, o):
+                ident = self.ids.get(term)
+                if ident is None:
+                    ident = self.ids[term] = len(self.terms)
+                    self.terms.append(term)
+                ids.append(ident)
+            fs, fp, fo = colonnes[ids[0] % shards]
+            fs.append(ids[0])
+            fp.append(ids[1])
+            fo.append(ids[2])
+
+        self.segments = []
+        for fs, fp, fo in colonnes:
+            n = len(fs)
+            spo = sorted(range(n), key=lambda i: (fs[i], fp[i], fo[i]))
+            pos = sorted(range(n), key=lambda i: (fp[i], fo[i], fs[i]))
+            donnees = array('I')
+            for ordre, cols in ((spo, (fs, fp, fo)), (pos, (fp, fo, fs))):
+                for col in cols:
+                    donnees.extend(col[i] for i in ordre)
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(donnees) * 4))
+            shm.buf[:len(donnees) * 4] = donnees.tobytes()
+            self.segments.append((shm, n))
+
+    def close(self):
+        for shm, _ in self.segments:
+            shm.close()
+            shm.unlink()
+        self.segments = []
+
+
+class ParallelEvaluator:
+    """Pool de processus + instantané fragmenté du graphe"""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._snapshot = None
+        self._graph = None
+        self._generation = None
+        self._lock = threading.Lock()
+        # Reconstruction en fond après les écritures: dernière demande en attente
+        self._condition = threading.Condition()
+        self._a_rafraichir = None
+        self._constructeur = None
+
+    def _executor(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=_contexte())
+            # Libérer la mémoire partagée à l'arrêt du serveur
+            atexit.register(self.close)
+        return self._pool
+
+    def _courant(self, graph, generation, verrou=None):
+        """Instantané du graphe, reconstruit si le graphe ou sa génération a changé (verrou tenu)"""
+        courant = self._graph() if self._graph is not None else None
+        if courant is not graph or self._generation != generation:
+            if self._snapshot is not None:
+                self._retirer(self._snapshot)
+            self._snapshot = Snapshot(graph, self.workers, verrou)
+            self._graph = weakref.ref(graph)
+            self._generation = generation
+        return self._snapshot
+
+    @staticmethod
+    def _retirer(snapshot):
+        # Des processus peuvent encore s'attacher à ses fragments: libérer au dernier release
+        snapshot.retired = True
+        if snapshot.refs == 0:
+            snapshot.close()
+
+    def snapshot(self, graph, generation, verrou=None):
+        """Instantané du graphe (construit d'avance, sans le réserver)"""
+        with self._lock:
+            return self._courant(graph, generation, verrou)
+
+    def acquire(self, graph, generation, verrou=None):
+        """Instantané réservé pour une requête: le rendre avec release"""
+        with self._lock:
+            snapshot = self._courant(graph, generation, verrou)
+            snapshot.refs += 1
+            return snapshot
+
+    def release(self, snapshot):
+        with self._lock:
+            snapshot.refs -= 1
+            if snapshot.retired and snapshot.refs == 0:
+                snapshot.close()
+
+    def rafraichir(self, graph, generation, verrou=None):
+        """Après une écriture (hors du verrou d'écriture): reconstruire l'instantané en fond
+
+        Seulement si c'est le graphe de l'instantané courant; la requête
+        parallèle suivante le trouve alors déjà à jour.
+        """
+        with self._condition:
+            self._a_rafraichir = (graph, generation, verrou)
+            if self._constructeur is None:
+                self._constructeur = threading.Thread(
+                    target=self._construire, name='parallel-snapshot', daemon=True)
+                self._constructeur.start()
+            self._condition.notify()
+
+    def _construire(self):
+        while True:
+            with self._condition:
+                while self._a_rafraichir is None:
+                    self._condition.wait()
+                graph, generation, verrou = self._a_rafraichir
+                self._a_rafraichir = None
+            with self._lock:
+                courant = self._graph() if self._graph is not None else None
+                if courant is graph:
+                    self._courant(graph, generation, verrou)
+
+    def activate(self, graph, generation, verrou=None):
+        """Activer l'évaluation parallèle pour la requête en cours (jeton à passer à deactivate)
+
+        `verrou` est le verrou d'écriture du locataire, tenu pendant la lecture
+        du graphe quand l'instantané est reconstruit.
+        """
+        return _actif.set((self, graph, generation, verrou))
+
+    @staticmethod
+    def deactivate(jeton):
+        _actif.reset(jeton)
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            if self._snapshot is not None:
+                # Pool arrêté: plus aucun processus attaché, libérer sans attendre
+                self._snapshot.close()
+                self._snapshot = None
+                self._graph = None
+
+    # ------------------------------------------------------------------
+    # Évaluation d'un BGP
+    # ------------------------------------------------------------------
+
+    def evaluer_bgp(self, ctx, triples, graph, generation, verrou=None):
+        variables = []
+        index = {}
+
+        def est_variable(t):
+            return isinstance(t, (Variable, BNode))
+
+        for triple in triples:
+            if isinstance(triple[1], Path):
+                raise NotImplementedError
+            for t in triple:
+                if est_variable(t):
+                    if ctx[t] is not None:
+                        # Variables déjà liées: une évaluation par ligne externe, pas rentable
+                        raise NotImplementedError
+                    if t not in index:
+                        index[t] = len(variables)
+                        variables.append(t)
+
+        return self._solutions(ctx, triples, graph, generation, verrou, variables, index)
+
+    def _solutions(self, ctx, triples, graph, generation, verrou, variables, index):
+        snapshot = self.acquire(graph, generation, verrou)
+        try:
+            tables = self._tables(triples, snapshot, variables, index)
+        finally:
+            # Tous les fragments ont été lus: l'instantané peut être remplacé et libéré
+            self.release(snapshot)
+        if tables is None:
+            return
+
+        for ligne in _joindre(tables):
+            c = ctx.push()
+            for i, ident in enumerate(ligne):
+                if ident is not None:
+                    c[variables[i]] = snapshot.terms[ident]
+            yield c.solution()
+
+    def _tables(self, triples, snapshot, variables, index):
+        """Solutions de chaque étoile, évaluée dans les fragments (None si aucune solution)"""
+        def spec(t):
+            if t in index:
+                return ('v', index[t])
+            ident = snapshot.ids.get(t)
+            return None if ident is None else ('c', ident)
+
+        # Étoiles: motifs regroupés par sujet
+        etoiles = {}
+        for s, p, o in triples:
+            specs = (spec(s), spec(p), spec(o))
+            if None in specs:
+                # Constante absente du graphe: aucune solution
+                return None
+            etoiles.setdefault(specs[0], []).append(specs[1:])
+
+        pool = self._executor()
+        taches = []
+        for sujet, motifs in etoiles.items():
+            fragments = snapshot.segments
+            if sujet[0] == 'c':
+                fragments = [fragments[sujet[1] % len(fragments)]]
+            taches.append((sujet, motifs, [
+                pool.submit(evaluer_etoile, shm.name, n, sujet, motifs, len(variables))
+                for shm, n in fragments]))
+
+        tables = []
+        for sujet, motifs, futures in taches:
+            lignes = []
+            for future in futures:
+                lignes.extend(future.result())
+            presentes = {sujet[1]} if sujet[0] == 'v' else set()
+            for p, o in motifs:
+                presentes.update(x[1] for x in (p, o) if x[0] == 'v')
+            tables.append((lignes, presentes))
+        return tables
+
+
+def _joindre(tables):
+    """Jointure par hachage des tables d'étoiles, de la plus petite à la plus grande"""
+    tables = sorted(tables, key=lambda t: len(t[0]))
+    lignes, presentes = tables[0]
+    for autres, vars_autres in tables[1:]:
+        communes = sorted(presentes & vars_autres)
+        index = {}
+        for ligne in autres:
+            index.setdefault(tuple(ligne[i] for i in communes), []).append(ligne)
+        jointes = []
+        for ligne in lignes:
+            for autre in index.get(tuple(ligne[i] for i in communes), ()):
+                jointes.append(tuple(a if a is not None else b for a, b in zip(ligne, autre)))
+        lignes, presentes = jointes, presentes | vars_autres
+        if not lignes:
+            break
+    return lignes
+
+
+def _custom_eval(ctx, part):
+    """Hook CUSTOM_EVALS: BGP évalués sur les fragments si la requête l'a demandé"""
+    actif = _actif.get()
+    if actif is None or part.name != 'BGP' or not part.triples:
+        raise NotImplementedError
+    evaluateur, graph, generation, verrou = actif
+    if ctx.graph is not graph:
+        raise NotImplementedError
+    return evaluateur.evaluer_bgp(ctx, part.triples, graph, generation, verrou)
+
+
+CUSTOM_EVALS['parallel_bgp'] = _custom_eval
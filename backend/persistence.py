@@ -0,0 +1,304 @@
+"""
+Pipeline d'écriture: journal synchronisé sur disque + écrivain de fond.
+
+Une mutation est d'abord appliquée au graphe en mémoire. Son delta est
+ensuite confié à l'écrivain du locataire, avec la nouvelle génération du
+graphe. Deux niveaux de durabilité existent, au choix de chaque requête
+(`"durability"`, défaut WRITE_DURABILITY):
+
+- `sync`: la requête attend que le delta soit écrit dans le journal et
+  synchronisé (fsync). Les écritures concurrentes partagent le même fsync.
+- `async`: la requête répond dès l'application en mémoire. Le journal et la
+  sauvegarde se font en arrière-plan.
+
+Le fichier de l'ontologie (ou la base SQLite) n'est plus réécrit à chaque
+mutation. L'écrivain regroupe les mutations d'une rafale (WRITE_FLUSH_MS)
+en une seule sauvegarde complète, puis vide le journal. Au démarrage, les
+deltas restés dans le journal après un arrêt brutal sont rejoués.
+
+Chaque réponse d'écriture donne la génération produite. GET
+/api/persistence?generation=N attend qu'elle soit durable.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from events import term_from_json, term_to_json
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+DURABILITY_MODES = ('sync', 'async')
+
+# Attente maximale entre deux tentatives de sauvegarde après une erreur (secondes)
+BACKOFF_MAX = 30.0
+
+
+class Journal:
+    """Deltas en JSON Lines, ajoutés puis synchronisés par lots"""
+
+    def __init__(self, path):
+        self.path = path
+        self._fichier = None
+
+    def replay(self):
+        """Deltas enregistrés [(génération, ajoutés, retirés)], dans l'ordre"""
+        if not os.path.exists(self.path):
+            return []
+        deltas = []
+        with open(self.path, encoding='utf-8') as f:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal: jamais acquittée
+                    continue
+                deltas.append((
+                    entree['generation'],
+                    [tuple(term_from_json(t) for t in triple) for triple in entree['added']],
+                    [tuple(term_from_json(t) for t in triple) for triple in entree['removed']]))
+        return deltas
+
+    def append(self, deltas):
+        if self._fichier is None:
+            self._fichier = open(self.path, 'a', encoding='utf-8')
+        for generation, added, removed in deltas:
+            self._fichier.write(json.dumps({
+                "generation": generation,
+                "added": [[term_to_json(t) for t in triple] for triple in added],
+                "removed": [[term_to_json(t) for t in triple] for triple in removed]
+            }, ensure_ascii=False) + '\n')
+        self._fichier.flush()
+        os.fsync(self._fichier.fileno())
+
+    def truncate(self):
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class PersistenceWriter:
+    """Journalise les deltas d'un locataire et regroupe ses sauvegardes complètes
+
+    `lock` est le verrou d'écriture du locataire: les mutations du graphe le
+    prennent, et la sauvegarde aussi, pour sérialiser un état cohérent.
+    """
+
+    def __init__(self, backend, graph, lock, journal_path, flush_delay=0.2, max_records=1000):
+        self.backend = backend
+        self._graph = graph
+        self.lock = lock
+        self.journal = Journal(journal_path)
+        self.flush_delay = flush_delay
+        self.max_records = max_records
+
+        self._cond = threading.Condition()
+        self._file = []
+        self._thread = None
+        self._arret = False
+        self._premiere = None        # date du plus ancien delta non sauvegardé
+        self._a_sauver = 0           # deltas journalisés depuis la dernière sauvegarde
+        self._forcer = False
+        self._backoff = 1.0
+        self.generation = 0          # dernière génération soumise
+        self.journaled = 0           # dernière génération synchronisée dans le journal
+        self.saved = 0               # dernière génération présente dans la sauvegarde complète
+        self.flushes = 0
+        self.last_error = None
+        # Triplets modifiés en mémoire depuis la dernière sauvegarde (voir file_watch)
+        self.unsaved = set()
+        # Appelés sous le verrou d'écriture, avant et après chaque sauvegarde complète
+        self.before_save = None
+        self.after_save = None
+
+    # ------------------------------------------------------------------
+    # Démarrage
+    # ------------------------------------------------------------------
+
+    def recover(self, graph):
+        """Rejouer le journal d'une exécution interrompue; retourne le nombre de deltas"""
+        deltas = self.journal.replay()
+        for _, added, removed in deltas:
+            for triple in removed:
+                graph.remove(triple)
+            for triple in added:
+                graph.add(triple)
+        if deltas:
+            logger.warning(f"{len(deltas)} écriture(s) rejouée(s) depuis {self.journal.path}")
+            self.backend.persist(graph)
+            self.journal.truncate()
+        return len(deltas)
+
+    def _demarrer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='persistence', daemon=True)
+            self._thread.start()
+            # Sauvegarder ce qui reste en mémoire à l'arrêt du serveur
+            atexit.register(self.close)
+
+    # ------------------------------------------------------------------
+    # Soumission
+    # ------------------------------------------------------------------
+
+    def submit(self, generation, added, removed):
+        """Confier le delta d'une génération (appelé sous le verrou d'écriture, dans l'ordre)"""
+        with self._cond:
+            self._demarrer()
+            self.generation = generation
+            self._file.append((generation, added, removed))
+            self._cond.notify_all()
+
+    def track(self, triples):
+        """Noter des triplets modifiés en mémoire (appelé sous le verrou d'écriture)"""
+        self.unsaved.update(triples)
+
+    def external(self, generation):
+        """Génération venue du fichier lui-même (modification externe): déjà sur disque"""
+        with self._cond:
+            if self.saved == self.generation:
+                self.saved = generation
+            if not self._file:
+                self.journaled = generation
+            self.generation = generation
+            self._cond.notify_all()
+
+    def wait(self, generation, timeout=None, saved=False):
+        """Attendre que la génération soit journalisée (ou sauvegardée); False si délai dépassé"""
+        fin = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self.saved if saved else self.journaled) < generation:
+                if saved:
+                    self._forcer = True
+                    self._cond.notify_all()
+                reste = None if fin is None else fin - time.monotonic()
+                if reste is not None and reste <= 0:
+                    return False
+                self._cond.wait(reste)
+            return True
+
+    def flush(self, timeout=None):
+        """Sauvegarder tout de suite tout ce qui a été soumis"""
+        with self._cond:
+            generation = self.generation
+        return self.wait(generation, timeout, saved=True)
+
+    def close(self):
+        with self._cond:
+            if self._thread is None:
+                return
+            self._arret = True
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
+        # Le hook d'arrêt retient l'écrivain (et son locataire): le retirer une fois fermé
+        atexit.unregister(self.close)
+
+    def status(self):
+        with self._cond:
+            return {
+                "generation": self.generation,
+                "journaled": self.journaled,
+                "saved": self.saved,
+                "pending": self.generation - self.saved,
+                "flushes": self.flushes,
+                "last_error": self.last_error
+            }
+
+    # ------------------------------------------------------------------
+    # Écrivain de fond
+    # ------------------------------------------------------------------
+
+    def _sauvegarde_due(self):
+        if not self._a_sauver:
+            return False
+        return (self._forcer or self._arret or self._a_sauver >= self.max_records
+                or time.monotonic() - self._premiere >= self.flush_delay)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._file and not self._sauvegarde_due() and not self._arret:
+                    attente = None if not self._a_sauver else max(
+                        0.0, self._premiere + self.flush_delay - time.monotonic())
+                    self._cond.wait(attente)
+                lot, self._file = self._file, []
+                arret = self._arret
+
+            if lot:
+                try:
+                    # Un seul fsync pour toutes les écritures arrivées entre-temps
+                    self.journal.append(lot)
+                except OSError as e:
+                    logger.error(f"Écriture du journal impossible: {e}")
+                    with self._cond:
+                        self.last_error = str(e)
+                        self._file[:0] = lot
+                    time.sleep(self._backoff)
+                    self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+                    continue
+                with self._cond:
+                    self.journaled = lot[-1][0]
+                    if not self._a_sauver:
+                        self._premiere = time.monotonic()
+                    self._a_sauver += len(lot)
+                    self._cond.notify_all()
+
+            with self._cond:
+                due = self._sauvegarde_due()
+            if due:
+                self._sauvegarder()
+            if arret:
+                with self._cond:
+                    # En cas d'erreur, le journal sera rejoué au prochain démarrage
+                    if (not self._file and not self._a_sauver) or self.last_error:
+                        return
+
+    def _sauvegarder(self):
+        try:
+            with self.lock:
+                # Aucune mutation pendant la sérialisation: l'état sauvegardé est cohérent
+                if self.before_save is not None:
+                    self.before_save()
+                with self._cond:
+                    generation = self.generation
+                with span('persistence'):
+                    self.backend.persist(self._graph())
+                self.unsaved.clear()
+                if self.after_save is not None:
+                    self.after_save()
+        except Exception as e:
+            logger.error(f"Sauvegarde du graphe impossible: {e}")
+            with self._cond:
+                self.last_error = str(e)
+            time.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+            return
+        # La sauvegarde contient tout le journal: il peut être vidé
+        self.journal.truncate()
+        with self._cond:
+            self.saved = generation
+            self.journaled = max(self.journaled, generation)
+            self._a_sauver = 0
+            self._forcer = False
+            self._backoff = 1.0
+            self.flushes += 1
+            self.last_error = None
+            self._cond.notify_all()
+
+
+def create_writer(backend, graph, lock, journal_path):
+    """Écrivain d'un locataire selon WRITE_FLUSH_MS"""
+    return PersistenceWriter(backend, graph, lock, journal_path,
+                             flush_delay=float(os.getenv('WRITE_FLUSH_MS', 200)) / 1000)
+
+
+def default_durability():
+    mode = os.getenv('WRITE_DURABILITY', 'sync').lower()
+    if mode not in DURABILITY_MODES:
+        raise ValueError(f"WRITE_DURABILITY inconnu: {mode} (valeurs possibles: sync, async)")
+    return mode
@@ -0,0 +1,308 @@
+"""
+Matérialisation d'un sous-ensemble d'OWL RL, maintenue par delta.
+
+Les requêtes qui suivent une propriété transitive (`ns:p+`), une inverse
+(`^ns:p`) ou une propriété symétrique (`ns:p|^ns:p`) sont évaluées par
+RDFLib en parcours de chemins, triplet par triplet, sans cache de BGP ni
+évaluation parallèle. Les faits qu'elles dérivent sont donc calculés une
+fois et rangés dans un graphe à part (`Reasoner.inferred`); les requêtes
+SPARQL lisent l'union des faits assertés et inférés (`Reasoner.view`), où
+un simple motif `?x ns:p ?y` suffit.
+
+Règles (noms de REASONER_RULES):
+
+- `inverse`: p owl:inverseOf q, (s p o) ⇒ (o q s), dans les deux sens;
+- `symmetric`: p de type owl:SymmetricProperty, (s p o) ⇒ (o p s);
+- `transitive`: p de type owl:TransitiveProperty, (s p x) (x p o) ⇒ (s p o);
+- `domain`: p rdfs:domain C, (s p o) ⇒ (s rdf:type C);
+- `range`: p rdfs:range C, (s p o), o ressource ⇒ (o rdf:type C).
+
+`domain` et `range` ne sont pas actifs par défaut: plusieurs propriétés de
+ws.rdf déclarent plusieurs domaines (au sens d'une union), que la sémantique
+RDFS lit comme une intersection. Un hôtel deviendrait aussi une activité.
+
+Le graphe inféré ne contient jamais de triplet asserté: seuls les faits
+assertés sont sauvegardés et répliqués. Chaque mutation est propagée de
+façon incrémentale (`apply`):
+
+- ajouts: évaluation semi-naïve, seules les jointures qui font intervenir
+  un fait nouveau sont évaluées;
+- retraits: DRed. Tout ce qui dérivait d'un fait retiré est sur-supprimé,
+  puis les faits encore dérivables en une étape depuis ce qui reste sont
+  rétablis et propagés.
+
+Un delta qui modifie les déclarations (owl:inverseOf, rdfs:domain...)
+reconstruit toute la matérialisation.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from rdflib import Graph, Literal, OWL, RDF, RDFS
+from rdflib.store import Store, VALID_STORE
+
+RULES = ('inverse', 'symmetric', 'transitive', 'domain', 'range')
+DEFAULT_RULES = 'inverse,symmetric,transitive'
+
+
+class InferenceStore(Store):
+    """Vue lecture sur faits assertés + inférés (disjoints); les écritures vont aux faits assertés"""
+
+    context_aware = False
+    formula_aware = False
+    graph_aware = False
+
+    def __init__(self, asserted, inferred):
+        super().__init__()
+        self.asserted = asserted
+        self.inferred = inferred
+        # Prédicats que les règles peuvent produire: les autres motifs ne lisent que les faits assertés
+        self.produced = frozenset()
+
+    def open(self, configuration, create=False):
+        return VALID_STORE
+
+    def add(self, triple, context=None, quoted=False):
+        self.asserted.add(triple)
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.asserted.add((s, p, o))
+
+    def remove(self, triple_pattern, context=None):
+        self.asserted.remove(triple_pattern)
+
+    def triples(self, triple_pattern, context=None):
+        # Directement sur les stores: pas de couche Graph par triplet
+        yield from self.asserted.store.triples(triple_pattern, self.asserted)
+        if triple_pattern[1] is None or triple_pattern[1] in self.produced:
+            yield from self.inferred.store.triples(triple_pattern, self.inferred)
+
+    def __len__(self, context=None):
+        return len(self.asserted) + len(self.inferred)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self.asserted.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.asserted.store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.asserted.store.prefix(namespace)
+
+    def namespaces(self):
+        return self.asserted.store.namespaces()
+
+
+def _existe(sources, motif):
+    return any(next(iter(source.triples(motif)), None) is not None for source in sources)
+
+
+def _contient(sources, triple):
+    return any(triple in source for source in sources)
+
+
+class Reasoner:
+    """Faits inférés d'un graphe et vue union, maintenus à chaque mutation"""
+
+    def __init__(self, graph, rules):
+        self.asserted = graph
+        self.rules = frozenset(rules)
+        self.inferred = Graph()
+        self.view = Graph(store=InferenceStore(graph, self.inferred), identifier=graph.identifier)
+        self._lock = threading.RLock()
+        self.materialize_ms = 0.0
+        self.rebuild()
+
+    # ------------------------------------------------------------------
+    # Déclarations
+    # ------------------------------------------------------------------
+
+    def _charger_schema(self):
+        graph = self.asserted
+        self._inverses = {}
+        if 'inverse' in self.rules:
+            for p, q in graph.subject_objects(OWL.inverseOf):
+                self._inverses.setdefault(p, set()).add(q)
+                self._inverses.setdefault(q, set()).add(p)
+        self._symetriques = (set(graph.subjects(RDF.type, OWL.SymmetricProperty))
+                             if 'symmetric' in self.rules else set())
+        self._transitives = (set(graph.subjects(RDF.type, OWL.TransitiveProperty))
+                             if 'transitive' in self.rules else set())
+        self._domaines, self._par_domaine = {}, {}
+        if 'domain' in self.rules:
+            for p, c in graph.subject_objects(RDFS.domain):
+                self._domaines.setdefault(p, set()).add(c)
+                self._par_domaine.setdefault(c, set()).add(p)
+        self._images, self._par_image = {}, {}
+        if 'range' in self.rules:
+            for p, c in graph.subject_objects(RDFS.range):
+                self._images.setdefault(p, set()).add(c)
+                self._par_image.setdefault(c, set()).add(p)
+        # Prédicats dont un triplet peut produire un fait, et prédicats produits
+        self._predicats = (set(self._inverses) | self._symetriques | self._transitives
+                           | set(self._domaines) | set(self._images))
+        produits = {q for qs in self._inverses.values() for q in qs} | self._symetriques | self._transitives
+        if self._domaines or self._images:
+            produits.add(RDF.type)
+        self.view.store.produced = frozenset(produits)
+
+    @staticmethod
+    def _est_declaration(triple):
+        _, p, o = triple
+        return (p in (OWL.inverseOf, RDFS.domain, RDFS.range)
+                or (p == RDF.type and o in (OWL.TransitiveProperty, OWL.SymmetricProperty)))
+
+    # ------------------------------------------------------------------
+    # Règles
+    # ------------------------------------------------------------------
+
+    def _consequences(self, triple, sources):
+        """Faits dérivés en une étape d'un triplet, joint aux faits de `sources`"""
+        s, p, o = triple
+        for c in self._domaines.get(p, ()):
+            yield s, RDF.type, c
+        if p in self._transitives:
+            # (y p s) (s p o): o peut être un littéral
+            for source in sources:
+                for y in source.subjects(p, s):
+                    yield y, p, o
+        if isinstance(o, Literal):
+            return
+        for c in self._images.get(p, ()):
+            yield o, RDF.type, c
+        for q in self._inverses.get(p, ()):
+            yield o, q, s
+        if p in self._symetriques:
+            yield o, p, s
+        if p in self._transitives:
+            for source in sources:
+                for x in source.objects(o, p):
+                    yield s, p, x
+
+    def _derivable(self, triple, sources):
+        """Le triplet se déduit-il en une étape des faits de `sources` ?"""
+        s, p, o = triple
+        if p == RDF.type:
+            if any(_existe(sources, (s, q, None)) for q in self._par_domaine.get(o, ())):
+                return True
+            if any(_existe(sources, (None, q, s)) for q in self._par_image.get(o, ())):
+                return True
+        if p in self._transitives:
+            for source in sources:
+                for x in source.objects(s, p):
+                    if _contient(sources, (x, p, o)):
+                        return True
+        if isinstance(o, Literal):
+            return False
+        if any(_contient(sources, (o, q, s)) for q in self._inverses.get(p, ())):
+            return True
+        return p in self._symetriques and _contient(sources, (o, p, s))
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def _propager(self, nouveaux):
+        """Évaluation semi-naïve: ajouter la clôture des faits nouveaux; retourne les ajouts"""
+        asserted, inferred = self.asserted, self.inferred
+        sources = (asserted, inferred)
+        file = deque(t for t in nouveaux if t[1] in self._predicats)
+        ajoutes = []
+        while file:
+            for c in self._consequences(file.popleft(), sources):
+                if c in inferred or c in asserted:
+                    continue
+                inferred.add(c)
+                ajoutes.append(c)
+                if c[1] in self._predicats:
+                    file.append(c)
+        return ajoutes
+
+    def _supprimer(self, retires):
+        """DRed: sur-supprimer ce qui dérivait des faits retirés, puis rétablir le dérivable
+
+        Retourne (sur-supprimés, rétablis).
+        """
+        perdus = Graph()
+        for t in retires:
+            perdus.add(t)
+        # Jointures sur l'état d'avant le retrait: faits restants + retirés
+        sources = (self.asserted, self.inferred, perdus)
+        supprimes = set()
+        file = deque(t for t in retires if t[1] in self._predicats)
+        while file:
+            for c in self._consequences(file.popleft(), sources):
+                if c not in supprimes and c in self.inferred:
+                    supprimes.add(c)
+                    file.append(c)
+        for t in supprimes:
+            self.inferred.remove(t)
+
+        sources = (self.asserted, self.inferred)
+        retablis = []
+        for t in list(supprimes) + [t for t in retires if t not in self.asserted]:
+            if t not in self.inferred and self._derivable(t, sources):
+                self.inferred.add(t)
+                retablis.append(t)
+        return supprimes, retablis + self._propager(retablis)
+
+    def rebuild(self):
+        """Recalculer toute la matérialisation à partir des faits assertés"""
+        with self._lock:
+            debut = time.perf_counter()
+            self._charger_schema()
+            self.inferred.remove((None, None, None))
+            for p in self._predicats:
+                self._propager(list(self.asserted.triples((None, p, None))))
+            self.materialize_ms = round((time.perf_counter() - debut) * 1000, 3)
+
+    def apply(self, added, removed):
+        """Propager un delta déjà appliqué aux faits assertés
+
+        Retourne (inférés ajoutés, inférés retirés) visibles dans la vue, pour
+        invalider les caches qui les ont lus.
+        """
+        if not added and not removed:
+            return [], []
+        with self._lock:
+            if any(self._est_declaration(t) for t in list(added) + list(removed)):
+                avant = set(self.inferred)
+                self.rebuild()
+                apres = set(self.inferred)
+                return list(apres - avant), [t for t in avant - apres if t not in self.asserted]
+
+            avant = set()
+            supprimes, touches = (self._supprimer(removed) if removed else (set(), []))
+            avant.update(supprimes)
+            # Un fait asserté n'est plus inféré (il l'était peut-être)
+            for t in added:
+                if t in self.inferred:
+                    self.inferred.remove(t)
+                    avant.add(t)
+            touches = touches + self._propager(added)
+            inferred = self.inferred
+            ajoutes = [t for t in dict.fromkeys(touches) if t not in avant and t in inferred]
+            retires = [t for t in avant if t not in inferred and t not in self.asserted]
+            return ajoutes, retires
+
+    def stats(self):
+        return {
+            "rules": sorted(self.rules),
+            "inferred_triples": len(self.inferred),
+            "materialize_ms": self.materialize_ms
+        }
+
+
+def create_reasoner(graph):
+    """Raisonneur d'un locataire selon REASONER_RULES (vide: pas de matérialisation)"""
+    noms = [r.strip() for r in os.getenv('REASONER_RULES', DEFAULT_RULES).split(',') if r.strip()]
+    inconnues = [r for r in noms if r not in RULES]
+    if inconnues:
+        raise ValueError(f"REASONER_RULES inconnue(s): {', '.join(inconnues)} "
+                         f"(valeurs possibles: {', '.join(RULES)})")
+    return Reasoner(graph, noms) if noms else None
@@ -0,0 +1,210 @@
+"""
+Réplication incrémentale du graphe local vers Fuseki (SPARQL Update).
+
+Chaque mutation persistée produit un lot `DELETE DATA` / `INSERT DATA`
+minimal, d'abord écrit (fsync) dans une boîte d'envoi JSONL, puis envoyé par
+un thread de fond sur une session HTTP réutilisée. Les lots arrivés à
+quelques millisecondes d'intervalle partent dans une seule requête. Si
+Fuseki est indisponible, les lots restent dans la boîte d'envoi et sont
+renvoyés (backoff exponentiel), y compris après un redémarrage du serveur:
+Fuseki converge vers le graphe local sans rechargement complet.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+from rdflib import BNode
+
+from metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+# Attente maximale entre deux tentatives d'envoi (secondes)
+BACKOFF_MAX = 30.0
+
+replication_batches = registry.register(Counter(
+    'fuseki_replication_batches_total', 'Requêtes SPARQL Update envoyées à Fuseki par statut'))
+replication_updates = registry.register(Counter(
+    'fuseki_replication_updates_total', 'Mutations répliquées vers Fuseki'))
+
+
+def _triples_n3(triples):
+    return '\n  '.join(f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in triples)
+
+
+def build_update(added, removed):
+    """Requête SPARQL Update minimale pour un delta (None si vide)"""
+    # DELETE DATA n'accepte pas de nœuds anonymes: ils ne sont pas répliqués
+    supprimes = [t for t in removed if not any(isinstance(x, BNode) for x in t)]
+    if len(supprimes) < len(removed):
+        logger.warning(f"{len(removed) - len(supprimes)} suppression(s) de nœuds anonymes non répliquée(s)")
+    parties = []
+    if supprimes:
+        parties.append(f"DELETE DATA {{\n  {_triples_n3(supprimes)}\n}}")
+    if added:
+        parties.append(f"INSERT DATA {{\n  {_triples_n3(added)}\n}}")
+    return ' ;\n'.join(parties) or None
+
+
+class FusekiReplicator:
+    """Boîte d'envoi durable + thread d'envoi groupé vers l'endpoint update de Fuseki"""
+
+    def __init__(self, update_endpoint, outbox_path, batch_delay=0.05, max_batch=200, timeout=10):
+        self.update_endpoint = update_endpoint
+        self.outbox_path = outbox_path
+        self.ack_path = outbox_path + '.ack'
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._acked = self._lire_ack()
+        self._seq = self._acked
+        self.last_error = None
+        self._backoff = 1.0
+        self._charger_outbox()
+        self._outbox = open(self.outbox_path, 'a', encoding='utf-8')
+        threading.Thread(target=self._run, name='fuseki-replication', daemon=True).start()
+
+    # ------------------------------------------------------------------
+    # Boîte d'envoi
+    # ------------------------------------------------------------------
+
+    def _lire_ack(self):
+        try:
+            with open(self.ack_path, encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _charger_outbox(self):
+        """Reprendre les lots non acquittés d'une exécution précédente"""
+        if not os.path.exists(self.outbox_path):
+            return
+        with open(self.outbox_path, encoding='utf-8') as f:
+            for ligne in f:
+                try:
+                    entree = json.loads(ligne)
+                except ValueError:
+                    # Dernière ligne tronquée par un arrêt brutal
+                    continue
+                self._seq = max(self._seq, entree['seq'])
+                if entree['seq'] > self._acked:
+                    self._queue.append((entree['seq'], entree['update']))
+        if self._queue:
+            logger.info(f"{len(self._queue)} lot(s) Fuseki en attente repris depuis {self.outbox_path}")
+
+    def _ecrire_ack(self, seq):
+        temp = self.ack_path + '.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp, self.ack_path)
+
+    def submit(self, added, removed):
+        """Enregistrer durablement un delta puis le confier au thread d'envoi"""
+        update = build_update(added, removed)
+        if update is None:
+            return None
+        with self._cond:
+            self._seq += 1
+            self._outbox.write(json.dumps({"seq": self._seq, "update": update}, ensure_ascii=False) + '\n')
+            self._outbox.flush()
+            os.fsync(self._outbox.fileno())
+            self._queue.append((self._seq, update))
+            self._cond.notify()
+            return self._seq
+
+    # ------------------------------------------------------------------
+    # Envoi
+    # ------------------------------------------------------------------
+
+    def _envoyer(self, lot):
+        reponse = self.session.post(
+            self.update_endpoint,
+            data=' ;\n'.join(update for _, update in lot).encode('utf-8'),
+            headers={'Content-Type': 'application/sparql-update; charset=utf-8'},
+            timeout=self.timeout)
+        reponse.raise_for_status()
+
+    def _echec(self, erreur):
+        replication_batches.inc(status='error')
+        self.last_error = str(erreur)
+        logger.warning(f"Réplication Fuseki en échec ({len(self._queue)} lot(s) en attente): {erreur}")
+        time.sleep(self._backoff)
+        self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            # Laisser arriver les mutations proches pour les grouper
+            time.sleep(self.batch_delay)
+            with self._cond:
+                lot = [self._queue[i] for i in range(min(self.max_batch, len(self._queue)))]
+            try:
+                self._envoyer(lot)
+            except requests.HTTPError as e:
+                if e.response is None or e.response.status_code != 400:
+                    self._echec(e)
+                    continue
+                # Requête refusée par Fuseki: isoler le lot fautif et l'écarter
+                replication_batches.inc(status='rejected')
+                if len(lot) > 1:
+                    lot = lot[:1]
+                    try:
+                        self._envoyer(lot)
+                    except requests.HTTPError:
+                        logger.error(f"Lot Fuseki {lot[0][0]} rejeté et écarté: {lot[0][1]}")
+                    except requests.RequestException as e:
+                        self._echec(e)
+                        continue
+                else:
+                    logger.error(f"Lot Fuseki {lot[0][0]} rejeté et écarté: {lot[0][1]}")
+            except requests.RequestException as e:
+                self._echec(e)
+                continue
+
+            self._backoff = 1.0
+            self.last_error = None
+            replication_batches.inc(status='ok')
+            replication_updates.inc(len(lot))
+            with self._cond:
+                for _ in lot:
+                    self._queue.popleft()
+                self._acked = lot[-1][0]
+                self._ecrire_ack(self._acked)
+                if not self._queue:
+                    # Tout est acquitté: repartir d'une boîte d'envoi vide
+                    self._outbox.truncate(0)
+                self._cond.notify_all()
+
+    def flush(self, timeout=None):
+        """Attendre que tous les lots soient acquittés par Fuseki"""
+        fin = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._queue:
+                reste = None if fin is None else fin - time.monotonic()
+                if reste is not None and reste <= 0:
+                    return False
+                self._cond.wait(reste)
+        return True
+
+    def status(self):
+        with self._cond:
+            return {
+                "pending": len(self._queue),
+                "last_acked": self._acked,
+                "last_error": self.last_error
+            }
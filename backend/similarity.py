@@ -0,0 +1,535 @@
+"""
+Recherche d'entités similaires (« destinations comme Djerba »), sans réseau.
+
+Chaque entité d'une collection (destinations, activités...) reçoit un
+vecteur creux TF-IDF de caractéristiques hachées (DIMENSIONS cases):
+
+- noms (propriétés de nom du schéma, à défaut nom local de l'URI): mots
+  et trigrammes de caractères, sans accents, pour rapprocher « randonnée »
+  et « randonnees »;
+- classes (rdf:type et super-classes);
+- autres littéraux: textes courts (`pays`, `typeTransport`), mots des
+  descriptions, nombres par paliers logarithmiques (`prix`, `duree`);
+- voisins: propriété et cible des arêtes sortantes, classe de la cible, et
+  valeurs numériques des nœuds de valeur liés (empreinte carbone via
+  `aEmpreinteCarbone`); sources des arêtes entrantes (au plus
+  MAX_INCOMING par propriété) et leur nombre.
+
+Les vecteurs (au plus MAX_FEATURES cases, normalisés) sont rangés à la
+suite dans des tableaux `array` (une matrice creuse par lignes). Chaque
+collection a son fichier inversé: pour chaque case, les lignes qui la
+portent et leurs poids. Une requête parcourt les listes de ses cases par
+poids décroissant (les cases rares d'abord, IDF élevée) et s'arrête après
+`budget` entrées; les RERANK meilleurs candidats sont notés exactement
+(cosinus complet). Le coût est borné par le budget, pas par la taille de
+la collection.
+
+L'index d'une collection est construit à sa première requête (ou au
+préchauffage, `warm`), hors du verrou global: une construction ne bloque
+ni les autres collections ni les recherches. Les mutations (`apply`)
+marquent les entités touchées; elles sont revectorisées à la requête
+suivante: l'ancienne ligne est retirée, la nouvelle ajoutée au bout des
+listes. Celles touchées pendant une construction le sont avant que l'index
+ne soit publié. Les lignes retirées sont purgées au-delà de SEUIL_COMPACTAGE
+(ou du quart des lignes). Les IDF sont figées à la construction.
+"""
+import heapq
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from array import array
+
+from rdflib import OWL, RDF, RDFS, XSD, Literal, URIRef
+
+DIMENSIONS = 1 << 20
+# Cases gardées par vecteur (les plus lourdes)
+MAX_FEATURES = 64
+# Arêtes entrantes d'une propriété décrites une à une jusqu'à ce nombre
+MAX_INCOMING = 32
+# Entrées de listes parcourues au plus par requête
+DEFAULT_BUDGET = 20000
+# Candidats notés exactement
+RERANK = 200
+# Proximité minimale du nom cherché (`find`) et du nom de l'entité
+SEUIL_NOM = 0.5
+# Lignes retirées au-delà desquelles les listes sont reconstruites
+SEUIL_COMPACTAGE = 1024
+
+# Classes racines des collections
+ROOT_CLASSES = ('Destination', 'Hébergement', 'ActivitéTouristique', 'Transport', 'Services',
+                'Nourriture', 'Equipement', 'Personne', 'CertificationÉco')
+
+NUMERIQUES = {XSD.integer, XSD.int, XSD.long, XSD.float, XSD.double, XSD.decimal}
+_NOMBRE = re.compile(r'^-?\d+(\.\d+)?$')
+_MOT = re.compile(r'[a-z0-9]+')
+
+
+def _local(uri):
+    return str(uri).split('#')[-1]
+
+
+def _normaliser(texte):
+    texte = unicodedata.normalize('NFKD', str(texte).lower())
+    return ''.join(c for c in texte if not unicodedata.combining(c))
+
+
+def _nombre(literal):
+    if literal.datatype in NUMERIQUES or (literal.datatype is None and _NOMBRE.match(str(literal))):
+        try:
+            return float(literal)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+def _palier(valeur):
+    """Palier d'une demi-octave: 10 et 12 se rapprochent, 10 et 100 non"""
+    return int(round(2 * math.log2(1 + abs(valeur))))
+
+
+def _case(feature):
+    return zlib.crc32(feature.encode('utf-8')) & (DIMENSIONS - 1)
+
+
+def _cosinus(a, b):
+    produit = sum(p * b.get(f, 0.0) for f, p in a.items())
+    return produit / (math.sqrt(sum(p * p for p in a.values()) * sum(p * p for p in b.values())) or 1.0)
+
+
+def _dot(q, dims, poids):
+    return sum(q.get(d, 0.0) * p for d, p in zip(dims, poids))
+
+
+def name_features(texte):
+    """Caractéristiques d'un nom: mots et trigrammes de caractères (sans accents)"""
+    f = {}
+    for mot in _MOT.findall(_normaliser(texte)):
+        f['w:' + mot] = f.get('w:' + mot, 0.0) + 1.0
+        bornes = f"^{mot}$"
+        for i in range(len(bornes) - 2):
+            f['t:' + bornes[i:i + 3]] = f.get('t:' + bornes[i:i + 3], 0.0) + 0.5
+    return f
+
+
+class Features:
+    """Caractéristiques d'une entité du graphe: {caractéristique: poids}"""
+
+    def __init__(self, graph, name_properties, root_uris):
+        self.graph = graph
+        self.name_properties = name_properties
+        self.root_uris = root_uris
+        self._classes = {}
+
+    def classes(self, classe):
+        """La classe et ses super-classes (mises en cache)"""
+        resultat = self._classes.get(classe)
+        if resultat is None:
+            resultat = self._classes[classe] = tuple(self.graph.transitive_objects(classe, RDFS.subClassOf))
+        return resultat
+
+    def roots(self, uri):
+        """Classes racines (collections) d'une entité"""
+        racines = set()
+        for t in self.graph.objects(uri, RDF.type):
+            racines.update(c for c in self.classes(t) if c in self.root_uris)
+        return racines
+
+    def __call__(self, uri):
+        graph = self.graph
+        f = {}
+        nomme = False
+
+        def ajouter(feature, poids=1.0):
+            f[feature] = f.get(feature, 0.0) + poids
+
+        for p, o in graph.predicate_objects(uri):
+            if p == RDF.type:
+                if o != OWL.NamedIndividual:
+                    for c in self.classes(o):
+                        ajouter('c:' + _local(c), 1.0 if c == o else 0.5)
+            elif isinstance(o, Literal):
+                if p in self.name_properties:
+                    nomme = True
+                    for feature, poids in name_features(o).items():
+                        ajouter(feature, poids)
+                    continue
+                nombre = _nombre(o)
+                if nombre is not None:
+                    ajouter(f"n:{_local(p)}~{_palier(nombre)}")
+                elif len(o) <= 40:
+                    ajouter(f"a:{_local(p)}={_normaliser(o)}")
+                else:
+                    for mot in _MOT.findall(_normaliser(o)):
+                        ajouter('w:' + mot, 0.25)
+            elif isinstance(o, URIRef):
+                propriete = _local(p)
+                ajouter(f"o:{propriete}={_local(o)}")
+                valeur = True
+                for t in graph.objects(o, RDF.type):
+                    if t != OWL.NamedIndividual:
+                        ajouter(f"oc:{propriete}={_local(t)}", 0.5)
+                        valeur = valeur and not any(c in self.root_uris for c in self.classes(t))
+                # Nœud de valeur (empreinte carbone...): ses nombres décrivent l'entité
+                if valeur:
+                    for q, v in graph.predicate_objects(o):
+                        if isinstance(v, Literal):
+                            nombre = _nombre(v)
+                            if nombre is not None:
+                                ajouter(f"n:{propriete}.{_local(q)}~{_palier(nombre)}")
+
+        if not nomme:
+            for feature, poids in name_features(_local(uri)).items():
+                ajouter(feature, poids)
+
+        entrants = {}
+        for s, p in graph.subject_predicates(uri):
+            if isinstance(s, URIRef) and p != RDF.type:
+                entrants.setdefault(p, []).append(s)
+        for p, sujets in entrants.items():
+            propriete = _local(p)
+            if len(sujets) <= MAX_INCOMING:
+                for s in sujets:
+                    ajouter(f"i:{propriete}={_local(s)}")
+            ajouter(f"in:{propriete}", 1 + math.log(len(sujets)))
+        return f
+
+
+class CollectionIndex:
+    """Vecteurs et fichier inversé des entités d'une collection"""
+
+    def __init__(self, name, budget=DEFAULT_BUDGET):
+        self.name = name
+        self.budget = budget
+        self.uris = []
+        self.lignes = {}
+        self.actives = bytearray()
+        self.debut = array('l')
+        self.longueur = array('i')
+        self.dims = array('i')
+        self.poids = array('f')
+        # case -> (lignes, poids), dans l'ordre d'insertion
+        self.postings = {}
+        # case -> fréquence documentaire (creux: seules les cases présentes)
+        self.df = {}
+        self.documents = 0
+        self.retirees = 0
+        self.build_ms = None
+
+    # ------------------------------------------------------------------
+    # Vecteurs
+    # ------------------------------------------------------------------
+
+    def _hacher(self, features):
+        cases = {}
+        for feature, poids in features.items():
+            d = _case(feature)
+            cases[d] = cases.get(d, 0.0) + poids
+        return cases
+
+    def _ponderer(self, cases):
+        """TF-IDF, MAX_FEATURES cases les plus lourdes, normalisé: (dims, poids)"""
+        df, n = self.df, self.documents
+        # tf sous-linéaire au-delà de 1 (les poids < 1 viennent des caractéristiques secondaires)
+        ponderes = [(d, (1 + math.log(tf) if tf > 1 else tf) * (math.log((n + 1) / (df.get(d, 0) + 1)) + 1))
+                    for d, tf in cases.items()]
+        if len(ponderes) > MAX_FEATURES:
+            ponderes = heapq.nlargest(MAX_FEATURES, ponderes, key=lambda x: x[1])
+        norme = math.sqrt(sum(w * w for _, w in ponderes)) or 1.0
+        ponderes.sort()
+        return [d for d, _ in ponderes], [w / norme for _, w in ponderes]
+
+    def _ajouter_ligne(self, uri, dims, poids):
+        ligne = len(self.uris)
+        self.uris.append(uri)
+        self.lignes[uri] = ligne
+        self.actives.append(1)
+        self.debut.append(len(self.dims))
+        self.longueur.append(len(dims))
+        self.dims.extend(dims)
+        self.poids.extend(poids)
+        postings = self.postings
+        for d, p in zip(dims, poids):
+            liste = postings.get(d)
+            if liste is None:
+                liste = postings[d] = (array('i'), array('f'))
+            liste[0].append(ligne)
+            liste[1].append(p)
+        return ligne
+
+    def vector(self, ligne):
+        a = self.debut[ligne]
+        b = a + self.longueur[ligne]
+        return self.dims[a:b], self.poids[a:b]
+
+    # ------------------------------------------------------------------
+    # Construction et mises à jour
+    # ------------------------------------------------------------------
+
+    def build(self, items):
+        """Construire vecteurs et listes depuis des (uri, {caractéristique: poids})"""
+        debut = time.perf_counter()
+        # Première passe: cases hachées à plat (dims, tf) et fréquences documentaires
+        uris, bornes, cases_dims, cases_tf = [], array('l', [0]), array('i'), array('f')
+        df = self.df = {}
+        for uri, features in items:
+            cases = self._hacher(features)
+            for d in cases:
+                df[d] = df.get(d, 0) + 1
+            uris.append(uri)
+            cases_dims.extend(cases)
+            cases_tf.extend(cases.values())
+            bornes.append(len(cases_dims))
+        self.documents = len(uris)
+        for i, uri in enumerate(uris):
+            a, b = bornes[i], bornes[i + 1]
+            self._ajouter_ligne(uri, *self._ponderer(dict(zip(cases_dims[a:b], cases_tf[a:b]))))
+        self.build_ms = round((time.perf_counter() - debut) * 1000, 1)
+
+    def upsert(self, uri, features):
+        """Revectoriser une entité: nouvelle ligne ajoutée au bout des listes"""
+        self.remove(uri)
+        self._ajouter_ligne(uri, *self._ponderer(self._hacher(features)))
+
+    def remove(self, uri):
+        ligne = self.lignes.pop(uri, None)
+        if ligne is None:
+            return
+        self.actives[ligne] = 0
+        self.retirees += 1
+        if self.retirees > max(SEUIL_COMPACTAGE, len(self.uris) // 4):
+            self.compact()
+
+    def compact(self):
+        """Renuméroter les lignes actives et reconstruire les listes sans les lignes retirées"""
+        anciennes = [(self.uris[ligne], *self.vector(ligne))
+                     for ligne in range(len(self.uris)) if self.actives[ligne]]
+        self.uris, self.lignes, self.actives = [], {}, bytearray()
+        self.debut, self.longueur = array('l'), array('i')
+        self.dims, self.poids = array('i'), array('f')
+        self.postings = {}
+        self.retirees = 0
+        for uri, dims, poids in anciennes:
+            self._ajouter_ligne(uri, dims, poids)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def search(self, dims, poids, k=10, budget=None, exclude=None, exact=False):
+        """[(uri, cosinus)] des k entités les plus proches du vecteur
+
+        Les listes des cases de la requête sont parcourues par poids
+        décroissant jusqu'à `budget` entrées (la dernière est tronquée);
+        les RERANK meilleurs candidats sont ensuite notés exactement.
+        `exact=True` parcourt toutes les listes (référence).
+        """
+        budget = budget or self.budget
+        q = sorted(zip(dims, poids), key=lambda x: -x[1])
+        scores = {}
+        cumul = scores.get
+        for d, w in q:
+            liste = self.postings.get(d)
+            if liste is None:
+                continue
+            lignes, valeurs = liste
+            if not exact:
+                if budget <= 0:
+                    break
+                if len(lignes) > budget:
+                    lignes, valeurs = lignes[:budget], valeurs[:budget]
+                budget -= len(lignes)
+            for ligne, p in zip(lignes, valeurs):
+                scores[ligne] = cumul(ligne, 0.0) + w * p
+        actives = self.actives
+        candidats = ((ligne, score) for ligne, score in scores.items() if actives[ligne] and ligne != exclude)
+        if not exact:
+            requete = dict(q)
+            candidats = [(ligne, _dot(requete, *self.vector(ligne)))
+                         for ligne, _ in heapq.nlargest(max(RERANK, k), candidats, key=lambda x: x[1])]
+        meilleurs = heapq.nlargest(k, candidats, key=lambda x: x[1])
+        return [(self.uris[ligne], round(score, 4)) for ligne, score in meilleurs if score > 0]
+
+    def lookup(self, features, k=5):
+        """[(uri, cosinus)] des entités les plus proches de caractéristiques données"""
+        return self.search(*self._ponderer(self._hacher(features)), k=k)
+
+    def similar(self, uri, k=10, budget=None, exact=False):
+        ligne = self.lignes.get(uri)
+        if ligne is None:
+            return None
+        return self.search(*self.vector(ligne), k=k, budget=budget, exclude=ligne, exact=exact)
+
+    def stats(self):
+        return {
+            "entities": len(self.lignes),
+            "features": len(self.postings),
+            "postings": len(self.dims),
+            "retired": self.retirees,
+            "budget": self.budget,
+            "build_ms": self.build_ms
+        }
+
+
+class SimilarityIndex:
+    """Index de similarité des collections d'un graphe, construits à la demande"""
+
+    def __init__(self, ns, name_properties, budget=DEFAULT_BUDGET):
+        self.ns = ns
+        # Propriétés de nom du schéma (fonction: le schéma peut changer)
+        self.name_properties = name_properties
+        self.budget = budget
+        self.root_uris = {ns[c]: c for c in ROOT_CLASSES}
+        # Protège les collections construites (recherches, mises à jour)
+        self._lock = threading.Lock()
+        self._collections = {}
+        # Constructions en cours: collection -> entités touchées pendant la construction
+        self._construction = {}
+        self._verrous = {}
+        # Incrémentée quand toutes les collections sont à reconstruire
+        self._generation = 0
+        # Entités à revectoriser, notées par les écritures sans attendre une construction
+        self._attente = threading.Lock()
+        self._touchees = set()
+        self._cascade = set()
+        self._reconstruire = False
+
+    def apply(self, added, removed):
+        """Noter les entités dont les caractéristiques ont pu changer"""
+        if not self._collections and not self._construction:
+            return
+        with self._attente:
+            for s, p, o in list(added) + list(removed):
+                if p in (RDFS.subClassOf, RDFS.domain):
+                    # Classes ou propriétés de nom modifiées: tout reconstruire
+                    self._reconstruire = True
+                    continue
+                self._touchees.add(s)
+                if isinstance(o, URIRef) and p != RDF.type:
+                    self._touchees.add(o)
+                if p == RDF.type:
+                    self._cascade.add(s)
+
+    def _features(self, graph):
+        return Features(graph, self.name_properties(), self.root_uris)
+
+    def _rafraichir(self, graph):
+        """Revectoriser les entités touchées dans les collections construites"""
+        with self._attente:
+            touchees, cascade, reconstruire = self._touchees, self._cascade, self._reconstruire
+            self._touchees, self._cascade, self._reconstruire = set(), set(), False
+        if reconstruire:
+            self._collections = {}
+            self._generation += 1
+            return
+        if not touchees:
+            return
+        features = self._features(graph)
+        for uri in touchees:
+            if not features.roots(uri):
+                cascade.add(uri)
+        # Nœuds de valeur ou types modifiés: les entités qui les citent changent aussi
+        for uri in cascade:
+            touchees.update(s for s in graph.subjects(None, uri) if isinstance(s, URIRef))
+        for pendantes in self._construction.values():
+            pendantes.update(touchees)
+        self._mettre_a_jour(features, self._collections, touchees)
+
+    def _mettre_a_jour(self, features, collections, touchees):
+        for uri in touchees:
+            racines = {self.root_uris[c] for c in features.roots(uri)}
+            caracteristiques = features(uri) if racines else None
+            for nom, index in collections.items():
+                if nom in racines:
+                    index.upsert(uri, caracteristiques)
+                else:
+                    index.remove(uri)
+
+    def _collection(self, graph, nom):
+        """Index d'une collection, construit au besoin sans tenir le verrou global"""
+        with self._lock:
+            index = self._collections.get(nom)
+            if index is not None:
+                return index
+            verrou = self._verrous.setdefault(nom, threading.Lock())
+        # Une seule construction par collection; les autres requêtes l'attendent
+        with verrou:
+            with self._lock:
+                index = self._collections.get(nom)
+                if index is not None:
+                    return index
+                self._rafraichir(graph)
+                self._construction[nom] = set()
+                generation = self._generation
+            try:
+                features = self._features(graph)
+                entites = set()
+                for classe in graph.transitive_subjects(RDFS.subClassOf, self.ns[nom]):
+                    entites.update(s for s in graph.subjects(RDF.type, classe) if isinstance(s, URIRef))
+                index = CollectionIndex(nom, self.budget)
+                index.build((uri, features(uri)) for uri in sorted(entites))
+                with self._lock:
+                    # Entités touchées pendant la construction: revectorisées avant publication
+                    self._rafraichir(graph)
+                    pendantes = self._construction.pop(nom)
+                    if self._generation == generation:
+                        self._mettre_a_jour(self._features(graph), {nom: index}, pendantes)
+                        self._collections[nom] = index
+            finally:
+                with self._lock:
+                    self._construction.pop(nom, None)
+        return index
+
+    def warm(self, graph, collections=ROOT_CLASSES):
+        """Construire d'avance les index des collections (préchauffage); retourne leurs statistiques"""
+        for nom in collections:
+            self._collection(graph, nom)
+        return self.stats()
+
+    def similar(self, graph, uri, k=10, budget=None):
+        """(collection, [(uri, cosinus)]), ou (None, None) si l'entité n'est dans aucune collection"""
+        racines = sorted(self.root_uris[c] for c in self._features(graph).roots(uri))
+        if not racines:
+            return None, None
+        index = self._collection(graph, racines[0])
+        with self._lock:
+            self._rafraichir(graph)
+            return racines[0], index.similar(uri, k, budget)
+
+    def find(self, graph, nom, collections=ROOT_CLASSES):
+        """(collection, uri) de l'entité dont le nom ressemble le plus à `nom`, ou (None, None)
+
+        Les candidats viennent des index des collections données (mots et
+        trigrammes: « la randonnée » trouve « Randonnee »); le retenu doit
+        porter un nom proche (cosinus des caractéristiques >= SEUIL_NOM), ou à
+        défaut un nom local d'URI proche (`Train_Express`).
+        """
+        cherchees = name_features(nom)
+        if not cherchees:
+            return None, None
+        index = {collection: self._collection(graph, collection) for collection in collections}
+        with self._lock:
+            self._rafraichir(graph)
+            name_properties = self.name_properties()
+            trouve, meilleur = (None, None), SEUIL_NOM
+            for collection in collections:
+                for uri, _ in index[collection].lookup(cherchees):
+                    noms = [o for p, o in graph.predicate_objects(uri)
+                            if p in name_properties and isinstance(o, Literal)]
+                    for texte in noms + [_local(uri)]:
+                        proximite = _cosinus(cherchees, name_features(texte))
+                        if proximite >= meilleur:
+                            trouve, meilleur = (collection, uri), proximite
+        return trouve
+
+    def stats(self):
+        with self._lock:
+            return {nom: index.stats() for nom, index in self._collections.items()}
+
+
+def create_similarity_index(ns, name_properties):
+    """Index de similarité, budget de parcours selon SIMILARITY_BUDGET"""
+    return SimilarityIndex(ns, name_properties, int(os.getenv('SIMILARITY_BUDGET', DEFAULT_BUDGET)))
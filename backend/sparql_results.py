@@ -0,0 +1,359 @@
+"""
+Résultats SPARQL uniformes pour RDFLib et Fuseki.
+
+`SparqlResult` expose la même interface quel que soit le moteur: `vars`,
+itération sur des lignes (`row.nom`, `row['nom']`, `row[Variable('nom')]`),
+`records()` pour obtenir des dictionnaires de valeurs Python et
+`describe()` pour le type de chaque colonne (URI, littéral + datatype,
+nœud anonyme), et `typed_records()` qui déduit de `describe()` la
+conversion des colonnes numériques et booléennes.
+
+Les cellules restent sous leur forme brute (terme RDFLib, ou jeton TSV pour
+Fuseki) et ne sont décodées qu'à l'accès. Les conversions typées (`int`,
+`float`...) se font une fois par colonne dans `records()`, pas par ligne
+dans chaque endpoint. Côté Fuseki, la réponse est lue en flux au format
+SPARQL TSV, plus compact et plus rapide à découper que le JSON.
+"""
+import itertools
+import re
+import threading
+
+from rdflib import BNode, Graph, Literal, URIRef, Variable
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.sparql import prepareQuery
+
+from entity_types import DECIMAUX, ENTIERS, _booleen
+
+TSV = 'text/tab-separated-values'
+
+# Le parseur SPARQL de RDFLib (pyparsing) n'est pas réentrant: deux analyses
+# simultanées échouent au hasard (« postParse2() missing ... tokenList »)
+_analyse = threading.Lock()
+
+_ECHAPPEMENTS = re.compile(r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))')
+# Conversion par défaut des colonnes de littéraux d'un seul datatype (typed_records)
+DATATYPE_CONVERTERS = {
+    **{str(d): int for d in ENTIERS},
+    **{str(d): float for d in DECIMAUX},
+    str(XSD.boolean): _booleen
+}
+
+_SIMPLES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+
+def _unescape(texte):
+    if '\\' not in texte:
+        return texte
+
+    def remplacer(m):
+        if m.group(3) is not None:
+            return _SIMPLES.get(m.group(3), m.group(3))
+        return chr(int(m.group(1) or m.group(2), 16))
+    return _ECHAPPEMENTS.sub(remplacer, texte)
+
+
+class RDFLibCodec:
+    """Cellules = termes RDFLib (ou None si non lié)"""
+
+    @staticmethod
+    def decode(cell):
+        return cell
+
+    @staticmethod
+    def lexical(cell):
+        return None if cell is None else str(cell)
+
+    @staticmethod
+    def kind(cell):
+        if cell is None:
+            return None, None
+        if isinstance(cell, Literal):
+            if cell.language:
+                return 'literal', str(RDF.langString)
+            return 'literal', str(cell.datatype or XSD.string)
+        if isinstance(cell, BNode):
+            return 'bnode', None
+        return 'uri', None
+
+
+class TSVCodec:
+    """Cellules = jetons du format SPARQL TSV ('' si non lié)"""
+
+    @staticmethod
+    def _nombre(jeton):
+        if jeton in ('true', 'false'):
+            return XSD.boolean
+        if 'e' in jeton or 'E' in jeton:
+            return XSD.double
+        if '.' in jeton:
+            return XSD.decimal
+        return XSD.integer
+
+    @staticmethod
+    def decode(cell):
+        if not cell:
+            return None
+        c = cell[0]
+        if c == '<':
+            return URIRef(cell[1:-1])
+        if c == '_':
+            return BNode(cell[2:])
+        if c == '"':
+            fin = cell.rfind('"')
+            suffixe = cell[fin + 1:]
+            lexical = _unescape(cell[1:fin])
+            if suffixe.startswith('@'):
+                return Literal(lexical, lang=suffixe[1:])
+            if suffixe.startswith('^^'):
+                return Literal(lexical, datatype=URIRef(suffixe[3:-1]))
+            return Literal(lexical)
+        return Literal(cell, datatype=TSVCodec._nombre(cell))
+
+    @staticmethod
+    def lexical(cell):
+        if not cell:
+            return None
+        c = cell[0]
+        if c == '<':
+            return cell[1:-1]
+        if c == '_':
+            return cell[2:]
+        if c == '"':
+            return _unescape(cell[1:cell.rfind('"')])
+        return cell
+
+    @staticmethod
+    def kind(cell):
+        if not cell:
+            return None, None
+        c = cell[0]
+        if c == '<':
+            return 'uri', None
+        if c == '_':
+            return 'bnode', None
+        if c == '"':
+            suffixe = cell[cell.rfind('"') + 1:]
+            if suffixe.startswith('@'):
+                return 'literal', str(RDF.langString)
+            if suffixe.startswith('^^'):
+                return 'literal', suffixe[3:-1]
+            return 'literal', str(XSD.string)
+        return 'literal', str(TSVCodec._nombre(cell))
+
+
+class ResultRow:
+    """Ligne de résultat: cellules décodées à la demande"""
+
+    __slots__ = ('_result', '_cells')
+
+    def __init__(self, result, cells):
+        self._result = result
+        self._cells = cells
+
+    def _valeur(self, index):
+        return self._result.codec.decode(self._cells[index])
+
+    def __getattr__(self, name):
+        index = self._result._index.get(name)
+        if index is None:
+            raise AttributeError(name)
+        return self._valeur(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._valeur(key)
+        index = self._result._index.get(str(key))
+        if index is None:
+            raise KeyError(key)
+        return self._valeur(index)
+
+    def __iter__(self):
+        return (self._valeur(i) for i in range(len(self._cells)))
+
+    def __len__(self):
+        return len(self._cells)
+
+    def asdict(self):
+        return {str(v): t for v, t in zip(self._result.vars, self) if t is not None}
+
+
+class SparqlResult:
+    """Résultat tabulaire paresseux, commun aux moteurs RDFLib et Fuseki"""
+
+    def __init__(self, variables, rows, codec, on_close=None):
+        self.vars = [Variable(str(v)) for v in variables]
+        self.codec = codec
+        self._index = {str(v): i for i, v in enumerate(self.vars)}
+        self._source = iter(rows)
+        self._rows = []
+        self._on_close = on_close
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_rdflib(cls, result):
+        """Envelopper un `rdflib.query.Result` (SELECT, ASK, CONSTRUCT/DESCRIBE)"""
+        if result.type == 'SELECT':
+            return cls(result.vars, result, RDFLibCodec)
+        if result.type == 'ASK':
+            return cls(['boolean'], [(Literal(result.askAnswer),)], RDFLibCodec)
+        return cls(['subject', 'predicate', 'object'], result.graph, RDFLibCodec)
+
+    @classmethod
+    def from_tsv_lines(cls, lines, on_close=None):
+        """Lire un résultat SPARQL TSV ligne par ligne (première ligne: ?var1\\t?var2...)"""
+        lines = iter(lines)
+        entete = next(lines, '')
+        variables = [v.lstrip('?$') for v in entete.split('\t')] if entete else []
+        largeur = len(variables)
+
+        def lignes():
+            for ligne in lines:
+                if ligne:
+                    cells = ligne.split('\t')
+                    if len(cells) < largeur:
+                        cells += [''] * (largeur - len(cells))
+                    yield cells
+        return cls(variables, lignes(), TSVCodec, on_close)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+
+    def _consommer(self):
+        for cells in self._source:
+            self._rows.append(cells)
+        self._fermer()
+
+    def _fermer(self):
+        if self._on_close is not None:
+            self._on_close()
+            self._on_close = None
+
+    def __iter__(self):
+        i = 0
+        while True:
+            if i < len(self._rows):
+                yield ResultRow(self, self._rows[i])
+                i += 1
+                continue
+            cells = next(self._source, None)
+            if cells is None:
+                self._fermer()
+                return
+            self._rows.append(cells)
+
+    def __len__(self):
+        self._consommer()
+        return len(self._rows)
+
+    def batches(self, size):
+        """Cellules brutes par lots de `size` lignes, sans les garder en mémoire
+
+        Pour les exports: le résultat ne peut plus être relu ensuite.
+        """
+        lot = []
+        for cells in itertools.chain(self._rows, self._source):
+            lot.append(cells)
+            if len(lot) >= size:
+                yield lot
+                lot = []
+        self._rows = []
+        self._fermer()
+        if lot:
+            yield lot
+
+    def column(self, var):
+        """Termes RDFLib d'une colonne"""
+        self._consommer()
+        j = self._index[str(var)]
+        decode = self.codec.decode
+        return [decode(cells[j]) for cells in self._rows]
+
+    def records(self, **converters):
+        """Lignes sous forme de dictionnaires {variable: valeur Python}
+
+        Chaque colonne est convertie en une passe: `str` par défaut, ou le
+        convertisseur donné (`records(age=int, prix=float)`). Les valeurs non
+        liées ou non convertibles valent None.
+        """
+        self._consommer()
+        lexical = self.codec.lexical
+        colonnes = []
+        for j, var in enumerate(self.vars):
+            convertir = converters.get(str(var))
+            valeurs = [lexical(cells[j]) for cells in self._rows]
+            if convertir is not None:
+                valeurs = [_convertir(convertir, v) for v in valeurs]
+            colonnes.append(valeurs)
+        noms = [str(v) for v in self.vars]
+        return [dict(zip(noms, ligne)) for ligne in zip(*colonnes)] if colonnes else [{} for _ in self._rows]
+
+    def typed_records(self, **converters):
+        """`records()` avec un convertisseur par défaut pour chaque colonne typée
+
+        Une colonne dont tous les littéraux ont le même datatype (`describe()`)
+        est convertie selon DATATYPE_CONVERTERS: entiers en `int`, décimaux et
+        flottants en `float`, booléens en `bool`. Les autres restent en texte.
+        """
+        for colonne in self.describe():
+            if colonne["name"] not in converters and colonne["kind"] == 'literal':
+                convertir = DATATYPE_CONVERTERS.get(colonne["datatype"])
+                if convertir is not None:
+                    converters[colonne["name"]] = convertir
+        return self.records(**converters)
+
+    def describe(self):
+        """Type de chaque colonne: kind (uri, literal, bnode, mixed) et datatype"""
+        self._consommer()
+        description = []
+        for j, var in enumerate(self.vars):
+            kinds, datatypes = set(), set()
+            for cells in self._rows:
+                kind, datatype = self.codec.kind(cells[j])
+                if kind is not None:
+                    kinds.add(kind)
+                    datatypes.add(datatype)
+            description.append({
+                "name": str(var),
+                "kind": (kinds.pop() if len(kinds) == 1 else 'mixed') if kinds else None,
+                "datatype": datatypes.pop() if len(datatypes) == 1 else None
+            })
+        return description
+
+
+def _convertir(convertir, valeur):
+    if valeur is None:
+        return None
+    try:
+        return convertir(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def prepare_query(query, graph):
+    """prepareQuery avec les préfixes du graphe, une analyse à la fois"""
+    with _analyse:
+        return prepareQuery(query, initNs=dict(graph.namespaces()))
+
+
+def query_fuseki(session, endpoint, query, timeout=30):
+    """Interroger Fuseki et lire la réponse en flux (TSV pour SELECT)"""
+    reponse = session.post(endpoint, data={'query': query}, stream=True, timeout=timeout, headers={
+        'Accept': f'{TSV}, application/sparql-results+json;q=0.9, application/n-triples;q=0.8'
+    })
+    reponse.raise_for_status()
+    reponse.encoding = 'utf-8'
+    type_contenu = reponse.headers.get('Content-Type', '').split(';')[0].strip()
+    if type_contenu == TSV:
+        return SparqlResult.from_tsv_lines(reponse.iter_lines(decode_unicode=True), on_close=reponse.close)
+    if type_contenu == 'application/sparql-results+json':
+        # ASK: seul cas où Fuseki ne répond pas en TSV
+        booleen = reponse.json().get('boolean')
+        return SparqlResult(['boolean'], [(Literal(booleen),)], RDFLibCodec)
+    # CONSTRUCT / DESCRIBE: N-Triples, une ligne par triplet
+    graphe = Graph()
+    graphe.parse(data=reponse.text, format='nt')
+    return SparqlResult(['subject', 'predicate', 'object'], graphe, RDFLibCodec)
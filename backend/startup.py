@@ -0,0 +1,155 @@
+"""
+Démarrage du backend: rapport des temps et composants initialisés à la demande.
+
+L'import de app.py se limite à ce qui sert toutes les requêtes: Flask,
+RDFLib et le graphe de l'ontologie. Les services externes sont des
+composants paresseux (`LazyComponent`):
+
+- Gemini: l'import de google.generativeai (environ une seconde) et sa
+  configuration;
+- Fuseki: la sonde HTTP (jusqu'à 2 s si le serveur ne répond pas) et la
+  session de requêtes.
+
+Un thread de préchauffage (`warm_up`) les initialise juste après l'import.
+Une requête qui en a besoin plus tôt l'initialise elle-même, ou attend la
+fin de l'initialisation en cours. Jamais deux fois.
+
+`report` mesure chaque phase (imports, parsing, préchauffage...). Le
+rapport est affiché au démarrage et exposé par /api/health. Le serveur est
+vivant dès la fin de l'import, et prêt quand aucun composant n'est plus en
+attente d'initialisation.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Instant de référence: le premier import de ce module, en tête de app.py
+PROCESS_START = time.perf_counter()
+
+PENDING, READY, DISABLED, FAILED = 'pending', 'ready', 'disabled', 'failed'
+
+
+class StartupReport:
+    """Durée de chaque phase du démarrage, dans l'ordre"""
+
+    def __init__(self, start=PROCESS_START):
+        self.start = start
+        self.phases = []
+        self.serving_at = None
+        self._repere = start
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, thread='import'):
+        with self._lock:
+            self.phases.append((name, seconds, thread))
+
+    def checkpoint(self, name, thread='import'):
+        """Phase écoulée depuis le point précédent (ou le début du processus)"""
+        maintenant = time.perf_counter()
+        self.record(name, maintenant - self._repere, thread)
+        self._repere = maintenant
+
+    @contextmanager
+    def phase(self, name, thread='import'):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - debut, thread)
+
+    def mark_serving(self):
+        """Fin de l'import: le serveur peut répondre"""
+        self.serving_at = time.perf_counter()
+
+    def as_dict(self):
+        with self._lock:
+            phases = list(self.phases)
+        return {
+            "import_ms": None if self.serving_at is None else round((self.serving_at - self.start) * 1000, 1),
+            "phases": [{"name": nom, "ms": round(duree * 1000, 1), "thread": thread}
+                       for nom, duree, thread in phases]
+        }
+
+    def summary(self):
+        """Une ligne par phase, pour la console"""
+        rapport = self.as_dict()
+        lignes = [f"⏱️ Démarrage: {rapport['import_ms']} ms jusqu'au service"]
+        for phase in rapport['phases']:
+            lignes.append(f"   {phase['name']:<24} {phase['ms']:>9.1f} ms  ({phase['thread']})")
+        return '\n'.join(lignes)
+
+
+report = StartupReport()
+
+
+class LazyComponent:
+    """Valeur initialisée une seule fois, au premier `get()` ou au préchauffage
+
+    `factory()` retourne la valeur, ou None si le composant est désactivé
+    (clé absente, service injoignable). Une exception le marque en échec:
+    `get()` retourne alors None, sans réessayer.
+    """
+
+    def __init__(self, name, factory):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.value = None
+        self.error = None
+        self.seconds = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self.state != PENDING:
+            return self.value
+        with self._lock:
+            if self.state == PENDING:
+                debut = time.perf_counter()
+                try:
+                    self.value = self.factory()
+                    self.state = READY if self.value is not None else DISABLED
+                except Exception as e:
+                    self.error = str(e)
+                    self.state = FAILED
+                    logger.warning(f"Initialisation de {self.name} impossible: {e}")
+                self.seconds = time.perf_counter() - debut
+                thread = threading.current_thread().name
+                report.record(self.name, self.seconds, 'warm-up' if thread == 'warm-up' else 'request')
+        return self.value
+
+    def set(self, value):
+        """Fixer la valeur (tests, benchmarks) sans appeler la fabrique"""
+        with self._lock:
+            self.value = value
+            self.state = READY if value is not None else DISABLED
+            self.error = None
+
+    @property
+    def settled(self):
+        return self.state != PENDING
+
+    def status(self):
+        return {
+            "state": self.state,
+            "init_ms": None if self.seconds is None else round(self.seconds * 1000, 1),
+            "error": self.error
+        }
+
+
+def warm_up(components):
+    """Initialiser les composants dans un thread de fond; retourne le thread"""
+    def run():
+        for component in components:
+            component.get()
+    thread = threading.Thread(target=run, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness(components):
+    """(prêt, état de chaque composant)"""
+    etats = {component.name: component.status() for component in components}
+    return all(component.settled for component in components), etats
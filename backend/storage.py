@@ -0,0 +1,347 @@
+"""
+Stockage du graphe RDF derrière `g`.
+
+Trois backends sont disponibles (variable d'environnement RDF_STORE):
+
+- `memory` (défaut): graphe RDFLib en mémoire, chargé depuis ONTOLOGY_FILE
+  et réécrit dans ce fichier à chaque sauvegarde.
+- `compact`: comme `memory`, mais sur `CompactStore` (termes internés,
+  triplets en entiers dans des tableaux triés): plusieurs fois moins de
+  mémoire pour les grosses ontologies.
+- `sqlite`: store RDFLib persistant (SQLite) avec index SPO / POS / OSP.
+  Les mutations vont directement sur disque (transaction validée à chaque
+  sauvegarde), sans réécriture du fichier complet. La mémoire est bornée par
+  le cache de pages SQLite (RDF_STORE_CACHE_MB) et un cache LRU de termes
+  (RDF_STORE_TERM_CACHE). Au premier démarrage, la base est initialisée
+  depuis ONTOLOGY_FILE.
+
+Les endpoints n'ont pas à connaître le backend: ils manipulent un
+`rdflib.Graph` dans tous les cas, SPARQL compris.
+"""
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.store import Store, VALID_STORE
+
+from compact_store import CompactStore
+
+# Nombre de lignes lues par lot sur un curseur SQLite
+TAILLE_LOT = 512
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS terms (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    datatype TEXT NOT NULL DEFAULT '',
+    lang TEXT NOT NULL DEFAULT '',
+    UNIQUE (kind, value, datatype, lang)
+);
+CREATE TABLE IF NOT EXISTS triples (
+    s INTEGER NOT NULL,
+    p INTEGER NOT NULL,
+    o INTEGER NOT NULL,
+    PRIMARY KEY (s, p, o)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS triples_pos ON triples (p, o, s);
+CREATE INDEX IF NOT EXISTS triples_osp ON triples (o, s, p);
+CREATE TABLE IF NOT EXISTS namespaces (
+    prefix TEXT PRIMARY KEY,
+    uri TEXT NOT NULL
+);
+"""
+
+
+def _encode(term):
+    """Clé (kind, value, datatype, lang) d'un terme RDF"""
+    if isinstance(term, Literal):
+        return ('L', str(term), str(term.datatype or ''), term.language or '')
+    if isinstance(term, BNode):
+        return ('B', str(term), '', '')
+    return ('U', str(term), '', '')
+
+
+def _decode(kind, value, datatype, lang):
+    if kind == 'L':
+        return Literal(value, lang=lang or None, datatype=URIRef(datatype) if datatype else None)
+    if kind == 'B':
+        return BNode(value)
+    return URIRef(value)
+
+
+class _LRU:
+    """Petit cache LRU borné (terme <-> identifiant)"""
+
+    def __init__(self, taille):
+        self.taille = taille
+        self._data = OrderedDict()
+
+    def get(self, cle):
+        valeur = self._data.get(cle)
+        if valeur is not None:
+            self._data.move_to_end(cle)
+        return valeur
+
+    def put(self, cle, valeur):
+        self._data[cle] = valeur
+        self._data.move_to_end(cle)
+        if len(self._data) > self.taille:
+            self._data.popitem(last=False)
+
+
+class SQLiteStore(Store):
+    """Store RDFLib persistant: termes internés et triplets indexés SPO/POS/OSP"""
+
+    context_aware = False
+    formula_aware = False
+    transaction_aware = True
+    graph_aware = False
+
+    def __init__(self, configuration=None, cache_mb=64, term_cache=100000):
+        self._cache_mb = cache_mb
+        self._ids = _LRU(term_cache)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._count = 0
+        super().__init__(configuration)
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+
+    def open(self, configuration, create=True):
+        self._conn = sqlite3.connect(configuration, check_same_thread=False, isolation_level='DEFERRED')
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA cache_size=-{int(self._cache_mb * 1024)}")
+        self._conn.executescript(_SCHEMA)
+        self._count = self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+        return VALID_STORE
+
+    def close(self, commit_pending_transaction=False):
+        with self._lock:
+            if self._conn is None:
+                return
+            if commit_pending_transaction:
+                self._conn.commit()
+            else:
+                self._conn.rollback()
+            self._conn.close()
+            self._conn = None
+
+    def commit(self):
+        with self._lock:
+            self._conn.commit()
+
+    def rollback(self):
+        with self._lock:
+            self._conn.rollback()
+            self._count = self._conn.execute("SELECT COUNT(*) FROM triples").fetchone()[0]
+            self._ids = _LRU(self._ids.taille)
+
+    # ------------------------------------------------------------------
+    # Dictionnaire de termes
+    # ------------------------------------------------------------------
+
+    def _term_id(self, term, creer=False):
+        cle = _encode(term)
+        ident = self._ids.get(cle)
+        if ident is not None:
+            return ident
+        row = self._conn.execute(
+            "SELECT id FROM terms WHERE kind=? AND value=? AND datatype=? AND lang=?", cle).fetchone()
+        if row is None:
+            if not creer:
+                return None
+            ident = self._conn.execute(
+                "INSERT INTO terms (kind, value, datatype, lang) VALUES (?, ?, ?, ?)", cle).lastrowid
+        else:
+            ident = row[0]
+        self._ids.put(cle, ident)
+        return ident
+
+    # ------------------------------------------------------------------
+    # Triplets
+    # ------------------------------------------------------------------
+
+    def add(self, triple, context=None, quoted=False):
+        with self._lock:
+            ids = tuple(self._term_id(t, creer=True) for t in triple)
+            cur = self._conn.execute("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", ids)
+            self._count += cur.rowcount
+
+    def addN(self, quads):
+        with self._lock:
+            lignes = [tuple(self._term_id(t, creer=True) for t in (s, p, o)) for s, p, o, _ in quads]
+            avant = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO triples (s, p, o) VALUES (?, ?, ?)", lignes)
+            self._count += self._conn.total_changes - avant
+
+    def _where(self, pattern):
+        """Clause WHERE pour un motif; None si un terme lié est inconnu"""
+        clauses, params = [], []
+        for colonne, term in zip(('s', 'p', 'o'), pattern):
+            if term is None:
+                continue
+            ident = self._term_id(term)
+            if ident is None:
+                return None, None
+            clauses.append(f"t.{colonne}=?")
+            params.append(ident)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def remove(self, triple_pattern, context=None):
+        with self._lock:
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return
+            cur = self._conn.execute(f"DELETE FROM triples AS t{where}", params)
+            self._count -= cur.rowcount
+
+    def triples(self, triple_pattern, context=None):
+        with self._lock:
+            where, params = self._where(triple_pattern)
+            if where is None:
+                return
+            cur = self._conn.execute(
+                "SELECT ts.kind, ts.value, ts.datatype, ts.lang, "
+                "tp.kind, tp.value, tp.datatype, tp.lang, "
+                "tob.kind, tob.value, tob.datatype, tob.lang "
+                "FROM triples AS t "
+                "JOIN terms AS ts ON ts.id = t.s "
+                "JOIN terms AS tp ON tp.id = t.p "
+                f"JOIN terms AS tob ON tob.id = t.o{where}", params)
+        while True:
+            with self._lock:
+                lignes = cur.fetchmany(TAILLE_LOT)
+            if not lignes:
+                break
+            for r in lignes:
+                yield (_decode(*r[0:4]), _decode(*r[4:8]), _decode(*r[8:12])), iter(())
+
+    def __len__(self, context=None):
+        return self._count
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    # ------------------------------------------------------------------
+    # Espaces de noms
+    # ------------------------------------------------------------------
+
+    def bind(self, prefix, namespace, override=True):
+        with self._lock:
+            if not override and self.namespace(prefix) is not None:
+                return
+            self._conn.execute("DELETE FROM namespaces WHERE uri=?", (str(namespace),))
+            self._conn.execute("INSERT OR REPLACE INTO namespaces (prefix, uri) VALUES (?, ?)",
+                               (prefix, str(namespace)))
+
+    def namespace(self, prefix):
+        with self._lock:
+            row = self._conn.execute("SELECT uri FROM namespaces WHERE prefix=?", (prefix,)).fetchone()
+        return URIRef(row[0]) if row else None
+
+    def prefix(self, namespace):
+        with self._lock:
+            row = self._conn.execute("SELECT prefix FROM namespaces WHERE uri=?", (str(namespace),)).fetchone()
+        return row[0] if row else None
+
+    def namespaces(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT prefix, uri FROM namespaces").fetchall()
+        for prefix, uri in rows:
+            yield prefix, URIRef(uri)
+
+
+class MemoryBackend:
+    """Graphe en mémoire, persisté par réécriture du fichier de l'ontologie"""
+
+    name = 'memory'
+    file_backed = True
+
+    def __init__(self, ontology_file, ontology_format):
+        self.ontology_file = ontology_file
+        self.ontology_format = ontology_format
+        # Écritures pas encore sauvegardées dans le fichier (voir persistence)
+        self.journal_path = ontology_file + '.journal'
+
+    def _graph(self):
+        return Graph()
+
+    def open(self):
+        graph = self._graph()
+        graph.parse(self.ontology_file, format=self.ontology_format)
+        return graph
+
+    @property
+    def source_file(self):
+        return self.ontology_file
+
+    def read_file(self):
+        """Contenu actuel du fichier dans un graphe à part (modifications externes, voir file_watch)"""
+        graph = Graph()
+        graph.parse(self.ontology_file, format=self.ontology_format)
+        return graph
+
+    def data_graph(self, graph):
+        """Partie du graphe servi qui correspond au fichier"""
+        return graph
+
+    def persist(self, graph):
+        graph.serialize(destination=self.ontology_file, format=self.ontology_format, encoding="utf-8")
+
+
+class CompactBackend(MemoryBackend):
+    """Graphe en mémoire sur CompactStore, persisté comme MemoryBackend"""
+
+    name = 'compact'
+
+    def _graph(self):
+        return Graph(store=CompactStore())
+
+
+class SQLiteBackend:
+    """Graphe persistant SQLite: chaque sauvegarde valide la transaction en cours"""
+
+    name = 'sqlite'
+    file_backed = False
+
+    def __init__(self, ontology_file, ontology_format, path, cache_mb, term_cache):
+        self.ontology_file = ontology_file
+        self.ontology_format = ontology_format
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.cache_mb = cache_mb
+        self.term_cache = term_cache
+
+    def open(self):
+        store = SQLiteStore(cache_mb=self.cache_mb, term_cache=self.term_cache)
+        graph = Graph(store=store)
+        graph.open(self.path, create=True)
+        if len(graph) == 0:
+            # Première ouverture: importer l'ontologie existante
+            graph.parse(self.ontology_file, format=self.ontology_format)
+            graph.commit()
+        return graph
+
+    def persist(self, graph):
+        graph.commit()
+
+
+def create_backend(ontology_file, ontology_format):
+    """Choisir le backend de stockage d'après RDF_STORE"""
+    kind = os.getenv('RDF_STORE', 'memory').lower()
+    if kind == 'sqlite':
+        path = os.getenv('RDF_STORE_PATH', os.path.splitext(ontology_file)[0] + '.sqlite')
+        return SQLiteBackend(ontology_file, ontology_format, path,
+                             cache_mb=float(os.getenv('RDF_STORE_CACHE_MB', 64)),
+                             term_cache=int(os.getenv('RDF_STORE_TERM_CACHE', 100000)))
+    if kind == 'compact':
+        return CompactBackend(ontology_file, ontology_format)
+    if kind != 'memory':
+        raise ValueError(f"RDF_STORE inconnu: {kind} (valeurs possibles: memory, compact, sqlite)")
+    return MemoryBackend(ontology_file, ontology_format)
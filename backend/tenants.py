@@ -0,0 +1,413 @@
+"""
+Plusieurs ontologies (locataires) servies par un seul processus.
+
+Le locataire `default` reste l'ontologie historique (ONTOLOGY_FILE, backend
+RDF_STORE). Les autres locataires sont des fichiers `<nom>.nt|.ttl|.rdf`
+de TENANTS_DIR. Ils sont chargés à la demande dans un `rdflib.Dataset`: un
+graphe nommé partagé pour le schéma (classes, propriétés, restrictions) et
+un graphe nommé par locataire pour ses individus. Chaque locataire voit
+l'union des deux via `UnionStore`, donc les endpoints et SPARQL sont
+inchangés.
+
+Chaque locataire chargé a ses propres génération, types d'entités, index
+d'adjacence et de similarité, caches (itinéraires, solutions de BGP, réponses), faits
+inférés (reasoner), flux de changements et surveillance de son fichier. Au-delà de MAX_HOT_TENANTS, le moins
+récemment utilisé (et inactif) est retiré de la mémoire, après la
+sauvegarde de ses écritures en attente (voir persistence). La mémoire suit
+donc le nombre de locataires actifs, pas le nombre total.
+
+Le locataire est choisi par requête: préfixe `/t/<nom>/api/...` ou en-tête
+`X-Tenant`.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g as request_state, has_request_context, jsonify, request
+from rdflib import Dataset, Graph, OWL, RDF, RDFS, URIRef
+from rdflib.store import Store, VALID_STORE
+from rdflib.util import guess_format
+
+from bgp_cache import create_cache
+from dependencies import create_response_cache
+from entity_types import EntityTypes
+from events import ChangeFeed
+from file_watch import FileWatcher
+from graph_index import AdjacencyIndex
+from itinerary import ItineraryOptimizer
+from persistence import create_writer
+from reasoner import create_reasoner
+from similarity import create_similarity_index
+
+DEFAULT_TENANT = 'default'
+TENANT_HEADER = 'X-Tenant'
+SCHEMA_GRAPH = URIRef('urn:ws:schema')
+TENANT_GRAPH_PREFIX = 'urn:ws:tenant:'
+EXTENSIONS = ('.nt', '.ttl', '.rdf', '.owl', '.xml')
+
+_NOM_VALIDE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+# Types des sujets du schéma (T-box): tout autre type désigne un individu
+SCHEMA_TYPES = frozenset({
+    OWL.Ontology, OWL.Class, RDFS.Class, OWL.Restriction, RDF.Property,
+    OWL.ObjectProperty, OWL.DatatypeProperty, OWL.AnnotationProperty,
+    OWL.TransitiveProperty, OWL.SymmetricProperty, OWL.AsymmetricProperty,
+    OWL.FunctionalProperty, OWL.InverseFunctionalProperty,
+    OWL.ReflexiveProperty, OWL.IrreflexiveProperty,
+    OWL.AllDisjointClasses, OWL.AllDisjointProperties
+})
+
+
+def extract_schema(source, target):
+    """Recopier dans `target` le schéma (T-box) de `source`, sans aucun individu
+
+    Un sujet appartient au schéma si tous ses types sont des types du
+    schéma. Les sujets sans type (listes RDF d'owl:unionOf, owl:oneOf...)
+    n'y entrent que s'ils sont atteints depuis un sujet du schéma.
+    """
+    schema, individus = set(), set()
+    for sujet, type_ in source.subject_objects(RDF.type):
+        (schema if type_ in SCHEMA_TYPES else individus).add(sujet)
+    schema -= individus
+    a_visiter = list(schema)
+    while a_visiter:
+        for objet in source.objects(a_visiter.pop()):
+            if objet not in schema and objet not in individus and (objet, None, None) in source:
+                schema.add(objet)
+                a_visiter.append(objet)
+    for sujet in schema:
+        for triple in source.triples((sujet, None, None)):
+            target.add(triple)
+
+
+class UnionStore(Store):
+    """Vue lecture sur schéma + données d'un locataire; les écritures vont aux données"""
+
+    context_aware = False
+    formula_aware = False
+    graph_aware = False
+
+    def __init__(self, schema, data):
+        super().__init__()
+        self.schema = schema
+        self.data = data
+
+    def open(self, configuration, create=False):
+        return VALID_STORE
+
+    def add(self, triple, context=None, quoted=False):
+        self.data.add(triple)
+
+    def addN(self, quads):
+        for s, p, o, _ in quads:
+            self.data.add((s, p, o))
+
+    def remove(self, triple_pattern, context=None):
+        # Le schéma partagé n'est jamais modifié depuis un locataire: ses
+        # triplets restent visibles (graph_remove ne les compte pas comme retirés)
+        self.data.remove(triple_pattern)
+
+    def triples(self, triple_pattern, context=None):
+        for triple in self.schema.triples(triple_pattern):
+            yield triple, iter(())
+        schema = self.schema
+        for triple in self.data.triples(triple_pattern):
+            if triple not in schema:
+                yield triple, iter(())
+
+    def __len__(self, context=None):
+        return len(self.schema) + len(self.data)
+
+    def contexts(self, triple=None):
+        return iter(())
+
+    def bind(self, prefix, namespace, override=True):
+        self.data.store.bind(prefix, namespace, override=override)
+
+    def namespace(self, prefix):
+        return self.data.store.namespace(prefix)
+
+    def prefix(self, namespace):
+        return self.data.store.prefix(namespace)
+
+    def namespaces(self):
+        return self.data.store.namespaces()
+
+
+class NamedGraphBackend:
+    """Locataire dans un graphe nommé du Dataset partagé, persisté dans son fichier"""
+
+    name = 'named-graph'
+    file_backed = True
+
+    def __init__(self, dataset, schema, tenant, path):
+        self.dataset = dataset
+        self.schema = schema
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.format = guess_format(path) or 'nt'
+        self.identifier = URIRef(TENANT_GRAPH_PREFIX + tenant)
+        self._data = None
+
+    def open(self):
+        self._data = self.dataset.graph(self.identifier)
+        self._data.parse(self.path, format=self.format)
+        # Les fichiers peuvent contenir une copie du schéma: ne garder qu'un exemplaire
+        for triple in self.schema:
+            self._data.remove(triple)
+        return Graph(store=UnionStore(self.schema, self._data), identifier=self.identifier)
+
+    @property
+    def source_file(self):
+        return self.path
+
+    def read_file(self):
+        """Contenu actuel du fichier, sans le schéma partagé"""
+        graph = Graph()
+        graph.parse(self.path, format=self.format)
+        for triple in self.schema:
+            graph.remove(triple)
+        return graph
+
+    def data_graph(self, graph):
+        return self._data
+
+    def persist(self, graph):
+        self._data.serialize(destination=self.path, format=self.format, encoding="utf-8")
+
+    def close(self):
+        if self._data is not None:
+            self.dataset.remove_graph(self._data)
+            self._data = None
+
+
+class Tenant:
+    """Graphe d'un locataire et tout ce qui en dérive (index, caches, flux)"""
+
+    def __init__(self, name, backend, ns):
+        self.name = name
+        self.backend = backend
+        self.graph = backend.open()
+        self.generation = 0
+        # Mutations du graphe et sauvegardes complètes sont sérialisées
+        self.write_lock = threading.RLock()
+        self.writer = create_writer(backend, lambda: self.graph, self.write_lock, backend.journal_path)
+        self.writer.recover(self.graph)
+        # Faits inférés (owl:inverseOf, propriétés transitives...) hors du graphe sauvegardé
+        self.reasoner = create_reasoner(self.graph)
+        self.itinerary_optimizer = ItineraryOptimizer(ns)
+        # Attributs des types d'entités, d'après les déclarations du schéma
+        self.entity_types = EntityTypes(self.graph, ns)
+        # Entités similaires: index construits à la première requête de chaque collection
+        self.similarity_index = create_similarity_index(ns, lambda: self.entity_types.name_properties)
+        self.adjacency_index = AdjacencyIndex()
+        self.adjacency_index.rebuild(self.graph)
+        self.change_feed = ChangeFeed()
+        self.bgp_cache = create_cache()
+        self.response_cache = create_response_cache()
+        self.watcher = None
+        self.active_requests = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def sparql_graph(self):
+        """Graphe lu par les requêtes SPARQL: faits assertés + inférés
+
+        Sans fait inféré, le graphe lui-même (pas d'indirection par triplet).
+        """
+        if self.reasoner is not None and len(self.reasoner.inferred):
+            return self.reasoner.view
+        return self.graph
+
+    def watch(self, apply, interval):
+        """Appliquer les modifications externes du fichier (backends fichier seulement)"""
+        if not self.backend.file_backed or interval <= 0:
+            return
+        self.watcher = FileWatcher(self, apply, interval)
+        # Vérifier le fichier avant de l'écraser, puis reconnaître la sauvegarde
+        self.writer.before_save = self.watcher.check
+        self.writer.after_save = self.watcher.acknowledge
+        self.watcher.start()
+
+    def close(self):
+        """Arrêter la surveillance, sauvegarder les écritures en attente, fermer le backend"""
+        if self.watcher is not None:
+            self.watcher.close()
+        self.writer.close()
+        self.backend.close()
+
+
+class TenantRegistry:
+    """Locataire par défaut + locataires chargés à la demande, évincés en LRU"""
+
+    def __init__(self, default, ns, tenants_dir=None, schema_file=None, max_hot=8):
+        self.default = default
+        self.ns = ns
+        self.tenants_dir = tenants_dir
+        self.schema_file = schema_file
+        self.max_hot = max_hot
+        self._hot = OrderedDict()
+        self._lock = threading.Lock()
+        self._chargements = {}
+        self.dataset = None
+        self.schema = None
+        self.evictions = 0
+        # Démarrage de la surveillance du fichier d'un locataire chargé (voir file_watch)
+        self.watch = None
+
+    def _init_dataset(self):
+        """Créer le Dataset et son graphe de schéma au premier locataire chargé"""
+        self.dataset = Dataset()
+        self.schema = self.dataset.graph(SCHEMA_GRAPH)
+        if self.schema_file:
+            self.schema.parse(self.schema_file, format=guess_format(self.schema_file) or 'xml')
+        else:
+            extract_schema(self.default.graph, self.schema)
+        for prefix, namespace in self.default.graph.namespaces():
+            self.dataset.bind(prefix, namespace, override=False)
+
+    def path(self, name):
+        """Fichier du locataire dans TENANTS_DIR (None s'il n'existe pas)"""
+        if not self.tenants_dir or not _NOM_VALIDE.match(name):
+            return None
+        for extension in EXTENSIONS:
+            chemin = os.path.join(self.tenants_dir, name + extension)
+            if os.path.isfile(chemin):
+                return chemin
+        return None
+
+    def names(self):
+        noms = [DEFAULT_TENANT]
+        if self.tenants_dir and os.path.isdir(self.tenants_dir):
+            for fichier in sorted(os.listdir(self.tenants_dir)):
+                nom, extension = os.path.splitext(fichier)
+                if extension in EXTENSIONS and _NOM_VALIDE.match(nom):
+                    noms.append(nom)
+        return noms
+
+    def acquire(self, name):
+        """Locataire prêt à servir une requête (chargé si besoin); None s'il est inconnu"""
+        if not name or name == DEFAULT_TENANT:
+            return self.default
+        while True:
+            with self._lock:
+                tenant = self._hot.get(name)
+                if tenant is not None:
+                    self._hot.move_to_end(name)
+                    tenant.active_requests += 1
+                    tenant.last_used = time.monotonic()
+                    return tenant
+                chargement = self._chargements.get(name)
+                if chargement is None:
+                    chemin = self.path(name)
+                    if chemin is None:
+                        return None
+                    if self.dataset is None:
+                        self._init_dataset()
+                    chargement = self._chargements[name] = threading.Event()
+                    break
+            # Un autre thread charge (ou ferme) déjà ce locataire: attendre puis réessayer
+            chargement.wait()
+
+        # Chargement hors du verrou global: les autres locataires restent servis
+        try:
+            tenant = Tenant(name, NamedGraphBackend(self.dataset, self.schema, name, chemin), self.ns)
+        finally:
+            with self._lock:
+                del self._chargements[name]
+            chargement.set()
+        if self.watch is not None:
+            self.watch(tenant)
+        with self._lock:
+            tenant.active_requests += 1
+            self._hot[name] = tenant
+            evinces = self._evict()
+        self._close(evinces)
+        return tenant
+
+    def release(self, tenant):
+        if tenant is self.default:
+            return
+        with self._lock:
+            tenant.active_requests -= 1
+            tenant.last_used = time.monotonic()
+            evinces = self._evict()
+        self._close(evinces)
+
+    def _evict(self):
+        """Retirer du LRU les locataires froids au-delà de max_hot (verrou tenu)
+
+        Retourne les locataires retirés: `_close` les ferme une fois le verrou
+        relâché, leur sauvegarde ne bloquant pas les autres locataires. Jusque-là,
+        `acquire` attend avant de recharger le même locataire.
+        """
+        evinces = []
+        while len(self._hot) > self.max_hot:
+            froid = next((nom for nom, t in self._hot.items() if t.active_requests == 0), None)
+            if froid is None:
+                break
+            evinces.append(self._hot.pop(froid))
+            self._chargements[froid] = threading.Event()
+            self.evictions += 1
+        return evinces
+
+    def _close(self, evinces):
+        for tenant in evinces:
+            try:
+                tenant.close()
+            finally:
+                with self._lock:
+                    fermeture = self._chargements.pop(tenant.name)
+                fermeture.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hot": {nom: {"triples": len(t.graph), "active_requests": t.active_requests,
+                              "generation": t.generation} for nom, t in self._hot.items()},
+                "max_hot": self.max_hot,
+                "evictions": self.evictions
+            }
+
+    # ------------------------------------------------------------------
+    # Intégration Flask
+    # ------------------------------------------------------------------
+
+    def current(self):
+        """Locataire de la requête en cours (défaut hors requête)"""
+        if has_request_context():
+            tenant = request_state.get('tenant')
+            if tenant is not None:
+                return tenant
+        return self.default
+
+    def init_app(self, app):
+        """Sélection du locataire par préfixe /t/<nom> ou en-tête X-Tenant"""
+        wsgi_app = app.wsgi_app
+
+        def prefixe_locataire(environ, start_response):
+            chemin = environ.get('PATH_INFO', '')
+            if chemin.startswith('/t/'):
+                nom, _, reste = chemin[3:].partition('/')
+                environ['ws.tenant'] = nom
+                environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/t/' + nom
+                environ['PATH_INFO'] = '/' + reste
+            return wsgi_app(environ, start_response)
+        app.wsgi_app = prefixe_locataire
+
+        @app.before_request
+        def _choisir_locataire():
+            nom = request.environ.get('ws.tenant') or request.headers.get(TENANT_HEADER)
+            tenant = self.acquire(nom)
+            if tenant is None:
+                return jsonify({"success": False, "error": f"Locataire inconnu: {nom}"}), 404
+            request_state.tenant = tenant
+
+        @app.teardown_request
+        def _liberer_locataire(exc):
+            tenant = request_state.pop('tenant', None)
+            if tenant is not None:
+                self.release(tenant)
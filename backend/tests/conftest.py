@@ -0,0 +1,61 @@
+"""
+Fixtures communes: l'application sur une copie de ws.rdf et un locataire `sfax`.
+
+`app` est importé une seule fois par session (le graphe est chargé à
+l'import), avec un environnement isolé: copie de l'ontologie dans un
+dossier temporaire, pas de Fuseki, pas de contrôle d'admission, relevé
+du fichier déclenché à la main par les tests (`watcher.check()`).
+"""
+import importlib
+import os
+import shutil
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+
+NS = "http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#"
+WS_RDF = os.path.join(BACKEND, '..', 'ws.rdf')
+
+SFAX = (
+    f"<{NS}Sfax> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{NS}Destination> .\n"
+    f"<{NS}Sfax> <{NS}nomDestination> \"Sfax\" .\n"
+)
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    dossier = tmp_path_factory.mktemp('ontologie')
+    shutil.copy(WS_RDF, dossier / 'ws.rdf')
+    locataires = dossier / 'tenants'
+    locataires.mkdir()
+    (locataires / 'sfax.nt').write_text(SFAX, encoding='utf-8')
+
+    environnement = pytest.MonkeyPatch()
+    for nom, valeur in {
+        'ONTOLOGY_FILE': str(dossier / 'ws.rdf'),
+        'TENANTS_DIR': str(locataires),
+        'RDF_STORE': 'memory',
+        'USE_FUSEKI': 'false',
+        'ADMISSION': 'false',
+        'WRITE_DURABILITY': 'sync',
+        'WATCH_INTERVAL_S': '3600',
+        'GEMINI_API_KEY': '',
+    }.items():
+        environnement.setenv(nom, valeur)
+    module = importlib.import_module('app')
+    yield module
+    module.default_tenant.writer.close()
+    environnement.undo()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def ns():
+    return NS
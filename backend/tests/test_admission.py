@@ -0,0 +1,90 @@
+"""Contrôle d'admission: file pleine, attente trop longue, débit par client, flux"""
+import threading
+import time
+
+import pytest
+
+from admission import EndpointClass
+
+REQUETE = {'query': "SELECT ?s WHERE { ?s ?p ?o } LIMIT 1"}
+
+
+@pytest.fixture
+def query_classe(app_module, monkeypatch):
+    """Classe `query` limitée à query=1/1, courte attente, sans limite de débit"""
+    controle = app_module.admission_control
+    classe = EndpointClass('query', concurrency=1, queue=1, timeout=0.2)
+    monkeypatch.setattr(controle, 'enabled', True)
+    monkeypatch.setattr(controle, 'classes', {'query': classe})
+    return classe
+
+
+def refus(reponse, status, reason):
+    assert reponse.status_code == status, reponse.get_json()
+    assert reponse.get_json()['reason'] == reason
+    assert int(reponse.headers['Retry-After']) >= 1
+
+
+def test_attente_trop_longue(client, query_classe):
+    query_classe.acquire('occupant')
+    try:
+        debut = time.monotonic()
+        refus(client.post('/api/query', json=REQUETE), 503, 'queue_timeout')
+        assert time.monotonic() - debut >= 0.2
+    finally:
+        query_classe.release(0.1)
+    assert client.post('/api/query', json=REQUETE).status_code == 200
+    assert query_classe.stats()['rejected'] == {'queue_timeout': 1}
+
+
+def test_file_pleine(client, query_classe):
+    query_classe.timeout = 5
+    query_classe.acquire('occupant')
+    admis = threading.Event()
+
+    def attendre():
+        query_classe.acquire('en attente')
+        admis.set()
+    attente = threading.Thread(target=attendre)
+    attente.start()
+    try:
+        while query_classe.stats()['queued'] < 1:
+            time.sleep(0.005)
+        # Place occupée et file pleine: refus immédiat
+        debut = time.monotonic()
+        refus(client.post('/api/query', json=REQUETE), 503, 'queue_full')
+        assert time.monotonic() - debut < 1
+    finally:
+        query_classe.release(0.1)
+        attente.join()
+    assert admis.is_set()
+    query_classe.release(0.1)
+    assert query_classe.stats()['active'] == 0
+
+
+def test_debit_par_client(client, app_module, monkeypatch):
+    classe = EndpointClass('query', rate=0.5, burst=1)
+    monkeypatch.setattr(app_module.admission_control, 'enabled', True)
+    monkeypatch.setattr(app_module.admission_control, 'classes', {'query': classe})
+    assert client.post('/api/query', json=REQUETE, headers={'X-Client-Id': 'a'}).status_code == 200
+    reponse = client.post('/api/query', json=REQUETE, headers={'X-Client-Id': 'a'})
+    refus(reponse, 429, 'rate_limited')
+    assert int(reponse.headers['Retry-After']) == 2
+    # Un autre client a son propre seau
+    assert client.post('/api/query', json=REQUETE, headers={'X-Client-Id': 'b'}).status_code == 200
+    assert classe.stats()['active'] == 0
+
+
+def test_place_rendue_apres_le_flux(client, query_classe):
+    reponse = client.post('/api/export', json={'collection': 'destinations'}, buffered=False)
+    assert reponse.status_code == 200
+    flux = iter(reponse.response)
+    next(flux)
+    # Flux non terminé: la place est toujours tenue, la requête suivante attend puis est refusée
+    assert query_classe.stats()['active'] == 1
+    refus(client.post('/api/query', json=REQUETE), 503, 'queue_timeout')
+    for _ in flux:
+        pass
+    reponse.close()
+    assert query_classe.stats()['active'] == 0
+    assert client.post('/api/query', json=REQUETE).status_code == 200
@@ -0,0 +1,45 @@
+"""Cache des solutions de BGP: forme canonique et invalidation par les écritures"""
+from rdflib import Namespace, RDF, Variable
+
+from bgp_cache import canonicalize
+
+EX = Namespace('urn:ex:')
+
+PREFIXE = "PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>\n"
+
+
+def test_forme_canonique_independante_des_noms():
+    a, b, x, y = (Variable(n) for n in 'abxy')
+    cle1, vars1 = canonicalize([(a, RDF.type, EX.Hotel), (a, EX.nom, b)])
+    cle2, vars2 = canonicalize([(x, EX.nom, y), (x, RDF.type, EX.Hotel)])
+    assert cle1 == cle2
+    assert vars1 == [a, b] and vars2 == [x, y]
+    cle3, _ = canonicalize([(a, RDF.type, EX.Hotel), (a, EX.prix, b)])
+    assert cle3 != cle1
+
+
+def noms(client, variable):
+    requete = PREFIXE + f"SELECT ?{variable}n WHERE {{ ?{variable} a ns:Destination ; ns:nomDestination ?{variable}n }}"
+    reponse = client.post('/api/query', json={'query': requete})
+    assert reponse.status_code == 200
+    return sorted(r[f'{variable}n'] for r in reponse.get_json()['results'])
+
+
+def bgp(client):
+    return client.get('/api/cache').get_json()['bgp']
+
+
+def test_meme_motif_autres_variables(client):
+    premiers = noms(client, 'd')
+    avant = bgp(client)
+    assert noms(client, 'lieu') == premiers
+    assert bgp(client)['hits'] > avant['hits']
+
+
+def test_table_invalidee_par_les_ecritures(client):
+    avant = noms(client, 'd')
+    cree = client.post('/api/entity/create', json={'type': 'Destination', 'attributes': {'nom': 'Tozeur'}})
+    assert cree.status_code == 200
+    assert noms(client, 'e') == sorted(avant + ['Tozeur'])
+    assert client.delete('/api/entity/delete', json={'uri': cree.get_json()['uri']}).status_code == 200
+    assert noms(client, 'f') == avant
@@ -0,0 +1,56 @@
+"""Cache des réponses des listings: invalidation par ce qu'une écriture touche"""
+
+
+def destinations(client):
+    return {d['uri']: d['nom'] for d in client.get('/api/destinations').get_json()}
+
+
+def reponses(client):
+    return client.get('/api/cache').get_json()['responses']
+
+
+def test_creation_modification_suppression(client):
+    avant = destinations(client)
+    assert destinations(client) == avant
+
+    cree = client.post('/api/entity/create', json={'type': 'Destination', 'attributes': {'nom': 'Kairouan'}})
+    assert cree.status_code == 200
+    uri = cree.get_json()['uri']
+    apres_creation = destinations(client)
+    assert apres_creation == {**avant, uri: 'Kairouan'}
+
+    modifie = client.put('/api/entity/update', json={'uri': uri, 'attributes': {'nom': 'Kairouan la sainte'}})
+    assert modifie.status_code == 200
+    assert destinations(client)[uri] == 'Kairouan la sainte'
+
+    supprime = client.delete('/api/entity/delete', json={'uri': uri})
+    assert supprime.status_code == 200
+    assert destinations(client) == avant
+
+
+def test_ecriture_sans_rapport_garde_la_reponse(client):
+    destinations(client)
+    cree = client.post('/api/entity/create', json={'type': 'Transport', 'attributes': {'nom': 'Calèche'}})
+    assert cree.status_code == 200
+    try:
+        avant = reponses(client)
+        destinations(client)
+        apres = reponses(client)
+        # Une écriture sur Transport ne lit ni n'écrit rien de ce que lit le listing des destinations
+        assert apres['hits'] == avant['hits'] + 1
+        assert apres['survivals'] == avant['survivals'] + 1
+    finally:
+        assert client.delete('/api/entity/delete', json={'uri': cree.get_json()['uri']}).status_code == 200
+
+
+def test_ecriture_dans_un_locataire_n_invalide_pas_le_defaut(client):
+    destinations(client)
+    avant = reponses(client)
+    cree = client.post('/t/sfax/api/entity/create', json={'type': 'Destination', 'attributes': {'nom': 'Gabès'}})
+    assert cree.status_code == 200
+    try:
+        destinations(client)
+        assert reponses(client)['hits'] == avant['hits'] + 1
+        assert cree.get_json()['uri'] not in destinations(client)
+    finally:
+        client.delete('/t/sfax/api/entity/delete', json={'uri': cree.get_json()['uri']})
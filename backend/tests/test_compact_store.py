@@ -0,0 +1,58 @@
+"""Store compact: zone d'attente, fusion et suppressions comparées au store mémoire"""
+import random
+
+from rdflib import Graph, Literal, Namespace
+
+import compact_store
+from compact_store import CompactStore
+
+EX = Namespace('urn:ex:')
+
+
+def motifs(termes):
+    s, p, o = termes
+    for ms in (None, s):
+        for mp in (None, p):
+            for mo in (None, o):
+                yield (ms, mp, mo)
+
+
+def test_melange_ajouts_suppressions_lectures(monkeypatch):
+    # Petit seuil: les fusions par insertion et en masse sont toutes exercées
+    monkeypatch.setattr(compact_store, 'SEUIL_FUSION', 16)
+    alea = random.Random(32)
+    sujets = [EX[f's{i}'] for i in range(12)]
+    predicats = [EX[f'p{i}'] for i in range(4)]
+    objets = [EX[f'o{i}'] for i in range(8)] + [Literal(i) for i in range(4)]
+    compact = Graph(store=CompactStore())
+    memoire = Graph()
+
+    for _ in range(3000):
+        triplet = (alea.choice(sujets), alea.choice(predicats), alea.choice(objets))
+        action = alea.random()
+        if action < 0.5:
+            for _ in range(alea.choice((1, 1, 1, 40))):
+                triplet = (alea.choice(sujets), alea.choice(predicats), alea.choice(objets))
+                compact.add(triplet)
+                memoire.add(triplet)
+        elif action < 0.7:
+            motif = alea.choice(list(motifs(triplet))[1:])
+            compact.remove(motif)
+            memoire.remove(motif)
+        else:
+            motif = alea.choice(list(motifs(triplet)))
+            assert set(compact.triples(motif)) == set(memoire.triples(motif)), motif
+            assert len(compact) == len(memoire)
+
+    assert set(compact) == set(memoire)
+
+
+def test_doublons_en_attente_et_fusionnes():
+    compact = Graph(store=CompactStore())
+    compact.add((EX.a, EX.p, EX.b))
+    assert len(compact) == 1
+    compact.add((EX.a, EX.p, EX.b))
+    compact.add((EX.a, EX.p, EX.c))
+    compact.add((EX.a, EX.p, EX.c))
+    assert sorted(compact.objects(EX.a, EX.p)) == [EX.b, EX.c]
+    assert len(compact) == 2
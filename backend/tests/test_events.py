@@ -0,0 +1,55 @@
+"""Flux de changements: un événement par écriture, dans l'ordre des générations"""
+import threading
+import time
+
+
+def test_ecritures_concurrentes_generations_distinctes(client, app_module, monkeypatch):
+    feed = app_module.default_tenant.change_feed
+    depart = feed.generation
+    publier = feed.publish
+
+    def publier_lentement(*args, **kwargs):
+        # Élargit la fenêtre entre génération et publication
+        time.sleep(0.01)
+        return publier(*args, **kwargs)
+    monkeypatch.setattr(feed, 'publish', publier_lentement)
+    erreurs = []
+
+    def ecrire(i):
+        c = app_module.app.test_client()
+        cree = c.post('/api/entity/create', json={'type': 'Transport', 'attributes': {'nom': f'Navette {i}'}})
+        if cree.status_code != 200:
+            erreurs.append(cree.get_json())
+            return
+        supprime = c.delete('/api/entity/delete', json={'uri': cree.get_json()['uri']})
+        if supprime.status_code != 200:
+            erreurs.append(supprime.get_json())
+
+    threads = [threading.Thread(target=ecrire, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not erreurs
+
+    evenements = feed.since(depart)
+    generations = [e['generation'] for e in evenements]
+    assert len(generations) == 16
+    assert generations == sorted(set(generations))
+    assert generations[-1] == app_module.default_tenant.generation
+    # Chaque client qui reprend à une génération reçoit exactement la suite
+    for i, generation in enumerate(generations):
+        assert [e['generation'] for e in feed.since(generation)] == generations[i + 1:]
+
+
+def test_evenement_porte_le_delta(client, app_module):
+    feed = app_module.default_tenant.change_feed
+    depart = feed.generation
+    cree = client.post('/api/entity/create', json={'type': 'Transport', 'attributes': {'nom': 'Trottinette'}})
+    uri = cree.get_json()['uri']
+    client.delete('/api/entity/delete', json={'uri': uri})
+    creation, suppression = feed.since(depart)
+    assert creation['generation'] == cree.get_json()['generation']
+    assert creation['entities'][0]['uri'] == uri and not creation['entities'][0]['deleted']
+    assert suppression['entities'][0]['deleted']
+    assert {t['s'] for t in suppression['removed']} == {uri}
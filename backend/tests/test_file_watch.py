@@ -0,0 +1,53 @@
+"""Modifications externes du fichier d'un locataire, appliquées par delta"""
+import os
+
+from rdflib import Graph, Literal
+
+from file_watch import diff_graphs
+
+
+def noms(client):
+    return sorted(d['nom'] for d in client.get('/t/sfax/api/destinations').get_json())
+
+
+def test_diff_graphs_protege_les_ecritures_non_sauvegardees(app_module):
+    ns = app_module.NS
+    fichier, live = Graph(), Graph()
+    commun, externe, local = (ns.a, ns.nom, Literal('a')), (ns.b, ns.nom, Literal('b')), (ns.c, ns.nom, Literal('c'))
+    fichier.add(commun)
+    fichier.add(externe)
+    live.add(commun)
+    live.add(local)
+    assert diff_graphs(fichier, live) == ([externe], [local])
+    assert diff_graphs(fichier, live, proteges={local}) == ([externe], [])
+
+
+def test_modification_externe_appliquee(client, app_module, ns):
+    registre = app_module.tenant_registry
+    tenant = registre.acquire('sfax')
+    try:
+        chemin = tenant.backend.source_file
+        tenant.writer.flush(timeout=10)
+        with open(chemin, encoding='utf-8') as f:
+            original = f.read()
+        assert noms(client) == ['Sfax']
+        generation = tenant.generation
+
+        ajout = (f'<{ns}Djerba> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{ns}Destination> .\n'
+                 f'<{ns}Djerba> <{ns}nomDestination> "Djerba" .\n')
+        with open(chemin, 'a', encoding='utf-8') as f:
+            f.write(ajout)
+        assert tenant.watcher.check() == 2
+        assert tenant.generation == generation + 1
+        assert noms(client) == ['Djerba', 'Sfax']
+
+        # Fichier touché sans changement de contenu: rien à appliquer
+        os.utime(chemin, ns=(0, 0))
+        assert tenant.watcher.check() == 0
+
+        with open(chemin, 'w', encoding='utf-8') as f:
+            f.write(original)
+        assert tenant.watcher.check() == 2
+        assert noms(client) == ['Sfax']
+    finally:
+        registre.release(tenant)
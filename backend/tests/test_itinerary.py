@@ -0,0 +1,110 @@
+"""Recommandation d'itinéraires: validation du budget, mémo borné et élagage du top-k"""
+import itertools
+import math
+import random
+
+import pytest
+from rdflib import Graph, Literal, RDF
+
+from itinerary import MAX_BUDGET, MAX_DP_ENTRIES, ItineraryOptimizer, valider_budget
+
+
+@pytest.mark.parametrize('budget', [float('nan'), float('inf'), -float('inf'), 0, -5, MAX_BUDGET * 10])
+def test_valider_budget_rejette(budget):
+    with pytest.raises(ValueError):
+        valider_budget(budget)
+
+
+def test_valider_budget_accepte():
+    assert valider_budget('250') == 250.0
+    assert valider_budget(MAX_BUDGET) == MAX_BUDGET
+
+
+@pytest.mark.parametrize('budget', ['nan', 'NaN', 'inf', '-inf', 'Infinity', 1e300, -1, 0, 'abc'])
+def test_endpoint_refuse_budget_invalide(client, ns, budget):
+    reponse = client.post('/api/itineraires', json={'voyageur': ns + 'Sophie', 'budget': budget})
+    assert reponse.status_code == 400
+    assert reponse.get_json()['success'] is False
+
+
+@pytest.mark.parametrize('k, nb_activites', [(0, 1), (-1, 1), (2, -1)])
+def test_endpoint_refuse_k_et_nb_activites(client, ns, k, nb_activites):
+    reponse = client.post('/api/itineraires', json={'voyageur': ns + 'Sophie', 'budget': 500,
+                                                   'k': k, 'nb_activites': nb_activites})
+    assert reponse.status_code == 400
+    assert reponse.get_json()['error'] == "k doit être strictement positif et nb_activites positif ou nul"
+
+
+def test_endpoint_budget_valide(client, ns):
+    reponse = client.post('/api/itineraires', json={'voyageur': ns + 'Sophie', 'budget': 500, 'k': 2})
+    assert reponse.status_code == 200
+    donnees = reponse.get_json()
+    assert donnees['count'] == len(donnees['itineraires']) <= 2
+    for itineraire in donnees['itineraires']:
+        assert itineraire['prix_total'] <= 500
+        assert math.isfinite(itineraire['empreinte_totale'])
+
+
+def test_recommander_refuse_budget_non_fini(app_module, ns):
+    optimiseur = ItineraryOptimizer(app_module.NS)
+    with pytest.raises(ValueError):
+        optimiseur.recommander(app_module.default_tenant.graph, ns + 'Sophie', float('nan'))
+
+
+def test_memo_borne(app_module, ns):
+    optimiseur = ItineraryOptimizer(app_module.NS)
+    graphe = app_module.default_tenant.graph
+    for budget in range(2001, 2001 + 2 * MAX_DP_ENTRIES):
+        optimiseur.recommander(graphe, ns + 'Sophie', budget)
+    assert 0 < len(optimiseur._dp) <= MAX_DP_ENTRIES
+
+
+def test_elagage_identique_a_l_enumeration(app_module):
+    """Top-k élagué = top-k de l'énumération complète (destination, hébergement, transport, activités)"""
+    NS = app_module.NS
+    alea = random.Random(26)
+    graphe = Graph()
+    destinations = [NS[f'D{i}'] for i in range(3)]
+    elements = {}
+    for classe, prefixe, nombre in (('Hébergement', 'H', 20), ('Transport', 'T', 12), ('ActivitéTouristique', 'A', 7)):
+        for i in range(nombre):
+            uri = NS[f'{prefixe}{i}']
+            graphe.add((uri, RDF.type, NS[classe]))
+            graphe.add((uri, NS.prix, Literal(alea.randint(0, 150))))
+            graphe.add((NS[f'EC{prefixe}{i}'], NS.empreinte, Literal(alea.randint(0, 60))))
+            graphe.add((uri, NS.aEmpreinteCarbone, NS[f'EC{prefixe}{i}']))
+            if classe != 'Transport' and alea.random() < 0.8:
+                lien = NS['estSituéÀ'] if classe == 'Hébergement' else NS.aPourLieu
+                graphe.add((uri, lien, alea.choice(destinations)))
+            elements.setdefault(classe, []).append(uri)
+    for d in destinations:
+        graphe.add((d, RDF.type, NS.Destination))
+
+    def valeur(uri, prop):
+        if prop == 'empreinte':
+            return float(graphe.value(graphe.value(uri, NS.aEmpreinteCarbone), NS.empreinte))
+        return float(graphe.value(uri, NS.prix))
+
+    def localise(uri, lien, d):
+        lieux = set(graphe.objects(uri, lien))
+        return not lieux or d in lieux
+
+    def enumeration(budget, k, nb):
+        totaux = []
+        for d in destinations:
+            hebergements = [h for h in elements['Hébergement'] if localise(h, NS['estSituéÀ'], d)] or [None]
+            activites = [a for a in elements['ActivitéTouristique'] if localise(a, NS.aPourLieu, d)]
+            for h in hebergements:
+                for t in elements['Transport']:
+                    reste = budget - (valeur(h, 'prix') if h else 0) - valeur(t, 'prix')
+                    meilleur = min((sum(valeur(a, 'empreinte') for a in combinaison)
+                                    for combinaison in itertools.combinations(activites, min(nb, len(activites)))
+                                    if sum(valeur(a, 'prix') for a in combinaison) <= reste), default=None)
+                    if reste >= 0 and meilleur is not None:
+                        totaux.append(meilleur + (valeur(h, 'empreinte') if h else 0) + valeur(t, 'empreinte'))
+        return sorted(totaux)[:k]
+
+    optimiseur = ItineraryOptimizer(NS)
+    for budget, k, nb in ((200, 1, 1), (300, 5, 2), (450, 20, 2), (120, 3, 0), (1000, 50, 3)):
+        itineraires = optimiseur.recommander(graphe, NS.Personne, budget, k=k, nb_activites=nb)
+        assert [i['empreinte_totale'] for i in itineraires] == enumeration(budget, k, nb)
@@ -0,0 +1,31 @@
+"""Requêtes parallèles: mêmes résultats que l'évaluation séquentielle, instantané à jour"""
+import time
+
+PREFIXE = "PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>\n"
+REQUETE = PREFIXE + "SELECT ?n WHERE { ?d a ns:Destination ; ns:nomDestination ?n }"
+
+
+def noms(client, parallel):
+    reponse = client.post('/api/query', json={'query': REQUETE, 'parallel': parallel})
+    assert reponse.status_code == 200, reponse.get_json()
+    return sorted(r['n'] for r in reponse.get_json()['results'])
+
+
+def test_parallele_identique_et_suit_les_ecritures(client, app_module):
+    evaluateur = app_module.parallel_evaluator
+    assert noms(client, True) == noms(client, False)
+
+    cree = client.post('/api/entity/create', json={
+        'type': 'Destination', 'attributes': {'nom': 'Tozeur parallèle'}})
+    assert cree.status_code == 200
+    try:
+        # Instantané reconstruit en fond après l'écriture, pas par la requête
+        generation = app_module.default_tenant.generation
+        limite = time.monotonic() + 10
+        while evaluateur._generation != generation and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert evaluateur._generation == generation
+        assert 'Tozeur parallèle' in noms(client, True)
+    finally:
+        client.delete('/api/entity/delete', json={'uri': cree.get_json()['uri']})
+    assert noms(client, True) == noms(client, False)
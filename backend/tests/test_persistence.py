@@ -0,0 +1,72 @@
+"""Journal des écritures: rejeu après un arrêt entre le fsync du journal et la sauvegarde"""
+import os
+import threading
+
+from rdflib import Graph, Literal, Namespace
+
+from persistence import PersistenceWriter
+from storage import MemoryBackend
+
+EX = Namespace('urn:ex:')
+
+
+def ouvrir(chemin):
+    backend = MemoryBackend(str(chemin), 'nt')
+    graph = backend.open()
+    # Sauvegarde retardée d'une heure: seul le journal est écrit pendant le test
+    writer = PersistenceWriter(backend, lambda: graph, threading.RLock(), backend.journal_path, flush_delay=3600)
+    return backend, graph, writer
+
+
+def fichier(chemin):
+    graph = Graph()
+    graph.parse(str(chemin), format='nt')
+    return graph
+
+
+def test_rejeu_apres_arret_avant_sauvegarde(tmp_path):
+    chemin = tmp_path / 'onto.nt'
+    chemin.write_text(f'<{EX.a}> <{EX.nom}> "ancien" .\n', encoding='utf-8')
+    ancien, nouveau, ajout = (EX.a, EX.nom, Literal('ancien')), (EX.a, EX.nom, Literal('nouveau')), (EX.b, EX.nom, Literal('b'))
+
+    backend, graph, writer = ouvrir(chemin)
+    try:
+        with writer.lock:
+            graph.remove(ancien)
+            graph.add(nouveau)
+            writer.submit(1, [nouveau], [ancien])
+        with writer.lock:
+            graph.add(ajout)
+            writer.submit(2, [ajout], [])
+        # fsync du journal fait, sauvegarde complète pas encore: état d'un arrêt brutal
+        assert writer.wait(2, timeout=10)
+        assert writer.status()['saved'] == 0
+        assert os.path.getsize(backend.journal_path) > 0
+        assert set(fichier(chemin)) == {ancien}
+
+        # Redémarrage: le fichier seul ne contient pas les écritures, le journal si
+        backend2, graph2, writer2 = ouvrir(chemin)
+        assert set(graph2) == {ancien}
+        assert writer2.recover(graph2) == 2
+        assert set(graph2) == {nouveau, ajout}
+        # Le rejeu est sauvegardé dans le fichier, puis le journal est vidé
+        assert set(fichier(chemin)) == {nouveau, ajout}
+        assert not os.path.exists(backend2.journal_path)
+    finally:
+        writer.close()
+
+
+def test_ligne_tronquee_ignoree(tmp_path):
+    chemin = tmp_path / 'onto.nt'
+    chemin.write_text('', encoding='utf-8')
+    backend, graph, writer = ouvrir(chemin)
+    ajout = (EX.c, EX.nom, Literal('c'))
+    writer.journal.append([(1, [ajout], [])])
+    with open(backend.journal_path, 'a', encoding='utf-8') as f:
+        # Écriture interrompue au milieu d'une ligne: jamais acquittée
+        f.write('{"generation": 2, "added": [[')
+
+    backend2, graph2, writer2 = ouvrir(chemin)
+    assert writer2.recover(graph2) == 1
+    assert set(graph2) == {ajout}
+    assert set(fichier(chemin)) == {ajout}
@@ -0,0 +1,83 @@
+"""Raisonneur: maintenance incrémentale (semi-naïve, DRed) identique à une reconstruction"""
+import random
+
+from rdflib import Graph, Literal, Namespace, OWL, RDF, RDFS
+
+from reasoner import RULES, Reasoner
+
+EX = Namespace('urn:ex:')
+NOEUDS = [EX[f'n{i}'] for i in range(6)] + [Literal('x')]
+PREDICATS = [EX.part, EX.contient, EX.dans, EX.voisin, EX.lie]
+
+DECLARATIONS = [
+    (EX.part, RDF.type, OWL.TransitiveProperty),
+    (EX.contient, OWL.inverseOf, EX.dans),
+    (EX.voisin, RDF.type, OWL.SymmetricProperty),
+    (EX.lie, RDFS.domain, EX.Source),
+    (EX.lie, RDFS.range, EX.Cible),
+    (EX.dans, RDF.type, OWL.TransitiveProperty),
+]
+
+
+def triplet_aleatoire(alea):
+    sujet = alea.choice(NOEUDS[:-1])
+    return sujet, alea.choice(PREDICATS), alea.choice(NOEUDS)
+
+
+def reference(graph):
+    return set(Reasoner(graph, RULES).inferred)
+
+
+def appliquer(graph, raisonneur, ajouts, retraits):
+    """Delta net appliqué au graphe puis au raisonneur; retourne (ajoutés, retirés) annoncés"""
+    retires = [t for t in dict.fromkeys(retraits) if t in graph]
+    for t in retires:
+        graph.remove(t)
+    ajoutes = [t for t in dict.fromkeys(ajouts) if t not in graph]
+    for t in ajoutes:
+        graph.add(t)
+    return raisonneur.apply(ajoutes, retires)
+
+
+def test_incremental_identique_a_la_reconstruction():
+    alea = random.Random(45)
+    for essai in range(300):
+        graph = Graph()
+        for t in DECLARATIONS:
+            graph.add(t)
+        for _ in range(alea.randint(0, 12)):
+            graph.add(triplet_aleatoire(alea))
+        raisonneur = Reasoner(graph, RULES)
+        for etape in range(4):
+            assertes = [t for t in graph if t not in DECLARATIONS]
+            retraits = alea.sample(assertes, min(len(assertes), alea.randint(0, 3)))
+            ajouts = [triplet_aleatoire(alea) for _ in range(alea.randint(0, 3))]
+            avant = set(raisonneur.inferred)
+            ajoutes, retires = appliquer(graph, raisonneur, ajouts, retraits)
+            apres = set(raisonneur.inferred)
+            assert apres == reference(graph), (essai, etape)
+            assert not apres & set(graph)
+            # Delta annoncé: tout ce qui est apparu ou disparu de la vue
+            assert apres - avant <= set(ajoutes)
+            assert {t for t in avant - apres if t not in graph} <= set(retires)
+
+
+def test_changement_de_declaration_reconstruit():
+    graph = Graph()
+    for t in DECLARATIONS:
+        graph.add(t)
+    for t in [(EX.n0, EX.part, EX.n1), (EX.n1, EX.part, EX.n2), (EX.n2, EX.lien, EX.n3)]:
+        graph.add(t)
+    raisonneur = Reasoner(graph, RULES)
+    assert (EX.n0, EX.part, EX.n2) in raisonneur.inferred
+
+    # Nouvelle inverse: les faits existants la suivent
+    ajoutes, retires = appliquer(graph, raisonneur, [(EX.lien, OWL.inverseOf, EX.lienInverse)], [])
+    assert (EX.n3, EX.lienInverse, EX.n2) in set(ajoutes)
+    assert set(raisonneur.inferred) == reference(graph)
+
+    # Propriété plus transitive: sa clôture disparaît
+    ajoutes, retires = appliquer(graph, raisonneur, [], [(EX.part, RDF.type, OWL.TransitiveProperty)])
+    assert (EX.n0, EX.part, EX.n2) in set(retires)
+    assert (EX.n0, EX.part, EX.n2) not in raisonneur.view
+    assert set(raisonneur.inferred) == reference(graph)
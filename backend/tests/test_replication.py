@@ -0,0 +1,122 @@
+"""Réplication vers Fuseki: boîte d'envoi durable, reprise, nouvel essai, rejet isolé"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from rdflib import Literal, Namespace
+
+from replication import FusekiReplicator, build_update
+
+EX = Namespace('urn:ex:')
+
+
+class Fuseki:
+    """Endpoint SPARQL Update factice: `statut(corps)` choisit le code de réponse"""
+
+    def __init__(self, statut=lambda corps: 200):
+        self.statut = statut
+        self.recus = []
+        self.acceptes = []
+        fuseki = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                corps = self.rfile.read(int(self.headers['Content-Length'])).decode('utf-8')
+                code = fuseki.statut(corps)
+                fuseki.recus.append(corps)
+                if code == 200:
+                    fuseki.acceptes.append(corps)
+                self.send_response(code)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.serveur = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.serveur.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.serveur.server_address[1]}/update'
+
+    def close(self):
+        self.serveur.shutdown()
+        self.serveur.server_close()
+
+
+@pytest.fixture
+def fuseki():
+    serveurs = []
+
+    def demarrer(statut=lambda corps: 200):
+        serveur = Fuseki(statut)
+        serveurs.append(serveur)
+        return serveur
+    yield demarrer
+    for serveur in serveurs:
+        serveur.close()
+
+
+def delta(nom):
+    return [(EX[nom], EX.nom, Literal(nom))], []
+
+
+def test_build_update():
+    assert build_update([], []) is None
+    update = build_update([(EX.a, EX.nom, Literal('a'))], [(EX.b, EX.nom, Literal('b'))])
+    assert update.index('DELETE DATA') < update.index('INSERT DATA')
+    assert '<urn:ex:a> <urn:ex:nom> "a" .' in update
+
+
+def test_boite_d_envoi_durable_et_reprise(fuseki, tmp_path):
+    outbox = str(tmp_path / 'outbox.jsonl')
+    indisponible = fuseki(lambda corps: 503)
+    replicateur = FusekiReplicator(indisponible.url, outbox, batch_delay=0.01)
+    assert replicateur.submit(*delta('a')) == 1
+    assert replicateur.submit(*delta('b')) == 2
+    # Écrit (fsync) avant tout envoi: les deux lots sont dans la boîte d'envoi
+    with open(outbox, encoding='utf-8') as f:
+        assert [json.loads(ligne)['seq'] for ligne in f] == [1, 2]
+    assert not replicateur.flush(timeout=0.3)
+    assert replicateur.status()['last_acked'] == 0
+
+    # Redémarrage: les lots non acquittés sont repris et envoyés dans l'ordre
+    disponible = fuseki()
+    reprise = FusekiReplicator(disponible.url, outbox, batch_delay=0.01)
+    assert reprise.flush(timeout=10)
+    assert reprise.status() == {"pending": 0, "last_acked": 2, "last_error": None}
+    envoye = ' '.join(disponible.acceptes)
+    assert envoye.index('urn:ex:a') < envoye.index('urn:ex:b')
+    with open(outbox + '.ack', encoding='utf-8') as f:
+        assert f.read() == '2'
+
+    # Un lot acquitté n'est jamais renvoyé
+    apres = fuseki()
+    relance = FusekiReplicator(apres.url, outbox, batch_delay=0.01)
+    assert relance.submit(*delta('c')) == 3
+    assert relance.flush(timeout=10)
+    assert len(apres.recus) == 1 and 'urn:ex:c' in apres.recus[0]
+
+
+def test_nouvel_essai_apres_erreur_serveur(fuseki, tmp_path):
+    reponses = iter([503, 500])
+    serveur = fuseki(lambda corps: next(reponses, 200))
+    replicateur = FusekiReplicator(serveur.url, str(tmp_path / 'outbox.jsonl'), batch_delay=0.01)
+    replicateur.submit(*delta('a'))
+    assert replicateur.flush(timeout=20)
+    assert len(serveur.recus) == 3
+    assert len(serveur.acceptes) == 1 and 'urn:ex:a' in serveur.acceptes[0]
+    assert replicateur.status()['last_error'] is None
+
+
+def test_lot_rejete_isole(fuseki, tmp_path):
+    serveur = fuseki(lambda corps: 400 if 'urn:ex:mauvais' in corps else 200)
+    replicateur = FusekiReplicator(serveur.url, str(tmp_path / 'outbox.jsonl'), batch_delay=0.2)
+    for nom in ('bon1', 'mauvais', 'bon2'):
+        replicateur.submit(*delta(nom))
+    assert replicateur.flush(timeout=10)
+    # Le lot groupé est refusé, puis chaque mise à jour est isolée: seule la fautive est écartée
+    assert any('urn:ex:bon1' in corps and 'urn:ex:mauvais' in corps for corps in serveur.recus)
+    acceptes = ' '.join(serveur.acceptes)
+    assert 'urn:ex:bon1' in acceptes and 'urn:ex:bon2' in acceptes
+    assert 'urn:ex:mauvais' not in acceptes
+    assert replicateur.status()['pending'] == 0
@@ -0,0 +1,83 @@
+"""Similarité: index construits hors du verrou global, revectorisation après une écriture"""
+import threading
+
+from rdflib import Graph, Literal, Namespace, RDF
+
+import similarity
+from similarity import SimilarityIndex
+
+NS = Namespace("http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#")
+
+
+def destinations(noms):
+    graph = Graph()
+    for cle, (nom, pays) in noms.items():
+        graph.add((NS[cle], RDF.type, NS.Destination))
+        graph.add((NS[cle], NS.nomDestination, Literal(nom)))
+        graph.add((NS[cle], NS.pays, Literal(pays)))
+    return graph
+
+
+def premier(index, graph, uri):
+    collection, voisins = index.similar(graph, uri, k=3)
+    assert collection == 'Destination'
+    exacts = index._collections['Destination'].similar(uri, k=3, exact=True)
+    assert voisins[0] == exacts[0]
+    return voisins[0][0]
+
+
+def test_plus_proche_voisin_apres_revectorisation():
+    graph = destinations({
+        'Djerba_Houmt': ('Djerba Houmt Souk', 'Tunisie'),
+        'Djerba_Midoun': ('Djerba Midoun', 'Tunisie'),
+        'Tozeur': ('Tozeur Oasis', 'Tunisie'),
+        'Chefchaouen': ('Chefchaouen Medina', 'Maroc'),
+        'Fes_Medina': ('Fes Medina', 'Maroc'),
+    })
+    index = SimilarityIndex(NS, lambda: {NS.nomDestination})
+    assert premier(index, graph, NS.Djerba_Houmt) == NS.Djerba_Midoun
+    assert premier(index, graph, NS.Tozeur) != NS.Fes_Medina
+
+    # Tozeur devient une seconde Fès: sa ligne est remplacée par le nouveau vecteur
+    retires = [(NS.Tozeur, NS.nomDestination, Literal('Tozeur Oasis')), (NS.Tozeur, NS.pays, Literal('Tunisie'))]
+    ajoutes = [(NS.Tozeur, NS.nomDestination, Literal('Fes Medina Jdid')), (NS.Tozeur, NS.pays, Literal('Maroc'))]
+    for t in retires:
+        graph.remove(t)
+    for t in ajoutes:
+        graph.add(t)
+    index.apply(ajoutes, retires)
+    assert premier(index, graph, NS.Tozeur) == NS.Fes_Medina
+    assert premier(index, graph, NS.Fes_Medina) == NS.Tozeur
+    assert premier(index, graph, NS.Djerba_Midoun) == NS.Djerba_Houmt
+
+
+def test_construction_hors_du_verrou_global(monkeypatch):
+    graph = destinations({f'D{i}': (f'Destination {i}', 'Tunisie') for i in range(5)})
+    graph.set((NS.D3, NS.nomDestination, Literal('Zaghouan Temple')))
+    graph.add((NS.Hotel, RDF.type, NS['Hébergement']))
+    index = SimilarityIndex(NS, lambda: {NS.nomDestination})
+    index.warm(graph, ['Hébergement'])
+    en_cours, reprise = threading.Event(), threading.Event()
+    construire = similarity.CollectionIndex.build
+
+    def construire_lentement(self, items):
+        # Caractéristiques calculées, puis pause avant la fin de la construction
+        items = list(items)
+        en_cours.set()
+        reprise.wait(5)
+        construire(self, items)
+    monkeypatch.setattr(similarity.CollectionIndex, 'build', construire_lentement)
+    construction = threading.Thread(target=index.warm, args=(graph, ['Destination']))
+    construction.start()
+    try:
+        assert en_cours.wait(5)
+        # Une autre collection reste interrogeable pendant la construction
+        assert index.similar(graph, NS.Hotel)[0] == 'Hébergement'
+        # Écriture après la lecture de D0: prise en compte avant publication
+        ajout = (NS.D0, NS.nomDestination, Literal('Zaghouan'))
+        graph.add(ajout)
+        index.apply([ajout], [])
+    finally:
+        reprise.set()
+        construction.join()
+    assert premier(index, graph, NS.D0) == NS.D3
@@ -0,0 +1,139 @@
+"""Locataires: schéma partagé sans individus, isolation, suppression, éviction"""
+import gc
+import shutil
+import weakref
+
+from rdflib import BNode, Graph, Literal, Namespace, OWL, RDF, RDFS
+from rdflib.collection import Collection
+
+from tenants import TenantRegistry, extract_schema
+
+EX = Namespace('urn:ex:')
+
+
+def test_extract_schema_ne_garde_que_la_tbox():
+    source = Graph()
+    source.add((EX.Lieu, RDF.type, OWL.Class))
+    source.add((EX.Ville, RDF.type, OWL.Class))
+    source.add((EX.Ville, RDFS.subClassOf, EX.Lieu))
+    source.add((EX.situeDans, RDF.type, OWL.ObjectProperty))
+    source.add((EX.nom, RDF.type, OWL.DatatypeProperty))
+    union, liste = BNode(), BNode()
+    source.add((EX.Zone, RDF.type, OWL.Class))
+    source.add((EX.Zone, OWL.unionOf, liste))
+    Collection(source, liste, [EX.Lieu, EX.Ville])
+    source.add((union, RDF.type, OWL.Restriction))
+    source.add((union, OWL.onProperty, EX.situeDans))
+    source.add((union, OWL.hasValue, EX.Tunis))
+    # Individus: typés par une classe du domaine, avec ou sans owl:NamedIndividual
+    source.add((EX.Tunis, RDF.type, EX.Ville))
+    source.add((EX.Tunis, EX.nom, Literal('Tunis')))
+    source.add((EX.Sousse, RDF.type, EX.Ville))
+    source.add((EX.Sousse, RDF.type, OWL.NamedIndividual))
+
+    schema = Graph()
+    extract_schema(source, schema)
+
+    sujets = set(schema.subjects())
+    assert {EX.Lieu, EX.Ville, EX.Zone, EX.situeDans, EX.nom, union, liste} <= sujets
+    assert EX.Tunis not in sujets and EX.Sousse not in sujets
+    assert list(Collection(schema, liste)) == [EX.Lieu, EX.Ville]
+
+
+def test_schema_partage_sans_individus_du_defaut(client, app_module, ns):
+    client.get('/t/sfax/api/destinations')
+    schema = app_module.tenant_registry.schema
+    for individu in ('Tunisie', 'Sophie', 'moamen', 'Hotel_keops'):
+        assert (app_module.NS[individu], None, None) not in schema
+    assert (app_module.NS.Destination, RDF.type, OWL.Class) in schema
+
+
+def test_listings_isoles(client, ns):
+    locataire = client.get('/t/sfax/api/destinations').get_json()
+    assert [d['nom'] for d in locataire] == ['Sfax']
+    defaut = {d['uri'] for d in client.get('/api/destinations').get_json()}
+    assert ns + 'Tunisie' in defaut
+    assert ns + 'Sfax' not in defaut
+    assert client.get('/api/destinations', headers={'X-Tenant': 'sfax'}).get_json() == locataire
+
+
+def test_locataire_inconnu(client):
+    assert client.get('/t/inconnu/api/destinations').status_code == 404
+
+
+def test_suppression_dans_un_locataire(client, ns):
+    cree = client.post('/t/sfax/api/entity/create',
+                       json={'type': 'Destination', 'attributes': {'nom': 'Monastir'}})
+    assert cree.status_code == 200
+    uri = cree.get_json()['uri']
+    assert uri in {d['uri'] for d in client.get('/t/sfax/api/destinations').get_json()}
+    assert uri not in {d['uri'] for d in client.get('/api/destinations').get_json()}
+
+    supprime = client.delete('/t/sfax/api/entity/delete', json={'uri': uri})
+    assert supprime.status_code == 200
+    assert uri not in {d['uri'] for d in client.get('/t/sfax/api/destinations').get_json()}
+    assert client.delete('/t/sfax/api/entity/delete', json={'uri': uri}).status_code == 404
+
+
+def test_suppression_ne_touche_ni_le_defaut_ni_le_schema(client, app_module, ns):
+    # Individu du locataire par défaut: inconnu du locataire
+    assert client.delete('/t/sfax/api/entity/delete', json={'uri': ns + 'Tunisie'}).status_code == 404
+    assert ns + 'Tunisie' in {d['uri'] for d in client.get('/api/destinations').get_json()}
+
+    # Classe du schéma partagé: visible mais non supprimable depuis un locataire
+    reponse = client.delete('/t/sfax/api/entity/delete', json={'uri': ns + 'Destination'})
+    assert reponse.status_code == 403
+    assert reponse.get_json()['success'] is False
+    assert (app_module.NS.Destination, RDF.type, OWL.Class) in app_module.tenant_registry.schema
+    assert [d['nom'] for d in client.get('/t/sfax/api/destinations').get_json()] == ['Sfax']
+
+
+def test_eviction_ferme_hors_du_verrou(app_module, tmp_path):
+    source = app_module.tenant_registry.path('sfax')
+    for nom in ('a', 'b'):
+        shutil.copy(source, tmp_path / f'{nom}.nt')
+    registre = TenantRegistry(app_module.default_tenant, app_module.NS, tenants_dir=str(tmp_path), max_hot=1)
+
+    fermes = []
+    a = registre.acquire('a')
+    fermer = a.close
+
+    def close():
+        fermes.append(registre._lock.locked())
+        fermer()
+    a.close = close
+    registre.release(a)
+    b = registre.acquire('b')
+    registre.release(b)
+
+    assert fermes == [False]
+    assert registre.evictions == 1
+    assert list(registre.stats()['hot']) == ['b']
+    # Rechargé après sa fermeture, le locataire évincé retrouve ses données
+    a = registre.acquire('a')
+    assert (app_module.NS.Sfax, None, None) in a.graph
+    registre.release(a)
+
+
+def test_locataire_evince_libere_apres_ecriture(app_module, tmp_path):
+    source = app_module.tenant_registry.path('sfax')
+    for nom in ('a', 'b'):
+        shutil.copy(source, tmp_path / f'{nom}.nt')
+    registre = TenantRegistry(app_module.default_tenant, app_module.NS, tenants_dir=str(tmp_path), max_hot=1)
+
+    a = registre.acquire('a')
+    triple = (app_module.NS.Mahdia, app_module.NS.nomDestination, Literal('Mahdia'))
+    with a.write_lock:
+        a.graph.add(triple)
+        a.writer.submit(1, [triple], [])
+    assert a.writer.wait(1, timeout=10)
+    registre.release(a)
+    reference = weakref.ref(a)
+    del a
+
+    registre.release(registre.acquire('b'))
+    assert registre.evictions == 1
+    gc.collect()
+    # Ni le hook d'arrêt de l'écrivain ni son thread ne retiennent le locataire évincé
+    assert reference() is None
+    assert 'Mahdia' in (tmp_path / 'a.nt').read_text(encoding='utf-8')
@@ -0,0 +1,173 @@
+"""
+Latence des lectures interactives pendant une tempête de requêtes lourdes.
+
+Lance l'application dans un serveur HTTP multi-thread (werkzeug), dans un
+processus séparé par configuration:
+
+- `off`: ADMISSION=false, tous les endpoints passent sans file;
+- `on`: contrôle d'admission par défaut (`backend/admission.py`).
+
+Pendant `--duration` secondes, `--storm` clients lancent en boucle une
+requête SPARQL lourde sur /api/query (le cache de BGP est désactivé pour
+qu'elle le reste). Ils respectent `Retry-After` quand ils sont refusés.
+En même temps, `--interactive` clients lisent /api/health et des listings
+en cache. Le script relève les percentiles de latence des lectures
+interactives, le nombre de requêtes lourdes servies et les refus (429,
+503).
+
+Usage:
+    python benchmarks/admission_benchmark.py --triples 20000 --storm 8 --duration 30 --output benchmarks/results/admission-20k.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ICI, '..', 'backend')
+sys.path.insert(0, ICI)
+
+from generate_ontology import NS, generer_fichier  # noqa: E402
+
+MODES = ['off', 'on']
+
+LOURDE = f"""
+PREFIX ns: <{NS}>
+SELECT ?d (COUNT(?p) AS ?n) (AVG(?prix) AS ?moyenne) WHERE {{
+    ?p ns:choisitDestination ?d . ?p ns:participeÀ ?a . ?a ns:prix ?prix .
+}} GROUP BY ?d ORDER BY DESC(?n)
+"""
+INTERACTIVES = ['/api/health', '/api/destinations', '/api/activites', '/api/hebergements']
+
+
+def percentile(valeurs, p):
+    if not valeurs:
+        return None
+    valeurs = sorted(valeurs)
+    return round(valeurs[min(len(valeurs) - 1, int(len(valeurs) * p / 100))] * 1000, 1)
+
+
+def executer(mode, dataset, storm, interactive, duree):
+    """Charge mesurée dans ce processus (appelé par main dans un processus fils)"""
+    import requests
+    os.environ['ONTOLOGY_FILE'] = dataset
+    os.environ.pop('GEMINI_API_KEY', None)
+    os.environ['BGP_CACHE_CELLS'] = '0'
+    os.environ['ADMISSION'] = 'true' if mode == 'on' else 'false'
+    sys.path.insert(0, BACKEND)
+    import app as app_module
+    from werkzeug.serving import make_server
+    app_module.app.logger.disabled = True
+    import logging
+    logging.getLogger('werkzeug').disabled = True
+
+    serveur = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{serveur.server_port}"
+    for url in INTERACTIVES:
+        requests.get(base + url)  # listings en cache avant la mesure
+
+    fin = time.monotonic() + duree
+    latences, lourdes, statuts = [], [], {}
+    verrou = threading.Lock()
+
+    def tempete(i):
+        session = requests.Session()
+        while time.monotonic() < fin:
+            debut = time.monotonic()
+            r = session.post(base + '/api/query', json={"query": LOURDE},
+                             headers={'X-Client-Id': f"lourd-{i % 4}"})
+            with verrou:
+                statuts[r.status_code] = statuts.get(r.status_code, 0) + 1
+                if r.status_code == 200:
+                    lourdes.append(time.monotonic() - debut)
+            if r.status_code in (429, 503):
+                time.sleep(min(float(r.headers.get('Retry-After', 1)), max(0, fin - time.monotonic())))
+
+    def lecteur(i):
+        session = requests.Session()
+        rng = random.Random(i)
+        while time.monotonic() < fin:
+            debut = time.monotonic()
+            r = session.get(base + rng.choice(INTERACTIVES))
+            if r.status_code == 200:
+                with verrou:
+                    latences.append(time.monotonic() - debut)
+            time.sleep(0.02)
+
+    threads = ([threading.Thread(target=tempete, args=(i,)) for i in range(storm)]
+               + [threading.Thread(target=lecteur, args=(i,)) for i in range(interactive)])
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    serveur.shutdown()
+    return {
+        "interactive_requests": len(latences),
+        "interactive_p50_ms": percentile(latences, 50),
+        "interactive_p95_ms": percentile(latences, 95),
+        "interactive_p99_ms": percentile(latences, 99),
+        "interactive_max_ms": percentile(latences, 100),
+        "heavy_completed": len(lourdes),
+        "heavy_median_ms": round(statistics.median(lourdes) * 1000, 1) if lourdes else None,
+        "heavy_statuses": {str(k): v for k, v in sorted(statuts.items())},
+        "admission": app_module.admission_control.stats()["classes"]["query"] if mode == 'on' else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lectures interactives sous tempête de requêtes lourdes")
+    parser.add_argument('--triples', type=int, default=20000)
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--storm', type=int, default=8, help="clients qui envoient la requête lourde")
+    parser.add_argument('--interactive', type=int, default=4, help="clients qui lisent les listings")
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='admission-results.json')
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        resultat = executer(args.mode, args.dataset, args.storm, args.interactive, args.duration)
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(resultat, f)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='ws-admission-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                     "storm_clients": args.storm, "interactive_clients": args.interactive,
+                     "duration_s": args.duration, "modes": {}}
+        for mode in MODES:
+            print(f"▶ admission {mode}...", flush=True)
+            chemin = os.path.join(travail, f"{mode}.json")
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--mode', mode, '--dataset', dataset,
+                            '--storm', str(args.storm), '--interactive', str(args.interactive),
+                            '--duration', str(args.duration), '--result', chemin],
+                           check=True, stdout=subprocess.DEVNULL)
+            with open(chemin, encoding='utf-8') as f:
+                r = resultats["modes"][mode] = json.load(f)
+            print(f"  interactif: p50 {r['interactive_p50_ms']} ms, p99 {r['interactive_p99_ms']} ms "
+                  f"({r['interactive_requests']} requêtes); lourdes servies: {r['heavy_completed']} "
+                  f"(médiane {r['heavy_median_ms']} ms), statuts {r['heavy_statuses']}")
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
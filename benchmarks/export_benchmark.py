@@ -0,0 +1,152 @@
+"""
+Export en flux (/api/export) contre réponse JSON complète (/api/query).
+
+Charge l'application sur une ontologie synthétique et demande les mêmes
+résultats des deux façons:
+
+- `/api/query`: toutes les lignes sont matérialisées (résultat RDFLib,
+  dictionnaires, corps JSON) avant le premier octet;
+- `/api/export` dans chaque format disponible (CSV, plus Parquet et Arrow
+  si pyarrow est installé), lu en flux par le client (`buffered=False`).
+
+Pour chaque requête et chaque variante: durée totale, délai avant le
+premier octet, octets reçus, lignes, et pic d'allocation Python
+(tracemalloc, mesuré dans une passe séparée, plus lente). Le script vérifie
+que l'export compte autant de lignes que /api/query.
+
+Usage:
+    python benchmarks/export_benchmark.py --triples 1000000 --output benchmarks/results/export-1m.json
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ICI, '..', 'backend')
+sys.path.insert(0, ICI)
+
+from generate_ontology import NS, generer_fichier  # noqa: E402
+
+PREFIXES = f"PREFIX ns: <{NS}>\n"
+
+QUERIES = {
+    # Une ligne par (voyageur, activité): la plus grande jointure du jeu généré
+    'participations': "SELECT ?v ?a ?prix WHERE { ?v ns:participeÀ ?a . OPTIONAL { ?a ns:prix ?prix } }",
+    'prix': "SELECT ?s ?prix WHERE { ?s ns:prix ?prix }",
+    'collection_personnes': None
+}
+
+
+def via_query(client, requete):
+    """(octets, lignes, délai avant premier octet en s)"""
+    debut = time.perf_counter()
+    reponse = client.post('/api/query', json={"query": requete})
+    premier = time.perf_counter() - debut
+    return len(reponse.data), reponse.get_json()["count"], premier
+
+
+def via_export(client, requete, fmt, batch_rows):
+    """(octets, lignes, délai avant premier octet en s), réponse lue morceau par morceau"""
+    corps = {"format": fmt, "batch_rows": batch_rows}
+    corps.update({"collection": "personnes"} if requete is None else {"query": requete})
+    debut = time.perf_counter()
+    reponse = client.post('/api/export', json=corps, buffered=False)
+    octets, lignes, premier = 0, 0, None
+    try:
+        for morceau in reponse.iter_encoded():
+            if premier is None:
+                premier = time.perf_counter() - debut
+            octets += len(morceau)
+            if fmt == 'csv':
+                lignes += morceau.count(b'\n')
+    finally:
+        reponse.close()
+    if fmt == 'csv':
+        lignes -= 1  # en-tête
+    else:
+        lignes = None
+    return octets, lignes, premier
+
+
+def mesurer(fn):
+    """(durée en ms, pic d'allocation en Mo, résultat) sur deux passes"""
+    debut = time.perf_counter()
+    resultat = fn()
+    duree = (time.perf_counter() - debut) * 1000
+    tracemalloc.start()
+    fn()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(duree, 1), round(pic / 2 ** 20, 1), resultat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export en flux contre réponse JSON complète")
+    parser.add_argument('--triples', type=int, default=500000, help="taille de l'ontologie générée")
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--batch-rows', type=int, default=65536)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='export-results.json')
+    args = parser.parse_args(argv)
+
+    travail = tempfile.mkdtemp(prefix='ws-export-')
+    try:
+        if args.dataset:
+            dataset = os.path.join(travail, 'onto' + os.path.splitext(args.dataset)[1])
+            shutil.copy(args.dataset, dataset)
+        else:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+
+        os.environ['ONTOLOGY_FILE'] = dataset
+        os.environ.pop('GEMINI_API_KEY', None)
+        os.environ['RESPONSE_CACHE_MB'] = '0'
+        # Débit du moteur: toutes les requêtes viennent du même client, sans limite d'admission
+        os.environ['ADMISSION'] = 'false'
+        sys.path.insert(0, BACKEND)
+        import app as app_module
+        from collection_queries import COLLECTION_QUERIES
+        from export import AVAILABLE_FORMATS
+        app_module.app.logger.disabled = True
+        client = app_module.app.test_client()
+
+        resultats = {
+            "dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+            "triples": len(app_module.g),
+            "batch_rows": args.batch_rows,
+            "formats": AVAILABLE_FORMATS,
+            "queries": {}
+        }
+        for nom, requete in QUERIES.items():
+            texte = COLLECTION_QUERIES['personnes'] if requete is None else PREFIXES + requete
+            variantes = resultats["queries"][nom] = {}
+            ms, pic, (octets, attendues, premier) = mesurer(lambda: via_query(client, texte))
+            variantes["query_json"] = {"ms": ms, "first_byte_ms": round(premier * 1000, 1),
+                                       "peak_mb": pic, "bytes": octets, "rows": attendues}
+            print(f"{nom}: /api/query {attendues} ligne(s), {ms} ms, pic {pic} Mo, {octets} o")
+            for fmt in AVAILABLE_FORMATS:
+                ms, pic, (octets, lignes, premier) = mesurer(
+                    lambda: via_export(client, None if requete is None else texte, fmt, args.batch_rows))
+                variantes[f"export_{fmt}"] = {"ms": ms, "first_byte_ms": round(premier * 1000, 1),
+                                              "peak_mb": pic, "bytes": octets, "rows": lignes}
+                controle = "" if lignes in (None, attendues) else f" ⚠ {lignes} ligne(s) au lieu de {attendues}"
+                print(f"{nom}: /api/export {fmt} {ms} ms (premier octet {premier * 1000:.0f} ms), "
+                      f"pic {pic} Mo, {octets} o{controle}")
+
+        dossier = os.path.dirname(os.path.abspath(args.output))
+        os.makedirs(dossier, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {args.output}")
+    finally:
+        shutil.rmtree(travail, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+"""
+Octets transférés et CPU de sérialisation par format de réponse.
+
+Charge l'application sur une ontologie synthétique, récupère chaque listing
+(`/api/destinations`, ...) et des réponses de /api/query, puis mesure pour
+chaque format négociable (JSON, JSON en colonnes avec CURIE, MessagePack et
+Arrow si leurs paquets sont installés) et chaque compression (aucune, gzip,
+br si `brotli` est installé):
+
+- la taille du corps;
+- le temps CPU médian d'encodage et de compression;
+- la référence avant négociation: json.dumps de la bibliothèque standard
+  (`json_stdlib`), clés triées, comme le jsonify de Flask.
+
+Chaque variante est aussi demandée une fois par HTTP (client de test Flask)
+pour vérifier le type de contenu servi et la taille reçue.
+
+Usage:
+    python benchmarks/formats_benchmark.py --triples 200000 --output benchmarks/results/formats-200k.json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ICI, '..', 'backend')
+sys.path.insert(0, ICI)
+
+from generate_ontology import generer_fichier  # noqa: E402
+from run_benchmarks import LISTINGS, QUERIES  # noqa: E402
+
+
+def cpu_ms(fn, repeat):
+    """(temps CPU médian en ms, dernier résultat)"""
+    durees, resultat = [], None
+    for _ in range(repeat):
+        debut = time.process_time()
+        resultat = fn()
+        durees.append(time.process_time() - debut)
+    return round(statistics.median(durees) * 1000, 3), resultat
+
+
+def mesurer(app_module, client, nom, payload, requete, repeat):
+    """Tailles et temps d'encodage d'une réponse dans chaque format et compression"""
+    encoding = app_module.encoding
+    espaces = app_module.curie_namespaces()
+    variantes = {}
+
+    ms, corps = cpu_ms(lambda: json.dumps(payload, sort_keys=True, separators=(',', ':')).encode(), repeat)
+    formats = [('json_stdlib', corps, ms)]
+    for mimetype in encoding.AVAILABLE_FORMATS:
+        ms, (corps, servi) = cpu_ms(lambda: encoding.encode(payload, mimetype, espaces), repeat)
+        formats.append((servi, corps, ms))
+
+    for format_nom, corps, encode_ms in formats:
+        for compression in [None] + encoding.AVAILABLE_ENCODINGS:
+            compress_ms, compresse = cpu_ms(lambda: encoding.compress(corps, compression), repeat)
+            variante = variantes[f"{format_nom}|{compression or 'identity'}"] = {
+                "bytes": len(compresse),
+                "encode_ms": encode_ms,
+                "compress_ms": compress_ms if compression else 0.0,
+                "total_ms": round(encode_ms + (compress_ms if compression else 0.0), 3)
+            }
+            if format_nom != 'json_stdlib':
+                reponse = requete(client, {'Accept': format_nom, 'Accept-Encoding': compression or 'identity'})
+                variante["http_bytes"] = len(reponse.data)
+                variante["http_content_type"] = reponse.mimetype
+
+    reference = variantes['json_stdlib|identity']["bytes"]
+    for variante in variantes.values():
+        variante["ratio"] = round(variante["bytes"] / reference, 4) if reference else None
+    meilleur = min(variantes, key=lambda v: variantes[v]["bytes"])
+    print(f"{nom}: {reference} o en JSON, {variantes[meilleur]['bytes']} o en {meilleur}")
+    return variantes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Taille et coût de sérialisation des formats de réponse")
+    parser.add_argument('--triples', type=int, default=200000, help="taille de l'ontologie générée")
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='formats-results.json')
+    args = parser.parse_args(argv)
+
+    travail = tempfile.mkdtemp(prefix='ws-fmt-')
+    try:
+        if args.dataset:
+            dataset = os.path.join(travail, 'onto' + os.path.splitext(args.dataset)[1])
+            shutil.copy(args.dataset, dataset)
+        else:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+
+        os.environ['ONTOLOGY_FILE'] = dataset
+        os.environ.pop('GEMINI_API_KEY', None)
+        # Chaque requête HTTP encode sa réponse (pas de cache)
+        os.environ['RESPONSE_CACHE_MB'] = '0'
+        # Débit du moteur: toutes les requêtes viennent du même client, sans limite d'admission
+        os.environ['ADMISSION'] = 'false'
+        sys.path.insert(0, BACKEND)
+        import app as app_module
+        app_module.app.logger.disabled = True
+        encoding = app_module.encoding
+        client = app_module.app.test_client()
+
+        resultats = {
+            "dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+            "triples": len(app_module.g),
+            "formats": encoding.AVAILABLE_FORMATS,
+            "encodings": encoding.AVAILABLE_ENCODINGS,
+            "orjson": encoding.orjson is not None,
+            "responses": {}
+        }
+        cibles = [(url, lambda c, h, url=url: c.get(url, headers=h)) for url in LISTINGS]
+        cibles += [(f"/api/query:{nom}", lambda c, h, q=q: c.post('/api/query', json={"query": q}, headers=h))
+                   for nom, q in QUERIES.items()]
+        for nom, requete in cibles:
+            reponse = requete(client, {'Accept': encoding.JSON})
+            if reponse.status_code != 200:
+                print(f"⚠ {nom}: statut {reponse.status_code}")
+                continue
+            resultats["responses"][nom] = mesurer(app_module, client, nom, reponse.get_json(),
+                                                  requete, args.repeat)
+
+        # Totaux sur toutes les réponses, par variante
+        totaux = {}
+        for variantes in resultats["responses"].values():
+            for variante, mesure in variantes.items():
+                total = totaux.setdefault(variante, {"bytes": 0, "total_ms": 0.0})
+                total["bytes"] += mesure["bytes"]
+                total["total_ms"] = round(total["total_ms"] + mesure["total_ms"], 3)
+        reference = totaux.get('json_stdlib|identity', {}).get("bytes")
+        for total in totaux.values():
+            total["ratio"] = round(total["bytes"] / reference, 4) if reference else None
+        resultats["totals"] = totaux
+        print("Total par variante:")
+        for variante, total in sorted(totaux.items(), key=lambda v: v[1]["bytes"]):
+            print(f"  {variante:<55} {total['bytes']:>10} o  x{total['ratio']:<7} {total['total_ms']:>9.1f} ms CPU")
+
+        dossier = os.path.dirname(os.path.abspath(args.output))
+        os.makedirs(dossier, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {args.output}")
+    finally:
+        shutil.rmtree(travail, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
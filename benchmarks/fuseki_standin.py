@@ -0,0 +1,158 @@
+"""
+Store HTTP local qui remplace Fuseki pour tester le chargement en masse.
+
+Implémente la partie écriture du Graph Store Protocol: `POST` (ajout),
+`PUT` (remplacement) et `DELETE` sur `/<dataset>/data?default` ou
+`?graph=<uri>`, corps en N-Triples. Les triplets sont gardés par graphe
+sous forme de lignes N-Triples distinctes, ce qui permet de vérifier qu'un
+chargement interrompu puis repris ne perd ni ne duplique rien.
+`GET /stats` donne les compteurs.
+
+Comme Fuseki, l'intégration d'une requête se fait sous un verrou
+d'écriture unique: `ingest_rate` (triplets/s, 0 = instantané) simule son
+coût. Le découpage du corps se fait hors du verrou. `fail_after` fait
+échouer (503) toutes les requêtes d'écriture au-delà de la N-ième, pour
+simuler un serveur tombé en cours de chargement.
+
+Usage:
+    python benchmarks/fuseki_standin.py --port 3030 --ingest-rate 200000
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_GRAPH = ''
+
+
+class StandInStore:
+    def __init__(self, ingest_rate=0.0, fail_after=None):
+        self.ingest_rate = ingest_rate
+        self.fail_after = fail_after
+        self.graphs = {}
+        self.requests = 0
+        self.failures = 0
+        self.received = 0
+        self._compteur = threading.Lock()
+        self._ecriture = threading.Lock()
+
+    def admit(self):
+        """Numéroter une requête d'écriture; False si elle doit échouer"""
+        with self._compteur:
+            self.requests += 1
+            if self.fail_after is not None and self.requests > self.fail_after:
+                self.failures += 1
+                return False
+            return True
+
+    def write(self, graph, corps, replace=False):
+        lignes = [ligne.strip() for ligne in corps.decode('utf-8').splitlines()]
+        lignes = [ligne for ligne in lignes if ligne and not ligne.startswith('#')]
+        for ligne in lignes:
+            if not ligne.endswith('.'):
+                raise ValueError(f"Ligne N-Triples invalide: {ligne[:80]}")
+        with self._ecriture:
+            if self.ingest_rate > 0:
+                time.sleep(len(lignes) / self.ingest_rate)
+            cible = self.graphs.setdefault(graph, set())
+            if replace:
+                cible.clear()
+            cible.update(lignes)
+            self.received += len(lignes)
+        return len(lignes)
+
+    def delete(self, graph):
+        with self._ecriture:
+            return self.graphs.pop(graph, None) is not None
+
+    def stats(self):
+        with self._ecriture:
+            return {
+                "graphs": {nom or 'default': len(t) for nom, t in self.graphs.items()},
+                "requests": self.requests,
+                "failures": self.failures,
+                "received_triples": self.received
+            }
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _repondre(self, statut, donnees=None):
+            corps = json.dumps(donnees or {}).encode('utf-8')
+            self.send_response(statut)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def _graphe(self):
+            url = urlparse(self.path)
+            if not url.path.endswith('/data'):
+                return None
+            params = parse_qs(url.query, keep_blank_values=True)
+            return params['graph'][0] if 'graph' in params else DEFAULT_GRAPH
+
+        def _ecrire(self, replace):
+            corps = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            graphe = self._graphe()
+            if graphe is None:
+                return self._repondre(404)
+            if not store.admit():
+                return self._repondre(503, {"error": "indisponible"})
+            try:
+                n = store.write(graphe, corps, replace)
+            except ValueError as e:
+                return self._repondre(400, {"error": str(e)})
+            self._repondre(200, {"count": n})
+
+        def do_POST(self):
+            self._ecrire(replace=False)
+
+        def do_PUT(self):
+            self._ecrire(replace=True)
+
+        def do_DELETE(self):
+            graphe = self._graphe()
+            if graphe is None:
+                return self._repondre(404)
+            self._repondre(204 if store.delete(graphe) else 404)
+
+        def do_GET(self):
+            if urlparse(self.path).path == '/stats':
+                return self._repondre(200, store.stats())
+            self._repondre(200, {"status": "ok"})
+
+    return Handler
+
+
+def serve(store, port=0):
+    """Démarrer le store dans un thread; retourne (serveur, url de base)"""
+    serveur = ThreadingHTTPServer(('127.0.0.1', port), make_handler(store))
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, name='fuseki-standin', daemon=True).start()
+    return serveur, f"http://127.0.0.1:{serveur.server_address[1]}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Store Graph Store Protocol local (remplaçant de Fuseki)")
+    parser.add_argument('--port', type=int, default=3030)
+    parser.add_argument('--ingest-rate', type=float, default=0.0, help="triplets intégrés par seconde (0: instantané)")
+    parser.add_argument('--fail-after', type=int, help="requêtes d'écriture acceptées avant de répondre 503")
+    args = parser.parse_args(argv)
+    serveur, url = serve(StandInStore(args.ingest_rate, args.fail_after), args.port)
+    print(f"Store de test sur {url}/tourisme/data (statistiques: {url}/stats)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        serveur.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Générateur d'ontologies synthétiques pour les benchmarks.
+
+Reprend le schéma de ws.rdf (classes, propriétés, restrictions) et produit des
+individus en respectant les mêmes classes et propriétés: destinations,
+hébergements certifiés, activités avec EmpreinteCarbone, transports,
+services, nourritures, équipements et voyageurs. Les degrés suivent des
+distributions à queue lourde (popularité de Zipf pour les destinations et
+hébergements, nombre de liens de Pareto par voyageur).
+
+Les triplets sont écrits au fil de l'eau en N-Triples, ce qui permet de
+générer 10M triplets sans tout garder en mémoire.
+
+Usage:
+    python benchmarks/generate_ontology.py --triples 100000 --output benchmarks/data/onto-100k.nt
+    python benchmarks/generate_ontology.py --triples 10000 --output benchmarks/data/onto-10k.rdf --format xml
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+from rdflib import Graph, OWL, RDF, XSD
+
+NS = "http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#"
+WS_RDF = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ws.rdf')
+
+# Part du budget de triplets attribuée à chaque famille d'individus
+REPARTITION = {
+    'destinations': 0.03,
+    'certifications': 0.01,
+    'hebergements': 0.15,
+    'activites': 0.22,
+    'transports': 0.03,
+    'services': 0.05,
+    'nourritures': 0.02,
+    'equipements': 0.02,
+    'personnes': 0.47
+}
+
+SOUS_CLASSES = {
+    'Destination': ['Destination', 'DestinationUrbaine', 'DestinationRurale', 'DestinationCotière',
+                    'DestinationInsulaire', 'DestinationMontagneuse'],
+    'Hébergement': ['Hôtel', 'Camping', 'Village_vacances'],
+    'ActivitéTouristique': ['ActivitéTouristique', 'Randonnée', 'Camping_écologique', 'Visite_de_musées',
+                            'Excursions_en_montagne', 'Excursions_en_désert'],
+    'Transport': ['Train', 'Taxi', 'Vélo'],
+    'Services': ['Services', 'AgenceVoyage', 'AssuranceVoyage', 'ServiceAdditionnel'],
+    'Nourriture': ['PetitDejeuner', 'Diner', 'Buffet', 'Snack'],
+    'Equipement': ['Valise', 'Material_de_camping', 'EquipementSecurite'],
+    'CertificationÉco': ['CertificationISO14001', 'CertificationInternationale', 'CertificationLocale',
+                         'CertificationSectorielle'],
+    'Personne': ['Voyageur', 'Personne']
+}
+
+PAYS = ['Tunisie', 'France', 'Maroc', 'Espagne', 'Italie', 'Islande', 'Costa Rica', 'Madagascar', 'Grèce', 'Portugal']
+
+
+def _uri(local):
+    return f"<{NS}{local}>"
+
+
+def _lit(value):
+    if isinstance(value, bool):
+        raise TypeError(value)
+    if isinstance(value, int):
+        return f'"{value}"^^<{XSD.integer}>'
+    if isinstance(value, float):
+        return f'"{value:.2f}"^^<{XSD.float}>'
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+class Zipf:
+    """Tirage d'indices selon une loi de Zipf (popularité à queue lourde)"""
+
+    def __init__(self, n, s, rng):
+        self.rng = rng
+        poids = [1.0 / (i + 1) ** s for i in range(n)]
+        self.cumul = list(itertools.accumulate(poids))
+        self.population = range(n)
+
+    def tirer(self, k=1):
+        return self.rng.choices(self.population, cum_weights=self.cumul, k=k)
+
+
+class Generateur:
+    def __init__(self, sortie, triplets, seed):
+        self.sortie = sortie
+        self.cible = triplets
+        self.rng = random.Random(seed)
+        self.ecrits = 0
+
+    def t(self, s, p, o):
+        self.sortie.write(f"{s} {p} {o} .\n")
+        self.ecrits += 1
+
+    def individu(self, local, classe):
+        s = _uri(local)
+        self.t(s, f"<{RDF.type}>", f"<{OWL.NamedIndividual}>")
+        self.t(s, f"<{RDF.type}>", _uri(classe))
+        return s
+
+    def pareto(self, alpha, maximum):
+        return min(maximum, int(self.rng.paretovariate(alpha)) - 1)
+
+    def schema(self):
+        """Recopier le schéma de ws.rdf (tout sauf les individus)"""
+        source = Graph()
+        source.parse(WS_RDF, format="xml")
+        individus = set(source.subjects(RDF.type, OWL.NamedIndividual))
+        schema = Graph()
+        for triple in source:
+            if triple[0] not in individus:
+                schema.add(triple)
+        lignes = schema.serialize(format="nt", encoding="utf-8").decode("utf-8").splitlines()
+        for ligne in lignes:
+            if ligne.strip():
+                self.sortie.write(ligne + "\n")
+                self.ecrits += 1
+
+    def generer(self):
+        self.schema()
+        budget = {k: int(v * self.cible) for k, v in REPARTITION.items()}
+        rng = self.rng
+
+        def jusqua(famille, depart):
+            return self.ecrits - depart < budget[famille]
+
+        # Destinations
+        destinations = []
+        depart = self.ecrits
+        while jusqua('destinations', depart) or not destinations:
+            i = len(destinations)
+            s = self.individu(f"Destination_{i}", rng.choice(SOUS_CLASSES['Destination']))
+            self.t(s, _uri('nomDestination'), _lit(f"Destination {i}"))
+            self.t(s, _uri('pays'), _lit(rng.choice(PAYS)))
+            self.t(s, _uri('region'), _lit(f"Région {i % 50}"))
+            destinations.append(s)
+        pop_dest = Zipf(len(destinations), 1.1, rng)
+
+        # Certifications
+        certifications = []
+        depart = self.ecrits
+        while jusqua('certifications', depart) or not certifications:
+            i = len(certifications)
+            s = self.individu(f"Certification_{i}", rng.choice(SOUS_CLASSES['CertificationÉco']))
+            self.t(s, _uri('nomCertification'), _lit(f"Label Eco {i}"))
+            self.t(s, _uri('dateValidite'), f'"20{rng.randint(25, 32)}-12-31"^^<{XSD.date}>')
+            certifications.append(s)
+        pop_cert = Zipf(len(certifications), 1.2, rng)
+
+        # Empreintes carbone partagées (paliers de valeurs, comme dans ws.rdf)
+        empreintes = []
+        for i in range(max(10, len(destinations) // 10)):
+            s = self.individu(f"Empreinte_{i}", 'EmpreinteCarbone')
+            self.t(s, _uri('empreinte'), _lit(round(rng.lognormvariate(1.0, 0.8), 2)))
+            empreintes.append(s)
+
+        # Hébergements: localisation selon la popularité, 0..k certifications
+        hebergements = []
+        depart = self.ecrits
+        while jusqua('hebergements', depart) or not hebergements:
+            i = len(hebergements)
+            s = self.individu(f"Hebergement_{i}", rng.choice(SOUS_CLASSES['Hébergement']))
+            self.t(s, _uri('nomHebergement'), _lit(f"Hebergement {i}"))
+            self.t(s, _uri('prix'), _lit(round(rng.uniform(30, 400), 2)))
+            self.t(s, _uri('capacite'), _lit(rng.randint(2, 300)))
+            self.t(s, _uri('estSituéÀ'), destinations[pop_dest.tirer()[0]])
+            for c in set(pop_cert.tirer(self.pareto(1.5, 8))):
+                self.t(s, _uri('possèdeCertification'), certifications[c])
+            hebergements.append(s)
+        pop_heb = Zipf(len(hebergements), 1.05, rng)
+
+        # Transports
+        transports = []
+        depart = self.ecrits
+        while jusqua('transports', depart) or not transports:
+            i = len(transports)
+            s = self.individu(f"Transport_{i}", rng.choice(SOUS_CLASSES['Transport']))
+            self.t(s, _uri('nomTransport'), _lit(f"Transport {i}"))
+            self.t(s, _uri('typeTransport'), _lit(rng.choice(['Électrique', 'Express', 'Régional', 'Partagé'])))
+            self.t(s, _uri('aEmpreinteCarbone'), rng.choice(empreintes))
+            transports.append(s)
+
+        # Activités: lieu, empreinte, transport nécessaire
+        activites = []
+        depart = self.ecrits
+        while jusqua('activites', depart) or not activites:
+            i = len(activites)
+            s = self.individu(f"Activite_{i}", rng.choice(SOUS_CLASSES['ActivitéTouristique']))
+            self.t(s, _uri('nomActivité'), _lit(f"Activite {i}"))
+            self.t(s, _uri('prix'), _lit(round(rng.uniform(5, 200), 2)))
+            self.t(s, _uri('duree'), _lit(rng.randint(1, 10)))
+            self.t(s, _uri('aPourLieu'), destinations[pop_dest.tirer()[0]])
+            self.t(s, _uri('aEmpreinteCarbone'), rng.choice(empreintes))
+            if rng.random() < 0.3:
+                self.t(s, _uri('nécessite'), rng.choice(transports))
+            activites.append(s)
+        pop_act = Zipf(len(activites), 1.05, rng)
+
+        # Services, nourritures, équipements
+        services, nourritures, equipements = [], [], []
+        for famille, liste, classe, nom in (('services', services, 'Services', 'nomService'),
+                                            ('nourritures', nourritures, 'Nourriture', 'nomNourriture'),
+                                            ('equipements', equipements, 'Equipement', 'nomEquipement')):
+            depart = self.ecrits
+            while jusqua(famille, depart) or not liste:
+                i = len(liste)
+                s = self.individu(f"{classe}_{i}", rng.choice(SOUS_CLASSES[classe]))
+                self.t(s, _uri(nom), _lit(f"{classe} {i}"))
+                if classe == 'Services':
+                    self.t(s, _uri('prix'), _lit(round(rng.uniform(10, 150), 2)))
+                liste.append(s)
+
+        # Voyageurs: liens à queue lourde vers le reste du graphe
+        personnes = 0
+        while self.ecrits < self.cible or personnes == 0:
+            i = personnes
+            s = self.individu(f"Voyageur_{i}", rng.choice(SOUS_CLASSES['Personne']))
+            self.t(s, _uri('nomVoyageur'), _lit(f"Voyageur {i}"))
+            self.t(s, _uri('age'), _lit(rng.randint(18, 80)))
+            for d in set(pop_dest.tirer(1 + self.pareto(2.0, 5))):
+                self.t(s, _uri('choisitDestination'), destinations[d])
+            for h in set(pop_heb.tirer(self.pareto(2.0, 4))):
+                self.t(s, _uri('séjourneDans'), hebergements[h])
+            for a in set(pop_act.tirer(self.pareto(1.5, 12))):
+                self.t(s, _uri('participeÀ'), activites[a])
+            if rng.random() < 0.6:
+                self.t(s, _uri('utilise'), rng.choice(transports))
+            if rng.random() < 0.3:
+                self.t(s, _uri('consomme'), rng.choice(nourritures))
+            if rng.random() < 0.2:
+                self.t(s, _uri('possèdeEquipement'), rng.choice(equipements))
+            if rng.random() < 0.05:
+                self.t(rng.choice(services), _uri('fournit'), s)
+            personnes += 1
+        return self.ecrits
+
+
+def generer_fichier(chemin, triplets, fmt='nt', seed=42):
+    """Générer une ontologie synthétique; retourne le nombre de triplets écrits"""
+    dossier = os.path.dirname(os.path.abspath(chemin))
+    os.makedirs(dossier, exist_ok=True)
+    if fmt == 'nt':
+        with open(chemin, 'w', encoding='utf-8') as sortie:
+            return Generateur(sortie, triplets, seed).generer()
+
+    # Autres formats: passer par un graphe RDFLib (réservé aux petites tailles)
+    temporaire = chemin + '.tmp.nt'
+    with open(temporaire, 'w', encoding='utf-8') as sortie:
+        n = Generateur(sortie, triplets, seed).generer()
+    graphe = Graph()
+    graphe.parse(temporaire, format='nt')
+    graphe.bind('default1', NS)
+    graphe.serialize(destination=chemin, format=fmt, encoding='utf-8')
+    os.remove(temporaire)
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Générer une ontologie synthétique au schéma de ws.rdf")
+    parser.add_argument('--triples', type=int, default=10000, help="nombre approximatif de triplets")
+    parser.add_argument('--output', required=True, help="fichier de sortie")
+    parser.add_argument('--format', default='nt', choices=['nt', 'xml', 'turtle'],
+                        help="nt (flux, toutes tailles) ou xml/turtle (petites tailles)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    n = generer_fichier(args.output, args.triples, args.format, args.seed)
+    duree = time.perf_counter() - debut
+    print(f"{n} triplets écrits dans {args.output} en {duree:.1f}s")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
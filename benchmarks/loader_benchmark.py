@@ -0,0 +1,112 @@
+"""
+Débit du chargement en masse vers Fuseki, face à un store de test local.
+
+Génère une ontologie N-Triples puis la charge dans `fuseki_standin` (qui
+intègre les requêtes sous un verrou d'écriture unique, comme Fuseki, à
+`--ingest-rate` triplets/s):
+
+- `single_request`: tout le fichier en une requête, comme
+  load-ontology-fuseki.ps1;
+- `fuseki_loader` pour chaque nombre de requêtes simultanées demandé;
+- `resume`: le store tombe (503) après la moitié des lots, le chargement
+  échoue, puis la même commande reprend. Le script vérifie que seuls les
+  lots manquants sont renvoyés et que le store contient exactement les
+  triplets de la source.
+
+Usage:
+    python benchmarks/loader_benchmark.py --triples 1000000 --workers 1,2,4 --output benchmarks/results/loader-1m.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ICI)
+sys.path.insert(0, os.path.join(ICI, '..', 'backend'))
+
+from generate_ontology import generer_fichier  # noqa: E402
+from fuseki_standin import StandInStore, serve  # noqa: E402
+
+
+def charger(dataset, store, url, chunk_size, workers, travail, retries=5, restart=True):
+    from fuseki_loader import FusekiLoader
+    loader = FusekiLoader(url + '/tourisme/data', chunk_size=chunk_size, workers=workers, retries=retries)
+    return loader.load(dataset, checkpoint_path=os.path.join(travail, 'reprise.json'), restart=restart)
+
+
+def nouveau_store(ingest_rate, fail_after=None):
+    store = StandInStore(ingest_rate, fail_after)
+    _, url = serve(store)
+    return store, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Débit du chargement en masse vers Fuseki")
+    parser.add_argument('--triples', type=int, default=500000)
+    parser.add_argument('--dataset', help="fichier N-Triples existant à utiliser au lieu de générer")
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    parser.add_argument('--workers', default='1,2,4', help="requêtes simultanées à mesurer (liste)")
+    parser.add_argument('--ingest-rate', type=float, default=300000, help="triplets/s intégrés par le store")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='loader-results.json')
+    args = parser.parse_args(argv)
+
+    from fuseki_loader import LoadError
+
+    with tempfile.TemporaryDirectory(prefix='ws-load-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        with open(dataset, encoding='utf-8') as f:
+            attendus = len({ligne.strip() for ligne in f if ligne.strip() and not ligne.startswith('#')})
+
+        resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                     "distinct_triples": attendus, "chunk_size": args.chunk_size,
+                     "ingest_rate": args.ingest_rate, "runs": {}}
+
+        def noter(nom, rapport, store):
+            stats = store.stats()
+            complet = stats["graphs"].get("default") == attendus
+            resultats["runs"][nom] = {"seconds": rapport["seconds"], "triples_per_s": rapport["triples_per_s"],
+                                      "requests": stats["requests"], "complete": complet}
+            print(f"{nom}: {rapport['triples_per_s']} triplets/s, {stats['requests']} requête(s)"
+                  + ("" if complet else " ⚠ store incomplet"))
+
+        store, url = nouveau_store(args.ingest_rate)
+        noter('single_request', charger(dataset, store, url, 10 ** 12, 1, travail), store)
+        for workers in (int(w) for w in args.workers.split(',')):
+            store, url = nouveau_store(args.ingest_rate)
+            noter(f"workers_{workers}", charger(dataset, store, url, args.chunk_size, workers, travail), store)
+
+        # Reprise: le store refuse tout au-delà de la moitié des lots, puis revient
+        lots = -(-attendus // args.chunk_size)
+        store, url = nouveau_store(args.ingest_rate, fail_after=lots // 2)
+        try:
+            charger(dataset, store, url, args.chunk_size, 2, travail, retries=0)
+            raise SystemExit("⚠ le chargement aurait dû échouer")
+        except LoadError as e:
+            print(f"resume: échec simulé ({e})")
+        store.fail_after = None
+        rapport = charger(dataset, store, url, args.chunk_size, 2, travail, restart=False)
+        resultats["runs"]["resume"] = {
+            "chunks": lots,
+            "resent_chunks": rapport["chunks"],
+            "skipped_chunks": rapport["skipped_chunks"],
+            "complete": store.stats()["graphs"].get("default") == attendus
+        }
+        print(f"resume: {rapport['skipped_chunks']} lot(s) déjà chargé(s), {rapport['chunks']} renvoyé(s), "
+              f"store {'complet' if resultats['runs']['resume']['complete'] else 'incomplet ⚠'}")
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Empreinte mémoire des stores RDF sur une ontologie synthétique.
+
+Charge le même fichier dans le store `Memory` de RDFLib et dans le
+`CompactStore` du backend (RDF_STORE=compact), chacun dans un processus
+séparé, et compare la mémoire retenue après chargement (tracemalloc) et le
+RSS. Une requête SPARQL représentative vérifie que les deux stores donnent
+le même nombre de résultats.
+
+Usage:
+    python benchmarks/memory_benchmark.py --triples 1000000 --output benchmarks/results/memory-1m.json
+    python benchmarks/memory_benchmark.py --dataset benchmarks/data/onto-1m.nt
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ICI, '..', 'backend')
+sys.path.insert(0, ICI)
+
+from generate_ontology import generer_fichier  # noqa: E402
+
+STORES = ['memory', 'compact']
+
+REQUETE = """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+SELECT ?d (COUNT(?p) AS ?n) WHERE { ?p ns:choisitDestination ?d } GROUP BY ?d
+"""
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def mesurer(store, dataset):
+    """Processus enfant: charger le fichier dans un store et mesurer"""
+    sys.path.insert(0, BACKEND)
+    from rdflib import Graph
+    from compact_store import CompactStore
+
+    gc.collect()
+    rss_avant = rss_mb()
+    tracemalloc.start()
+    debut = time.perf_counter()
+    graph = Graph(store=CompactStore()) if store == 'compact' else Graph()
+    graph.parse(dataset, format='nt')
+    triplets = len(graph)
+    chargement = time.perf_counter() - debut
+    gc.collect()
+    retenu = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    debut = time.perf_counter()
+    lignes = len(list(graph.query(REQUETE)))
+    requete = time.perf_counter() - debut
+    return {
+        "triples": triplets,
+        "load_s": round(chargement, 2),
+        "retained_mb": round(retenu / (1024 * 1024), 1),
+        "bytes_per_triple": round(retenu / triplets, 1),
+        "rss_delta_mb": round(rss_mb() - rss_avant, 1),
+        "query_s": round(requete, 3),
+        "query_rows": lignes
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mémoire du store Memory vs CompactStore")
+    parser.add_argument('--triples', type=int, default=1000000, help="taille de l'ontologie générée")
+    parser.add_argument('--dataset', help="fichier N-Triples existant à utiliser au lieu de générer")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='memory-results.json')
+    parser.add_argument('--store', choices=STORES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.store:
+        json.dump(mesurer(args.store, args.dataset), sys.stdout)
+        return 0
+
+    with tempfile.TemporaryDirectory(prefix='ws-mem-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            print(f"Génération de {args.triples} triplets...", flush=True)
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+
+        resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}", "stores": {}}
+        for store in STORES:
+            print(f"▶ {store}...", flush=True)
+            sortie = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+                                              '--store', store, '--dataset', dataset])
+            r = resultats["stores"][store] = json.loads(sortie)
+            print(f"  {r['retained_mb']} Mo retenus ({r['bytes_per_triple']} o/triplet), "
+                  f"RSS +{r['rss_delta_mb']} Mo, chargement {r['load_s']} s")
+
+    memoire, compact = resultats["stores"]["memory"], resultats["stores"]["compact"]
+    if memoire["query_rows"] != compact["query_rows"]:
+        print("⚠ Les deux stores ne donnent pas le même résultat SPARQL")
+    resultats["reduction"] = round(memoire["retained_mb"] / compact["retained_mb"], 1)
+    print(f"Réduction mémoire: x{resultats['reduction']}")
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
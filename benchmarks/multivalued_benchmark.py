@@ -0,0 +1,193 @@
+"""
+Listings à propriétés multivaluées: jointure unique contre requêtes regroupées.
+
+Charge une ontologie synthétique et donne à chaque hébergement, activité et
+transport `--extra` valeurs supplémentaires de ses propriétés
+multivaluées (certifications, empreintes carbone). Pour chaque listing, le
+script compare:
+
+- `joined`: l'ancienne forme, une requête qui joint la propriété
+  multivaluée (`COLLECTION_QUERIES`), puis la première ligne de chaque
+  entité l'emporte;
+- `grouped`: la requête de base (`LISTING_QUERIES`) plus une requête
+  `?item ?valeur` par propriété (`MULTI_VALUED`), regroupées par entité.
+
+Il relève les lignes produites par le moteur, la durée médiane et les
+valeurs que l'ancienne forme perdait (`dropped_values`). Le cas `cross`
+ajoute une seconde propriété multivaluée aux activités (`ns:nécessite`):
+la jointure y produit le produit cartésien des deux propriétés par entité.
+
+Usage:
+    python benchmarks/multivalued_benchmark.py --triples 200000 --extra 4 --output benchmarks/results/multivalued-200k.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ICI)
+sys.path.insert(0, os.path.join(ICI, '..', 'backend'))
+
+from rdflib import Graph, Literal, RDF, URIRef  # noqa: E402
+
+from generate_ontology import NS, generer_fichier  # noqa: E402
+from collection_queries import COLLECTION_QUERIES, LISTING_QUERIES, MULTI_VALUED, PREFIXES  # noqa: E402
+from sparql_results import SparqlResult  # noqa: E402
+
+# listing -> (variable de l'entité, variable multivaluée de la jointure, champ de MULTI_VALUED)
+LISTINGS = {
+    'hebergements': ('hebergement', 'certification', 'certifications'),
+    'activites': ('activite', 'empreinte', 'empreintes'),
+    'transports': ('transport', 'empreinte', 'empreintes'),
+}
+
+# Deux propriétés multivaluées sur les activités
+CROSS_JOINED = PREFIXES + """
+SELECT DISTINCT ?activite ?nom ?empreinte ?transport
+WHERE {
+    ?activite ns:nomActivité ?nom .
+    OPTIONAL { ?activite ns:aEmpreinteCarbone ?ec . ?ec ns:empreinte ?empreinte }
+    OPTIONAL { ?activite ns:nécessite ?transport }
+}
+"""
+CROSS_BASE = PREFIXES + "SELECT DISTINCT ?activite ?nom WHERE { ?activite ns:nomActivité ?nom }"
+CROSS_FACETS = {
+    'empreintes': PREFIXES + "SELECT DISTINCT ?item ?valeur WHERE { ?item ns:nomActivité ?nom . "
+                          "?item ns:aEmpreinteCarbone ?ec . ?ec ns:empreinte ?valeur }",
+    'transports': PREFIXES + "SELECT DISTINCT ?item ?valeur WHERE { ?item ns:nécessite ?valeur }",
+}
+
+
+def u(local):
+    return URIRef(NS + local)
+
+
+def enrichir(graph, extra, seed):
+    """`extra` certifications, empreintes et transports nécessaires de plus par entité"""
+    rng = random.Random(seed)
+    certifications = sorted(set(graph.subjects(u('nomCertification'), None)))
+    empreintes = [u(f"Empreinte_extra_{i}") for i in range(64)]
+    for i, e in enumerate(empreintes):
+        graph.add((e, RDF.type, u('EmpreinteCarbone')))
+        graph.add((e, u('empreinte'), Literal(round(1 + i * 0.37, 2))))
+    transports = sorted(set(graph.subjects(u('nomTransport'), None)))
+    for h in sorted(set(graph.subjects(u('nomHebergement'), None))):
+        for c in rng.sample(certifications, min(extra, len(certifications))):
+            graph.add((h, u('possèdeCertification'), c))
+    for s in sorted(set(graph.subjects(u('nomActivité'), None))) + transports:
+        for e in rng.sample(empreintes, extra):
+            graph.add((s, u('aEmpreinteCarbone'), e))
+    for a in sorted(set(graph.subjects(u('nomActivité'), None))):
+        for t in rng.sample(transports, min(extra, len(transports))):
+            graph.add((a, u('nécessite'), t))
+
+
+def executer(graph, requete):
+    return SparqlResult.from_rdflib(graph.query(requete)).records()
+
+
+def joined(graph, requete, cle, champs):
+    """(lignes, {entité: {champ: première valeur}}, {entité: {champ: valeurs}})"""
+    lignes = executer(graph, requete)
+    premiers, toutes = {}, {}
+    for row in lignes:
+        uri = row[cle]
+        premiers.setdefault(uri, {c: row[c] for c in champs})
+        for c in champs:
+            if row[c] is not None:
+                toutes.setdefault(uri, {}).setdefault(c, set()).add(row[c])
+    return len(lignes), premiers, toutes
+
+
+def grouped(graph, base, facettes, cle):
+    """(lignes, {entité: {champ: valeurs}}) comme app.multi_valued"""
+    lignes = executer(graph, base)
+    n = len(lignes)
+    entites = {row[cle] for row in lignes}
+    valeurs = {}
+    for champ, requete in facettes.items():
+        rows = executer(graph, requete)
+        n += len(rows)
+        for row in rows:
+            if row['item'] in entites and row['valeur'] is not None:
+                valeurs.setdefault(row['item'], {}).setdefault(champ, set()).add(row['valeur'])
+    return n, valeurs
+
+
+def chronometrer(fn, repeat):
+    durees, resultat = [], None
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        resultat = fn()
+        durees.append(time.perf_counter() - debut)
+    return round(statistics.median(durees) * 1000, 3), resultat
+
+
+def comparer(graph, nom, requete_jointe, cle, colonnes, base, facettes, repeat):
+    joint_ms, (joint_lignes, premiers, toutes) = chronometrer(
+        lambda: joined(graph, requete_jointe, cle, colonnes), repeat)
+    groupe_ms, (groupe_lignes, valeurs) = chronometrer(lambda: grouped(graph, base, facettes, cle), repeat)
+    # Valeurs rendues par l'ancienne forme (première ligne) contre toutes celles de la jointure
+    rendues = sum(1 for p in premiers.values() for v in p.values() if v is not None)
+    attendues = sum(len(vs) for t in toutes.values() for vs in t.values())
+    obtenues = sum(len(vs) for t in valeurs.values() for vs in t.values())
+    resultat = {
+        "entities": len(premiers),
+        "joined_rows": joint_lignes,
+        "grouped_rows": groupe_lignes,
+        "joined_ms": joint_ms,
+        "grouped_ms": groupe_ms,
+        "values": attendues,
+        "dropped_values": attendues - rendues,
+        "same_value_count": obtenues == attendues
+    }
+    print(f"{nom}: {joint_lignes} ligne(s) jointes en {joint_ms} ms -> {groupe_lignes} regroupées en "
+          f"{groupe_ms} ms; {attendues - rendues}/{attendues} valeur(s) perdues par la première ligne"
+          + ("" if obtenues == attendues else " ⚠ valeurs différentes"))
+    return resultat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Listings multivalués: jointure contre requêtes regroupées")
+    parser.add_argument('--triples', type=int, default=200000)
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--extra', type=int, default=4, help="valeurs multivaluées ajoutées par entité")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='multivalued-results.json')
+    args = parser.parse_args(argv)
+
+    graph = Graph()
+    with tempfile.TemporaryDirectory(prefix='ws-multi-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        graph.parse(dataset)
+    enrichir(graph, args.extra, args.seed)
+
+    resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                 "triples": len(graph), "extra": args.extra, "listings": {}}
+    for nom, (cle, colonne, champ) in LISTINGS.items():
+        resultats["listings"][nom] = comparer(
+            graph, nom, COLLECTION_QUERIES[nom], cle, [colonne],
+            LISTING_QUERIES[nom], {champ: MULTI_VALUED[nom][champ]}, args.repeat)
+    resultats["listings"]["cross"] = comparer(
+        graph, "cross", CROSS_JOINED, 'activite', ['empreinte', 'transport'],
+        CROSS_BASE, CROSS_FACETS, args.repeat)
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Passage à l'échelle de l'évaluation SPARQL parallèle (1 à N processus).
+
+Charge une ontologie synthétique puis exécute des requêtes analytiques
+larges, d'abord avec l'évaluation RDFLib séquentielle, puis avec
+`ParallelEvaluator` pour 1, 2, 4... processus. Pour chaque configuration, le
+script vérifie que les résultats sont identiques et mesure la médiane des
+temps, l'accélération par rapport au séquentiel et le temps de construction
+de l'instantané en mémoire partagée.
+
+Usage:
+    python benchmarks/parallel_benchmark.py --triples 1000000 --workers 1,2,4,8
+    python benchmarks/parallel_benchmark.py --dataset benchmarks/data/onto-1m.nt --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ICI)
+sys.path.insert(0, os.path.join(ICI, '..', 'backend'))
+
+from generate_ontology import generer_fichier  # noqa: E402
+from run_benchmarks import PREFIXES  # noqa: E402
+
+# Requêtes larges: étoiles sur toutes les instances, jointures entre étoiles, agrégats
+QUERIES = {
+    'voyageurs_destinations': PREFIXES + """
+        SELECT ?p ?n ?d WHERE {
+            ?p ns:nomVoyageur ?n . ?p ns:choisitDestination ?d . ?d ns:nomDestination ?nd .
+        }""",
+    'prix_par_destination': PREFIXES + """
+        SELECT ?d (AVG(?prix) AS ?moyenne) (COUNT(?h) AS ?n) WHERE {
+            ?h ns:estSituéÀ ?d . ?h ns:prix ?prix .
+        } GROUP BY ?d""",
+    'empreintes_activites': PREFIXES + """
+        SELECT DISTINCT ?a ?e WHERE {
+            ?a ns:aEmpreinteCarbone ?ec . ?ec ns:empreinte ?e .
+            FILTER(?e < 5.0)
+        }""",
+    'types_instances': PREFIXES + """
+        SELECT ?t (COUNT(?s) AS ?n) WHERE { ?s rdf:type ?t } GROUP BY ?t"""
+}
+
+
+def chronometrer(fn, repeat):
+    durees = []
+    resultat = None
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        resultat = fn()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees), resultat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Accélération de l'évaluation SPARQL parallèle")
+    parser.add_argument('--triples', type=int, default=200000)
+    parser.add_argument('--dataset', help="fichier N-Triples existant à utiliser au lieu de générer")
+    parser.add_argument('--workers', default=','.join(str(w) for w in (1, 2, 4, 8) if w <= (os.cpu_count() or 1))
+                        or '1', help="nombres de processus à mesurer (liste)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='parallel-results.json')
+    args = parser.parse_args(argv)
+
+    from rdflib import Graph
+    from parallel_sparql import ParallelEvaluator
+
+    with tempfile.TemporaryDirectory(prefix='ws-par-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        graph = Graph()
+        graph.parse(dataset, format='nt')
+
+    def normaliser(valeur):
+        # Les agrégats flottants dépendent de l'ordre de sommation
+        try:
+            return f"{float(valeur):.9g}"
+        except ValueError:
+            return str(valeur)
+
+    def executer(requete):
+        return sorted(tuple(normaliser(x) for x in ligne) for ligne in graph.query(requete))
+
+    resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                 "triples": len(graph), "cpu_count": os.cpu_count(), "queries": {}}
+    references = {}
+    for nom, requete in QUERIES.items():
+        duree, references[nom] = chronometrer(lambda: executer(requete), args.repeat)
+        resultats["queries"][nom] = {"rows": len(references[nom]), "sequential_s": round(duree, 4), "parallel": {}}
+        print(f"{nom}: {len(references[nom])} lignes, séquentiel {duree:.3f} s")
+
+    for workers in (int(w) for w in args.workers.split(',')):
+        evaluateur = ParallelEvaluator(workers)
+        debut = time.perf_counter()
+        evaluateur.snapshot(graph, 0)
+        construction = time.perf_counter() - debut
+        print(f"▶ {workers} processus (instantané {construction:.2f} s)")
+        for nom, requete in QUERIES.items():
+            def parallele():
+                jeton = evaluateur.activate(graph, 0)
+                try:
+                    return executer(requete)
+                finally:
+                    evaluateur.deactivate(jeton)
+            parallele()  # démarrage des processus
+            duree, lignes = chronometrer(parallele, args.repeat)
+            entree = resultats["queries"][nom]
+            entree["parallel"][workers] = {
+                "median_s": round(duree, 4),
+                "speedup": round(entree["sequential_s"] / duree, 2) if duree else None,
+                "snapshot_s": round(construction, 2),
+                "identical": lignes == references[nom]
+            }
+            print(f"  {nom}: {duree:.3f} s (x{entree['parallel'][workers]['speedup']})"
+                  + ("" if lignes == references[nom] else " ⚠ résultats différents"))
+        evaluateur.close()
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
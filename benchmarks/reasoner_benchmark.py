@@ -0,0 +1,184 @@
+"""
+Requêtes sur faits matérialisés contre chemins de propriétés équivalents.
+
+Charge une ontologie synthétique et y ajoute des déclarations OWL et des
+faits pour chaque règle de `backend/reasoner.py`:
+
+- `ns:accueille owl:inverseOf ns:estSituéÀ` (déclaration seule: les
+  hébergements ont déjà leur `estSituéÀ`);
+- `ns:faitPartieDe`, transitive: chaque destination fait partie d'une zone,
+  chaque zone d'une zone plus large, sur `--depth` niveaux;
+- `ns:voisinDe`, symétrique: deux voisines par destination, dans un sens.
+
+Chaque requête est évaluée par RDFLib sur le graphe asserté avec un chemin
+de propriétés (`^ns:estSituéÀ`, `ns:faitPartieDe+`, `ns:voisinDe|^ns:voisinDe`),
+puis sur la vue assertés + inférés du raisonneur avec un simple motif. Le
+script vérifie que les deux donnent les mêmes lignes, et mesure aussi la
+matérialisation complète et la maintenance incrémentale (ajout semi-naïf,
+retrait DRed) d'une arête de la hiérarchie, comparée à une reconstruction.
+
+Usage:
+    python benchmarks/reasoner_benchmark.py --triples 200000 --depth 4 --output benchmarks/results/reasoner-200k.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ICI)
+sys.path.insert(0, os.path.join(ICI, '..', 'backend'))
+
+from rdflib import Graph, OWL, RDF, URIRef  # noqa: E402
+
+from generate_ontology import NS, generer_fichier  # noqa: E402
+from reasoner import Reasoner  # noqa: E402
+
+PREFIXES = f"PREFIX ns: <{NS}>\n"
+
+# nom -> (chemin de propriétés sur les faits assertés, motif sur la vue matérialisée)
+QUERIES = {
+    "inverse": (
+        "SELECT ?d ?h WHERE { ?d ^ns:estSituéÀ ?h }",
+        "SELECT ?d ?h WHERE { ?d ns:accueille ?h }"),
+    "transitive_all": (
+        "SELECT ?x ?z WHERE { ?x ns:faitPartieDe+ ?z }",
+        "SELECT ?x ?z WHERE { ?x ns:faitPartieDe ?z }"),
+    "transitive_bound": (
+        "SELECT ?h WHERE { ?h ns:estSituéÀ ?d . ?d ns:faitPartieDe+ ns:Zone_1_0 }",
+        "SELECT ?h WHERE { ?h ns:estSituéÀ ?d . ?d ns:faitPartieDe ns:Zone_1_0 }"),
+    "symmetric": (
+        "SELECT ?a ?b WHERE { ?a ns:voisinDe|^ns:voisinDe ?b }",
+        "SELECT ?a ?b WHERE { ?a ns:voisinDe ?b }"),
+    "combined": (
+        "SELECT ?v ?a WHERE { ?a ns:aPourLieu ?d . ?d ns:voisinDe|^ns:voisinDe ?e . "
+        "?e ns:faitPartieDe+ ns:Zone_2_0 . ?v ns:participeÀ ?a }",
+        "SELECT ?v ?a WHERE { ?a ns:aPourLieu ?d . ?d ns:voisinDe ?e . "
+        "?e ns:faitPartieDe ns:Zone_2_0 . ?v ns:participeÀ ?a }"),
+}
+
+
+def u(local):
+    return URIRef(NS + local)
+
+
+def enrichir(graph, depth, seed):
+    """Déclarations et faits des règles; retourne les arêtes de la hiérarchie"""
+    rng = random.Random(seed)
+    graph.add((u('accueille'), OWL.inverseOf, u('estSituéÀ')))
+    graph.add((u('faitPartieDe'), RDF.type, OWL.TransitiveProperty))
+    graph.add((u('voisinDe'), RDF.type, OWL.SymmetricProperty))
+
+    destinations = sorted(set(graph.subjects(u('nomDestination'), None)))
+    niveau, aretes = destinations, []
+    for profondeur in range(depth, 0, -1):
+        zones = [u(f"Zone_{profondeur}_{i}") for i in range(max(1, -(-len(niveau) // 8)))]
+        for i, noeud in enumerate(niveau):
+            aretes.append((noeud, u('faitPartieDe'), zones[i % len(zones)]))
+        niveau = zones
+    for arete in aretes:
+        graph.add(arete)
+    for d in destinations:
+        for voisine in rng.sample(destinations, min(2, len(destinations))):
+            if voisine != d:
+                graph.add((d, u('voisinDe'), voisine))
+    return aretes
+
+
+def chronometrer(graph, requete, repeat):
+    """(médiane en ms, lignes distinctes)"""
+    durees, lignes = [], None
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        lignes = set(graph.query(PREFIXES + requete))
+        durees.append(time.perf_counter() - debut)
+    return round(statistics.median(durees) * 1000, 3), lignes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Faits matérialisés contre chemins de propriétés")
+    parser.add_argument('--triples', type=int, default=200000)
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--depth', type=int, default=4, help="niveaux de zones au-dessus des destinations")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='reasoner-results.json')
+    args = parser.parse_args(argv)
+
+    graph = Graph()
+    with tempfile.TemporaryDirectory(prefix='ws-reason-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        graph.parse(dataset)
+    aretes = enrichir(graph, args.depth, args.seed)
+
+    regles = ['inverse', 'symmetric', 'transitive']
+    debut = time.perf_counter()
+    reasoner = Reasoner(graph, regles)
+    materialisation = round((time.perf_counter() - debut) * 1000, 3)
+    resultats = {
+        "dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+        "asserted_triples": len(graph),
+        "inferred_triples": len(reasoner.inferred),
+        "rules": regles,
+        "depth": args.depth,
+        "materialize_ms": materialisation,
+        "queries": {}
+    }
+    print(f"{len(graph)} triplets assertés, {len(reasoner.inferred)} inférés en {materialisation} ms")
+
+    for nom, (chemin, motif) in QUERIES.items():
+        chemin_ms, attendues = chronometrer(graph, chemin, args.repeat)
+        motif_ms, obtenues = chronometrer(reasoner.view, motif, args.repeat)
+        resultats["queries"][nom] = {
+            "rows": len(attendues),
+            "property_path_ms": chemin_ms,
+            "materialized_ms": motif_ms,
+            "speedup": round(chemin_ms / motif_ms, 2) if motif_ms else None,
+            "identical": attendues == obtenues
+        }
+        print(f"{nom}: {chemin_ms} ms (chemin) -> {motif_ms} ms (matérialisé), {len(attendues)} ligne(s)"
+              + ("" if attendues == obtenues else " ⚠ résultats différents"))
+
+    # Maintenance: retirer puis rétablir une arête haute de la hiérarchie
+    arete = aretes[-1]
+    debut = time.perf_counter()
+    graph.remove(arete)
+    retires = reasoner.apply([], [arete])[1]
+    retrait_ms = (time.perf_counter() - debut) * 1000
+    debut = time.perf_counter()
+    graph.add(arete)
+    ajoutes = reasoner.apply([arete], [])[0]
+    ajout_ms = (time.perf_counter() - debut) * 1000
+    debut = time.perf_counter()
+    reference = Reasoner(graph, regles)
+    reconstruction_ms = (time.perf_counter() - debut) * 1000
+    resultats["maintenance"] = {
+        "edge": [str(t) for t in arete],
+        "dred_remove_ms": round(retrait_ms, 3),
+        "dred_removed": len(retires),
+        "semi_naive_add_ms": round(ajout_ms, 3),
+        "semi_naive_added": len(ajoutes),
+        "rebuild_ms": round(reconstruction_ms, 3),
+        "identical_to_rebuild": set(reference.inferred) == set(reasoner.inferred)
+    }
+    print(f"maintenance: retrait {retrait_ms:.1f} ms ({len(retires)} faits), ajout {ajout_ms:.1f} ms "
+          f"({len(ajoutes)} faits), reconstruction {reconstruction_ms:.1f} ms"
+          + ("" if resultats["maintenance"]["identical_to_rebuild"] else " ⚠ différent de la reconstruction"))
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,349 @@
+"""
+Benchmarks reproductibles du backend Flask.
+
+Génère (ou réutilise) une ontologie synthétique, démarre l'application sur
+une copie du fichier puis exécute des charges scriptées via le client de test
+Flask: listings, statistiques, /api/query avec des requêtes SPARQL
+représentatives, mélange CRUD et questions en langage naturel (Gemini est
+remplacé par un stub déterministe, sans réseau).
+
+Les résultats (débit, percentiles de latence, RSS maximal) sont écrits dans
+un fichier JSON pour suivre les régressions d'une version à l'autre.
+
+Usage:
+    python benchmarks/run_benchmarks.py --triples 10000 --output benchmarks/results/bench-10k.json
+    python benchmarks/run_benchmarks.py --dataset benchmarks/data/onto-1m.nt --workloads listings,query
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+BACKEND = os.path.join(ICI, '..', 'backend')
+sys.path.insert(0, ICI)
+
+from generate_ontology import generer_fichier  # noqa: E402
+
+PREFIXES = """
+PREFIX ns: <http://www.semanticweb.org/lenovo/ontologies/2025/9/untitled-ontology-2#>
+PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+"""
+
+# Requêtes représentatives de ce qu'envoient le frontend et Gemini
+QUERIES = {
+    'hebergements_certifies': PREFIXES + """
+        SELECT ?h ?nom ?cert WHERE {
+            ?h rdf:type/rdfs:subClassOf* ns:Hébergement .
+            ?h ns:possèdeCertification ?c . ?c ns:nomCertification ?cert .
+            OPTIONAL { ?h ns:nomHebergement ?nom }
+        } LIMIT 500""",
+    'activites_faible_empreinte': PREFIXES + """
+        SELECT ?a ?nom ?e WHERE {
+            ?a ns:aEmpreinteCarbone ?ec . ?ec ns:empreinte ?e .
+            OPTIONAL { ?a ns:nomActivité ?nom }
+            FILTER(?e < 3.0)
+        } ORDER BY ?e LIMIT 200""",
+    'voyageurs_par_destination': PREFIXES + """
+        SELECT ?d (COUNT(?p) AS ?n) WHERE {
+            ?p ns:choisitDestination ?d .
+        } GROUP BY ?d ORDER BY DESC(?n) LIMIT 20""",
+    'prix_moyen_hebergement_par_destination': PREFIXES + """
+        SELECT ?d (AVG(?prix) AS ?moyenne) WHERE {
+            ?h ns:estSituéÀ ?d . ?h ns:prix ?prix .
+        } GROUP BY ?d LIMIT 50""",
+    'voyageur_point': PREFIXES + """
+        SELECT ?p ?age WHERE { ?p ns:nomVoyageur "Voyageur 7" . OPTIONAL { ?p ns:age ?age } }"""
+}
+
+LISTINGS = ['/api/destinations', '/api/hebergements', '/api/activites', '/api/transports',
+            '/api/services', '/api/nourritures', '/api/equipements', '/api/personnes',
+            '/api/certifications']
+
+
+class StubGemini:
+    """Remplace le modèle Gemini: réponses déterministes construites depuis la question
+
+    `latency` (secondes) simule l'aller-retour réseau de chaque appel.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def generate_content(self, prompt):
+        if self.latency:
+            time.sleep(self.latency)
+        match = re.search(r'Question(?: utilisateur)?: "?(.*?)"?\n', prompt)
+        question = match.group(1) if match else ''
+        return SimpleNamespace(text=self._repondre(prompt, question))
+
+    def _repondre(self, prompt, question):
+        if 'demande de relation' in prompt:
+            m = re.match(r'(.+?) va à (.+)', question)
+            return json.dumps({"sujet_type": "Personne", "sujet_nom": m.group(1), "relation": "choisitDestination",
+                               "objet_type": "Destination", "objet_nom": m.group(2)})
+        if 'demande de création' in prompt:
+            m = re.match(r'Ajoute une personne (\S+) qui a (\d+) ans', question)
+            return json.dumps({"type": "Personne", "attributes": {"nom": m.group(1), "age": int(m.group(2))}})
+        if 'demande de modification' in prompt:
+            m = re.match(r"Modifie l'âge de (\S+) à (\d+) ans", question)
+            return json.dumps({"type": "Personne", "nom": m.group(1), "attributes": {"age": int(m.group(2))}})
+        if 'demande de suppression' in prompt:
+            m = re.match(r'Supprime la personne (\S+)', question)
+            return json.dumps({"type": "Personne", "nom": m.group(1)})
+        return "```sparql\n" + QUERIES['hebergements_certifies'].strip() + "\n```"
+
+
+def percentile(valeurs, p):
+    if not valeurs:
+        return None
+    ordonnees = sorted(valeurs)
+    k = (len(ordonnees) - 1) * p / 100
+    bas = int(k)
+    haut = min(bas + 1, len(ordonnees) - 1)
+    return ordonnees[bas] + (ordonnees[haut] - ordonnees[bas]) * (k - bas)
+
+
+def peak_rss_mb():
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class Bench:
+    def __init__(self, app_module, iterations, concurrency, gemini_latency=0.0, batch_size=25):
+        self.app = app_module
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.gemini_latency = gemini_latency
+        self.batch_size = batch_size
+
+    def _mesurer(self, requetes, concurrent=False):
+        """Exécuter une liste de fonctions (client) -> réponse et mesurer chaque appel"""
+        latences, erreurs = [], 0
+
+        def executer(fn):
+            client = self.app.app.test_client()
+            debut = time.perf_counter()
+            reponse = fn(client)
+            return time.perf_counter() - debut, reponse.status_code
+
+        debut = time.perf_counter()
+        if concurrent and self.concurrency > 1:
+            with ThreadPoolExecutor(self.concurrency) as pool:
+                resultats = list(pool.map(executer, requetes))
+        else:
+            resultats = [executer(fn) for fn in requetes]
+        duree = time.perf_counter() - debut
+        for latence, statut in resultats:
+            latences.append(latence)
+            if statut >= 400:
+                erreurs += 1
+        return {
+            "requests": len(resultats),
+            "errors": erreurs,
+            "duration_s": round(duree, 4),
+            "throughput_rps": round(len(resultats) / duree, 2) if duree else None,
+            "latency_ms": {
+                "mean": round(sum(latences) / len(latences) * 1000, 3),
+                "p50": round(percentile(latences, 50) * 1000, 3),
+                "p90": round(percentile(latences, 90) * 1000, 3),
+                "p95": round(percentile(latences, 95) * 1000, 3),
+                "p99": round(percentile(latences, 99) * 1000, 3),
+                "max": round(max(latences) * 1000, 3)
+            },
+            "peak_rss_mb": round(peak_rss_mb(), 1)
+        }
+
+    def listings(self):
+        requetes = [lambda c, url=url: c.get(url) for _ in range(self.iterations) for url in LISTINGS]
+        return self._mesurer(requetes, concurrent=True)
+
+    def stats(self):
+        return self._mesurer([lambda c: c.get('/api/ontology/stats')] * self.iterations, concurrent=True)
+
+    def query(self):
+        requetes = [lambda c, q=q: c.post('/api/query', json={"query": q})
+                    for _ in range(self.iterations) for q in QUERIES.values()]
+        return self._mesurer(requetes, concurrent=True)
+
+    def crud(self):
+        ns = self.app.NS
+        requetes = []
+        for i in range(self.iterations):
+            nom = f"BenchDestination{i}"
+            requetes.append(lambda c, nom=nom: c.post('/api/entity/create', json={
+                "type": "Destination", "attributes": {"nom": nom, "pays": "Tunisie"}}))
+            requetes.append(lambda c, nom=nom: c.put('/api/entity/update', json={
+                "uri": str(ns[nom]), "attributes": {"pays": "France"}}))
+            requetes.append(lambda c, nom=nom: c.delete('/api/entity/delete', json={"uri": str(ns[nom])}))
+        return self._mesurer(requetes)
+
+    def _questions_nl(self, prefixe):
+        self.app.gemini_client.set(StubGemini(self.gemini_latency))
+        ns = self.app.NS
+        # Destination typée directement (la résolution par nom ne suit pas les sous-classes)
+        destination = next(str(nom) for s in self.app.g.subjects(self.app.RDF.type, ns.Destination)
+                           for nom in self.app.g.objects(s, ns.nomDestination))
+        questions = []
+        for i in range(self.iterations):
+            nom = f"{prefixe}{i}"
+            questions.extend((f"Ajoute une personne {nom} qui a 30 ans",
+                              f"{nom} va à {destination}",
+                              f"Modifie l'âge de {nom} à 31 ans",
+                              "Quels hébergements ont une certification ?",
+                              f"Supprime la personne {nom}"))
+        return questions
+
+    def nl(self):
+        questions = self._questions_nl("BenchVoyageur")
+        requetes = [lambda c, q=q: c.post('/api/nl-query', json={"question": q}) for q in questions]
+        resultat = self._mesurer(requetes)
+        resultat["questions_per_s"] = resultat["throughput_rps"]
+        return resultat
+
+    def nl_batch(self):
+        # Mêmes commandes que `nl`, envoyées par lots à /api/nl-query/batch
+        questions = self._questions_nl("BenchLot")
+        lots = [questions[i:i + self.batch_size] for i in range(0, len(questions), self.batch_size)]
+        requetes = [lambda c, lot=lot: c.post('/api/nl-query/batch', json={"questions": lot}) for lot in lots]
+        resultat = self._mesurer(requetes)
+        resultat["questions"] = len(questions)
+        resultat["questions_per_s"] = round(len(questions) / resultat["duration_s"], 2)
+        return resultat
+
+
+    def mixed(self):
+        # Écritures sur une classe (Nourriture) entre deux lectures de toutes les collections:
+        # mesure ce que l'invalidation sélective conserve dans les caches
+        ns = self.app.NS
+        requetes = []
+        for i in range(self.iterations):
+            nom = f"BenchNourriture{i}"
+            requetes.append(lambda c, nom=nom: c.post('/api/entity/create', json={
+                "type": "Nourriture", "attributes": {"nom": nom}}))
+            requetes.extend(lambda c, url=url: c.get(url) for url in LISTINGS)
+            requetes.append(lambda c, nom=nom: c.delete('/api/entity/delete', json={"uri": str(ns[nom])}))
+        return self._mesurer(requetes)
+
+
+WORKLOADS = ['listings', 'stats', 'query', 'crud', 'nl', 'nl_batch', 'mixed']
+
+
+def cache_delta(avant, apres):
+    """Consultations d'un cache pendant une charge, et taux avec une invalidation globale"""
+    delta = {k: apres[k] - avant[k] for k in ('hits', 'misses', 'survivals', 'invalidations', 'evictions')}
+    consultations = delta['hits'] + delta['misses']
+    delta['hit_rate'] = round(delta['hits'] / consultations, 4) if consultations else None
+    delta['global_invalidation_hit_rate'] = (
+        round((delta['hits'] - delta['survivals']) / consultations, 4) if consultations else None)
+    delta['entries'] = apres['entries']
+    return delta
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ICI,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks du backend sur une ontologie synthétique")
+    parser.add_argument('--triples', type=int, default=10000, help="taille de l'ontologie générée")
+    parser.add_argument('--dataset', help="fichier existant à utiliser au lieu de générer")
+    parser.add_argument('--workloads', default=','.join(WORKLOADS))
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=1, help="threads pour les charges de lecture")
+    parser.add_argument('--gemini-latency-ms', type=float, default=0.0,
+                        help="latence simulée de chaque appel Gemini (charges nl et nl_batch)")
+    parser.add_argument('--batch-size', type=int, default=25, help="questions par lot (charge nl_batch)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench-results.json')
+    args = parser.parse_args(argv)
+
+    travail = tempfile.mkdtemp(prefix='ws-bench-')
+    try:
+        # L'application écrit dans son fichier: toujours travailler sur une copie
+        dataset = os.path.join(travail, 'onto.nt')
+        if args.dataset:
+            dataset = os.path.join(travail, 'onto' + os.path.splitext(args.dataset)[1])
+            shutil.copy(args.dataset, dataset)
+            triplets = None
+        else:
+            triplets = generer_fichier(dataset, args.triples, 'nt', args.seed)
+
+        os.environ['ONTOLOGY_FILE'] = dataset
+        os.environ.pop('GEMINI_API_KEY', None)
+        # Débit du moteur: toutes les requêtes viennent du même client, sans limite d'admission
+        os.environ['ADMISSION'] = 'false'
+        sys.path.insert(0, BACKEND)
+        debut = time.perf_counter()
+        import app as app_module
+        chargement = time.perf_counter() - debut
+        app_module.app.logger.disabled = True
+
+        bench = Bench(app_module, args.iterations, args.concurrency,
+                      args.gemini_latency_ms / 1000, args.batch_size)
+        resultats = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                "triples": triplets if triplets is not None else len(app_module.g),
+                "iterations": args.iterations,
+                "gemini_latency_ms": args.gemini_latency_ms,
+                "concurrency": args.concurrency,
+                "bgp_cache_cells": app_module.default_tenant.bgp_cache.max_cells,
+                "response_cache_bytes": app_module.default_tenant.response_cache.max_cost,
+                "write_durability": app_module.WRITE_DURABILITY
+            },
+            "startup": {"load_s": round(chargement, 3), "peak_rss_mb": round(peak_rss_mb(), 1),
+                        "phases": app_module.startup.report.as_dict()["phases"]},
+            "workloads": {}
+        }
+        for nom in args.workloads.split(','):
+            nom = nom.strip()
+            if nom not in WORKLOADS:
+                parser.error(f"charge inconnue: {nom}")
+            print(f"▶ {nom}...", flush=True)
+            caches = {"bgp_cache": app_module.default_tenant.bgp_cache,
+                      "response_cache": app_module.default_tenant.response_cache}
+            avant = {nom_cache: cache.stats() for nom_cache, cache in caches.items()}
+            resultats["workloads"][nom] = getattr(bench, nom)()
+            w = resultats["workloads"][nom]
+            for nom_cache, cache in caches.items():
+                w[nom_cache] = cache_delta(avant[nom_cache], cache.stats())
+            print(f"  {w['throughput_rps']} req/s, p50 {w['latency_ms']['p50']} ms, "
+                  f"p99 {w['latency_ms']['p99']} ms, erreurs {w['errors']}, "
+                  f"cache BGP {w['bgp_cache']['hit_rate']}, réponses {w['response_cache']['hit_rate']} "
+                  f"(invalidation globale: {w['response_cache']['global_invalidation_hit_rate']})")
+
+        # Sauvegarder les écritures en attente avant de supprimer la copie de travail
+        app_module.default_tenant.writer.close()
+        resultats["persistence"] = app_module.default_tenant.writer.status()
+
+        dossier = os.path.dirname(os.path.abspath(args.output))
+        os.makedirs(dossier, exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, ensure_ascii=False)
+        print(f"Résultats écrits dans {args.output}")
+    finally:
+        shutil.rmtree(travail, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
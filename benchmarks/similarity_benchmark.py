@@ -0,0 +1,199 @@
+"""
+Index de similarité (/api/similar): construction, latence, rappel, mémoire.
+
+Deux modes:
+
+- graphe (par défaut): charge une ontologie synthétique (ou `--dataset`)
+  et construit l'index de chaque collection comme l'application
+  (`SimilarityIndex`, caractéristiques lues dans le graphe);
+- `--entities N`: une collection de N entités synthétiques dont les
+  caractéristiques sont tirées directement (noms à syllabes, classes,
+  paliers numériques, voisins de popularité log-uniforme), pour mesurer
+  l'index seul à 1M d'entités sans charger le graphe correspondant.
+
+Pour chaque collection: durée de construction, RSS ajoutée, latence de la
+recherche exacte (toutes les listes) sur `--queries` entités tirées au
+hasard, puis pour chaque budget de parcours (`--budgets`) la latence p50
+et p99 de `similar` et son rappel@k contre la recherche exacte (un
+résultat à égalité de score avec le k-ième exact compte comme trouvé). Le
+mode synthétique mesure aussi `--updates` revectorisations (upsert) et le
+rappel après celles-ci.
+
+Usage:
+    python benchmarks/similarity_benchmark.py --triples 200000 --output benchmarks/results/similarity-200k.json
+    python benchmarks/similarity_benchmark.py --entities 1000000 --output benchmarks/results/similarity-1m.json
+"""
+import argparse
+import gc
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ICI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ICI)
+sys.path.insert(0, os.path.join(ICI, '..', 'backend'))
+
+from rdflib import Graph, Namespace  # noqa: E402
+
+from generate_ontology import NS, generer_fichier  # noqa: E402
+from entity_types import EntityTypes  # noqa: E402
+from similarity import DEFAULT_BUDGET, ROOT_CLASSES, CollectionIndex, SimilarityIndex  # noqa: E402
+
+SYLLABES = ['ba', 'ri', 'lo', 'ne', 'ta', 'mo', 'su', 'ka', 'di', 'ze', 'pa', 'vi', 'go', 'ul', 'an', 'or']
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def mot(i):
+    """Mot de syllabes d'un indice: les indices proches partagent des trigrammes"""
+    lettres = ''
+    while True:
+        i, r = divmod(i, len(SYLLABES))
+        lettres += SYLLABES[r]
+        if not i:
+            return lettres
+
+
+def synthetiques(n, seed):
+    """(uri, {caractéristique: poids}) de n entités, dans la forme de similarity.Features"""
+    rng = random.Random(seed)
+    vocabulaire, cibles = max(16, n // 8), max(16, n // 20)
+    for i in range(n):
+        f = {f"c:Classe{rng.randrange(8)}": 1.0, 'c:Racine': 0.5}
+        for _ in range(rng.randint(1, 3)):
+            m = mot(int(vocabulaire ** rng.random()))
+            f['w:' + m] = 1.0
+            bornes = f"^{m}$"
+            for j in range(len(bornes) - 2):
+                f['t:' + bornes[j:j + 3]] = f.get('t:' + bornes[j:j + 3], 0.0) + 0.5
+        for prop in ('prix', 'duree'):
+            f[f"n:{prop}~{rng.randrange(24)}"] = 1.0
+        for _ in range(rng.randint(2, 8)):
+            prop, cible = rng.randrange(12), int(cibles ** rng.random())
+            f[f"o:p{prop}=e{cible}"] = 1.0
+            f[f"oc:p{prop}=C{cible % 15}"] = 0.5
+        f[f"in:p{rng.randrange(12)}"] = 1.0 + rng.random() * 3
+        yield f"e{i}", f
+
+
+def interroger(index, rng, requetes, k, budgets):
+    """Latence de la recherche exacte, puis latences (ms) et rappel@k de `similar` par budget"""
+    uris = rng.sample(sorted(index.lignes), min(requetes, len(index.lignes)))
+    exactes, references = [], []
+    for uri in uris:
+        debut = time.perf_counter()
+        references.append(index.similar(uri, k, exact=True))
+        exactes.append((time.perf_counter() - debut) * 1000)
+    mesure = {"queries": len(uris), "exact_p50_ms": round(statistics.median(exactes), 2), "budgets": {}}
+    for budget in budgets:
+        durees, rappels = [], []
+        for uri, exact in zip(uris, references):
+            debut = time.perf_counter()
+            resultat = index.similar(uri, k, budget)
+            durees.append((time.perf_counter() - debut) * 1000)
+            if exact:
+                seuil = exact[-1][1] - 1e-4
+                rappels.append(sum(1 for _, score in resultat if score >= seuil) / len(exact))
+        durees.sort()
+        mesure["budgets"][budget] = {
+            "p50_ms": round(statistics.median(durees), 2),
+            "p99_ms": round(durees[min(len(durees) - 1, int(len(durees) * 0.99))], 2),
+            f"recall_at_{k}": round(statistics.mean(rappels), 3) if rappels else None
+        }
+    return mesure
+
+
+def mode_graphe(args, rng):
+    graph = Graph()
+    with tempfile.TemporaryDirectory(prefix='ws-similar-') as travail:
+        dataset = args.dataset
+        if not dataset:
+            dataset = os.path.join(travail, 'onto.nt')
+            generer_fichier(dataset, args.triples, 'nt', args.seed)
+        graph.parse(dataset)
+    ns = Namespace(NS)
+    types = EntityTypes(graph, ns)
+    index = SimilarityIndex(ns, lambda: types.name_properties)
+    resultats = {"dataset": args.dataset or f"synthetic:{args.triples}:seed={args.seed}",
+                 "triples": len(graph), "collections": {}}
+    for nom in ROOT_CLASSES:
+        gc.collect()
+        rss = rss_mb()
+        collection = index._collection(graph, nom)
+        if not collection.lignes:
+            continue
+        mesure = dict(collection.stats(), rss_mb=round(rss_mb() - rss, 1))
+        mesure.update(interroger(collection, rng, args.queries, args.k, args.budgets))
+        resultats["collections"][nom] = mesure
+        afficher(nom, mesure, args.k)
+    return resultats
+
+
+def mode_synthetique(args, rng):
+    gc.collect()
+    rss = rss_mb()
+    index = CollectionIndex('synthetic')
+    index.build(synthetiques(args.entities, args.seed))
+    mesure = dict(index.stats(), rss_mb=round(rss_mb() - rss, 1))
+    mesure.update(interroger(index, rng, args.queries, args.k, args.budgets))
+    afficher('synthetic', mesure, args.k)
+
+    # Revectorisations: une entité existante reçoit les caractéristiques d'une autre
+    modeles = dict(synthetiques(args.updates, args.seed + 1))
+    cibles = rng.sample(sorted(index.lignes), args.updates)
+    debut = time.perf_counter()
+    for uri, features in zip(cibles, modeles.values()):
+        index.upsert(uri, features)
+    upsert_ms = (time.perf_counter() - debut) * 1000
+    apres = interroger(index, rng, args.queries, args.k, [DEFAULT_BUDGET])["budgets"][DEFAULT_BUDGET]
+    print(f"{args.updates} upsert(s) en {upsert_ms:.0f} ms ({upsert_ms / max(1, args.updates):.3f} ms chacun); "
+          f"ensuite p50 {apres['p50_ms']} ms, rappel@{args.k} {apres[f'recall_at_{args.k}']} (budget {DEFAULT_BUDGET})")
+    return {"entities": args.entities, "seed": args.seed,
+            "collections": {"synthetic": mesure},
+            "updates": {"count": args.updates, "total_ms": round(upsert_ms, 1), "after": apres}}
+
+
+def afficher(nom, mesure, k):
+    print(f"{nom}: {mesure['entities']} entité(s), construit en {mesure['build_ms']:.0f} ms "
+          f"(+{mesure['rss_mb']} Mo); recherche exacte p50 {mesure['exact_p50_ms']} ms")
+    for budget, m in mesure["budgets"].items():
+        print(f"  budget {budget}: similar p50 {m['p50_ms']} ms, p99 {m['p99_ms']} ms, rappel@{k} {m[f'recall_at_{k}']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index de similarité: construction, latence, rappel")
+    parser.add_argument('--triples', type=int, default=200000)
+    parser.add_argument('--dataset', help="fichier d'ontologie existant à utiliser au lieu de générer")
+    parser.add_argument('--entities', type=int, default=0,
+                        help="entités synthétiques (sans graphe) au lieu des collections d'une ontologie")
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--budgets', default=f"5000,{DEFAULT_BUDGET},50000",
+                        help="budgets de parcours comparés, séparés par des virgules")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='similarity-results.json')
+    args = parser.parse_args(argv)
+    args.budgets = [int(b) for b in args.budgets.split(',') if b.strip()]
+
+    rng = random.Random(args.seed)
+    resultats = mode_synthetique(args, rng) if args.entities else mode_graphe(args, rng)
+
+    dossier = os.path.dirname(os.path.abspath(args.output))
+    os.makedirs(dossier, exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(resultats, f, indent=2, ensure_ascii=False)
+    print(f"Résultats écrits dans {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
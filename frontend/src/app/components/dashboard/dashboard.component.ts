@@ -3,6 +3,25 @@ import { CommonModule } from '@angular/common';
 import { Subscription } from 'rxjs';
 import { OntologyService, OntologyStats, Destination, Hebergement, Activite, Transport, Service, Nourriture, Equipement, Personne, Certification } from '../../services/ontology.service';
 import { DataRefreshService } from '../../services/data-refresh.service';
+import { ChangeStreamService, GraphChange, ChangedTriple } from '../../services/change-stream.service';
+
+// Propriétés de données recopiées telles quelles dans les listes du dashboard
+const FIELD_BY_PREDICATE: { [predicate: string]: string } = {
+  nomDestination: 'nom',
+  nomHebergement: 'nom',
+  nomActivité: 'nom',
+  nomVoyageur: 'nom',
+  nomService: 'nom',
+  nomNourriture: 'nom',
+  nomEquipement: 'nom',
+  nomCertification: 'nom',
+  age: 'age',
+  duree: 'duree',
+  prix: 'prix',
+  dateValidite: 'dateValidite'
+};
+
+const NUMERIC_FIELDS = ['age', 'duree', 'prix'];
 
 @Component({
   selector: 'app-dashboard',
@@ -26,10 +45,12 @@ export class DashboardComponent implements OnInit, OnDestroy {
   apiStatus: string = 'Vérification...';
   
   private refreshSubscription?: Subscription;
+  private changesSubscription?: Subscription;
 
   constructor(
     private ontologyService: OntologyService,
-    private dataRefreshService: DataRefreshService
+    private dataRefreshService: DataRefreshService,
+    private changeStreamService: ChangeStreamService
   ) { }
 
   ngOnInit(): void {
@@ -41,13 +62,98 @@ export class DashboardComponent implements OnInit, OnDestroy {
       console.log('🔄 Rafraîchissement des données du dashboard...');
       this.loadData();
     });
+
+    // Appliquer les deltas du backend au lieu de tout recharger
+    this.changesSubscription = this.changeStreamService.changes$.subscribe((change) => {
+      this.applyChange(change);
+    });
   }
   
   ngOnDestroy(): void {
-    // Nettoyer la souscription
+    // Nettoyer les souscriptions
     if (this.refreshSubscription) {
       this.refreshSubscription.unsubscribe();
     }
+    if (this.changesSubscription) {
+      this.changesSubscription.unsubscribe();
+    }
+  }
+
+  applyChange(change: GraphChange): void {
+    const reload = new Set<string>();
+
+    for (const entity of change.entities) {
+      const collection = entity.collection;
+      if (!collection || !Array.isArray((this as any)[collection])) {
+        // Empreintes carbone: champs dérivés des activités et transports
+        if (entity.types.includes('EmpreinteCarbone')) {
+          reload.add('activites');
+          reload.add('transports');
+        }
+        continue;
+      }
+
+      let list: any[] = (this as any)[collection];
+      if (entity.deleted) {
+        list = list.filter((item) => item.uri !== entity.uri);
+      } else {
+        let item = list.find((i) => i.uri === entity.uri);
+        if (!item) {
+          item = { uri: entity.uri };
+          list = [...list, item];
+        }
+        const triples = (t: ChangedTriple) => t.s === entity.uri;
+        for (const t of change.removed.filter(triples)) {
+          const predicate = this.extractClassName(t.p);
+          const field = FIELD_BY_PREDICATE[predicate];
+          if (field && item[field] === this.termValue(field, t)) {
+            item[field] = null;
+          } else if (predicate === 'possèdeCertification' || predicate === 'aEmpreinteCarbone') {
+            reload.add(collection);
+          }
+        }
+        for (const t of change.added.filter(triples)) {
+          const predicate = this.extractClassName(t.p);
+          const field = FIELD_BY_PREDICATE[predicate];
+          if (field) {
+            item[field] = this.termValue(field, t);
+          } else if (predicate === 'possèdeCertification' || predicate === 'aEmpreinteCarbone') {
+            reload.add(collection);
+          }
+        }
+      }
+      (this as any)[collection] = list;
+
+      // Le nom d'une certification est recopié dans les hébergements
+      if (collection === 'certifications') {
+        reload.add('hebergements');
+      }
+    }
+
+    // Les compteurs de l'ontologie sont un petit objet: les relire suffit
+    this.ontologyService.getStats().subscribe({
+      next: (stats) => this.stats = stats,
+      error: (err) => console.error('Erreur stats:', err)
+    });
+    reload.forEach((collection) => this.reloadCollection(collection));
+  }
+
+  private termValue(field: string, triple: ChangedTriple): any {
+    return NUMERIC_FIELDS.includes(field) ? Number(triple.o.value) : triple.o.value;
+  }
+
+  private reloadCollection(collection: string): void {
+    const loaders: { [key: string]: () => any } = {
+      hebergements: () => this.ontologyService.getHebergements(),
+      activites: () => this.ontologyService.getActivites(),
+      transports: () => this.ontologyService.getTransports()
+    };
+    if (loaders[collection]) {
+      loaders[collection]().subscribe({
+        next: (items: any[]) => (this as any)[collection] = items,
+        error: (err: any) => console.error(`Erreur ${collection}:`, err)
+      });
+    }
   }
 
   checkApiHealth(): void {
@@ -2,7 +2,6 @@ import { Component, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormsModule } from '@angular/forms';
 import { OntologyService, QueryResult } from '../../services/ontology.service';
-import { DataRefreshService } from '../../services/data-refresh.service';
 
 @Component({
   selector: 'app-query',
@@ -37,10 +36,7 @@ export class QueryComponent implements OnInit {
     '➕ Ajoute un service [nom] à [prix] euros'
   ];
 
-  constructor(
-    private ontologyService: OntologyService,
-    private dataRefreshService: DataRefreshService
-  ) { }
+  constructor(private ontologyService: OntologyService) { }
 
   ngOnInit(): void { }
 
@@ -70,10 +66,7 @@ export class QueryComponent implements OnInit {
             this.crudAction = response.action;
             this.successMessage = response.message;
             
-            // Notifier le dashboard pour rafraîchir les données
-            setTimeout(() => {
-              this.dataRefreshService.triggerRefresh();
-            }, 500);
+            // Le dashboard reçoit le delta via le flux de changements du backend
             
             // Afficher les détails de l'entité si disponibles
             if (response.entity) {
@@ -0,0 +1,81 @@
+import { Injectable, NgZone, OnDestroy } from '@angular/core';
+import { Subject } from 'rxjs';
+import { DataRefreshService } from './data-refresh.service';
+
+export interface RdfTerm {
+  type: 'uri' | 'literal' | 'bnode';
+  value: string;
+  datatype?: string;
+  lang?: string;
+}
+
+export interface ChangedTriple {
+  s: string;
+  p: string;
+  o: RdfTerm;
+}
+
+export interface ChangedEntity {
+  uri: string;
+  types: string[];
+  collection: string | null;
+  deleted: boolean;
+}
+
+export interface GraphChange {
+  generation: number;
+  timestamp: number;
+  entities: ChangedEntity[];
+  added: ChangedTriple[];
+  removed: ChangedTriple[];
+}
+
+@Injectable({
+  providedIn: 'root'
+})
+export class ChangeStreamService implements OnDestroy {
+  private apiUrl = 'http://localhost:5000/api';
+  private source?: EventSource;
+  private lastGeneration: number | null = null;
+  private changesSubject = new Subject<GraphChange>();
+
+  // Deltas du graphe diffusés par le backend (Server-Sent Events)
+  changes$ = this.changesSubject.asObservable();
+
+  constructor(private zone: NgZone, private dataRefreshService: DataRefreshService) {
+    this.connect();
+  }
+
+  ngOnDestroy(): void {
+    this.source?.close();
+  }
+
+  private connect(): void {
+    const since = this.lastGeneration !== null ? `?since=${this.lastGeneration}` : '';
+    this.source = new EventSource(`${this.apiUrl}/events${since}`);
+
+    this.source.addEventListener('hello', (event: MessageEvent) => {
+      if (this.lastGeneration === null) {
+        this.lastGeneration = JSON.parse(event.data).generation;
+      }
+    });
+
+    this.source.addEventListener('change', (event: MessageEvent) => {
+      const change: GraphChange = JSON.parse(event.data);
+      this.lastGeneration = change.generation;
+      this.zone.run(() => this.changesSubject.next(change));
+    });
+
+    // Le backend ne peut plus rejouer depuis notre génération: recharger tout
+    this.source.addEventListener('resync', (event: MessageEvent) => {
+      this.lastGeneration = JSON.parse(event.data).generation;
+      this.zone.run(() => this.dataRefreshService.triggerRefresh());
+    });
+
+    // Reconnexion manuelle pour reprendre depuis la dernière génération reçue
+    this.source.onerror = () => {
+      this.source?.close();
+      setTimeout(() => this.connect(), 3000);
+    };
+  }
+}
@@ -1,6 +1,67 @@
 import { Injectable } from '@angular/core';
-import { HttpClient } from '@angular/common/http';
-import { Observable } from 'rxjs';
+import { HttpClient, HttpHeaders, HttpResponse } from '@angular/common/http';
+import { Observable, map } from 'rxjs';
+
+// Format compact négocié avec le backend (backend/encoding.py): une liste de
+// valeurs par champ et les URI en CURIE. La compression gzip/br est gérée par
+// le navigateur.
+const COLUMNAR = 'application/vnd.ws.columnar+json';
+const COMPACT_HEADERS = new HttpHeaders({ Accept: `${COLUMNAR}, application/json;q=0.9` });
+
+interface ColumnarTable {
+  fields: string[];
+  columns: any[][];
+  curies: string[];
+  prefixes: { [prefix: string]: string };
+}
+
+function isColumnarTable(value: any): value is ColumnarTable {
+  return value !== null && typeof value === 'object'
+    && Array.isArray(value.fields) && Array.isArray(value.columns);
+}
+
+function expandTable(table: ColumnarTable): any[] {
+  const columns = table.columns.map((values, i) => {
+    if (!table.curies.includes(table.fields[i])) {
+      return values;
+    }
+    return values.map((value: string | null) => {
+      if (value === null) {
+        return null;
+      }
+      const separator = value.indexOf(':');
+      return table.prefixes[value.slice(0, separator)] + value.slice(separator + 1);
+    });
+  });
+  const count = columns.length ? columns[0].length : 0;
+  const rows = new Array(count);
+  for (let r = 0; r < count; r++) {
+    const row: any = {};
+    table.fields.forEach((field, i) => row[field] = columns[i][r]);
+    rows[r] = row;
+  }
+  return rows;
+}
+
+// Réponse en colonnes -> forme JSON habituelle (listes d'objets)
+function decodeColumnar(body: any): any {
+  if (isColumnarTable(body)) {
+    return expandTable(body);
+  }
+  if (body !== null && typeof body === 'object' && !Array.isArray(body)) {
+    const decoded: any = {};
+    for (const key of Object.keys(body)) {
+      decoded[key] = isColumnarTable(body[key]) ? expandTable(body[key]) : body[key];
+    }
+    return decoded;
+  }
+  return body;
+}
+
+function decodeResponse<T>(response: HttpResponse<any>): T {
+  const contentType = response.headers.get('Content-Type') || '';
+  return (contentType.startsWith(COLUMNAR) ? decodeColumnar(response.body) : response.body) as T;
+}
 
 export interface OntologyStats {
   classes: number;
@@ -18,7 +79,9 @@ export interface Hebergement {
   uri: string;
   nom: string | null;
   type: string | null;
+  // Première certification (ancien champ) et toutes les certifications
   certification: string | null;
+  certifications: string[];
 }
 
 export interface Activite {
@@ -26,6 +89,7 @@ export interface Activite {
   nom: string | null;
   duree: number | null;
   empreinte: number | null;
+  empreintes: number[];
   type: string | null;
 }
 
@@ -33,6 +97,7 @@ export interface Transport {
   uri: string;
   type: string | null;
   empreinte: number | null;
+  empreintes: number[];
 }
 
 export interface Service {
@@ -81,6 +146,16 @@ export class OntologyService {
 
   constructor(private http: HttpClient) { }
 
+  private getCompact<T>(path: string): Observable<T> {
+    return this.http.get(`${this.apiUrl}${path}`, { headers: COMPACT_HEADERS, observe: 'response' })
+      .pipe(map(response => decodeResponse<T>(response)));
+  }
+
+  private postCompact<T>(path: string, body: any): Observable<T> {
+    return this.http.post(`${this.apiUrl}${path}`, body, { headers: COMPACT_HEADERS, observe: 'response' })
+      .pipe(map(response => decodeResponse<T>(response)));
+  }
+
   getHealth(): Observable<any> {
     return this.http.get(`${this.apiUrl}/health`);
   }
@@ -90,46 +165,46 @@ export class OntologyService {
   }
 
   getDestinations(): Observable<Destination[]> {
-    return this.http.get<Destination[]>(`${this.apiUrl}/destinations`);
+    return this.getCompact<Destination[]>('/destinations');
   }
 
   getHebergements(): Observable<Hebergement[]> {
-    return this.http.get<Hebergement[]>(`${this.apiUrl}/hebergements`);
+    return this.getCompact<Hebergement[]>('/hebergements');
   }
 
   getActivites(): Observable<Activite[]> {
-    return this.http.get<Activite[]>(`${this.apiUrl}/activites`);
+    return this.getCompact<Activite[]>('/activites');
   }
 
   getTransports(): Observable<Transport[]> {
-    return this.http.get<Transport[]>(`${this.apiUrl}/transports`);
+    return this.getCompact<Transport[]>('/transports');
   }
 
   getServices(): Observable<Service[]> {
-    return this.http.get<Service[]>(`${this.apiUrl}/services`);
+    return this.getCompact<Service[]>('/services');
   }
 
   getNourritures(): Observable<Nourriture[]> {
-    return this.http.get<Nourriture[]>(`${this.apiUrl}/nourritures`);
+    return this.getCompact<Nourriture[]>('/nourritures');
   }
 
   getEquipements(): Observable<Equipement[]> {
-    return this.http.get<Equipement[]>(`${this.apiUrl}/equipements`);
+    return this.getCompact<Equipement[]>('/equipements');
   }
 
   getPersonnes(): Observable<Personne[]> {
-    return this.http.get<Personne[]>(`${this.apiUrl}/personnes`);
+    return this.getCompact<Personne[]>('/personnes');
   }
 
   getCertifications(): Observable<Certification[]> {
-    return this.http.get<Certification[]>(`${this.apiUrl}/certifications`);
+    return this.getCompact<Certification[]>('/certifications');
   }
 
   executeQuery(query: string): Observable<QueryResult> {
-    return this.http.post<QueryResult>(`${this.apiUrl}/query`, { query });
+    return this.postCompact<QueryResult>('/query', { query });
   }
 
   askQuestion(question: string): Observable<QueryResult> {
-    return this.http.post<QueryResult>(`${this.apiUrl}/nl-query`, { question });
+    return this.postCompact<QueryResult>('/nl-query', { question });
   }
 }
@@ -1,4 +1,6 @@
 # Script pour charger automatiquement l'ontologie dans Fuseki
+# Le chargement est fait par backend/fuseki_loader.py (lots paralleles, reprise apres echec),
+# utilisable aussi sous Linux et macOS: python backend/fuseki_loader.py ws.rdf
 
 $rdfFile = "$PWD\ws.rdf"
 $fusekiEndpoint = "http://localhost:3030/tourisme/data"
@@ -25,28 +27,19 @@ try {
     exit 1
 }
 
-# Charger le fichier RDF
+# Charger le fichier RDF par lots (relancer le script reprend un chargement interrompu)
 Write-Host "Upload du fichier RDF..." -ForegroundColor Yellow
 
-try {
-    $headers = @{
-        "Content-Type" = "application/rdf+xml"
-    }
-    
-    $rdfContent = Get-Content -Path $rdfFile -Raw
-    
-    Invoke-RestMethod -Uri $fusekiEndpoint `
-                      -Method POST `
-                      -Headers $headers `
-                      -Body $rdfContent
-    
+python "$PWD\backend\fuseki_loader.py" $rdfFile --endpoint $fusekiEndpoint @args
+
+if ($LASTEXITCODE -eq 0) {
     Write-Host ""
     Write-Host "SUCCES: Ontologie chargee avec succes dans Fuseki!" -ForegroundColor Green
     Write-Host "Interface web: http://localhost:3030" -ForegroundColor Cyan
     Write-Host "Dataset: /tourisme" -ForegroundColor Cyan
     Write-Host "Vous pouvez maintenant executer des requetes SPARQL" -ForegroundColor Yellow
-} catch {
-    Write-Host "ERREUR lors du chargement: $_" -ForegroundColor Red
+} else {
+    Write-Host "ERREUR lors du chargement (relancez le script pour reprendre)" -ForegroundColor Red
     Write-Host ""
     Write-Host "Solution alternative:" -ForegroundColor Yellow
     Write-Host "1. Ouvrez http://localhost:3030" -ForegroundColor White
@@ -54,4 +47,5 @@ try {
     Write-Host "3. Selectionnez le dataset tourisme" -ForegroundColor White
     Write-Host "4. Cliquez sur upload files" -ForegroundColor White
     Write-Host "5. Uploadez le fichier ws.rdf" -ForegroundColor White
+    exit 1
 }